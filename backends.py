@@ -0,0 +1,434 @@
+import json
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+import sql_engine
+import table_sync
+from sql_engine import DATE_COLUMN, INPUT_DATE_FORMATS, NAME_PATTERN
+
+## Backend-native table handle (pd.DataFrame for pandas, temp table name for DuckDB)
+Table = Any
+
+
+class PipelineBackend(ABC):
+    """
+    Execution backend interface for the ingestion pipeline (see `ingestion.run_pipeline()`)
+
+    Every step takes & returns a backend-native `Table`, so the same pipeline runs on
+    pandas (in memory) or an out-of-core engine without touching the step order.
+    """
+    name = "base"
+
+    @abstractmethod
+    def read_source(self, source_file: str, verbose: bool = False) -> Iterable[Table]:
+        """Read a source file into one table per roster / chunk"""
+
+    @abstractmethod
+    def drop_nulls(self, table: Table) -> Tuple[Table, int]:
+        """Drop rows with any null value - returns the table & the dropped row count"""
+
+    @abstractmethod
+    def validate(self, table: Table, title: str = "UNKNOWN", verbose: bool = False) -> bool:
+        """Table-level validation, same rules as `validate_data()`"""
+
+    @abstractmethod
+    def parse(self, table: Table, date_columns: Optional[Tuple[str, ...]] = None, verbose: bool = False) -> Table:
+        """Normalize dates to `%Y-%m-%d` and states to full names"""
+
+    @abstractmethod
+    def preview(self, table: Table, rows: int = 5) -> pd.DataFrame:
+        """First rows as a pandas DataFrame, for logging"""
+
+    @abstractmethod
+    def concat(self, tables: List[Table]) -> Table:
+        """Stack parsed tables, aligning columns by name"""
+
+    @abstractmethod
+    def standardize(self, table: Table) -> Table:
+        """Rename roster columns to `std_member_info` columns & drop `Age`/`Gender`"""
+
+    @abstractmethod
+    def count(self, table: Table) -> int:
+        """Row count"""
+
+    @abstractmethod
+    def duplicate_count(self, table: Table) -> int:
+        """Number of distinct rows occurring more than once"""
+
+    @abstractmethod
+    def dedupe(self, table: Table) -> Table:
+        """Drop exact duplicate rows"""
+
+    def combine(self, tables: Iterable[Table], count_duplicates: bool = False) -> Tuple[Table, int, Optional[int]]:
+        """
+        Stack & dedupe standardized tables
+
+        Returns the unique table, the stacked row count & the number of distinct duplicated rows
+        (None unless `count_duplicates`). Backends with a memory budget override this to stream.
+        """
+        stacked = self.concat(list(tables))
+        row_count = self.count(stacked)
+        duplicate_count = self.duplicate_count(stacked) if count_duplicates else None
+        return self.dedupe(stacked), row_count, duplicate_count
+
+    @abstractmethod
+    def filter_window(self, table: Table, window: Tuple[str, str]) -> Table:
+        """Keep rows whose eligibility period overlaps the inclusive `window`"""
+
+    @abstractmethod
+    def write(self, table: Table, table_name: str, conn: sqlite3.Connection, cursor: sqlite3.Cursor,
+              overwrite: bool = False, verbose: bool = False) -> Dict[str, int]:
+        """Union-write (or overwrite) `table_name` in the SQLite target"""
+
+    def close(self) -> None:
+        """Release backend resources"""
+        pass
+
+
+class DuckDBBackend(PipelineBackend):
+    """
+    Out-of-core backend on an embedded DuckDB database
+
+    Intermediate tables live in DuckDB, which runs on all cores and spills to `spill_dir`
+    once `memory_limit` is reached. SQLite rows move in & out in Arrow batches of `batch_size`,
+    so Python never holds more than one batch.
+
+    Parameters
+    ----------
+    state_mapper : Dict[str, str]
+        Abbreviation -> full state name (`STATE_MAPPER`)
+    known_payer : set
+        Expected payer values (`KNOWN_PAYER`)
+    roster_query : Callable[[str, List[str]], Tuple[str, tuple]]
+        Per-table roster read for `.db` sources (`build_roster_query()`)
+    projected_column : Tuple[str, ...]
+        Columns read from columnar sources (`PROJECTED_COLUMN`)
+    required_column : Tuple[str, ...]
+        Expected schema of row sources (`REQUIRED_COLUMN`)
+    spill_dir : str, optional
+        Directory for DuckDB's spill files - a temporary directory if None
+    memory_limit : str, optional
+        DuckDB memory limit (e.g. "4GB") - DuckDB's default (80% of RAM) if None
+    threads : int, optional
+        Worker threads, by default all cores
+    batch_size : int, optional
+        Rows per SQLite <-> DuckDB batch, by default 100_000
+    log : Callable[..., None], optional
+        Logging function taking `styled_log()` keywords, by default `print`
+    """
+    name = "duckdb"
+
+    def __init__(self, state_mapper: Dict[str, str], known_payer: set,
+                 roster_query: Callable[[str, List[str]], Tuple[str, tuple]],
+                 projected_column: Tuple[str, ...], required_column: Tuple[str, ...],
+                 spill_dir: Optional[str] = None, memory_limit: Optional[str] = None,
+                 threads: Optional[int] = None, batch_size: int = 100_000,
+                 log: Optional[Callable[..., None]] = None):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("The duckdb backend requires `pip install duckdb`.") from e
+
+        self._spill_tmp = None if spill_dir else tempfile.TemporaryDirectory(prefix="duckdb-spill-")
+        config = {
+            "temp_directory": spill_dir or self._spill_tmp.name,
+            "threads": threads or os.cpu_count() or 1,
+            "preserve_insertion_order": False, ## Lets large DISTINCT/EXCEPT stream & spill
+        }
+        if memory_limit:
+            config["memory_limit"] = memory_limit
+        self.con = duckdb.connect(database=":memory:", config=config)
+
+        self.known_payer = known_payer
+        self.roster_query = roster_query
+        self.projected_column = projected_column
+        self.required_column = required_column
+        self.batch_size = batch_size
+        self.log = log or (lambda message, **kwargs: print(message))
+        self._counter = 0
+
+        self.con.execute("CREATE TEMP TABLE state_lookup (abbreviation VARCHAR, name VARCHAR);")
+        self.con.executemany("INSERT INTO state_lookup VALUES (?, ?);", list(state_mapper.items()))
+
+    ## Helpers
+    def _new_table(self) -> str:
+        self._counter += 1
+        return f"t{self._counter}"
+
+    def _columns(self, table: str) -> List[str]:
+        return [row[0] for row in self.con.execute(f"DESCRIBE {table};").fetchall()]
+
+    def _create(self, select: str, params: Optional[list] = None) -> str:
+        name = self._new_table()
+        self.con.execute(f"CREATE TEMP TABLE {name} AS {select};", params or [])
+        return name
+
+    def _load_sqlite(self, cursor: sqlite3.Cursor, query: str, params: tuple = ()) -> str:
+        """Stream a SQLite query into a DuckDB VARCHAR table, one Arrow batch at a time"""
+        cursor.execute(query, params)
+        columns = [desc[0] for desc in cursor.description]
+        name = self._new_table()
+        self.con.execute(
+            f"CREATE TEMP TABLE {name} ({', '.join(f'{sql_engine.quote(col)} VARCHAR' for col in columns)});"
+        )
+        while True:
+            rows = cursor.fetchmany(self.batch_size)
+            if not rows:
+                break
+            batch = pa.table({
+                col: pa.array([None if value is None else str(value) for value in values], pa.string())
+                for col, values in zip(columns, zip(*rows))
+            })
+            self.con.register("sqlite_batch", batch)
+            self.con.execute(f"INSERT INTO {name} SELECT * FROM sqlite_batch;")
+            self.con.unregister("sqlite_batch")
+        return name
+
+    def _as_text(self, column: str) -> str:
+        return f"CAST({sql_engine.quote(column)} AS VARCHAR)"
+
+    ## Interface
+    def read_source(self, source_file: str, verbose: bool = False) -> List[str]:
+        path = Path(source_file)
+        ext = path.suffix.lstrip('.').lower()
+
+        if ext in ("csv", "txt"):
+            tables = [self._create("SELECT * FROM read_csv(?, header = true, all_varchar = true)", [str(path)])]
+        elif ext == "json":
+            with open(path, "r", encoding="utf-8") as f:
+                tables = [self.from_pandas(pd.json_normalize(json.load(f)))]
+        elif ext == "parquet":
+            select = ", ".join(sql_engine.quote(col) for col in self.projected_column)
+            tables = [self._create(f"SELECT {select} FROM read_parquet(?)", [str(path)])]
+        elif ext in ("arrow", "feather", "ipc"):
+            import pyarrow.dataset as ds
+            dataset = ds.dataset(str(path), format="ipc")
+            self.con.register("arrow_source", dataset) ## Scanned lazily with projection pushdown
+            select = ", ".join(sql_engine.quote(col) for col in self.projected_column)
+            tables = [self._create(f"SELECT {select} FROM arrow_source")]
+            self.con.unregister("arrow_source")
+        elif ext == "db":
+            with sqlite3.connect(path) as source:
+                cursor = source.cursor()
+                roster_tables = [row[0] for row in cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'roster^_%' ESCAPE '^';"
+                )]
+                tables = []
+                for tab in roster_tables:
+                    query, params = self.roster_query(tab, sql_engine.table_columns(source, tab))
+                    tables.append(self._load_sqlite(cursor, query, params))
+        else:
+            raise ValueError(f"Unsupported file extension: .{ext}")
+
+        ## Row formats must match the roster schema, projected sources must cover the kept columns
+        for table in tables:
+            columns = set(self._columns(table))
+            if ext in ("csv", "txt", "json") and columns != set(self.required_column):
+                raise ValueError("Schema mismatch.")
+            if not set(self.projected_column) <= columns:
+                raise ValueError("Schema mismatch.")
+        if verbose:
+            self.log(f"[read_file] Read {len(tables)} tables into DuckDB.")
+        return tables
+
+    def from_pandas(self, df: pd.DataFrame) -> str:
+        self.con.register("pandas_source", df)
+        name = self._create("SELECT * FROM pandas_source")
+        self.con.unregister("pandas_source")
+        return name
+
+    def drop_nulls(self, table: str) -> Tuple[str, int]:
+        not_null = " AND ".join(f"{sql_engine.quote(col)} IS NOT NULL" for col in self._columns(table))
+        total = self.count(table)
+        kept = self._create(f"SELECT * FROM {table} WHERE {not_null}")
+        self.con.execute(f"DROP TABLE {table};")
+        return kept, total - self.count(kept)
+
+    def validate(self, table: str, title: str = "UNKNOWN", verbose: bool = False) -> bool:
+        columns = set(self._columns(table))
+        q = sql_engine.quote
+
+        def converts(col: str) -> str:
+            return " OR ".join(f"try_strptime({self._as_text(col)}, '{fmt}') IS NOT NULL" for fmt in INPUT_DATE_FORMATS)
+
+        checks = {
+            "Person_Id": f"regexp_full_match({q('Person_Id')}, '[0-9]{{8}}')",
+            "First_Name": f"regexp_full_match({q('First_Name')}, $name)",
+            "Last_Name": f"regexp_full_match({q('Last_Name')}, $name)",
+            "Dob": converts("Dob"),
+            "Age": f"regexp_full_match({q('Age')}, '[0-9]+')",
+            "Gender": f"{q('Gender')} IN ('Male', 'Female')",
+            "State": f"lower({q('State')}) IN (SELECT lower(abbreviation) FROM state_lookup UNION SELECT lower(name) FROM state_lookup)",
+            "City": f"regexp_full_match({q('City')}, $name)",
+            "Zip": f"regexp_full_match({q('Zip')}, '[0-9]{{5}}')",
+            "eligibility_start_date": converts("eligibility_start_date"),
+            "eligibility_end_date": converts("eligibility_end_date"),
+        }
+        ## `Age`/`Gender` are absent after projection - nothing to check
+        checks = {col: rule for col, rule in checks.items() if col in columns}
+        format_checks = {
+            col: f"try_strptime({self._as_text(col)}, '%Y-%m-%d') IS NOT NULL" for col in DATE_COLUMN
+        }
+        aggregates = ", ".join(
+            f"coalesce(bool_and({rule}), true)" for rule in list(checks.values()) + list(format_checks.values())
+        )
+        flags = self.con.execute(f"SELECT {aggregates} FROM {table};", {"name": NAME_PATTERN}).fetchone()
+        valid = dict(zip(checks, flags[:len(checks)]))
+        format_match = dict(zip(format_checks, flags[len(checks):]))
+
+        payer_list = ", ".join(f"'{payer}'" for payer in sorted(self.known_payer))
+        unexpected_payer = {row[0] for row in self.con.execute(
+            f"SELECT DISTINCT payer FROM {table} WHERE payer NOT IN ({payer_list});"
+        ).fetchall()}
+
+        if verbose:
+            self.log(f"\t=== Table {title} Validation ===", theme="CYAN", bold=True)
+            for col, is_valid in valid.items():
+                message = f"\t\tAll `{col}`: {'Valid' if is_valid else 'Invalid - - - ERROR'}"
+                level = "error" if not is_valid else None
+                if col in format_match:
+                    message += f" | Format: {'MATCH' if format_match[col] else 'NOT MATCH'}"
+                    level = level or ("warning" if not format_match[col] else None)
+                self.log(message, level=level, theme="CYAN")
+            self.log(
+                f"\t\t{len(unexpected_payer)} unexpected payer type(s) found: "
+                f"{'None' if len(unexpected_payer) == 0 else str(unexpected_payer) + ' - - - WARNING'}",
+                level="warning" if len(unexpected_payer) > 0 else None, theme="CYAN"
+            )
+
+        return all(valid.values())
+
+    def parse(self, table: str, date_columns: Optional[Tuple[str, ...]] = None, verbose: bool = False) -> str:
+        columns = self._columns(table)
+        replace = []
+        for col in DATE_COLUMN:
+            if col in columns:
+                parsed = ", ".join(f"try_strptime({self._as_text(col)}, '{fmt}')" for fmt in INPUT_DATE_FORMATS)
+                replace.append(f"strftime(coalesce({parsed}), '%Y-%m-%d') AS {sql_engine.quote(col)}")
+
+        ## Same all-or-nothing rule as `parse_state()`
+        is_full, is_abbreviation = self.con.execute(f"""
+            SELECT
+                coalesce(bool_and(lower(State) IN (SELECT lower(name) FROM state_lookup)), true),
+                coalesce(bool_and(State IN (SELECT abbreviation FROM state_lookup)), true)
+            FROM {table};
+        """).fetchone()
+        if not is_full and is_abbreviation:
+            replace.append("(SELECT name FROM state_lookup WHERE abbreviation = State) AS State")
+        if verbose:
+            self.log("\t===Parsing Table===", theme="BRIGHT_BLUE", bold=True)
+            state_status = "Skipped, already full name" if is_full else "Parsed" if is_abbreviation else "Failed"
+            self.log(f"\t\tColumn with state values [state parsing] - Status: {state_status}", theme="BRIGHT_BLUE")
+
+        parsed_table = self._create(f"SELECT * REPLACE ({', '.join(replace)}) FROM {table}")
+        self.con.execute(f"DROP TABLE {table};")
+        return parsed_table
+
+    def preview(self, table: str, rows: int = 5) -> pd.DataFrame:
+        return self.con.execute(f"SELECT * FROM {table} LIMIT {rows};").df()
+
+    def concat(self, tables: List[str]) -> str:
+        if not tables:
+            return self._create(
+                "SELECT " + ", ".join(f"NULL::VARCHAR AS {sql_engine.quote(col)}" for col in self.projected_column)
+                + " WHERE false"
+            )
+        union = " UNION ALL BY NAME ".join(f"SELECT * FROM {table}" for table in tables)
+        stacked = self._create(union)
+        for table in tables:
+            self.con.execute(f"DROP TABLE {table};")
+        return stacked
+
+    def standardize(self, table: str) -> str:
+        select = ", ".join(
+            f"{sql_engine.quote(roster_col)} AS {sql_engine.quote(std_col)}"
+            for roster_col, std_col in sql_engine.STD_COLUMN_MAPPER.items()
+        )
+        standardized = self._create(f"SELECT {select} FROM {table}")
+        self.con.execute(f"DROP TABLE {table};")
+        return standardized
+
+    def count(self, table: str) -> int:
+        return self.con.execute(f"SELECT count(*) FROM {table};").fetchone()[0]
+
+    def duplicate_count(self, table: str) -> int:
+        return self.con.execute(
+            f"SELECT count(*) FROM (SELECT *, count(*) AS n FROM {table} GROUP BY ALL) WHERE n > 1;"
+        ).fetchone()[0]
+
+    def dedupe(self, table: str) -> str:
+        unique = self._create(f"SELECT DISTINCT * FROM {table}")
+        self.con.execute(f"DROP TABLE {table};")
+        return unique
+
+    def filter_window(self, table: str, window: Tuple[str, str]) -> str:
+        kept = self._create(
+            f"SELECT * FROM {table} WHERE TRY_CAST(eligibility_start_date AS DATE) <= CAST(? AS DATE) "
+            f"AND TRY_CAST(eligibility_end_date AS DATE) >= CAST(? AS DATE)",
+            [window[1], window[0]]
+        )
+        self.con.execute(f"DROP TABLE {table};")
+        return kept
+
+    def write(self, table: str, table_name: str, conn: sqlite3.Connection, cursor: sqlite3.Cursor,
+              overwrite: bool = False, verbose: bool = False) -> Dict[str, int]:
+        table_exists = cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = ?;", (table_name,)
+        ).fetchone()[0] > 0
+        new_count = self.count(table)
+
+        if overwrite or not table_exists:
+            existing_count = 0
+            to_insert = table
+            cursor.execute(f"DROP TABLE IF EXISTS {sql_engine.quote(table_name)};")
+            sql_engine.create_member_table(conn, table_name)
+            if verbose and overwrite:
+                self.log(f"Overwriting table '{table_name}' with new data...", level="warning", theme="CYAN")
+        else:
+            if verbose:
+                self.log(f"Data exists in table '{table_name}' — reading existing data...", level="warning", theme="CYAN")
+            existing = self._load_sqlite(cursor, f"SELECT * FROM {sql_engine.quote(table_name)};")
+            existing_count = self.count(existing)
+            to_insert = self._create(f"SELECT * FROM {table} EXCEPT SELECT * FROM {existing}")
+            self.con.execute(f"DROP TABLE {existing};")
+
+        columns = self._columns(to_insert)
+        insert = (
+            f"INSERT INTO {sql_engine.quote(table_name)} ({', '.join(sql_engine.quote(col) for col in columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)});"
+        )
+        reader = self.con.execute(f"SELECT * FROM {to_insert};").fetch_record_batch(self.batch_size)
+        added_unique_rows = 0
+        for batch in reader:
+            rows = list(zip(*(batch.column(idx).to_pylist() for idx in range(batch.num_columns))))
+            cursor.executemany(insert, rows)
+            added_unique_rows += len(rows)
+        conn.commit()
+        table_sync.sync_derived(conn, table_name, restart=overwrite or not table_exists, skip_rows=existing_count)
+        self.con.execute(f"DROP TABLE {to_insert};")
+
+        final_count = existing_count + added_unique_rows
+        removed_dupes = new_count - added_unique_rows
+        if verbose:
+            self.log(f"Existing rows: {existing_count}", theme="CYAN")
+            self.log(f"New rows to add: {new_count}", theme="CYAN")
+            self.log(f"Duplicates removed from new data: {removed_dupes}", theme="CYAN")
+            self.log(f"Unique new rows added: {added_unique_rows}", theme="CYAN")
+            self.log(f"Final row count in table '{table_name}': {final_count}", theme="CYAN", bold=True)
+        return {
+            "existing_rows": existing_count,
+            "added_rows": added_unique_rows,
+            "final_rows": final_count,
+        }
+
+    def close(self) -> None:
+        self.con.close()
+        if self._spill_tmp is not None:
+            self._spill_tmp.cleanup()
@@ -0,0 +1,84 @@
+import argparse
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import bloom
+import ingestion
+from synthetic_rosters import make_members
+
+
+def std_members(n: int, seed: int) -> pd.DataFrame:
+    """Synthetic rows already in the `std_member_info` layout"""
+    return ingestion.PandasBackend().standardize(make_members(n, seed=seed))
+
+
+def read_member_table(db_path: Path) -> pd.DataFrame:
+    with sqlite3.connect(db_path) as conn:
+        data = pd.read_sql_query("SELECT * FROM std_member_info;", conn)
+    return data.sort_values(list(data.columns)).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Union-write a delivery with and without the Bloom filter pre-check.")
+    parser.add_argument("-n", "--existing", type=int, default=1_000_000, help="Rows already in std_member_info")
+    parser.add_argument("-d", "--delivery", type=int, default=200_000, help="Rows in the new delivery")
+    parser.add_argument("-r", "--resent", type=float, default=0.9, help="Fraction of the delivery that re-sends stored rows")
+    parser.add_argument("-e", "--error-rate", type=float, default=ingestion.BLOOM_ERROR_RATE, help="Bloom filter error rate")
+    args = parser.parse_args()
+
+    existing = std_members(args.existing, seed=0)
+    n_resent = int(args.delivery * args.resent)
+    delivery = pd.concat([
+        existing.sample(n_resent, random_state=1),
+        std_members(args.delivery - n_resent, seed=1),
+    ], ignore_index=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp) / "base.db"
+        with sqlite3.connect(base) as conn:
+            existing.to_sql("std_member_info", conn, index=False)
+
+        ## Filter built (and saved) outside the timed section, like after the first filtered run
+        filtered = Path(tmp) / "filtered.db"
+        shutil.copy(base, filtered)
+        conn = sqlite3.connect(filtered)
+        cur = conn.cursor()
+        row_filter = ingestion.load_row_filter(conn, cur, "std_member_info", incoming_rows=args.delivery,
+                                               error_rate=args.error_rate)
+        row_filter.save(str(bloom.filter_path(str(filtered))),
+                        metadata=ingestion.table_sync_token(conn, cur, "std_member_info"))
+
+        start = time.perf_counter()
+        stats = ingestion.write_with_row_filter("std_member_info", delivery, conn, cur, error_rate=args.error_rate)
+        filtered_seconds = time.perf_counter() - start
+        conn.close()
+
+        plain = Path(tmp) / "plain.db"
+        shutil.copy(base, plain)
+        conn = sqlite3.connect(plain)
+        start = time.perf_counter()
+        ingestion.write_to_db("std_member_info", delivery, conn, conn.cursor())
+        plain_seconds = time.perf_counter() - start
+        conn.close()
+
+        identical = read_member_table(plain).equals(read_member_table(filtered))
+
+    not_stored = stats["definitely_new"] + stats["false_positives"]
+    print(f"write_to_db()            {plain_seconds:>8.2f}s")
+    print(f"write_with_row_filter()  {filtered_seconds:>8.2f}s")
+    print(f"definitely new={stats['definitely_new']}  maybe duplicate={stats['maybe_duplicate']}  "
+          f"false positives={stats['false_positives']}")
+    print(f"false-positive rate: observed {stats['false_positives'] / max(1, not_stored):.4%}  "
+          f"expected {row_filter.expected_fp_rate():.4%}  target {args.error_rate:.4%}")
+    print(f"filter memory: {row_filter.nbytes / 2**20:.2f} MiB ({row_filter.num_bits:,} bits, "
+          f"{row_filter.num_hashes} hashes, capacity {row_filter.capacity:,})")
+    print(f"identical std_member_info: {identical}")
+    sys.exit(0 if identical else 1)
@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from ingestion import read_file, parse_date, DATE_COLUMN
+from synthetic_rosters import make_members
+
+
+def export_roster(roster: pd.DataFrame, directory: Path, row_group_size: int) -> dict:
+    """Write the same roster as CSV, Parquet and Arrow IPC (dates as native `date32`)"""
+    typed = roster.copy()
+    for col in DATE_COLUMN:
+        typed[col] = pd.to_datetime(typed[col]).dt.date
+    table = pa.Table.from_pandas(typed, preserve_index=False)
+
+    paths = {
+        "csv": directory / "roster.csv",
+        "parquet": directory / "roster.parquet",
+        "arrow": directory / "roster.arrow",
+    }
+    roster.to_csv(paths["csv"], index=False)
+    pq.write_table(table, paths["parquet"], row_group_size=row_group_size, compression="zstd")
+    with pa.OSFile(str(paths["arrow"]), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=row_group_size):
+                writer.write_batch(batch)
+    return paths
+
+
+def time_read(path: Path, fmt: str) -> tuple:
+    """Time `read_file()` + `parse_date()` - the part of `main()` the input format affects"""
+    start = time.perf_counter()
+    rows = 0
+    for chunk in read_file(str(path)):
+        chunk = parse_date(chunk, columns=None if fmt == "csv" else DATE_COLUMN)
+        rows += len(chunk)
+    return time.perf_counter() - start, rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CSV vs Parquet vs Arrow IPC roster ingestion reads.")
+    parser.add_argument("-n", "--rows", type=int, default=500_000, help="Number of roster rows")
+    parser.add_argument("-g", "--row-group", type=int, default=100_000, help="Parquet row group / Arrow batch size")
+    args = parser.parse_args()
+
+    roster = make_members(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = export_roster(roster, Path(tmp), args.row_group)
+        print(f"{'format':<10}{'size (MB)':>12}{'seconds':>12}{'rows/s':>14}")
+        for fmt, path in paths.items():
+            seconds, rows = time_read(path, fmt)
+            size_mb = os.path.getsize(path) / 1e6
+            print(f"{fmt:<10}{size_mb:>12.1f}{seconds:>12.2f}{rows / seconds:>14,.0f}")
@@ -0,0 +1,66 @@
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import dedup
+from synthetic_rosters import make_rosters, write_roster_db
+
+
+def read_rosters(db_path: Path):
+    """Yield roster tables one at a time, the way the pipelines read them"""
+    with sqlite3.connect(db_path) as conn:
+        names = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'roster_%' ORDER BY name;")]
+        for name in names:
+            yield pd.read_sql_query(f'SELECT * FROM "{name}" ORDER BY rowid;', conn)
+
+
+def measure(fn) -> tuple:
+    """Run `fn()` and return (result, seconds, peak traced MB) - tracing slows both runs alike"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare in-memory and budgeted (spilled) roster deduplication.")
+    parser.add_argument("-n", "--members", type=int, default=200_000, help="Number of unique synthetic members")
+    parser.add_argument("-r", "--rosters", type=int, default=10, help="Number of roster tables")
+    parser.add_argument("-o", "--overlap", type=float, default=0.8, help="Fraction of each roster re-sent in the next")
+    parser.add_argument("-m", "--max-memory", default="64MB", help="Budget for the spilled run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "source.db"
+        rosters = make_rosters(args.members, n_rosters=args.rosters, overlap=args.overlap)
+        columns = list(rosters["roster_1"].columns)
+        write_roster_db(str(db_path), {name: roster[columns] for name, roster in rosters.items()})
+        del rosters
+
+        def in_memory():
+            data = pd.concat(list(read_rosters(db_path)), ignore_index=True)
+            return dedup.dedupe_in_memory(data, count_duplicates=True)
+
+        (expected, expected_duplicates), seconds, peak = measure(in_memory)
+        print(f"{'in-memory':<22}{seconds:>8.2f}s  peak={peak:>8.1f}MB  duplicated={expected_duplicates}")
+
+        (result, stats), seconds, peak = measure(
+            lambda: dedup.drop_duplicates(read_rosters(db_path), max_memory=args.max_memory, count_duplicates=True)
+        )
+        print(f"{'max-memory ' + args.max_memory:<22}{seconds:>8.2f}s  peak={peak:>8.1f}MB  "
+              f"duplicated={stats['duplicate_rows']}  partitions={stats['partitions']}")
+
+    identical = result.equals(expected) and stats["duplicate_rows"] == expected_duplicates
+    print(f"identical result: {identical}")
+    sys.exit(0 if identical else 1)
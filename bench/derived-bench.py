@@ -0,0 +1,64 @@
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import derived
+import report
+from synthetic_rosters import make_members, std_layout
+
+AS_OF = pd.Timestamp("2025-06-01")
+
+
+def timed(fn, repeat: int = 3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def row_by_row(data: pd.DataFrame) -> pd.Series:
+    """Age per row with `pd.Timestamp` - the obvious `apply`"""
+    def age(dob):
+        born = pd.Timestamp(dob)
+        return AS_OF.year - born.year - ((AS_OF.month, AS_OF.day) < (born.month, born.day))
+    return data["date_of_birth"].apply(age)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Derived attributes: datetime64 vs per-row apply, bincount vs value_counts, persisted vs recomputed ages in the report.")
+    parser.add_argument("-n", "--rows", type=int, default=1_000_000, help="Roster rows")
+    args = parser.parse_args()
+
+    roster = make_members(args.rows)
+    data = std_layout(roster)
+
+    sample = data.iloc[:min(len(data), 100_000)]
+    applied, apply_seconds = timed(lambda: row_by_row(sample), repeat=1)
+    result, derive_seconds = timed(lambda: derived.derive(data, AS_OF))
+    same = bool((applied.to_numpy() == result["age"].to_numpy()[:len(sample)]).all())
+    print(f"{'apply, per row':<28}{apply_seconds / len(sample) * len(data):>8.2f}s  (extrapolated from {len(sample):,} rows)")
+    print(f"{'derive (age, band, days)':<28}{derive_seconds:>8.2f}s  (same ages: {same})")
+
+    ages = result["age"].to_numpy(dtype=float, na_value=np.nan)
+    codes, groups = pd.factorize(data["state"], sort=True)
+    strings = pd.Series(ages).astype(int).astype(str)
+    _, counts_seconds = timed(lambda: [strings[codes == i].value_counts() for i in range(len(groups))])
+    _, bincount_seconds = timed(lambda: derived.age_histogram(ages, codes, n_groups=len(groups)))
+    print(f"{'value_counts on strings':<28}{counts_seconds * 1000:>8.1f}ms  ({len(groups)} groups)")
+    print(f"{'bincount histogram':<28}{bincount_seconds * 1000:>8.1f}ms")
+
+    with sqlite3.connect(":memory:") as conn:
+        data.to_sql("std_member_info", conn, index=False)
+        stats, build_seconds = timed(lambda: derived.build_table(conn, AS_OF, rebuild=True), repeat=1)
+        print(f"{'persist member_derived':<28}{build_seconds:>8.2f}s  (" +
+              ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in stats["seconds"].items()) + ")")
+        _, recomputed = timed(lambda: report.summarize(report.read_members(conn, ["std_member_info"], ["state"]), "state", AS_OF), repeat=1)
+        _, persisted = timed(lambda: report.summarize(report.read_members(conn, ["std_member_info"], ["state"], AS_OF), "state", AS_OF), repeat=1)
+        print(f"{'report, ages recomputed':<28}{recomputed:>8.2f}s")
+        print(f"{'report, ages persisted':<28}{persisted:>8.2f}s")
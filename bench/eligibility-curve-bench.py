@@ -0,0 +1,72 @@
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import eligibility
+
+
+def make_members(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Payer & eligibility period per row, spread over 2019-2026"""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2019-01-01") + rng.integers(0, 7 * 365, n_rows)
+    end = start + rng.integers(30, 900, n_rows)
+    return pd.DataFrame({
+        "payer": rng.choice(["Mdcd", "Madv"], n_rows),
+        "eligibility_start_date": start.astype(str),
+        "eligibility_end_date": end.astype(str),
+    })
+
+
+def dense_curves(data: pd.DataFrame) -> dict:
+    """`eda.ipynb`'s per-payer broadcast"""
+    curves = {}
+    for payer_class in sorted(data["payer"].unique()):
+        subset = data[data["payer"] == payer_class]
+        start_dates = pd.to_datetime(subset["eligibility_start_date"])
+        end_dates = pd.to_datetime(subset["eligibility_end_date"])
+        date_range = pd.date_range(start_dates.min(), end_dates.max())
+        starts, ends = start_dates.values[:, None], end_dates.values[:, None]
+        date_mask = (starts <= date_range.values) & (ends >= date_range.values)
+        curves[payer_class] = pd.Series(date_mask.sum(axis=0), index=date_range)
+    return curves
+
+
+def measure(fn) -> tuple:
+    """Run `fn()` and return (result, seconds, peak traced MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily eligibility curves per payer: dense broadcast vs sweep.")
+    parser.add_argument("-d", "--dense-rows", type=int, default=100_000, help="Rows for the dense comparison")
+    parser.add_argument("-n", "--rows", type=int, default=10_000_000, help="Rows for the sweep alone")
+    args = parser.parse_args()
+
+    data = make_members(args.dense_rows)
+    expected, seconds, peak = measure(lambda: dense_curves(data))
+    print(f"{'dense broadcast':<18}{args.dense_rows:>12,} rows {seconds:>8.2f}s  peak={peak:>9.1f}MB")
+    result, seconds, peak = measure(lambda: eligibility.daily_eligibility(data, by="payer"))
+    print(f"{'sweep':<18}{args.dense_rows:>12,} rows {seconds:>8.2f}s  peak={peak:>9.1f}MB")
+    identical = list(result) == list(expected) and all(
+        result[payer].index.equals(expected[payer].index) and (result[payer].to_numpy() == expected[payer].to_numpy()).all()
+        for payer in expected
+    )
+    print(f"identical curves: {identical}")
+
+    data = make_members(args.rows)
+    result, seconds, peak = measure(lambda: eligibility.daily_eligibility(data, by="payer"))
+    days = sum(len(curve) for curve in result.values())
+    print(f"{'sweep':<18}{args.rows:>12,} rows {seconds:>8.2f}s  peak={peak:>9.1f}MB  ({days:,} payer-days)")
+    sys.exit(0 if identical else 1)
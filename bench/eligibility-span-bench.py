@@ -0,0 +1,73 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import eligibility
+
+
+def make_periods(n_rows: int, rows_per_member: float = 3.0, seed: int = 0) -> pd.DataFrame:
+    """Eligibility periods as stored in `std_member_info` - members repeat across rosters with overlapping, adjacent or gapped periods"""
+    rng = np.random.default_rng(seed)
+    member = rng.integers(0, max(1, int(n_rows / rows_per_member)), n_rows)
+    start = np.datetime64("2020-01-01") + rng.integers(0, 6 * 365, n_rows)
+    end = start + rng.integers(0, 400, n_rows)
+    return pd.DataFrame({
+        "member_id": (10000000 + member).astype(str),
+        "eligibility_start_date": start.astype(str),
+        "eligibility_end_date": end.astype(str),
+    })
+
+
+def merge_sweep(data: pd.DataFrame) -> pd.DataFrame:
+    codes, uniques = pd.factorize(data["member_id"])
+    _, spans = eligibility.merge_spans(codes, eligibility.to_days(data["eligibility_start_date"]),
+                                       eligibility.to_days(data["eligibility_end_date"]))
+    return pd.DataFrame({"member_id": uniques[spans["member_code"]], "start_day": spans["start_day"], "end_day": spans["end_day"]})
+
+
+def merge_groupby_apply(data: pd.DataFrame) -> pd.DataFrame:
+    """The per-member Python merge the sweep replaces"""
+    data = data.assign(start_day=eligibility.to_days(data["eligibility_start_date"]),
+                       end_day=eligibility.to_days(data["eligibility_end_date"]))
+
+    def merge(group: pd.DataFrame) -> pd.DataFrame:
+        spans = []
+        for start, end in sorted(zip(group["start_day"], group["end_day"])):
+            if spans and start <= spans[-1][1] + eligibility.ADJACENT_DAYS:
+                spans[-1][1] = max(spans[-1][1], end)
+            else:
+                spans.append([start, end])
+        return pd.DataFrame(spans, columns=["start_day", "end_day"])
+
+    return data.groupby("member_id")[["start_day", "end_day"]].apply(merge).reset_index(level=0).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge eligibility periods per member: sorted sweep vs groupby-apply.")
+    parser.add_argument("-n", "--rows", type=int, default=10_000_000, help="Rows for the sweep")
+    parser.add_argument("-a", "--apply-rows", type=int, default=300_000, help="Rows for the groupby-apply comparison")
+    args = parser.parse_args()
+
+    sample = make_periods(args.apply_rows)
+    start = time.perf_counter()
+    expected = merge_groupby_apply(sample)
+    apply_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    result = merge_sweep(sample)
+    sweep_seconds = time.perf_counter() - start
+    result = result.sort_values(["member_id", "start_day"], ignore_index=True) ## Sweep numbers members by first appearance
+    identical = result.equals(expected.astype(result.dtypes.to_dict()))
+    print(f"{args.apply_rows:>12,} rows  groupby-apply {apply_seconds:>8.2f}s  sweep {sweep_seconds:>6.2f}s  "
+          f"({apply_seconds / sweep_seconds:.0f}x)  identical spans: {identical}")
+
+    data = make_periods(args.rows)
+    start = time.perf_counter()
+    spans = merge_sweep(data)
+    seconds = time.perf_counter() - start
+    print(f"{args.rows:>12,} rows  sweep {seconds:.2f}s ({args.rows / seconds / 1e6:.1f}M rows/s)  -> {len(spans):,} spans")
+    sys.exit(0 if identical else 1)
@@ -0,0 +1,68 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import entity_resolution
+import sql_engine
+from synthetic_rosters import STATES, make_members
+
+STATE_MAPPER = {abbreviation: name for name, abbreviation in STATES.items()}
+
+
+def make_near_duplicates(n_members: int, dup_rate: float, seed: int = 0) -> pd.DataFrame:
+    """
+    `std_member_info`-like rows where `dup_rate` of the members are re-sent with formatting drift
+
+    Drift: upper-cased names, abbreviated state, spelled-out street suffix, `%m/%d/%Y` DOB and,
+    for a third of the copies, a re-issued `member_id`. `true_member` holds the ground truth.
+    """
+    rng = np.random.default_rng(seed)
+    members = make_members(n_members, seed=seed).rename(columns=sql_engine.STD_COLUMN_MAPPER).drop(columns=["Age", "Gender"])
+    members["true_member"] = np.arange(n_members)
+
+    copies = members.sample(frac=dup_rate, random_state=seed).copy()
+    copies["member_first_name"] = copies["member_first_name"].str.upper()
+    copies["member_last_name"] = copies["member_last_name"].str.upper()
+    copies["state"] = copies["state"].map(STATES)
+    copies["main_address"] = copies["main_address"].str.replace(r"\bSt$", "Street", regex=True).str.replace(r"\bAve$", "Avenue", regex=True)
+    copies["date_of_birth"] = pd.to_datetime(copies["date_of_birth"]).dt.strftime("%m/%d/%Y")
+    reissued = rng.random(len(copies)) < 1 / 3
+    copies.loc[reissued, "member_id"] = (80000000 + rng.choice(9999999, reissued.sum(), replace=False)).astype(str)
+
+    return pd.concat([members, copies], ignore_index=True).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def pair_count(sizes: pd.Series) -> int:
+    return int((sizes * (sizes - 1) // 2).sum())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Blocked entity resolution on synthetic near-duplicate members.")
+    parser.add_argument("-n", "--members", type=int, default=1_000_000, help="Number of distinct synthetic members")
+    parser.add_argument("-d", "--dup-rate", type=float, default=0.2, help="Fraction of members re-sent with drift")
+    args = parser.parse_args()
+
+    records = make_near_duplicates(args.members, args.dup_rate)
+    start = time.perf_counter()
+    cluster_ids, stats = entity_resolution.resolve(records, STATE_MAPPER)
+    seconds = time.perf_counter() - start
+
+    ## Pair-level precision / recall against the ground truth
+    predicted = pair_count(cluster_ids.value_counts())
+    actual = pair_count(records["true_member"].value_counts())
+    correct = pair_count(pd.DataFrame({"c": cluster_ids, "t": records["true_member"]}).value_counts())
+
+    print(f"records={stats['rows']:,}  clusters={stats['clusters']:,}  merged={stats['merged_records']:,}")
+    for key, key_stats in stats["blocking"].items():
+        print(f"  block {key:<10} blocks={key_stats['blocks']:>9,}  pairs={key_stats['pairs']:>10,}  "
+              f"skipped blocks={key_stats['skipped_blocks']}")
+    print(f"candidate pairs={stats['candidate_pairs']:,} of {stats['naive_pairs']:,} naive "
+          f"({stats['candidate_pairs'] / max(1, stats['naive_pairs']):.2e})  matched={stats['matched_pairs']:,}")
+    print("runtime " + "  ".join(f"{phase}={value:.2f}s" for phase, value in stats["seconds"].items()) + f"  total={seconds:.2f}s")
+    print(f"pair precision={correct / max(1, predicted):.4f}  recall={correct / max(1, actual):.4f}")
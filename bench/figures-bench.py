@@ -0,0 +1,43 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import figures
+from synthetic_rosters import make_members, make_zcta_polygons
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report figures: serial rendering vs the process pool vs a rerun over unchanged data.")
+    parser.add_argument("-n", "--rows", type=int, default=500_000, help="Roster rows")
+    parser.add_argument("-p", "--payers", type=int, default=4, help="Payers (figure groups)")
+    parser.add_argument("-z", "--zctas", type=int, default=5_000, help="Polygons on the choropleths")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    roster = make_members(args.rows)
+    roster["payer"] = np.random.default_rng(0).choice([f"Payer{i}" for i in range(args.payers)], args.rows)
+    polygons = make_zcta_polygons(args.zctas, vertices=200)
+    roster["Zip"] = polygons["ZCTA5CE20"].sample(args.rows, replace=True, random_state=0).to_numpy()
+    with tempfile.TemporaryDirectory() as tmp:
+        shapefile = str(Path(tmp) / "tl_2020_us_zcta520.shp")
+        polygons.to_file(shapefile)
+        figures.has_geometry(shapefile, figures.zcta_geometry.DEFAULT_TOLERANCE) ## One-time cache build, not timed
+
+        start = time.perf_counter()
+        jobs = figures.figure_jobs(roster, shapefile=shapefile)
+        print(f"{'aggregates':<24}{time.perf_counter() - start:>8.2f}s  ({len(jobs)} figures)")
+        start = time.perf_counter()
+        figures.render_figures(jobs, str(Path(tmp) / "serial"), workers=1)
+        print(f"{'serial render':<24}{time.perf_counter() - start:>8.2f}s")
+        start = time.perf_counter()
+        figures.render_figures(jobs, str(Path(tmp) / "pool"), workers=args.workers)
+        print(f"{'process pool':<24}{time.perf_counter() - start:>8.2f}s")
+        start = time.perf_counter()
+        status = figures.render_figures(figures.figure_jobs(roster, shapefile=shapefile), str(Path(tmp) / "pool"), workers=args.workers)
+        print(f"{'rerun, unchanged data':<24}{time.perf_counter() - start:>8.2f}s  "
+              f"({sum(state == 'rendered' for state in status.values())} rendered, aggregates included)")
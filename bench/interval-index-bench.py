@@ -0,0 +1,109 @@
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import interval_index
+
+## (label, start, end) - point queries are one-day ranges
+QUERIES = [
+    ("eligible at 2019-01-10", "2019-01-10", "2019-01-10"),
+    ("eligible at 2021-06-15", "2021-06-15", "2021-06-15"),
+    ("eligible at 2025-04-15", "2025-04-15", "2025-04-15"),
+    ("eligible during April 2025", "2025-04-01", "2025-04-30"),
+    ("eligible during 2023", "2023-01-01", "2023-12-31"),
+]
+
+
+def make_periods(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """`std_member_info`-like eligibility periods spread over 2019-2026"""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2019-01-01") + rng.integers(0, 7 * 365, n_rows)
+    end = start + rng.integers(30, 540, n_rows)
+    return pd.DataFrame({
+        "member_id": (10000000 + rng.integers(0, n_rows, n_rows)).astype(str),
+        "eligibility_start_date": start.astype(str),
+        "eligibility_end_date": end.astype(str),
+        "payer": rng.choice(["Mdcd", "Madv"], n_rows),
+    })
+
+
+def scan(conn: sqlite3.Connection, start: str, end: str, count: bool):
+    where = "eligibility_start_date <= ? AND eligibility_end_date >= ?"
+    if count:
+        return conn.execute(f"SELECT COUNT(*) FROM std_member_info WHERE {where};", (end, start)).fetchone()[0]
+    return pd.read_sql_query(f"SELECT rowid AS member_rowid, * FROM std_member_info WHERE {where} ORDER BY rowid;",
+                             conn, params=(end, start))
+
+
+def best_of(fn, runs: int) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Eligibility queries: R*Tree interval index vs scan.")
+    parser.add_argument("-n", "--rows", type=int, default=1_000_000, help="Rows in std_member_info")
+    parser.add_argument("-r", "--runs", type=int, default=3, help="Runs per query (best is reported)")
+    parser.add_argument("-a", "--appended", type=int, default=200, help="Rows added by the timed union-write")
+    args = parser.parse_args()
+
+    identical = True
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / "members.db")
+        data = make_periods(args.rows)
+        data.to_sql("std_member_info", conn, index=False)
+
+        start = time.perf_counter()
+        interval_index.sync_index(conn)
+        print(f"index build: {time.perf_counter() - start:.2f}s for {args.rows:,} rows")
+
+        ## Notebook baseline, once
+        dates = data.assign(eligibility_start_date=pd.to_datetime(data["eligibility_start_date"]),
+                            eligibility_end_date=pd.to_datetime(data["eligibility_end_date"]))
+        april_start, april_end = pd.Timestamp("2025-04-01"), pd.Timestamp("2025-04-30")
+        start = time.perf_counter()
+        notebook = len(dates[dates.apply(lambda row: row["eligibility_start_date"] <= april_end
+                                         and row["eligibility_end_date"] >= april_start, axis=1)])
+        print(f"notebook apply(is_eligible), April 2025: {time.perf_counter() - start:.2f}s -> {notebook:,}")
+        identical &= notebook == interval_index.eligible_during(conn, "2025-04-01", "2025-04-30", count=True)
+
+        print(f"{'query':<30}{'kind':<7}{'matches':>10}{'scan':>10}{'rtree':>10}{'speed-up':>10}")
+        for label, query_start, query_end in QUERIES:
+            for count in (True, False):
+                expected, scan_seconds = best_of(lambda: scan(conn, query_start, query_end, count), args.runs)
+                result, index_seconds = best_of(
+                    lambda: interval_index.eligible_during(conn, query_start, query_end, count=count), args.runs
+                )
+                same = result == expected if count else result.equals(expected)
+                identical &= bool(same)
+                matches = result if count else len(result)
+                print(f"{label:<30}{'count' if count else 'rows':<7}{matches:>10,}{scan_seconds:>9.3f}s"
+                      f"{index_seconds:>9.3f}s{scan_seconds / index_seconds:>9.1f}x")
+
+        ## Union-write: the table is replaced with its rows first, only the appended rows are indexed
+        union = pd.concat([data, make_periods(args.appended, seed=1)], ignore_index=True)
+        union.to_sql("std_member_info", conn, if_exists="replace", index=False)
+        start = time.perf_counter()
+        state = interval_index.sync_index(conn)
+        sync_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        interval_index.sync_index(conn, rebuild=True)
+        print(f"union-write of {args.appended:,} rows: index {state} in {sync_seconds:.3f}s "
+              f"(rebuild: {time.perf_counter() - start:.2f}s)")
+        identical &= interval_index.eligible_during(conn, "2025-04-01", "2025-04-30", count=True) == \
+            scan(conn, "2025-04-01", "2025-04-30", count=True)
+        conn.close()
+
+    print(f"identical results: {identical}")
+    sys.exit(0 if identical else 1)
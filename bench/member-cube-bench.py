@@ -0,0 +1,74 @@
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import member_cube
+from synthetic_rosters import make_std_members
+
+SLICES = [["payer", "state"], ["gender", "age_band"], ["month", "payer"], ["zip3"], []]
+
+
+def full_pass(conn: sqlite3.Connection, by: list) -> pd.DataFrame:
+    """A slice the way it is answered today - read the member rows & group them (month slices expand every row)"""
+    rows = pd.read_sql_query("SELECT s.*, g.Gender AS gender FROM std_member_info AS s "
+                             "LEFT JOIN roster_1 AS g ON g.Person_Id = s.member_id;", conn)
+    if "month" in by:
+        start = pd.to_datetime(rows["eligibility_start_date"]).dt.to_period("M")
+        end = pd.to_datetime(rows["eligibility_end_date"]).dt.to_period("M")
+        n_months = (end - start).apply(lambda offset: offset.n) + 1
+        rows = rows.loc[rows.index.repeat(n_months)]
+        rows["month"] = np.concatenate([np.arange(n) for n in n_months]) + np.repeat(
+            start.dt.year.to_numpy() * 12 + start.dt.month.to_numpy() - 1, n_months)
+    if "zip3" in by:
+        rows["zip3"] = rows["zip_code"].str[:3]
+    if "age_band" in by:
+        age = 2025 - pd.to_datetime(rows["date_of_birth"]).dt.year
+        rows["age_band"] = pd.cut(age, bins=[*member_cube.AGE_BANDS, np.inf], right=False, labels=member_cube.AGE_BAND_LABELS)
+    return rows.groupby(by, observed=True).size() if by else len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="member_cube: slice latency, full passes & incremental maintenance.")
+    parser.add_argument("-n", "--rows", type=int, default=1_000_000, help="Rows in std_member_info")
+    parser.add_argument("-c", "--changed", type=int, default=10_000, help="Rows added & removed by the incremental run")
+    args = parser.parse_args()
+
+    members = make_std_members(args.rows + args.changed, dob="1940-01-01", dob_days=365 * 80, start="2019-01-01", start_days=7 * 365,
+                               length_days=(30, 900), states=("California", "Nevada", "Oregon", "Arizona"), zip_codes=(85001, 97999))
+    base = members.iloc[:args.rows]
+    with tempfile.TemporaryDirectory() as tmp, sqlite3.connect(Path(tmp) / "bench.db") as conn:
+        pd.DataFrame({"Person_Id": members["member_id"], "Gender": np.where(np.arange(len(members)) % 3, "Female", "Male")}).to_sql(
+            "roster_1", conn, index=False)
+        conn.execute("CREATE INDEX roster_1_person ON roster_1 (Person_Id);")
+        base.to_sql("std_member_info", conn, index=False)
+
+        start = time.perf_counter()
+        stats = member_cube.sync(conn, [base])
+        print(f"{'full build':<28}{args.rows:>12,} rows {time.perf_counter() - start:>8.2f}s  ({stats['cells']:,} cells)")
+
+        current = members.iloc[args.changed:] ## `changed` rows out, `changed` rows in
+        start = time.perf_counter()
+        stats = member_cube.update(conn, added=members.iloc[args.rows:], removed=members.iloc[:args.changed])
+        print(f"{'incremental update':<28}+{stats['added_rows']:,} / -{stats['removed_rows']:,} {time.perf_counter() - start:>8.2f}s")
+        start = time.perf_counter()
+        member_cube.sync(conn, [current])
+        print(f"{'incremental sync (full scan)':<28}{'no change':>12} {time.perf_counter() - start:>8.2f}s")
+
+        conn.execute("DELETE FROM std_member_info;")
+        current.to_sql("std_member_info", conn, if_exists="append", index=False)
+        for by in SLICES:
+            start = time.perf_counter()
+            result = member_cube.rollup(conn, by)
+            cube_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            expected = full_pass(conn, by)
+            scan_seconds = time.perf_counter() - start
+            same = result["members"].sum() == (expected.sum() if by else expected)
+            print(f"{' x '.join(by) or 'total':<28}rollup {cube_ms:>7.1f}ms  full pass {scan_seconds:>6.2f}s  same totals: {same}")
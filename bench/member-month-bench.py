@@ -0,0 +1,61 @@
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import member_month
+from synthetic_rosters import make_std_members
+
+
+def scan_counts(conn: sqlite3.Connection, month: int) -> pd.DataFrame:
+    """Distinct members per payer overlapping `month`, scanning `std_member_info`"""
+    first = f"{month // 100:04d}-{month % 100:02d}-01"
+    last = (pd.Timestamp(first) + pd.offsets.MonthEnd(0)).strftime("%Y-%m-%d")
+    return pd.read_sql_query(
+        "SELECT payer, COUNT(DISTINCT member_id) AS members FROM std_member_info "
+        "WHERE eligibility_start_date <= ? AND eligibility_end_date >= ? GROUP BY payer ORDER BY payer;",
+        conn, params=(last, first)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="member_month fact table: monthly counts & incremental maintenance.")
+    parser.add_argument("-n", "--rows", type=int, default=1_000_000, help="Rows in std_member_info")
+    parser.add_argument("-a", "--append", type=int, default=10_000, help="Rows appended for the incremental update")
+    args = parser.parse_args()
+
+    members = make_std_members(args.rows + args.append, dob="1950-01-01", start="2019-01-01", start_days=7 * 365, length_days=(30, 900),
+                               states=("CA", "NY", "TX", "FL"), zip_codes=(10000, 99999))
+    base, appended = members.iloc[:args.rows], members.iloc[args.rows:]
+    months = [201906, 202101, 202212, 202405, 202511]
+    with tempfile.TemporaryDirectory() as tmp, sqlite3.connect(Path(tmp) / "bench.db") as conn:
+        base.to_sql("std_member_info", conn, index=False)
+
+        start = time.perf_counter()
+        stats = member_month.update(conn, base, rebuild=True)
+        print(f"{'full build':<26}{args.rows:>12,} rows {time.perf_counter() - start:>8.2f}s  ({stats['member_months']:,} member-months)")
+
+        appended.to_sql("std_member_info", conn, if_exists="append", index=False)
+        start = time.perf_counter()
+        stats = member_month.update(conn, members)
+        print(f"{'incremental (whole table)':<26}{stats['new_rows']:>12,} new  {time.perf_counter() - start:>8.2f}s")
+
+        identical = True
+        scan_seconds = fact_seconds = 0.0
+        for month in months:
+            start = time.perf_counter()
+            expected = scan_counts(conn, month)
+            scan_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            result = member_month.monthly_counts(conn, month, by="payer")
+            fact_seconds += time.perf_counter() - start
+            identical &= result[["payer", "members"]].equals(expected)
+        print(f"{'monthly counts (scan)':<26}{len(months):>12} months {scan_seconds / len(months):>6.3f}s/month")
+        print(f"{'monthly counts (fact)':<26}{len(months):>12} months {fact_seconds / len(months):>6.3f}s/month")
+        print(f"identical counts: {identical}")
+    sys.exit(0 if identical else 1)
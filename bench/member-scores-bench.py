@@ -0,0 +1,62 @@
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import member_scores
+from synthetic_rosters import make_model_scores, make_std_members
+
+
+def full_recompute(conn: sqlite3.Connection) -> pd.DataFrame:
+    """The notebook's way - join the whole roster to the scores again, then answer the questions"""
+    members = pd.read_sql_query("SELECT * FROM std_member_info;", conn)
+    scores = pd.read_sql_query("SELECT * FROM model_scores_by_zip;", conn)
+    joined = members.assign(Zip=members["zip_code"].str.zfill(5)).merge(
+        scores.assign(zcta=scores["zcta"].astype(str).str.zfill(5)), how="left", left_on="Zip", right_on="zcta")
+    low_food_access = (joined["food_access_score"] < 2).sum()
+    return low_food_access, joined["social_isolation_score"].mean()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="member_scores: incremental refresh vs recomputing the member-score join.")
+    parser.add_argument("-n", "--rows", type=int, default=1_000_000, help="Rows in std_member_info")
+    parser.add_argument("-a", "--appended", type=int, default=10_000, help="Rows appended by the incremental run")
+    parser.add_argument("-z", "--zips", type=int, default=50, help="Zips whose scores change")
+    args = parser.parse_args()
+
+    members = make_std_members(args.rows + args.appended)
+    scores = make_model_scores()
+    with tempfile.TemporaryDirectory() as tmp, sqlite3.connect(Path(tmp) / "bench.db") as conn:
+        scores.to_sql("model_scores_by_zip", conn, index=False)
+        members.iloc[:args.rows].to_sql("std_member_info", conn, index=False)
+        start = time.perf_counter()
+        member_scores.sync(conn, [members.iloc[:args.rows]])
+        print(f"{'initial build':<28}{args.rows:>12,} rows {time.perf_counter() - start:>8.2f}s")
+
+        members.iloc[args.rows:].to_sql("std_member_info", conn, index=False, if_exists="append")
+        start = time.perf_counter()
+        stats = member_scores.update(conn, added=members.iloc[args.rows:])
+        print(f"{'append (new rows only)':<28}{stats['added_rows']:>12,} rows {time.perf_counter() - start:>8.2f}s")
+
+        changed = scores.sample(args.zips, random_state=0).index
+        scores.loc[changed, "food_access_score"] -= 1
+        scores.to_sql("model_scores_by_zip", conn, index=False, if_exists="replace")
+        start = time.perf_counter()
+        stats = member_scores.refresh_scores(conn)
+        print(f"{'score change (changed zips)':<28}{stats['rescored_rows']:>12,} rows {time.perf_counter() - start:>8.2f}s"
+              f"  ({stats['changed_zips']} zips)")
+
+        start = time.perf_counter()
+        expected = full_recompute(conn)
+        recompute_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        answer = conn.execute("SELECT SUM(food_access_score < 2), AVG(social_isolation_score) FROM member_scores;").fetchone()
+        print(f"{'full recompute':<28}{len(members):>12,} rows {recompute_seconds:>8.2f}s  "
+              f"materialized query {(time.perf_counter() - start) * 1000:.0f}ms  "
+              f"same answers: {answer[0] == expected[0] and np.isclose(answer[1], expected[1])}")
@@ -0,0 +1,53 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import member_search
+from synthetic_rosters import make_members, std_layout
+
+QUERIES = ("smi", "john oak", "mari", "ma 12", "4821 oak")
+
+
+def timed(fn, repeat: int = 3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Member search: FTS5 trigram index vs LIKE '%...%' scans, index build and append costs.")
+    parser.add_argument("-n", "--rows", type=int, default=1_000_000, help="Roster rows")
+    args = parser.parse_args()
+
+    std = std_layout(make_members(args.rows))
+    appended = std.iloc[-len(std) // 10:]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "members.db")
+        with sqlite3.connect(db_path) as conn:
+            std.to_sql("std_member_info", conn, index=False)
+            size = os.path.getsize(db_path)
+            _, build_seconds = timed(lambda: member_search.sync_index(conn, rebuild=True), repeat=1)
+            print(f"{'index build':<28}{build_seconds:>8.2f}s  (file {size / 2**20:.0f}MB -> {os.path.getsize(db_path) / 2**20:.0f}MB)")
+
+            _, append_seconds = timed(lambda: (appended.to_sql("std_member_info", conn, index=False, if_exists="append"),
+                                               member_search.sync_index(conn)), repeat=1)
+            conn.execute("CREATE TABLE plain AS SELECT * FROM std_member_info LIMIT 0;")
+            _, plain_seconds = timed(lambda: appended.to_sql("plain", conn, index=False, if_exists="append"), repeat=1)
+            print(f"{'append ' + format(len(appended), ',') + ' rows':<28}{append_seconds:>8.2f}s then indexed  {plain_seconds:.2f}s unindexed")
+
+            columns = member_search.SEARCH_COLUMNS
+            for query in QUERIES:
+                where = " AND ".join("(" + " OR ".join(f"{c} LIKE ?" for c in columns) + ")" for _ in query.split())
+                params = [f"%{term}%" for term in query.split() for _ in columns]
+                scanned, scan_seconds = timed(lambda: conn.execute(f"SELECT rowid FROM std_member_info WHERE {where};", params).fetchall())
+                matches, search_seconds = timed(lambda: member_search.search(conn, query))
+                print(f"{repr(query):<28}{scan_seconds * 1000:>8.1f}ms LIKE scan  {search_seconds * 1000:>8.1f}ms ranked search  "
+                      f"(top {len(matches)} of {len(scanned):,})")
+            _, fuzzy_seconds = timed(lambda: member_search.search(conn, "Jonhson", fuzzy=True))
+            print(f"{'fuzzy ' + repr('Jonhson'):<28}{'':>21}{fuzzy_seconds * 1000:>8.1f}ms ranked search")
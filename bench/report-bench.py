@@ -0,0 +1,56 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import report
+from synthetic_rosters import make_members
+
+
+def notebook_summary(roster_data: pd.DataFrame, by: str) -> pd.DataFrame:
+    """`eda.ipynb`'s per-payer breakdown (plots left out) - one filtered copy per metric per group"""
+    rows = []
+    for group in sorted(roster_data[by].unique()):
+        pop = len(roster_data[roster_data[by] == group])
+        male = len(roster_data[(roster_data[by] == group) & (roster_data["Gender"] == "Male")])
+        female = len(roster_data[(roster_data[by] == group) & (roster_data["Gender"] == "Female")])
+        city = len(roster_data[roster_data[by] == group]["City"].unique())
+        state = len(roster_data[roster_data[by] == group]["State"].unique())
+        subset = roster_data[roster_data[by] == group]
+        start_dates = pd.to_datetime(subset["eligibility_start_date"])
+        end_dates = pd.to_datetime(subset["eligibility_end_date"])
+        age = pd.to_numeric(roster_data[roster_data[by] == group]["Age"])
+        zips = len(roster_data[roster_data[by] == group]["Zip"].value_counts())
+        rows.append({by: group, "population": pop, "male": male, "female": female, "unique_city": city,
+                     "unique_state": state, "eligibility_start": start_dates.min().strftime("%Y-%m-%d"),
+                     "eligibility_end": end_dates.max().strftime("%Y-%m-%d"), "age_min": age.min(), "age_max": age.max(),
+                     "unique_zip": zips})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-group member summary: notebook loop vs one grouped pass.")
+    parser.add_argument("-n", "--rows", type=int, default=1_000_000, help="Roster rows")
+    parser.add_argument("-b", "--by", nargs="+", default=["payer", "State", "City"], help="Grouping columns to compare, one at a time")
+    args = parser.parse_args()
+
+    data = make_members(args.rows)
+    identical = True
+    for by in args.by:
+        start = time.perf_counter()
+        expected = notebook_summary(data, by)
+        loop_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        result = report.summarize(data, by=by)
+        pass_seconds = time.perf_counter() - start
+        columns = list(expected.columns)
+        same = np.array_equal(result[columns].astype(str).to_numpy(), expected.astype(str).to_numpy())
+        identical &= same
+        print(f"by {by:<8}{len(expected):>6} groups  notebook loop {loop_seconds:>7.2f}s  one pass {pass_seconds:>6.2f}s  "
+              f"({loop_seconds / pass_seconds:>5.1f}x)  identical: {same}")
+    sys.exit(0 if identical else 1)
@@ -0,0 +1,54 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import score_lookup
+from synthetic_rosters import make_model_scores
+
+
+def notebook_join(members: pd.DataFrame, scores: pd.DataFrame) -> pd.DataFrame:
+    """`eda.ipynb`'s member-score join - zero-pad both sides, then a hash merge"""
+    members = members.assign(Zip=members["Zip"].astype(str).str.zfill(5))
+    scores = scores.assign(zcta=scores["zcta"].astype(str).str.zfill(5))
+    return members.merge(scores, how="left", left_on="Zip", right_on="zcta")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Member-score join: padded merge vs dense zip-indexed gather.")
+    parser.add_argument("-n", "--rows", type=int, default=2_000_000, help="Member rows")
+    parser.add_argument("-a", "--analyses", type=int, default=5, help="Analyses needing member scores")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    scores = make_model_scores()
+    members = pd.DataFrame({"Person_Id": np.arange(args.rows), "Zip": rng.integers(89990, 96200, args.rows).astype(str)})
+
+    start = time.perf_counter()
+    for _ in range(args.analyses):
+        merged = notebook_join(members, scores)
+    merge_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lookup = score_lookup.ScoreLookup(scores)
+    load_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(args.analyses):
+        gathered = lookup.gather(members["Zip"])
+    gather_seconds = time.perf_counter() - start
+
+    same = gathered.equals(merged[lookup.columns].astype(np.float64))
+    print(f"{'padded merge':<20}{args.analyses} x {args.rows:,} rows {merge_seconds:>8.2f}s")
+    print(f"{'dense gather':<20}{args.analyses} x {args.rows:,} rows {gather_seconds:>8.2f}s  "
+          f"(+ {load_seconds * 1000:.1f}ms load, {lookup.values.nbytes / 2**20:.1f} MiB)  "
+          f"{merge_seconds / gather_seconds:.1f}x  same scores: {same}")
+
+    zip_ints = score_lookup.zip_index(members["Zip"]) ## Zips already parsed - the gather alone
+    start = time.perf_counter()
+    for _ in range(args.analyses):
+        lookup.values[zip_ints]
+    print(f"{'gather (int zips)':<20}{args.analyses} x {args.rows:,} rows {time.perf_counter() - start:>8.2f}s")
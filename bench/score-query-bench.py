@@ -0,0 +1,60 @@
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import score_query
+from synthetic_rosters import make_model_scores
+
+SCORE = "algorex_sdoh_composite_score"
+
+
+def timed(fn, repeat: int = 5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score queries: scanning the joined frame vs the presorted score index.")
+    parser.add_argument("-n", "--rows", type=int, default=2_000_000, help="Rows in std_member_info")
+    parser.add_argument("-k", type=int, default=100, help="Members returned by top-k")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    scores = make_model_scores()
+    members = pd.DataFrame({"member_id": np.arange(args.rows).astype(str), "payer": rng.choice(["Mdcd", "Madv"], args.rows),
+                            "zip_code": rng.integers(90001, 96162, args.rows).astype(str)})
+    with tempfile.TemporaryDirectory() as tmp, sqlite3.connect(Path(tmp) / "bench.db") as conn:
+        members.to_sql("std_member_info", conn, index=False)
+        scores.to_sql("model_scores_by_zip", conn, index=False)
+        index, build_seconds = timed(lambda: score_query.open_index(conn), repeat=1)
+        _, open_seconds = timed(lambda: score_query.open_index(conn))
+        score_query._CACHE.clear()
+        _, load_seconds = timed(lambda: score_query.open_index(conn), repeat=1)
+        print(f"{'index build':<32}{build_seconds:>8.2f}s  reopen (checks sources) {open_seconds * 1000:.0f}ms  "
+              f"load from file {load_seconds:.2f}s")
+
+        joined = members.assign(Zip=members["zip_code"].str.zfill(5)).merge(
+            scores.assign(zcta=scores["zcta"].astype(str).str.zfill(5)), how="left", left_on="Zip", right_on="zcta")
+        queries = {
+            f"top {args.k} by SDOH": (lambda: joined.nlargest(args.k, SCORE), lambda: index.top(SCORE, args.k)),
+            "members of highest-SDOH zip": (lambda: joined[joined["zcta"] == joined.loc[joined[SCORE].idxmax(), "zcta"]],
+                                            lambda: index.members_in_top_zips(SCORE)),
+            "food_access_score < 2": (lambda: joined[joined["food_access_score"] < 2],
+                                      lambda: index.threshold("food_access_score", below=2)),
+            "SDOH top 1% band": (lambda: joined[joined[SCORE] >= joined[SCORE].quantile(0.99)],
+                                 lambda: index.percentile_band(SCORE, 0.99, 1.0)),
+        }
+        for name, (scan, indexed) in queries.items():
+            expected, scan_seconds = timed(scan)
+            result, index_seconds = timed(indexed)
+            print(f"{name:<32}scan {scan_seconds * 1000:>8.1f}ms  index {index_seconds * 1000:>7.2f}ms  "
+                  f"({len(result):,} vs {len(expected):,} rows)")
@@ -0,0 +1,59 @@
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import eligibility
+import sketches
+from synthetic_rosters import make_std_members
+
+AS_OF = pd.Timestamp("2026-01-01")
+
+
+def exact_summary(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Per-payer distinct counts & age quartiles the way they are answered today - read every row"""
+    rows = pd.read_sql_query("SELECT member_id, city, zip_code, date_of_birth, payer FROM std_member_info;", conn)
+    rows["age"] = eligibility.age_in_years(rows["date_of_birth"], AS_OF)
+    grouped = rows.groupby("payer")
+    summary = grouped.agg(population=("member_id", "size"), members=("member_id", "nunique"),
+                          unique_city=("city", "nunique"), unique_zip=("zip_code", "nunique"))
+    for q in (25, 50, 75):
+        summary[f"age_p{q}"] = grouped["age"].quantile(q / 100, interpolation="lower")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sketch mode: per-run sketch cost, merged-summary latency & error vs exact.")
+    parser.add_argument("-n", "--rows", type=int, default=500_000, help="Rows added per run")
+    parser.add_argument("-r", "--runs", type=int, default=6, help="Ingestion runs")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, sqlite3.connect(Path(tmp) / "bench.db") as conn:
+        record_seconds = 0.0
+        for seed in range(args.runs):
+            ## One ingestion run - about half the members were seen in earlier runs
+            run = make_std_members(args.rows, seed=seed, n_ids=args.rows * (seed + 2) // 2, dob="1940-01-01", dob_days=365 * 80, cities=5000)
+            run.to_sql("std_member_info", conn, if_exists="append", index=False)
+            start = time.perf_counter()
+            sketches.record_run(conn, run, as_of=AS_OF)
+            record_seconds += time.perf_counter() - start
+        stored = conn.execute(f"SELECT SUM(LENGTH(sketch)) FROM {sketches.SKETCH_TABLE};").fetchone()[0]
+        print(f"{'record (per run)':<24}{args.rows:>12,} rows {record_seconds / args.runs:>8.2f}s  "
+              f"({stored / 2**10:,.0f} KiB of sketches for {args.runs} runs)")
+
+        start = time.perf_counter()
+        approximate = sketches.summary(conn).set_index("payer")
+        sketch_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        exact = exact_summary(conn)
+        exact_seconds = time.perf_counter() - start
+        print(f"{'merged summary':<24}{args.rows * args.runs:>12,} rows  sketch {sketch_ms:>7.1f}ms  exact {exact_seconds:>6.2f}s")
+
+        error = (approximate[exact.columns] / exact - 1).abs()
+        for column in exact.columns:
+            print(f"{column:<24}max relative error {error[column].max():>8.3%}")
@@ -0,0 +1,61 @@
+import argparse
+import contextlib
+import importlib.util
+import io
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from synthetic_rosters import make_rosters, write_roster_db
+
+## `singular-ingestion.py` is not importable by name
+spec = importlib.util.spec_from_file_location("singular_ingestion", ROOT / "singular-ingestion.py")
+singular_ingestion = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(singular_ingestion)
+
+
+def run_engine(engine: str, db_path: Path, runs: int) -> float:
+    """Run `singular-ingestion.py` `runs` times (later runs union-write) and return total seconds"""
+    start = time.perf_counter()
+    for _ in range(runs):
+        with contextlib.redirect_stdout(io.StringIO()): ## Pandas engine prints separators
+            singular_ingestion.main(db_path=str(db_path), verbose=False, overwrite=False, engine=engine)
+    return time.perf_counter() - start
+
+
+def read_member_table(db_path: Path) -> pd.DataFrame:
+    """`std_member_info` in a canonical row order for comparison"""
+    with sqlite3.connect(db_path) as conn:
+        data = pd.read_sql_query("SELECT * FROM std_member_info;", conn)
+    return data.sort_values(list(data.columns)).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark & compare the pandas and SQL engines of singular-ingestion.py.")
+    parser.add_argument("-n", "--members", type=int, default=200_000, help="Number of unique synthetic members")
+    parser.add_argument("-r", "--runs", type=int, default=2, help="Consecutive runs (runs after the first union-write)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "source.db"
+        write_roster_db(str(source), make_rosters(args.members))
+
+        results = {}
+        for engine in ("pandas", "sql"):
+            db_path = Path(tmp) / f"{engine}.db"
+            shutil.copy(source, db_path)
+            seconds = run_engine(engine, db_path, args.runs)
+            results[engine] = read_member_table(db_path)
+            print(f"{engine:<8} {seconds:>8.2f}s  rows={len(results[engine])}")
+
+        identical = results["pandas"].equals(results["sql"])
+        print(f"identical std_member_info: {identical}")
+        sys.exit(0 if identical else 1)
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import star_schema
+from synthetic_rosters import make_members, std_layout
+
+
+def timed(fn, repeat: int = 3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Star schema: file size, encoding time and string vs integer-key scans against std_member_info.")
+    parser.add_argument("-n", "--rows", type=int, default=1_000_000, help="Roster rows")
+    args = parser.parse_args()
+
+    std = std_layout(make_members(args.rows))
+    std["payer"] = np.random.default_rng(0).choice(["Medicaid", "Medicare Advantage"], args.rows)
+    std["state"] = std["state"].map({"CA": "California", "NY": "New York", "TX": "Texas", "FL": "Florida"}).fillna(std["state"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "members.db")
+        with sqlite3.connect(db_path) as conn:
+            std.to_sql("std_member_info", conn, index=False)
+            stats, build_seconds = timed(lambda: star_schema.build(conn, rebuild=True), repeat=1)
+            print(f"{'encode (full)':<32}{build_seconds:>8.2f}s  (" +
+                  ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in stats["seconds"].items()) + ")")
+            _, append_seconds = timed(lambda: star_schema.build(conn), repeat=1)
+            print(f"{'encode (nothing appended)':<32}{append_seconds * 1000:>8.1f}ms")
+
+            flat_path, star_path = str(Path(tmp) / "flat.db"), str(Path(tmp) / "star.db")
+            conn.execute("VACUUM INTO ?;", (flat_path,))
+            with sqlite3.connect(flat_path) as flat:
+                for (name,) in flat.execute("SELECT name FROM sqlite_master WHERE type = 'view';").fetchall():
+                    flat.execute(f"DROP VIEW {star_schema.quote(name)};")
+                for table in [star_schema.FACT_TABLE, star_schema.STAR_RUN_TABLE, *star_schema.DIMENSIONS.values()]:
+                    flat.execute(f"DROP TABLE {star_schema.quote(table)};")
+            with sqlite3.connect(flat_path) as flat:
+                flat.execute("VACUUM;")
+            star_schema.export(conn, star_path)
+            print(f"{'std_member_info file':<32}{os.path.getsize(flat_path) / 2**20:>8.1f}MB")
+            print(f"{'star schema file':<32}{os.path.getsize(star_path) / 2**20:>8.1f}MB")
+
+            queries = {
+                "members per payer": ("SELECT payer, COUNT(*) FROM std_member_info GROUP BY payer;",
+                                      f"SELECT payer_key, COUNT(*) FROM {star_schema.FACT_TABLE} GROUP BY payer_key;"),
+                "members in one state": ("SELECT COUNT(*) FROM std_member_info WHERE state = 'New York';",
+                                         f"SELECT COUNT(*) FROM {star_schema.FACT_TABLE} WHERE state_key = "
+                                         "(SELECT state_key FROM dim_state WHERE state = 'New York');"),
+                "members per city & state": ("SELECT state, city, COUNT(*) FROM std_member_info GROUP BY state, city;",
+                                             f"SELECT state_key, city_key, COUNT(*) FROM {star_schema.FACT_TABLE} GROUP BY state_key, city_key;"),
+            }
+            for name, (flat_query, star_query) in queries.items():
+                _, flat_seconds = timed(lambda: conn.execute(flat_query).fetchall())
+                _, star_seconds = timed(lambda: conn.execute(star_query).fetchall())
+                print(f"{name:<32}{flat_seconds * 1000:>8.1f}ms strings  {star_seconds * 1000:>8.1f}ms keys")
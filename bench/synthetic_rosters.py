@@ -0,0 +1,278 @@
+import sqlite3
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from sql_engine import STD_COLUMN_MAPPER
+
+## Column order of `roster_1` ~ `roster_4` (`roster_5` is shuffled like the real data)
+ROSTER_COLUMN = [
+    "Person_Id", "First_Name", "Last_Name", "Dob", "Age", "Gender", "Street_Address",
+    "State", "City", "Zip", "eligibility_start_date", "eligibility_end_date", "payer"
+]
+
+FIRST_NAMES = ["John", "Maria", "Wei", "Aisha", "Carlos", "Emily", "Noah", "Olivia", "Liam", "Mary-Ann", "D'Andre"]
+LAST_NAMES = ["Koe", "Garcia", "Nguyen", "Smith", "O'Neil", "Johnson", "Lee", "Brown", "Van Dyke", "Martinez"]
+CITIES = ["Lake Sharonburgh", "Fresno", "Los Angeles", "San Diego", "Oakland", "Sacramento", "Santa Rosa", "Chico"]
+STREETS = ["Alvarez Spur", "Main St", "Oak Ave", "Pine Rd", "Sunset Blvd", "Mission St"]
+STATES = {"California": "CA", "Nevada": "NV", "Oregon": "OR", "Arizona": "AZ"}
+PAYERS = ["Mdcd", "Madv"]
+
+
+def make_members(n_members: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate unique synthetic members in the clean roster layout.
+
+    Parameters
+    ----------
+    n_members : int
+        Number of members to generate
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    pd.DataFrame
+        Members with `ROSTER_COLUMN` columns, all values stored as strings like the source rosters
+    """
+    rng = np.random.default_rng(seed)
+
+    ## Ids start with 9 so they are never mistaken for `%Y%m%d` dates
+    person_id = 90000000 + rng.choice(9999999, size=n_members, replace=False)
+    dob = pd.Timestamp("1940-01-01") + pd.to_timedelta(rng.integers(0, 365 * 80, n_members), unit="D")
+    start = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 365 * 6, n_members), unit="D")
+    end = start + pd.to_timedelta(rng.integers(30, 365 * 2, n_members), unit="D")
+    age = (pd.Timestamp("2025-06-01") - dob).days // 365
+
+    state = rng.choice(list(STATES), size=n_members, p=[0.85, 0.05, 0.05, 0.05])
+    street = [
+        f"{num} {rng.choice(STREETS)}" for num in rng.integers(1, 9999, n_members)
+    ]
+
+    return pd.DataFrame({
+        "Person_Id": person_id.astype(str),
+        "First_Name": rng.choice(FIRST_NAMES, n_members),
+        "Last_Name": rng.choice(LAST_NAMES, n_members),
+        "Dob": dob.strftime("%Y-%m-%d"),
+        "Age": age.astype(str),
+        "Gender": rng.choice(["Male", "Female"], n_members),
+        "Street_Address": street,
+        "State": state,
+        "City": rng.choice(CITIES, n_members),
+        "Zip": rng.integers(90001, 96162, n_members).astype(str),
+        "eligibility_start_date": start.strftime("%Y-%m-%d"),
+        "eligibility_end_date": end.strftime("%Y-%m-%d"),
+        "payer": rng.choice(PAYERS, n_members),
+    }, columns=ROSTER_COLUMN)
+
+
+def std_layout(roster: pd.DataFrame) -> pd.DataFrame:
+    """Roster rows (e.g. `make_members()`) in the `std_member_info` layout - renamed, without `Age` & `Gender`"""
+    return roster.rename(columns=STD_COLUMN_MAPPER).drop(columns=["Age", "Gender"])
+
+
+def make_std_members(n_rows: int, seed: int = 0, n_ids: Optional[int] = None, id_offset: int = 0,
+                     dob: str = "1980-01-01", dob_days: int = 0,
+                     start: str = "2025-01-01", start_days: int = 0, length_days: Tuple[int, int] = (364, 365),
+                     states: Sequence[str] = ("California",), cities: int = 0,
+                     zip_codes: Union[Tuple[int, int], Sequence[str]] = (90001, 96162),
+                     missing: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """
+    Generate `std_member_info` rows with placeholder names & addresses, varying only what a test counts on.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of rows
+    seed : int, optional
+        Random seed, by default 0
+    n_ids : Optional[int], optional
+        Draw member ids from `n_ids` values (repeated members), by default None (one id per row)
+    id_offset : int, optional
+        Added to every member id, by default 0
+    dob : str, optional
+        Birth date, or the earliest one when `dob_days` > 0, by default "1980-01-01"
+    dob_days : int, optional
+        Spread birth dates uniformly over this many days, by default 0
+    start : str, optional
+        Eligibility start, or the earliest one when `start_days` > 0, by default "2025-01-01"
+    start_days : int, optional
+        Spread eligibility starts uniformly over this many days, by default 0
+    length_days : Tuple[int, int], optional
+        Eligibility end = start + [low, high) days (negative lows give reversed periods), by default the rest of the year
+    states : Sequence[str], optional
+        States drawn from, by default ("California",)
+    cities : int, optional
+        Number of distinct (numeric) cities, by default 0 (every city "X")
+    zip_codes : Union[Tuple[int, int], Sequence[str]], optional
+        `(low, high)` integer zip range, or the zip strings drawn from, by default the California range
+    missing : Optional[Dict[str, float]], optional
+        Column -> fraction of rows set to None, by default None
+
+    Returns
+    -------
+    pd.DataFrame
+        Rows with `STD_COLUMN_MAPPER`'s columns, dates as `%Y-%m-%d` strings
+    """
+    rng = np.random.default_rng(seed)
+    member_id = np.arange(n_rows) if n_ids is None else rng.integers(0, n_ids, n_rows)
+    born = np.datetime64(dob) + (rng.integers(0, dob_days, n_rows) if dob_days else 0)
+    first = np.datetime64(start) + (rng.integers(0, start_days, n_rows) if start_days else np.zeros(n_rows, dtype=np.int64))
+    last = first + rng.integers(*length_days, n_rows)
+    zips = rng.choice(list(zip_codes), n_rows) if isinstance(zip_codes[0], str) else rng.integers(*zip_codes, n_rows).astype(str)
+    members = pd.DataFrame({
+        "member_id": (id_offset + member_id).astype(str), "member_first_name": "A", "member_last_name": "B",
+        "date_of_birth": np.broadcast_to(born, n_rows).astype(str), "main_address": "1 Main St",
+        "state": rng.choice(list(states), n_rows), "city": rng.integers(0, cities, n_rows).astype(str) if cities else "X",
+        "zip_code": zips, "eligibility_start_date": first.astype(str), "eligibility_end_date": last.astype(str),
+        "payer": rng.choice(PAYERS, n_rows),
+    })
+    for column, fraction in (missing or {}).items():
+        members.loc[rng.random(n_rows) < fraction, column] = None
+    return members
+
+
+def make_rosters(n_members: int, n_rosters: int = 5, overlap: float = 0.2, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """
+    Split synthetic members into `roster_` tables carrying the quirks found in the EDA.
+
+    Parameters
+    ----------
+    n_members : int
+        Number of unique members across all rosters
+    n_rosters : int, optional
+        Number of roster tables, by default 5
+    overlap : float, optional
+        Fraction of each roster re-sent in the next roster (cross-roster duplicates), by default 0.2
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    Dict[str, pd.DataFrame]
+        Roster tables keyed by table name
+
+    Notes
+    -----
+    * `roster_2` uses `%m/%d/%Y` dates
+    * `roster_4` uses state abbreviations
+    * `roster_5` has a shuffled column order
+    """
+    members = make_members(n_members, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+
+    rosters = {}
+    for idx, chunk in enumerate(np.array_split(members, n_rosters), start=1):
+        chunk = chunk.copy()
+        if idx > 1 and overlap > 0:
+            previous = rosters[f"roster_{idx - 1}"]
+            resent = previous.sample(frac=overlap, random_state=int(rng.integers(1 << 31)))
+            chunk = pd.concat([chunk, resent], ignore_index=True)
+        rosters[f"roster_{idx}"] = chunk.reset_index(drop=True)
+
+    for name, roster in rosters.items():
+        roster = roster.copy()
+        if name == "roster_2":
+            for col in ("Dob", "eligibility_start_date", "eligibility_end_date"):
+                roster[col] = pd.to_datetime(roster[col]).dt.strftime("%m/%d/%Y")
+        if name == "roster_4":
+            roster["State"] = roster["State"].map(lambda s: STATES.get(s, s))
+        if name == "roster_5":
+            roster = roster[list(reversed(ROSTER_COLUMN))]
+        rosters[name] = roster
+
+    return rosters
+
+
+def make_model_scores(seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a synthetic `model_scores_by_zip` table over the California zip range.
+
+    Parameters
+    ----------
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per zcta with the score columns of `model_scores_by_zip`
+    """
+    rng = np.random.default_rng(seed)
+    zcta = np.arange(90001, 96162)
+    n = len(zcta)
+    return pd.DataFrame({
+        "zcta": zcta,
+        "state_code": 6.0,
+        "state name": "California",
+        "neighborhood_stress_score": rng.normal(-0.06, 0.69, n).round(2),
+        "algorex_sdoh_composite_score": rng.normal(6.43, 0.46, n).round(2),
+        "social_isolation_score": rng.normal(3.07, 0.80, n).clip(0).round(2),
+        "transportation_access_score": rng.normal(4.24, 0.70, n).clip(0).round(2),
+        "food_access_score": rng.normal(3.16, 0.70, n).clip(0).round(2),
+        "unstable_housing_score": rng.normal(2.64, 0.60, n).clip(0).round(2),
+        "state_govt_assistance": rng.uniform(0, 1, n).round(2),
+        "homeless_indicator": rng.integers(0, 20, n).astype(float),
+        "derived_indicator": rng.integers(0, 2, n),
+    })
+
+
+def write_roster_db(path: str, rosters: Dict[str, pd.DataFrame], model_scores: Optional[pd.DataFrame] = None) -> None:
+    """
+    Write synthetic rosters (and optionally model scores) into a SQLite `.db` file.
+
+    Parameters
+    ----------
+    path : str
+        Target `.db` file
+    rosters : Dict[str, pd.DataFrame]
+        Roster tables keyed by table name
+    model_scores : pd.DataFrame, optional
+        `model_scores_by_zip` table, skipped if None
+    """
+    conn = sqlite3.connect(path)
+    for name, roster in rosters.items():
+        roster.to_sql(name, conn, if_exists="replace", index=False)
+    if model_scores is not None:
+        model_scores.to_sql("model_scores_by_zip", conn, if_exists="replace", index=False)
+    conn.commit()
+    conn.close()
+
+
+def make_zcta_polygons(n_zctas: int = 2_000, vertices: int = 400, seed: int = 0):
+    """
+    Generate a synthetic `tl_2020_us_zcta520` layer - wiggly, non-overlapping polygons on a grid
+    over California, numbered evenly over the real ZCTA range (00601 ~ 99929) in row-major order.
+
+    Parameters
+    ----------
+    n_zctas : int, optional
+        Number of polygons, by default 2,000
+    vertices : int, optional
+        Vertices per polygon ring, by default 400 (the real layer averages a few hundred)
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    gpd.GeoDataFrame
+        `ZCTA5CE20` (5-digit string) & `geometry` in EPSG:4269, like the Census shapefile
+    """
+    import geopandas as gpd
+    import shapely
+
+    rng = np.random.default_rng(seed)
+    side = int(np.ceil(np.sqrt(n_zctas)))
+    cell = 10.0 / side
+    row, col = np.divmod(np.arange(n_zctas), side)
+    center_x, center_y = -124.0 + (col + 0.5) * cell, 32.0 + (row + 0.5) * cell
+    angle = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    phase = rng.uniform(0, 2 * np.pi, (n_zctas, 1))
+    ## Radius stays under half a cell, so neighbours never overlap
+    radius = cell * (0.38 + 0.05 * np.sin(7 * angle + phase) + rng.uniform(0, 0.04, (n_zctas, vertices)))
+    rings = np.stack([center_x[:, None] + radius * np.cos(angle), center_y[:, None] + radius * np.sin(angle)], axis=-1)
+    rings = np.concatenate([rings, rings[:, :1]], axis=1)
+    zcta = np.linspace(601, 99929, n_zctas).round().astype(int)
+    return gpd.GeoDataFrame({"ZCTA5CE20": pd.Series(zcta).astype(str).str.zfill(5)},
+                            geometry=shapely.polygons(rings), crs="EPSG:4269")
@@ -0,0 +1,49 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import zcta_assign
+import zcta_geometry
+from synthetic_rosters import make_zcta_polygons
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ZCTA assignment: geopandas spatial join vs the cached STR-tree index.")
+    parser.add_argument("-z", "--zctas", type=int, default=33_791, help="Polygons in the synthetic shapefile")
+    parser.add_argument("-v", "--vertices", type=int, default=400, help="Vertices per polygon")
+    parser.add_argument("-n", "--points", type=int, default=2_000_000, help="Geocoded addresses to assign")
+    parser.add_argument("-a", "--addresses", type=float, default=0.7, help="Distinct coordinates per point (shared addresses)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    polygons = make_zcta_polygons(args.zctas, args.vertices)
+    distinct = max(int(args.points * args.addresses), 1)
+    coordinates = rng.uniform([-124.0, 32.0], [-114.0, 42.0], (distinct, 2))[rng.integers(0, distinct, args.points)]
+    with tempfile.TemporaryDirectory() as tmp:
+        shapefile = str(Path(tmp) / "tl_2020_us_zcta520.shp")
+        polygons.to_file(shapefile)
+
+        start = time.perf_counter()
+        zctas = gpd.read_file(shapefile)
+        points = gpd.GeoDataFrame(geometry=gpd.points_from_xy(coordinates[:, 0], coordinates[:, 1]), crs=zctas.crs)
+        joined = gpd.sjoin(points, zctas, how="left", predicate="within")
+        joined = joined[~joined.index.duplicated()]
+        sjoin_seconds = time.perf_counter() - start
+        print(f"{'read_file + sjoin':<28}{sjoin_seconds:>8.2f}s  {args.points / sjoin_seconds * 60 / 1e6:>6.1f}M points/min")
+
+        zcta_geometry.ensure(shapefile, (zcta_geometry.FULL_RESOLUTION,))
+        start = time.perf_counter()
+        index = zcta_assign.ZctaIndex.load(shapefile)
+        load_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        assigned = index.assign(coordinates[:, 0], coordinates[:, 1])
+        assign_seconds = time.perf_counter() - start
+        same = np.array_equal(assigned, joined["ZCTA5CE20"].fillna("-1").astype(int).to_numpy())
+        print(f"{'cached index + assign':<28}{load_seconds + assign_seconds:>8.2f}s  "
+              f"{args.points / assign_seconds * 60 / 1e6:>6.1f}M points/min  (index load {load_seconds:.2f}s, same: {same})")
@@ -0,0 +1,55 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import zcta_geometry
+from synthetic_rosters import make_zcta_polygons
+
+
+def notebook_choropleth(shapefile: str, zips: pd.Series) -> gpd.GeoDataFrame:
+    """The notebook's way - full-resolution shapefile, then a string merge of the zip counts"""
+    zctas = gpd.read_file(shapefile)
+    zipcode_counts = zips.value_counts().rename("count").rename_axis("Zip").reset_index()
+    return zctas.merge(zipcode_counts, how="left", left_on="ZCTA5CE20", right_on="Zip")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ZCTA choropleth input: full shapefile + merge vs the simplified geometry cache.")
+    parser.add_argument("-z", "--zctas", type=int, default=33_791, help="Polygons in the synthetic shapefile (the 2020 layer has 33,791)")
+    parser.add_argument("-v", "--vertices", type=int, default=400, help="Vertices per polygon")
+    parser.add_argument("-n", "--members", type=int, default=1_000_000, help="Member zips counted onto the map")
+    args = parser.parse_args()
+
+    polygons = make_zcta_polygons(args.zctas, args.vertices)
+    zips = polygons["ZCTA5CE20"].sample(args.members, replace=True, random_state=0).reset_index(drop=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        shapefile = str(Path(tmp) / "tl_2020_us_zcta520.shp")
+        polygons.to_file(shapefile)
+        print(f"{'shapefile':<28}{Path(shapefile).stat().st_size / 2**20:>10,.1f} MiB")
+
+        start = time.perf_counter()
+        expected = notebook_choropleth(shapefile, zips)
+        print(f"{'read_file + merge':<28}{time.perf_counter() - start:>10.2f}s")
+
+        start = time.perf_counter()
+        directory = zcta_geometry.build(shapefile)
+        print(f"{'one-time cache build':<28}{time.perf_counter() - start:>10.2f}s")
+        for tolerance in zcta_geometry.TOLERANCES:
+            zcta_geometry._CACHE.clear()
+            start = time.perf_counter()
+            frame = zcta_geometry.choropleth_frame(zips, tolerance, shapefile)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            zcta_geometry.choropleth_frame(zips, tolerance, shapefile)
+            warm = time.perf_counter() - start
+            size = zcta_geometry.layer_path(directory, tolerance).stat().st_size / 2**20
+            same = np.array_equal(frame["count"].to_numpy(), expected["count"].to_numpy(dtype=float), equal_nan=True)
+            print(f"{f'cache, tolerance {tolerance:g}':<28}{cold:>10.2f}s  (next payer {warm * 1000:.0f}ms, "
+                  f"{size:,.1f} MiB, same counts: {same})")
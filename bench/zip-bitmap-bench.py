@@ -0,0 +1,41 @@
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import ingestion
+import zip_bitmap
+from synthetic_rosters import make_model_scores, make_rosters
+
+
+def timed(fn, repeat: int = 3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Zip existence check: bitmap lookup vs joining to model_scores_by_zip, and its share of validate_data.")
+    parser.add_argument("-n", "--rows", type=int, default=1_000_000, help="Roster rows")
+    args = parser.parse_args()
+
+    roster = make_rosters(args.rows, n_rosters=1)["roster_1"]
+    scores = make_model_scores()
+    with sqlite3.connect(":memory:") as conn:
+        scores.to_sql("model_scores_by_zip", conn, index=False)
+        bitmap, build_seconds = timed(lambda: zip_bitmap.open_bitmap(zip_bitmap.SCORES_SOURCE, conn), repeat=1)
+    print(f"{'bitmap build':<32}{build_seconds * 1000:>8.1f}ms  ({len(bitmap):,} zips)")
+
+    zctas = scores[["zcta"]].assign(Zip=scores["zcta"].astype(str).str.zfill(5))
+    joined, join_seconds = timed(lambda: roster[["Zip"]].merge(zctas, on="Zip", how="left")["zcta"].notna().to_numpy())
+    looked_up, lookup_seconds = timed(lambda: bitmap.contains(roster["Zip"]))
+    print(f"{'join to model_scores_by_zip':<32}{join_seconds * 1000:>8.1f}ms")
+    print(f"{'bitmap lookup':<32}{lookup_seconds * 1000:>8.1f}ms  (same: {bool((joined == looked_up).all())})")
+
+    _, plain_seconds = timed(lambda: ingestion.validate_data(roster), repeat=1)
+    _, checked_seconds = timed(lambda: ingestion.validate_data(roster, valid_zips=bitmap), repeat=1)
+    print(f"{'validate_data':<32}{plain_seconds:>8.2f}s  with --valid-zips {checked_seconds:.2f}s "
+          f"(+{(checked_seconds / plain_seconds - 1) * 100:.1f}%)")
@@ -0,0 +1,151 @@
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+## Two independent 16-byte hash keys -> the (h1, h2) pair used for double hashing
+DIGEST_KEYS = ("row-digest-key-1", "row-digest-key-2")
+CHUNK_ROWS = 100_000 ## Rows hashed at a time, bounds the (rows x hashes) position matrix
+FORMAT_VERSION = 1
+
+
+def row_digests(df: pd.DataFrame) -> np.ndarray:
+    """
+    Two 64-bit digests per row over all columns
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Rows to digest
+
+    Returns
+    -------
+    np.ndarray
+        `(len(df), 2)` uint64 array
+
+    Notes
+    -----
+    * Rows are normalized before hashing: columns in name order, every value by its string
+      form - so a row digests the same whether it comes from a roster or is read back from SQLite
+    """
+    normalized = df[sorted(df.columns)].astype(str)
+    return np.column_stack([
+        pd.util.hash_pandas_object(normalized, index=False, hash_key=key).to_numpy()
+        for key in DIGEST_KEYS
+    ])
+
+
+class BloomFilter:
+    """
+    Bloom filter over row digests - `contains()` has false positives, never false negatives
+
+    Parameters
+    ----------
+    capacity : int
+        Number of rows the filter is sized for
+    error_rate : float, optional
+        Target false-positive rate at `capacity` rows, by default 0.01
+
+    Notes
+    -----
+    * `num_bits = -capacity * ln(error_rate) / ln(2)^2` and `num_hashes = num_bits / capacity * ln(2)`
+    * The `num_hashes` bit positions of a row are `h1 + i * h2 (mod num_bits)` (double hashing)
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError(f"Invalid Bloom filter size: capacity={capacity}, error_rate={error_rate}")
+        self.capacity = int(capacity)
+        self.error_rate = float(error_rate)
+        self.num_bits = max(8, math.ceil(-self.capacity * math.log(self.error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, digests: np.ndarray) -> np.ndarray:
+        """`(rows, num_hashes)` bit positions - uint64 arithmetic wraps like the modular hash"""
+        h1 = digests[:, 0:1]
+        h2 = digests[:, 1:2] | np.uint64(1) ## Odd step, so probes never collapse onto one bit
+        steps = np.arange(self.num_hashes, dtype=np.uint64)
+        return (h1 + steps * h2) % np.uint64(self.num_bits)
+
+    def add(self, digests: np.ndarray) -> None:
+        """Insert rows by their `row_digests()`"""
+        for start in range(0, len(digests), CHUNK_ROWS):
+            positions = self._positions(digests[start:start + CHUNK_ROWS]).ravel()
+            np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                             np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+        self.count += len(digests)
+
+    def contains(self, digests: np.ndarray) -> np.ndarray:
+        """Boolean mask - False means definitely not inserted, True means maybe inserted"""
+        result = np.empty(len(digests), dtype=bool)
+        for start in range(0, len(digests), CHUNK_ROWS):
+            positions = self._positions(digests[start:start + CHUNK_ROWS])
+            is_set = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+            result[start:start + CHUNK_ROWS] = is_set.all(axis=1)
+        return result
+
+    @property
+    def nbytes(self) -> int:
+        """Memory footprint of the bit array"""
+        return self.bits.nbytes
+
+    def expected_fp_rate(self) -> float:
+        """Theoretical false-positive rate at the current fill, `(1 - e^(-k * n / m))^k`"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def save(self, path: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Write the filter (and caller metadata) to `path` atomically
+
+        Parameters
+        ----------
+        path : str
+            Target file
+        metadata : Dict[str, Any], optional
+            JSON-serializable metadata stored with the filter
+        """
+        header = {
+            "version": FORMAT_VERSION, "capacity": self.capacity, "error_rate": self.error_rate,
+            "num_bits": self.num_bits, "num_hashes": self.num_hashes, "count": self.count,
+            "metadata": metadata or {},
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, bits=self.bits, header=np.array(json.dumps(header)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["BloomFilter", Dict[str, Any]]:
+        """
+        Read a filter written by `save()`
+
+        Returns
+        -------
+        Tuple[BloomFilter, Dict[str, Any]]
+            Filter & the metadata saved with it
+
+        Raises
+        ------
+        ValueError
+            Unknown file format version
+        """
+        with np.load(path) as data:
+            header = json.loads(str(data["header"]))
+            if header.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported Bloom filter file version: {header.get('version')}")
+            bloom = cls(header["capacity"], header["error_rate"])
+            bloom.bits = data["bits"]
+        bloom.count = header["count"]
+        return bloom, header["metadata"]
+
+
+def filter_path(db_path: str) -> Path:
+    """Bloom filter file kept next to the database, e.g. `members.db` -> `members.db.bloom`"""
+    db_path = Path(db_path)
+    return db_path.with_name(db_path.name + ".bloom")
@@ -0,0 +1,376 @@
+import math
+import pickle
+import re
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Literal, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from sql_engine import quote
+
+MEMORY_UNIT = {
+    "": 1, "B": 1,
+    "K": 2**10, "KB": 2**10, "KIB": 2**10,
+    "M": 2**20, "MB": 2**20, "MIB": 2**20,
+    "G": 2**30, "GB": 2**30, "GIB": 2**30,
+    "T": 2**40, "TB": 2**40, "TIB": 2**40,
+}
+
+## One 16-byte hash key per partitioning level, so an oversized partition re-splits differently
+HASH_KEYS = ("roster-dedup-l0-", "roster-dedup-l1-", "roster-dedup-l2-", "roster-dedup-l3-")
+DEFAULT_FANOUT = 64
+MEMORY_SAMPLE_ROWS = 10_000
+POSITION_COLUMN = "dedup_position" ## Input position of each staged row - restores first-occurrence order
+
+
+def parse_memory(value: Union[str, int]) -> int:
+    """
+    Parse a memory budget such as `"512MB"`, `"2GB"`, `"1.5G"` or a plain byte count
+
+    Parameters
+    ----------
+    value : Union[str, int]
+        Memory budget
+
+    Returns
+    -------
+    int
+        Budget in bytes
+
+    Raises
+    ------
+    ValueError
+        Unparseable or non-positive budget
+    """
+    if isinstance(value, int):
+        size = value
+    else:
+        match = re.fullmatch(r"\s*([0-9]*\.?[0-9]+)\s*([A-Za-z]*)\s*", str(value))
+        if match is None or match.group(2).upper() not in MEMORY_UNIT:
+            raise ValueError(f"Invalid memory size: {value!r}")
+        size = int(float(match.group(1)) * MEMORY_UNIT[match.group(2).upper()])
+    if size <= 0:
+        raise ValueError(f"Memory size must be positive: {value!r}")
+    return size
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """In-memory size of `df` in bytes including string payloads, estimated from evenly spaced rows"""
+    if len(df) <= MEMORY_SAMPLE_ROWS:
+        return int(df.memory_usage(deep=True, index=False).sum())
+    sample = df.iloc[::len(df) // MEMORY_SAMPLE_ROWS]
+    return int(sample.memory_usage(deep=True, index=False).sum() * len(df) / len(sample))
+
+
+def row_hash(df: pd.DataFrame, level: int = 0) -> np.ndarray:
+    """
+    64-bit hash of every row over all columns
+
+    Notes
+    -----
+    * Values are hashed by their string form with columns in name order, so equal rows
+      hash equally whatever the column order or dtype (`90001` vs `"90001"`) of their frame
+    """
+    return pd.util.hash_pandas_object(
+        df[sorted(df.columns)].astype(str), index=False, hash_key=HASH_KEYS[level]
+    ).to_numpy()
+
+
+class PartitionSpill:
+    """
+    Hash-partitioned spill of DataFrames to local temp files
+
+    Every row goes to partition `row_hash(row) % n_partitions`, so all copies of a row land
+    in the same partition. Pieces are appended to each partition file in arrival order.
+
+    Parameters
+    ----------
+    n_partitions : int
+        Number of partitions
+    spill_dir : str, optional
+        Parent directory of the spill files - the system temp directory if None
+    level : int, optional
+        Partitioning level, selects the hash key, by default 0
+    """
+
+    def __init__(self, n_partitions: int, spill_dir: Optional[str] = None, level: int = 0):
+        self.n_partitions = n_partitions
+        self.level = level
+        self.directory = Path(tempfile.mkdtemp(prefix="dedup-spill-", dir=spill_dir))
+        self.rows = np.zeros(n_partitions, dtype=np.int64)
+        self.bytes = np.zeros(n_partitions, dtype=np.int64)
+
+    def path(self, partition: int) -> Path:
+        return self.directory / f"partition-{partition:05d}.pkl"
+
+    def add(self, df: pd.DataFrame, size: Optional[int] = None) -> None:
+        """Append the rows of `df` (index kept) to their partitions"""
+        if df.empty:
+            return
+        size = frame_memory(df) if size is None else size
+        partition = row_hash(df, self.level) % self.n_partitions
+        for part, piece in df.groupby(partition, sort=False):
+            with open(self.path(part), "ab") as f:
+                pickle.dump(piece, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self.rows[part] += len(piece)
+            self.bytes[part] += size * len(piece) // len(df)
+
+    def pieces(self, partition: int) -> Iterator[pd.DataFrame]:
+        """Pieces of one partition, in arrival order"""
+        if self.rows[partition] == 0:
+            return
+        with open(self.path(partition), "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def load(self, partition: int) -> pd.DataFrame:
+        """Whole partition as one DataFrame"""
+        return pd.concat(list(self.pieces(partition)))
+
+    def close(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def dedupe_in_memory(data: pd.DataFrame, count_duplicates: bool = False) -> Tuple[pd.DataFrame, Optional[int]]:
+    """
+    `drop_duplicates()` plus the number of distinct rows occurring more than once
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, Optional[int]]
+        Unique rows (first occurrences) & duplicated distinct row count (None if not counted)
+    """
+    duplicate_count = None
+    if count_duplicates:
+        duplicate_count = data[data.duplicated(keep=False)].drop_duplicates().shape[0]
+    return data.drop_duplicates(), duplicate_count
+
+
+def _dedupe_spill(spill: PartitionSpill, budget: int, count_duplicates: bool,
+                  stats: Dict[str, Optional[int]]) -> Iterator[pd.DataFrame]:
+    """
+    Unique rows of `spill`, partition by partition, re-splitting partitions still larger than `budget`
+
+    Adds each partition's duplicated distinct rows to `stats["duplicate_rows"]` and counts it
+    in `stats["partitions"]` before yielding it.
+    """
+    for part in np.flatnonzero(spill.rows):
+        if spill.bytes[part] > budget and spill.level + 1 < len(HASH_KEYS):
+            sub_spill = PartitionSpill(DEFAULT_FANOUT, spill_dir=str(spill.directory), level=spill.level + 1)
+            try:
+                for piece in spill.pieces(part):
+                    sub_spill.add(piece)
+                yield from _dedupe_spill(sub_spill, budget, count_duplicates, stats)
+            finally:
+                sub_spill.close()
+            continue
+
+        ## Copies of a row never cross partitions, so per-partition results add up exactly
+        unique, duplicates = dedupe_in_memory(spill.load(part), count_duplicates=count_duplicates)
+        stats["duplicate_rows"] += duplicates or 0
+        stats["partitions"] += 1
+        yield unique
+
+
+def _unique_parts(frames: Iterable[pd.DataFrame], max_memory: Union[str, int], spill_dir: Optional[str],
+                  count_duplicates: bool, stats: Dict[str, Optional[int]], columns: List[str]) -> Iterator[pd.DataFrame]:
+    """
+    Unique rows of the stacked `frames` (index = position in the stacked input), one part at a time
+
+    Frames are buffered while they fit in half of `max_memory` (pandas' hash table roughly
+    doubles the working set) and deduplicated in memory as one part. Past that, every frame is
+    hash-partitioned to temp files and each partition is a part. `stats` is filled in as parts are
+    yielded, `columns` once every frame was read.
+    """
+    budget = parse_memory(max_memory) // 2
+    buffered, buffered_bytes, rows = [], 0, 0
+    spill = None
+    stats.update({"rows": 0, "unique_rows": 0, "duplicate_rows": 0, "partitions": 0})
+
+    try:
+        for frame in frames:
+            ## Global row position as index - restores first-occurrence order after partitioning
+            frame = frame.set_axis(pd.RangeIndex(rows, rows + len(frame)), axis=0, copy=False)
+            rows += len(frame)
+            columns.extend(col for col in frame.columns if col not in columns)
+
+            size = frame_memory(frame)
+            if spill is None:
+                buffered.append(frame)
+                buffered_bytes += size
+                if buffered_bytes > budget:
+                    spill = PartitionSpill(max(DEFAULT_FANOUT, math.ceil(4 * buffered_bytes / budget)), spill_dir)
+                    while buffered:
+                        spill.add(buffered.pop(0))
+            else:
+                spill.add(frame, size=size)
+            del frame ## Released before the next frame is read
+
+        stats["rows"] = rows
+        if spill is None:
+            data = pd.concat(buffered) if buffered else pd.DataFrame(columns=columns)
+            unique, duplicate_count = dedupe_in_memory(data, count_duplicates=count_duplicates)
+            stats["duplicate_rows"] = duplicate_count or 0
+            parts = [unique]
+        else:
+            parts = _dedupe_spill(spill, budget, count_duplicates, stats)
+        for unique in parts:
+            stats["unique_rows"] += len(unique)
+            yield unique
+    finally:
+        if spill is not None:
+            spill.close()
+        if not count_duplicates:
+            stats["duplicate_rows"] = None
+
+
+def _assemble(store: List[Tuple[Path, np.ndarray, Dict[str, np.dtype]]], columns: List[str]) -> pd.DataFrame:
+    """
+    Unique rows of every stored partition in global row order
+
+    Columns are filled in place one partition at a time, so only the result and a single
+    partition are in memory - no concat + sort copies.
+    """
+    positions = np.sort(np.concatenate([index for _, index, _ in store])) if store else np.empty(0, dtype=np.int64)
+    values = {col: np.empty(len(positions), dtype=object) for col in columns}
+    dtypes: Dict[str, set] = {col: set() for col in columns}
+    for path, index, part_dtypes in store:
+        with open(path, "rb") as f:
+            unique = pickle.load(f)
+        target = np.searchsorted(positions, index)
+        for col in columns:
+            if col in unique.columns:
+                values[col][target] = unique[col].to_numpy(dtype=object)
+                dtypes[col].add(part_dtypes[col])
+            else:
+                values[col][target] = np.nan
+                dtypes[col].add(np.dtype(object))
+        del unique
+
+    result = pd.DataFrame(values, index=pd.Index(positions), columns=columns, copy=False)
+    ## Same dtype in every partition -> restore it, like `pd.concat()` would
+    return result.astype({col: next(iter(found)) for col, found in dtypes.items() if len(found) == 1})
+
+
+def drop_duplicates(frames: Iterable[pd.DataFrame], max_memory: Union[str, int],
+                    spill_dir: Optional[str] = None,
+                    count_duplicates: bool = False) -> Tuple[pd.DataFrame, Dict[str, Optional[int]]]:
+    """
+    `pd.concat(frames).drop_duplicates()` within a memory budget
+
+    Frames are buffered while they fit in half of `max_memory` (pandas' hash table roughly
+    doubles the working set) and deduplicated in memory as before. Past that, every frame is
+    hash-partitioned to temp files and partitions are deduplicated one at a time.
+
+    Parameters
+    ----------
+    frames : Iterable[pd.DataFrame]
+        Frames to stack & dedupe - consumed lazily, expected to share their columns
+    max_memory : Union[str, int]
+        Memory budget, e.g. "2GB" (see `parse_memory()`)
+    spill_dir : str, optional
+        Directory for the spill files - the system temp directory if None
+    count_duplicates : bool, optional
+        Also count distinct rows occurring more than once, by default False
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, Dict[str, Optional[int]]]
+        Unique rows in first-occurrence order (index = position in the stacked input), and
+        `rows`, `unique_rows`, `duplicate_rows` (None unless counted), `partitions` (0 if in memory)
+
+    Notes
+    -----
+    * The result equals `pd.concat(frames, ignore_index=True).drop_duplicates()`, row order
+      and duplicate count included
+    * The budget bounds the deduplication working set - the unique rows are still returned
+      as one DataFrame, assembled from disk one partition at a time. `drop_duplicates_to_sql()`
+      writes them to SQLite instead
+    """
+    stats: Dict[str, Optional[int]] = {}
+    columns: List[str] = []
+    store, store_dir, result = [], None, None
+    try:
+        for unique in _unique_parts(frames, max_memory, spill_dir, count_duplicates, stats, columns):
+            if not stats["partitions"]: ## Deduplicated in memory - the only part
+                result = unique
+                continue
+            if store_dir is None:
+                store_dir = Path(tempfile.mkdtemp(prefix="dedup-unique-", dir=spill_dir))
+            path = store_dir / f"unique-{len(store):05d}.pkl"
+            with open(path, "wb") as f:
+                pickle.dump(unique, f, protocol=pickle.HIGHEST_PROTOCOL)
+            store.append((path, unique.index.to_numpy(), unique.dtypes.to_dict()))
+        if result is None:
+            result = _assemble(store, columns)
+    finally:
+        if store_dir is not None:
+            shutil.rmtree(store_dir, ignore_errors=True)
+    return result, stats
+
+
+def drop_duplicates_to_sql(frames: Iterable[pd.DataFrame], conn: sqlite3.Connection, table_name: str,
+                           max_memory: Union[str, int], spill_dir: Optional[str] = None, count_duplicates: bool = False,
+                           skip_rows: int = 0, if_exists: Literal["append", "replace"] = "append") -> Dict[str, Optional[int]]:
+    """
+    `drop_duplicates()` written into `table_name` - the unique rows are never in memory together
+
+    Each part's unique rows go to a staging table with their input position as soon as they are
+    deduplicated, then one `INSERT ... SELECT ... ORDER BY` copies them into `table_name` in
+    first-occurrence order. The first `skip_rows` input rows are rows `table_name` already holds
+    (a union-write streams them first): only rows first seen after them are appended, so the
+    stored rows keep their rowids.
+
+    Parameters
+    ----------
+    frames : Iterable[pd.DataFrame]
+        Frames to stack & dedupe - consumed lazily, expected to share their columns
+    conn : sqlite3.Connection
+        Connection to the target database
+    table_name : str
+        Target table, created with the columns of `frames` if missing
+    max_memory : Union[str, int]
+        Memory budget, e.g. "2GB" (see `parse_memory()`)
+    spill_dir : str, optional
+        Directory for the spill files - the system temp directory if None
+    count_duplicates : bool, optional
+        Also count distinct rows occurring more than once, by default False
+    skip_rows : int, optional
+        Leading input rows already stored in `table_name`, by default 0
+    if_exists : Literal["append", "replace"], optional
+        Append to `table_name`, or write the unique rows in its place, by default "append"
+
+    Returns
+    -------
+    Dict[str, Optional[int]]
+        `drop_duplicates()` statistics, plus `added_rows` written to `table_name`
+    """
+    staging_name = f"{table_name}_dedup_staging"
+    staging = quote(staging_name)
+    stats: Dict[str, Optional[int]] = {"added_rows": 0}
+    columns: List[str] = []
+    conn.execute(f"DROP TABLE IF EXISTS {staging};")
+    try:
+        for unique in _unique_parts(frames, max_memory, spill_dir, count_duplicates, stats, columns):
+            new = unique[unique.index >= skip_rows].reindex(columns=columns)
+            if columns:
+                new.to_sql(staging_name, conn, if_exists="append", index=True, index_label=POSITION_COLUMN)
+            stats["added_rows"] += len(new)
+        if columns:
+            declared = [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({staging});") if row[1] != POSITION_COLUMN]
+            selected = ", ".join(quote(name) for name, _ in declared)
+            if if_exists == "replace":
+                conn.execute(f"DROP TABLE IF EXISTS {quote(table_name)};")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {quote(table_name)} ({', '.join(f'{quote(name)} {kind}' for name, kind in declared)});")
+            conn.execute(f"INSERT INTO {quote(table_name)} ({selected}) SELECT {selected} FROM {staging} ORDER BY {POSITION_COLUMN};")
+    finally:
+        conn.execute(f"DROP TABLE IF EXISTS {staging};")
+        conn.commit()
+    return stats
@@ -0,0 +1,203 @@
+import argparse
+import sqlite3
+import sys
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import bloom
+from eligibility import AGE_BANDS, NaT_DAYS, age_in_years, to_days
+from sql_engine import quote, rowids_unchanged
+
+MEMBER_TABLE = "std_member_info"
+DERIVED_TABLE = "member_derived"
+DERIVED_RUN_TABLE = "member_derived_run" ## One row: the reference date & the source rows covered
+AGE_BAND_EDGES = AGE_BANDS ## Lower bound of each band, the last one open-ended - the bands of `member_cube`
+NO_BAND = -1
+
+
+def band_labels(edges: Sequence[int] = AGE_BAND_EDGES) -> list:
+    """`AGE_BAND_EDGES` -> `["0-17", "18-34", ..., "85+"]`"""
+    return [f"{low}-{high - 1}" for low, high in zip(edges[:-1], edges[1:])] + [f"{edges[-1]}+"]
+
+
+def age_bands(ages: np.ndarray, edges: Sequence[int] = AGE_BAND_EDGES) -> np.ndarray:
+    """Band index of each age (into `band_labels(edges)`), `NO_BAND` for missing or negative ages"""
+    ages = np.asarray(ages, dtype=float)
+    known = ~np.isnan(ages) & (ages >= edges[0])
+    return np.where(known, np.searchsorted(np.asarray(edges), np.where(known, ages, 0), side="right") - 1, NO_BAND)
+
+
+def eligibility_days(start: pd.Series, end: pd.Series) -> np.ndarray:
+    """Days covered by each inclusive eligibility period - NaN when a date is missing or the period ends before it starts"""
+    start_days, end_days = to_days(start), to_days(end)
+    days = (end_days - start_days + 1).astype(float)
+    return np.where((start_days == NaT_DAYS) | (end_days == NaT_DAYS) | (days < 1), np.nan, days)
+
+
+def derive(data: pd.DataFrame, as_of: pd.Timestamp, edges: Sequence[int] = AGE_BAND_EDGES) -> pd.DataFrame:
+    """
+    Age as of `as_of`, age band & eligibility length of each row - datetime64 arithmetic, no per-row Python
+
+    The roster's `Age` string is recorded at an unknown date and drifts from `Dob`; ages here are
+    always whole years from `date_of_birth` to `as_of` (a birthday on `as_of` counts, a birth
+    after `as_of` has no age).
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Rows with `date_of_birth`, `eligibility_start_date` & `eligibility_end_date`
+        (`%Y-%m-%d` strings or datetimes)
+    as_of : pd.Timestamp
+        Reference date
+    edges : Sequence[int], optional
+        Age band lower bounds, by default `AGE_BAND_EDGES`
+
+    Returns
+    -------
+    pd.DataFrame
+        Same index as `data`, with nullable integer `age` & `eligibility_days` and a categorical
+        `age_band` - missing where the dates are
+    """
+    ages = age_in_years(data["date_of_birth"], as_of)
+    ages[ages < 0] = np.nan ## Born after `as_of`
+    bands = age_bands(ages, edges)
+    return pd.DataFrame({
+        "age": pd.array(np.where(np.isnan(ages), None, ages), dtype="Int64"),
+        "age_band": pd.Categorical.from_codes(bands, categories=band_labels(edges)),
+        "eligibility_days": pd.array(eligibility_days(data["eligibility_start_date"], data["eligibility_end_date"]), dtype="Int64"),
+    }, index=data.index)
+
+
+def age_histogram(ages: np.ndarray, codes: Optional[np.ndarray] = None, n_groups: int = 1) -> np.ndarray:
+    """
+    Members per whole age - `np.bincount` on integer ages instead of `value_counts()` on `Age` strings
+
+    With group `codes` (0 ~ `n_groups` - 1, negative = no group) one bincount fills every group's
+    histogram: row `g` of the result counts the ages of group `g`.
+    """
+    ages = np.asarray(ages, dtype=float)
+    codes = np.zeros(len(ages), dtype=np.int64) if codes is None else np.asarray(codes)
+    known = (codes >= 0) & ~np.isnan(ages) & (ages >= 0)
+    values = ages[known].astype(np.int64)
+    width = int(values.max()) + 1 if len(values) else 1
+    return np.bincount(codes[known] * width + values, minlength=n_groups * width).reshape(n_groups, width)
+
+
+def create_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {quote(DERIVED_TABLE)} (member_rowid INTEGER PRIMARY KEY, "
+                 "age INTEGER, age_band INTEGER, eligibility_days INTEGER);")
+    run_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({quote(DERIVED_RUN_TABLE)});")]
+    if run_columns and "last_row" not in run_columns: ## Written before the last-row digest was kept
+        conn.execute(f"DROP TABLE {quote(DERIVED_RUN_TABLE)};")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {quote(DERIVED_RUN_TABLE)} (as_of TEXT, rows INTEGER, max_rowid INTEGER, "
+                 "last_row INTEGER, band_edges TEXT);")
+
+
+def row_digest(conn: sqlite3.Connection, table_name: str, rowid: Optional[int]) -> Optional[int]:
+    """Digest of the row at `rowid` (first 64 bits of `bloom.row_digests()`), None when there is no such row"""
+    row = pd.read_sql_query(f"SELECT * FROM {quote(table_name)} WHERE rowid = ?;", conn, params=(rowid,))
+    return int(bloom.row_digests(row)[0, 0].view(np.int64)) if len(row) else None
+
+
+def build_table(conn: sqlite3.Connection, as_of: pd.Timestamp, table_name: str = MEMBER_TABLE,
+                edges: Sequence[int] = AGE_BAND_EDGES, rebuild: bool = False) -> Dict:
+    """
+    Persist `derive()` for every row of `table_name` into `DERIVED_TABLE` (keyed by `member_rowid`)
+
+    Typed INTEGER columns (`age_band` is the index into `band_labels()`), so reports read them
+    instead of parsing dates again. When the table was only appended to since the last build at
+    the same `as_of`, only the new rows are derived; any other change rebuilds the table. Rowids
+    alone can't tell a replaced table from an appended one, so the last row derived is also checked
+    by digest (like the row filter's sync token) - after an overwrite, pass `rebuild` all the same.
+
+    Returns
+    -------
+    Dict
+        `rows` (in the table), `derived_rows`, `rebuilt` & per-phase `seconds`
+    """
+    seconds = {}
+    as_of_text, edges_text = as_of.strftime("%Y-%m-%d"), ",".join(map(str, edges))
+    create_tables(conn)
+    rows, max_rowid = conn.execute(f"SELECT COUNT(*), MAX(rowid) FROM {quote(table_name)};").fetchone()
+    last = conn.execute(f"SELECT as_of, rows, max_rowid, last_row, band_edges FROM {quote(DERIVED_RUN_TABLE)};").fetchone()
+    appended = not rebuild and last is not None and last[0] == as_of_text and last[4] == edges_text \
+        and rowids_unchanged(conn, table_name, last[1], last[2]) and row_digest(conn, table_name, last[2]) == last[3] \
+        and conn.execute(f"SELECT COUNT(*) FROM {quote(DERIVED_TABLE)};").fetchone()[0] == last[1]
+    after = last[2] if appended else None
+
+    start = time.perf_counter()
+    data = pd.read_sql_query(
+        f"SELECT rowid AS member_rowid, date_of_birth, eligibility_start_date, eligibility_end_date "
+        f"FROM {quote(table_name)}" + (" WHERE rowid > ?;" if appended else ";"), conn, params=(after,) if appended else None
+    )
+    seconds["read"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    derived = derive(data, as_of, edges)
+    seconds["derive"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if not appended:
+        conn.execute(f"DELETE FROM {quote(DERIVED_TABLE)};")
+    conn.executemany(
+        f"INSERT INTO {quote(DERIVED_TABLE)} VALUES (?, ?, ?, ?);",
+        zip(data["member_rowid"].tolist(), derived["age"].astype(object).where(derived["age"].notna(), None).tolist(),
+            [code if code != NO_BAND else None for code in derived["age_band"].cat.codes.tolist()],
+            derived["eligibility_days"].astype(object).where(derived["eligibility_days"].notna(), None).tolist())
+    )
+    conn.execute(f"DELETE FROM {quote(DERIVED_RUN_TABLE)};")
+    conn.execute(f"INSERT INTO {quote(DERIVED_RUN_TABLE)} VALUES (?, ?, ?, ?, ?);",
+                 (as_of_text, rows, max_rowid, row_digest(conn, table_name, max_rowid), edges_text))
+    conn.commit()
+    seconds["write"] = time.perf_counter() - start
+
+    return {"rows": rows, "derived_rows": len(data), "rebuilt": not appended, "seconds": seconds}
+
+
+def is_current(conn: sqlite3.Connection, as_of: pd.Timestamp, table_name: str = MEMBER_TABLE) -> bool:
+    """
+    Whether `DERIVED_TABLE` covers every row of `table_name` as of `as_of` (with the default bands)
+
+    Row count, max rowid & the digest of the last row must match the last build - a table
+    overwritten with as many rows since is not current.
+    """
+    try:
+        last = conn.execute(f"SELECT as_of, rows, max_rowid, last_row, band_edges FROM {quote(DERIVED_RUN_TABLE)};").fetchone()
+    except sqlite3.OperationalError:
+        return False
+    rows, max_rowid = conn.execute(f"SELECT COUNT(*), MAX(rowid) FROM {quote(table_name)};").fetchone()
+    return last is not None and last == (
+        as_of.strftime("%Y-%m-%d"), rows, max_rowid, row_digest(conn, table_name, max_rowid), ",".join(map(str, AGE_BAND_EDGES)))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Persist age as of a date, age band & eligibility length of every std_member_info row into member_derived."
+    )
+    parser.add_argument(
+        "-db", "--database",
+        required=True,
+        help="Path to .db file"
+    )
+    parser.add_argument(
+        "--as-of",
+        help="Reference date for ages (default: today)"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Derive every row again, e.g. after std_member_info was overwritten"
+    )
+    args = parser.parse_args()
+    as_of = pd.Timestamp(args.as_of) if args.as_of else pd.Timestamp.today().normalize()
+    with sqlite3.connect(args.database) as conn:
+        try:
+            stats = build_table(conn, as_of, rebuild=args.rebuild)
+        except (sqlite3.OperationalError, pd.errors.DatabaseError) as error:
+            sys.exit(f"derived: {error}")
+    print(f"{stats['derived_rows']:,} of {stats['rows']:,} row(s) derived as of {as_of:%Y-%m-%d} "
+          f"({'rebuilt' if stats['rebuilt'] else 'appended'})")
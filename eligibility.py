@@ -0,0 +1,258 @@
+import sqlite3
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+SPAN_TABLE = "member_eligibility_span"
+SPAN_ROW_TABLE = "member_eligibility_span_row" ## `std_member_info` rowid -> span, keeps spans traceable
+ADJACENT_DAYS = 1 ## Inclusive end dates - a period starting the day after another ends continues it
+NaT_DAYS = np.datetime64("NaT", "D").astype(np.int64) ## Day number of a missing date
+AGE_BANDS = (0, 18, 35, 50, 65, 75, 85) ## Age band lower bounds (`member_cube`, `derived`), the last band is open-ended
+AGE_BAND_LABELS = ("0-17", "18-34", "35-49", "50-64", "65-74", "75-84", "85+")
+
+
+def to_days(values: pd.Series) -> np.ndarray:
+    """
+    `%Y-%m-%d` dates -> int64 days since 1970-01-01
+
+    Parameters
+    ----------
+    values : pd.Series
+        Date strings (as stored in `std_member_info`) or datetimes
+
+    Returns
+    -------
+    np.ndarray
+        Day numbers, `NaT_DAYS` where the date is missing or unparseable
+    """
+    try:
+        ## numpy parses ISO dates ~5x faster than pandas - anything else falls back to coercion
+        return np.asarray(values, dtype=object).astype("datetime64[D]").astype(np.int64)
+    except (ValueError, TypeError):
+        dates = pd.to_datetime(values, format="%Y-%m-%d", errors="coerce")
+        return dates.to_numpy(dtype="datetime64[D]").astype(np.int64)
+
+
+def from_days(days: np.ndarray) -> np.ndarray:
+    """int64 days since 1970-01-01 -> `%Y-%m-%d` strings"""
+    return np.asarray(days, dtype=np.int64).astype("datetime64[D]").astype(str)
+
+
+def age_in_years(date_of_birth: pd.Series, as_of: pd.Timestamp) -> np.ndarray:
+    """Whole years between `%Y-%m-%d` birth dates and `as_of` - NaN where the date is missing"""
+    days = to_days(date_of_birth)
+    born = np.where(days == NaT_DAYS, 0, days).astype("datetime64[D]")
+    years = born.astype("datetime64[Y]").astype(np.int64) + 1970
+    month_day = (born.astype("datetime64[M]").astype(np.int64) % 12 + 1) * 100 + (born - born.astype("datetime64[M]")).astype(np.int64) + 1
+    age = as_of.year - years - ((as_of.month * 100 + as_of.day) < month_day)
+    return np.where(days == NaT_DAYS, np.nan, age)
+
+
+def merge_spans(member_codes: np.ndarray, start_days: np.ndarray, end_days: np.ndarray,
+                adjacent_days: int = ADJACENT_DAYS) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Merge overlapping or adjacent eligibility periods per member in one sorted sweep
+
+    Rows are sorted once by (member, start). Walking that order, a row opens a new span when
+    the member changes or it starts more than `adjacent_days` after the running maximum end
+    of the member's earlier rows - both conditions are vectorized, so there is no per-member loop.
+
+    Parameters
+    ----------
+    member_codes : np.ndarray
+        Non-negative integer member code per row
+    start_days, end_days : np.ndarray
+        Inclusive period bounds as day numbers (`to_days()`)
+    adjacent_days : int, optional
+        Largest start - previous end that still continues a span, by default `ADJACENT_DAYS`
+
+    Returns
+    -------
+    Tuple[np.ndarray, Dict[str, np.ndarray]]
+        Span id per row (-1 for rows with a missing date or start after end) & span columns
+        `member_code`, `start_day`, `end_day` and `row_count`, ordered by (member, start)
+    """
+    member_codes = np.asarray(member_codes, dtype=np.int64)
+    start_days = np.asarray(start_days, dtype=np.int64)
+    end_days = np.asarray(end_days, dtype=np.int64)
+    row_span = np.full(len(member_codes), -1, dtype=np.int64)
+
+    is_valid = (start_days != NaT_DAYS) & (end_days != NaT_DAYS) & (start_days <= end_days)
+    if not is_valid.any():
+        empty = np.empty(0, dtype=np.int64)
+        return row_span, {"member_code": empty, "start_day": empty, "end_day": empty, "row_count": empty}
+    if is_valid.all(): ## Usual case - skip the compaction copies
+        valid, codes, start, end = None, member_codes, start_days, end_days
+    else:
+        valid = np.flatnonzero(is_valid)
+        codes, start, end = member_codes[valid], start_days[valid], end_days[valid]
+
+    ## One int64 sort key per row: member major, start minor. Ties may come in any order - they share a span
+    low = start.min()
+    start, end = start - low, end - low
+    width = int(end.max()) + adjacent_days + 2
+    order = np.argsort(codes * width + start)
+    codes, start, end = codes[order], start[order], end[order]
+
+    ## Running max end within each member - offsetting by member keeps earlier members out of the max
+    running_end = np.maximum.accumulate(codes * width + end) - codes * width
+    new_span = np.ones(len(codes), dtype=bool)
+    new_span[1:] = (codes[1:] != codes[:-1]) | (start[1:] > running_end[:-1] + adjacent_days)
+
+    span_starts = np.flatnonzero(new_span)
+    row_span[order if valid is None else valid[order]] = np.cumsum(new_span) - 1
+    return row_span, {
+        "member_code": codes[span_starts],
+        "start_day": start[span_starts] + low,
+        "end_day": np.maximum.reduceat(end, span_starts) + low,
+        "row_count": np.diff(np.r_[span_starts, len(codes)]),
+    }
+
+
+def build_span_table(conn: sqlite3.Connection, table_name: str = "std_member_info",
+                     target_table: str = SPAN_TABLE, row_table: str = SPAN_ROW_TABLE,
+                     keys: Sequence[str] = ("member_id",)) -> Dict:
+    """
+    (Re)write `target_table` with the merged eligibility spans of `table_name`
+
+    `target_table` has `span_id`, the `keys` columns, `eligibility_start_date`,
+    `eligibility_end_date` (inclusive, `%Y-%m-%d`) & `row_count`, indexed by `keys`.
+    `row_table` maps every source `member_rowid` to its `span_id`.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    table_name : str, optional
+        Source table, by default "std_member_info"
+    target_table, row_table : str, optional
+        Span & row-map tables, by default `SPAN_TABLE` & `SPAN_ROW_TABLE`
+    keys : Sequence[str], optional
+        Columns identifying a member, by default `("member_id",)`
+
+    Returns
+    -------
+    Dict
+        `rows`, `skipped_rows` (missing dates or start after end), `members`, `spans` &
+        per-phase `seconds`
+    """
+    keys = list(keys)
+    key_columns = ", ".join(f'"{key}"' for key in keys)
+    seconds = {}
+
+    start = time.perf_counter()
+    data = pd.read_sql_query(
+        f'SELECT rowid AS member_rowid, {key_columns}, eligibility_start_date, eligibility_end_date FROM "{table_name}";', conn
+    )
+    seconds["read"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ## Members are numbered by first appearance - sorting millions of key strings costs more than the merge
+    if len(keys) == 1:
+        member_codes, _ = pd.factorize(data[keys[0]], use_na_sentinel=False)
+    else:
+        member_codes = data.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+    row_span, spans = merge_spans(member_codes, to_days(data["eligibility_start_date"]),
+                                  to_days(data["eligibility_end_date"]))
+    ## Key values of each span from its first row
+    first_row = np.full(member_codes.max() + 1 if len(member_codes) else 0, -1, dtype=np.int64)
+    first_row[member_codes[::-1]] = np.arange(len(member_codes))[::-1]
+    span_keys = data[keys].iloc[first_row[spans["member_code"]]].reset_index(drop=True)
+    seconds["merge"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    conn.execute(f'DROP TABLE IF EXISTS "{target_table}";')
+    conn.execute(f'DROP TABLE IF EXISTS "{row_table}";')
+    conn.execute(
+        f'CREATE TABLE "{target_table}" (span_id INTEGER PRIMARY KEY, '
+        + "".join(f'"{key}" TEXT, ' for key in keys)
+        + "eligibility_start_date TEXT, eligibility_end_date TEXT, row_count INTEGER);"
+    )
+    conn.execute(f'CREATE TABLE "{row_table}" (member_rowid INTEGER PRIMARY KEY, span_id INTEGER);')
+    conn.executemany(
+        f'INSERT INTO "{target_table}" VALUES (?, {", ".join("?" for _ in keys)}, ?, ?, ?);',
+        zip(range(len(span_keys)), *(span_keys[key].astype(str).tolist() for key in keys),
+            from_days(spans["start_day"]).tolist(), from_days(spans["end_day"]).tolist(), spans["row_count"].tolist())
+    )
+    traced = row_span >= 0
+    conn.executemany(
+        f'INSERT INTO "{row_table}" VALUES (?, ?);',
+        zip(data["member_rowid"].to_numpy()[traced].tolist(), row_span[traced].tolist())
+    )
+    conn.execute(f'CREATE INDEX "idx_{target_table}_key" ON "{target_table}" ({key_columns});')
+    conn.execute(f'CREATE INDEX "idx_{row_table}_span_id" ON "{row_table}" (span_id);')
+    conn.commit()
+    seconds["write"] = time.perf_counter() - start
+
+    return {
+        "rows": len(data),
+        "skipped_rows": int((~traced).sum()),
+        "members": int(len(np.unique(spans["member_code"]))),
+        "spans": len(span_keys),
+        "seconds": seconds,
+    }
+
+
+def daily_eligibility(df: pd.DataFrame, by: Optional[str] = "payer") -> Dict[Any, pd.Series]:
+    """
+    Eligible row count per day, per group - the notebook's "Eligibility Over Time" curves
+
+    Same curves as the dense broadcast `(starts[:, None] <= date_range) & (ends[:, None] >= date_range)`
+    summed over rows - one day range per group from its earliest start to its latest end - but
+    computed with a difference array: +1 on each start day, -1 the day after each end, then a
+    cumulative sum. O(rows + days) time & memory instead of O(rows x days).
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Rows with `eligibility_start_date` & `eligibility_end_date` (`%Y-%m-%d` strings or datetimes)
+    by : str, optional
+        Grouping column, by default "payer" - None for a single curve over all rows
+
+    Returns
+    -------
+    Dict[Any, pd.Series]
+        Group value (in sorted order, or None when `by` is None) -> daily count indexed by date
+
+    Notes
+    -----
+    * Rows with a missing date never count, and the missing date is left out of the range like `min()` / `max()` skip NaT
+    * Rows ending before they start never count, but bound their group's range like in the notebook
+    """
+    start_days = to_days(df["eligibility_start_date"])
+    end_days = to_days(df["eligibility_end_date"])
+    if by is None:
+        codes, groups = np.zeros(len(df), dtype=np.int64), [None]
+    else:
+        codes, groups = pd.factorize(df[by])
+        order = np.argsort(groups, kind="stable")
+        rank = np.empty(len(groups), dtype=np.int64)
+        rank[order] = np.arange(len(groups))
+        codes, groups = np.where(codes >= 0, rank[codes], -1), list(groups[order])
+    n_groups = len(groups)
+
+    ## Per-group day range: min start .. max end, each bound over rows where that date is present
+    has_start, has_end = (codes >= 0) & (start_days != NaT_DAYS), (codes >= 0) & (end_days != NaT_DAYS)
+    first_day = np.full(n_groups, np.iinfo(np.int64).max)
+    last_day = np.full(n_groups, np.iinfo(np.int64).min)
+    np.minimum.at(first_day, codes[has_start], start_days[has_start])
+    np.maximum.at(last_day, codes[has_end], end_days[has_end])
+    n_days = np.where(first_day <= last_day, last_day - first_day + 1, 0)
+
+    ## One segment per group with a spare slot for the -1s of rows ending on its last day, so every
+    ## segment's differences sum to 0 and a single cumulative sum restarts at each segment
+    offset = np.r_[0, np.cumsum(n_days + 1)]
+    counted = has_start & has_end & (start_days <= end_days)
+    group = codes[counted]
+    diff = np.bincount(offset[group] + start_days[counted] - first_day[group], minlength=offset[-1])
+    diff -= np.bincount(offset[group] + end_days[counted] - first_day[group] + 1, minlength=offset[-1])
+    counts = np.cumsum(diff)
+
+    curves = {}
+    for idx, value in enumerate(groups):
+        dates = (first_day[idx] + np.arange(n_days[idx])).astype("datetime64[D]").astype("datetime64[ns]") ## As `pd.date_range()`
+        curves[value] = pd.Series(counts[offset[idx]:offset[idx] + n_days[idx]], index=pd.DatetimeIndex(dates, name="date"),
+                                  name="count")
+    return curves
@@ -0,0 +1,321 @@
+import sqlite3
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+## Address suffix / direction spellings folded to USPS abbreviations
+ADDRESS_ABBREVIATION = {
+    "street": "st", "avenue": "ave", "road": "rd", "boulevard": "blvd", "drive": "dr",
+    "lane": "ln", "court": "ct", "place": "pl", "terrace": "ter", "parkway": "pkwy",
+    "highway": "hwy", "circle": "cir", "square": "sq", "apartment": "apt", "suite": "ste",
+    "north": "n", "south": "s", "east": "e", "west": "w",
+}
+
+## Blocking key name -> key built from normalized records (rows sharing a key value form a block)
+BLOCKING_KEYS: Dict[str, Callable[[pd.DataFrame], pd.Series]] = {
+    "member_id": lambda norm: norm["member_id"],
+    "dob_name": lambda norm: norm["date_of_birth"] + "|" + norm["last_name"].str[:3] + norm["first_name"].str[:1],
+    "zip_name": lambda norm: norm["zip_code"] + "|" + norm["last_name"].str[:2],
+}
+
+## Agreement weights per normalized field - prefix weights only count when the full value differs
+MATCH_WEIGHT = {
+    "member_id": 3.0,
+    "date_of_birth": 2.0,
+    "last_name": 2.0,
+    "last_name_prefix": 1.0,
+    "first_name": 1.5,
+    "first_initial": 0.5,
+    "address": 1.5,
+    "street_number": 0.5,
+    "zip_code": 1.0,
+    "city": 0.5,
+    "state": 0.25,
+}
+## Disagreement penalties - tell twins & household members apart
+MISMATCH_PENALTY = {
+    "date_of_birth": -2.0,
+    "first_name": -2.5,
+}
+MATCH_THRESHOLD = 6.5 ## Name + DOB + city/state (6.25) is not enough - an address, zip or id must agree too
+MAX_BLOCK_SIZE = 1_000 ## Larger blocks are skipped (and reported) - they would dominate the pair count
+
+
+def _letters(values: pd.Series) -> pd.Series:
+    return values.astype(str).str.lower().str.replace(r"[^a-z]", "", regex=True)
+
+
+def normalize_dates(values: pd.Series) -> pd.Series:
+    """`%Y-%m-%d` or `%m/%d/%Y` strings -> `%Y-%m-%d`, anything else -> NaN"""
+    values = values.astype(str).str.strip()
+    parsed = pd.to_datetime(values, format="%Y-%m-%d", errors="coerce")
+    parsed = parsed.fillna(pd.to_datetime(values, format="%m/%d/%Y", errors="coerce"))
+    return parsed.dt.strftime("%Y-%m-%d")
+
+
+def normalize_address(values: pd.Series) -> pd.Series:
+    """Lowercase, punctuation-free, single-spaced address with abbreviated suffixes"""
+    values = values.astype(str).str.lower().str.replace(r"[^a-z0-9 ]", " ", regex=True)
+    values = values.str.replace(r"\s+", " ", regex=True).str.strip()
+    pattern = r"\b(" + "|".join(ADDRESS_ABBREVIATION) + r")\b"
+    return values.str.replace(pattern, lambda m: ADDRESS_ABBREVIATION[m.group(1)], regex=True)
+
+
+def normalize_records(df: pd.DataFrame, state_mapper: Dict[str, str]) -> pd.DataFrame:
+    """
+    Normalize `std_member_info` rows for comparison
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Rows with `std_member_info` columns
+    state_mapper : Dict[str, str]
+        Abbreviation -> full state name (`STATE_MAPPER`)
+
+    Returns
+    -------
+    pd.DataFrame
+        `member_id`, `first_name`, `last_name`, `date_of_birth`, `address`, `street_number`,
+        `city`, `state` (abbreviation) & `zip_code` (5 digits), aligned with `df`
+    """
+    full_to_abbreviation = {name.lower(): abbreviation for abbreviation, name in state_mapper.items()}
+    state = df["state"].astype(str).str.strip()
+    state = state.str.upper().where(state.str.upper().isin(state_mapper.keys()), state.str.lower().map(full_to_abbreviation))
+
+    address = normalize_address(df["main_address"])
+    return pd.DataFrame({
+        "member_id": df["member_id"].astype(str).str.strip().str.lstrip("0"),
+        "first_name": _letters(df["member_first_name"]),
+        "last_name": _letters(df["member_last_name"]),
+        "date_of_birth": normalize_dates(df["date_of_birth"]),
+        "address": address,
+        "street_number": address.str.extract(r"^(\d+)", expand=False),
+        "city": df["city"].astype(str).str.lower().str.replace(r"[^a-z ]", "", regex=True).str.strip(),
+        "state": state,
+        "zip_code": df["zip_code"].astype(str).str.extract(r"(\d{1,5})", expand=False).str.zfill(5),
+    }, index=df.index)
+
+
+def _codes(values: pd.Series) -> np.ndarray:
+    """Integer code per value, -1 for missing/empty values"""
+    codes, _ = pd.factorize(values.where(values != ""))
+    return codes
+
+
+def block_pairs(key: pd.Series, max_block_size: int = MAX_BLOCK_SIZE) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    All row pairs sharing a blocking key value
+
+    Rows are sorted by key once; pairs are generated by offset within each block, so the
+    work is proportional to the number of pairs produced, never to n^2.
+
+    Parameters
+    ----------
+    key : pd.Series
+        Blocking key per row (missing/empty -> row not blocked)
+    max_block_size : int, optional
+        Blocks larger than this are skipped, by default `MAX_BLOCK_SIZE`
+
+    Returns
+    -------
+    Tuple[np.ndarray, Dict[str, int]]
+        `(pairs, 2)` positional row pairs with `i < j`, and `blocks`, `pairs`, `skipped_blocks`, `skipped_rows`
+    """
+    codes = _codes(key)
+    order = np.argsort(codes, kind="stable")
+    order = order[codes[order] >= 0]
+    sorted_codes = codes[order]
+
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(order) else np.empty(0, dtype=np.int64)
+    sizes = np.diff(np.r_[starts, len(order)])
+    oversized = sizes > max_block_size
+    row_size = np.repeat(np.where(oversized, 0, sizes), sizes) ## 0 -> never paired
+    rank = np.arange(len(order)) - np.repeat(starts, sizes)
+
+    pairs = []
+    active = np.flatnonzero(row_size > 1)
+    offset = 1
+    while len(active):
+        active = active[rank[active] + offset < row_size[active]]
+        if len(active):
+            pairs.append(np.column_stack([order[active], order[active + offset]]))
+        offset += 1
+
+    pairs = np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+    pairs.sort(axis=1)
+    return pairs, {
+        "blocks": int((sizes > 1).sum()),
+        "pairs": len(pairs),
+        "skipped_blocks": int(oversized.sum()),
+        "skipped_rows": int(sizes[oversized].sum()),
+    }
+
+
+def score_pairs(norm: pd.DataFrame, pairs: np.ndarray) -> np.ndarray:
+    """
+    Match score of every candidate pair - weighted field agreements plus disagreement penalties
+
+    Every field is compared through integer codes, so scoring is vectorized over all pairs.
+    """
+    fields = {
+        "member_id": norm["member_id"],
+        "date_of_birth": norm["date_of_birth"],
+        "last_name": norm["last_name"],
+        "last_name_prefix": norm["last_name"].str[:3],
+        "first_name": norm["first_name"],
+        "first_initial": norm["first_name"].str[:1],
+        "address": norm["address"],
+        "street_number": norm["street_number"],
+        "zip_code": norm["zip_code"],
+        "city": norm["city"],
+        "state": norm["state"],
+    }
+    left, right = pairs[:, 0], pairs[:, 1]
+    agree, disagree = {}, {}
+    for name, values in fields.items():
+        codes = _codes(values)
+        both = (codes[left] >= 0) & (codes[right] >= 0)
+        agree[name] = both & (codes[left] == codes[right])
+        disagree[name] = both & (codes[left] != codes[right])
+
+    ## Prefix credit only when the full value disagrees
+    agree["last_name_prefix"] &= ~agree["last_name"]
+    agree["first_initial"] &= ~agree["first_name"]
+    agree["street_number"] &= ~agree["address"]
+
+    score = np.zeros(len(pairs))
+    for name, weight in MATCH_WEIGHT.items():
+        score += weight * agree[name]
+    for name, penalty in MISMATCH_PENALTY.items():
+        score += penalty * disagree[name]
+    return score
+
+
+def connected_components(n: int, pairs: np.ndarray) -> np.ndarray:
+    """Component label (smallest member position) per row, by min-label propagation"""
+    labels = np.arange(n)
+    if len(pairs) == 0:
+        return labels
+    left, right = pairs[:, 0], pairs[:, 1]
+    while True:
+        previous = labels.copy()
+        np.minimum.at(labels, left, labels[right])
+        np.minimum.at(labels, right, labels[left])
+        labels = labels[labels] ## Pointer jumping
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def stable_cluster_ids(norm: pd.DataFrame, labels: np.ndarray) -> pd.Series:
+    """
+    Cluster id per row - smallest normalized-record hash in the cluster
+
+    Depends only on cluster content, never on row order or rowids, so re-running on the same
+    members gives the same ids.
+    """
+    fields = ["member_id", "date_of_birth", "last_name", "first_name", "address", "zip_code"]
+    record = norm[fields[0]].fillna("")
+    for field in fields[1:]:
+        record = record + "|" + norm[field].fillna("")
+    hashes = pd.util.hash_pandas_object(record, index=False).to_numpy()
+    canonical = np.full(len(hashes), np.iinfo(np.uint64).max, dtype=np.uint64)
+    np.minimum.at(canonical, labels, hashes)
+    return pd.Series([f"{h:016x}" for h in canonical[labels]], index=norm.index, dtype=object)
+
+
+def resolve(df: pd.DataFrame, state_mapper: Dict[str, str], threshold: float = MATCH_THRESHOLD,
+            max_block_size: int = MAX_BLOCK_SIZE,
+            blocking_keys: Optional[Dict[str, Callable[[pd.DataFrame], pd.Series]]] = None) -> Tuple[pd.Series, Dict]:
+    """
+    Cluster near-duplicate member records
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Rows with `std_member_info` columns
+    state_mapper : Dict[str, str]
+        Abbreviation -> full state name (`STATE_MAPPER`)
+    threshold : float, optional
+        Minimum pair score to link two records, by default `MATCH_THRESHOLD`
+    max_block_size : int, optional
+        Blocks larger than this are skipped, by default `MAX_BLOCK_SIZE`
+    blocking_keys : Dict[str, Callable[[pd.DataFrame], pd.Series]], optional
+        Blocking keys over normalized records, by default `BLOCKING_KEYS`
+
+    Returns
+    -------
+    Tuple[pd.Series, Dict]
+        Cluster id per row (aligned with `df`) & statistics: `rows`, `naive_pairs`, per-key block
+        stats, `candidate_pairs`, `matched_pairs`, `clusters`, `merged_records` & per-phase `seconds`
+    """
+    blocking_keys = BLOCKING_KEYS if blocking_keys is None else blocking_keys
+    seconds = {}
+    start = time.perf_counter()
+    norm = normalize_records(df, state_mapper)
+    seconds["normalize"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    key_stats, key_pairs = {}, []
+    for name, build_key in blocking_keys.items():
+        pairs, key_stats[name] = block_pairs(build_key(norm), max_block_size=max_block_size)
+        key_pairs.append(pairs)
+    ## Pairs found by several keys are scored once
+    n = max(len(norm), 1)
+    pairs = np.concatenate(key_pairs) if key_pairs else np.empty((0, 2), dtype=np.int64)
+    encoded = np.unique(pairs[:, 0].astype(np.int64) * n + pairs[:, 1])
+    candidates = np.column_stack([encoded // n, encoded % n])
+    seconds["block"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = score_pairs(norm, candidates)
+    matched = candidates[scores >= threshold]
+    seconds["score"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    labels = connected_components(len(norm), matched)
+    cluster_ids = stable_cluster_ids(norm, labels)
+    seconds["cluster"] = time.perf_counter() - start
+
+    n_clusters = len(np.unique(labels)) if len(labels) else 0
+    return cluster_ids, {
+        "rows": len(norm),
+        "naive_pairs": len(norm) * (len(norm) - 1) // 2,
+        "blocking": key_stats,
+        "candidate_pairs": len(candidates),
+        "matched_pairs": len(matched),
+        "clusters": n_clusters,
+        "merged_records": len(norm) - n_clusters,
+        "seconds": seconds,
+    }
+
+
+def resolve_table(conn: sqlite3.Connection, state_mapper: Dict[str, str], table_name: str = "std_member_info",
+                  target_table: str = "member_entity", threshold: float = MATCH_THRESHOLD,
+                  max_block_size: int = MAX_BLOCK_SIZE) -> Dict:
+    """
+    Resolve `table_name` & (re)write `target_table` with one cluster id per row
+
+    `target_table` keeps `member_rowid` (rowid in `table_name`), `member_id` & `cluster_id`,
+    indexed by `cluster_id`.
+
+    Returns
+    -------
+    Dict
+        `resolve()` statistics
+    """
+    data = pd.read_sql_query(f'SELECT rowid AS member_rowid, * FROM "{table_name}";', conn)
+    cluster_ids, stats = resolve(data, state_mapper, threshold=threshold, max_block_size=max_block_size)
+
+    start = time.perf_counter()
+    conn.execute(f'DROP TABLE IF EXISTS "{target_table}";')
+    conn.execute(f'CREATE TABLE "{target_table}" (member_rowid INTEGER PRIMARY KEY, member_id TEXT, cluster_id TEXT);')
+    conn.executemany(
+        f'INSERT INTO "{target_table}" VALUES (?, ?, ?);',
+        zip(data["member_rowid"].tolist(), data["member_id"].astype(str).tolist(), cluster_ids.tolist())
+    )
+    conn.execute(f'CREATE INDEX "idx_{target_table}_cluster_id" ON "{target_table}" (cluster_id);')
+    conn.commit()
+    stats["seconds"]["write"] = time.perf_counter() - start
+    return stats
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import matplotlib
+matplotlib.use("Agg") ## Headless - before pyplot is imported, also in the pool's workers
+import matplotlib.pyplot as plt
+import matplotlib.ticker as ticker
+import numpy as np
+import pandas as pd
+
+import derived
+import eligibility
+import zcta_geometry
+from report import resolve_column
+from score_lookup import NO_ZIP, ZIP_SPACE, zip_index
+
+MANIFEST = "figures.json"
+STYLE_VERSION = 1 ## Bump when a figure's look changes, so every figure is re-rendered once
+DPI = 100
+KINDS = ("ratio", "gender", "eligibility", "age", "zcta")
+
+
+def slug(value: Any) -> str:
+    """File-name-safe group value, e.g. `None` -> `none`"""
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", str(value)).strip("_").lower() or "none"
+
+
+def content_hash(job: Dict[str, Any]) -> str:
+    """
+    Hash of everything a figure depends on - its kind, title, options, aggregate & `STYLE_VERSION`
+
+    Arrays are hashed by dtype, shape and bytes, so an unchanged aggregate always gives the same
+    hash no matter how it was computed.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"style": STYLE_VERSION, "kind": job["kind"], "title": job["title"],
+                              "options": job.get("options", {})}, sort_keys=True, default=str).encode())
+    for key in sorted(job["data"]):
+        values = np.ascontiguousarray(job["data"][key])
+        digest.update(f"{key}:{values.dtype.str}:{values.shape}".encode())
+        digest.update(values.tobytes() if values.dtype != object else json.dumps(values.tolist(), default=str).encode())
+    return digest.hexdigest()
+
+
+def figure_jobs(data: pd.DataFrame, by: str = "payer", as_of: Optional[pd.Timestamp] = None,
+                shapefile: Optional[str] = zcta_geometry.SHAPEFILE,
+                tolerance: float = zcta_geometry.DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """
+    The notebook's figures as render jobs - each with the small aggregate it plots
+
+    Per `by` group: the gender pie, eligibility over time, the age bar chart and the member
+    choropleth, plus one pie of the group sizes. Aggregates are computed here, in one vectorized
+    pass each; the jobs themselves only carry counts, so they are cheap to hash and to send to a
+    worker process.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Member rows, in the `std_member_info` or the raw roster layout
+    by : str, optional
+        Grouping column, by default "payer"
+    as_of : pd.Timestamp, optional
+        Date ages are computed at when `data` has no `Age` column, by default today
+    shapefile : Optional[str], optional
+        ZCTA shapefile for the choropleths (see `zcta_geometry`), by default `zcta_geometry.SHAPEFILE`
+        - None, or no shapefile and no geometry cache, leaves the choropleths out
+    tolerance : float, optional
+        Geometry simplification of the choropleths, by default `zcta_geometry.DEFAULT_TOLERANCE`
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        Jobs with `name` (file stem), `kind` (one of `KINDS`), `title`, `data` & `options`
+    """
+    column = {name: resolve_column(data.columns, name) for name in
+              (by, "gender", "age", "date_of_birth", "zip_code", "eligibility_start_date", "eligibility_end_date")}
+    if column[by] is None:
+        raise KeyError(f"Grouping column not found: {by}")
+    codes, groups = pd.factorize(data[column[by]], sort=True)
+    counts = np.bincount(codes[codes >= 0], minlength=len(groups))
+    jobs = [{"name": f"{slug(by)}-ratio", "kind": "ratio", "title": f"{by.capitalize()} Ratio",
+             "data": {"labels": np.array([str(group) for group in groups], dtype=object), "counts": counts}}]
+
+    if column["gender"] is not None:
+        gender = data[column["gender"]].astype(str).str.lower().to_numpy()
+        male = np.bincount(codes[(codes >= 0) & (gender == "male")], minlength=len(groups))
+        female = np.bincount(codes[(codes >= 0) & (gender == "female")], minlength=len(groups))
+        jobs += [{"name": f"gender-{slug(group)}", "kind": "gender", "title": f"Gender Distribution – {group}",
+                  "data": {"counts": np.array([male[i], female[i]])}} for i, group in enumerate(groups)]
+
+    if column["eligibility_start_date"] is not None and column["eligibility_end_date"] is not None:
+        curves = eligibility.daily_eligibility(pd.DataFrame({
+            "group": data[column[by]].to_numpy(), "eligibility_start_date": data[column["eligibility_start_date"]].to_numpy(),
+            "eligibility_end_date": data[column["eligibility_end_date"]].to_numpy()}), by="group")
+        jobs += [{"name": f"eligibility-{slug(group)}", "kind": "eligibility", "title": f"Eligibility Over Time – {group}",
+                  "data": {"days": eligibility.to_days(pd.Series(curve.index)), "counts": curve.to_numpy()}}
+                 for group, curve in curves.items() if not pd.isna(group)]
+
+    if column["age"] is not None:
+        ages = pd.to_numeric(data[column["age"]], errors="coerce").to_numpy(dtype=float)
+    elif column["date_of_birth"] is not None:
+        ages = eligibility.age_in_years(data[column["date_of_birth"]], as_of or pd.Timestamp.today().normalize())
+    else:
+        ages = None
+    if ages is not None:
+        histogram = derived.age_histogram(ages, codes, n_groups=len(groups))
+        jobs += [{"name": f"age-{slug(group)}", "kind": "age", "title": f"Age Distribution of {group}",
+                  "data": {"counts": np.trim_zeros(histogram[i], "b")}} for i, group in enumerate(groups)]
+
+    if column["zip_code"] is not None and shapefile is not None and has_geometry(shapefile, tolerance):
+        zips = zip_index(data[column["zip_code"]])
+        known = (codes >= 0) & (zips != NO_ZIP)
+        token = zcta_geometry.read_manifest(zcta_geometry.cache_dir(shapefile)).get("source")
+        for i, group in enumerate(groups):
+            per_zip = np.bincount(zips[known & (codes == i)], minlength=ZIP_SPACE)
+            present = np.flatnonzero(per_zip)
+            jobs.append({"name": f"zcta-{slug(group)}", "kind": "zcta", "title": f"{group} Member Distribution",
+                         "data": {"zips": present, "counts": per_zip[present]},
+                         "options": {"shapefile": str(shapefile), "tolerance": tolerance, "geometry": token}})
+    return jobs
+
+
+def has_geometry(shapefile: str, tolerance: float) -> bool:
+    """Whether choropleths can be drawn - the geometry cache has `tolerance` or can be built"""
+    try:
+        zcta_geometry.ensure(shapefile, (tolerance,))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def draw(job: Dict[str, Any], path: str) -> str:
+    """Render one job to `path` with the notebook's styling - runs in a worker process"""
+    kind, data = job["kind"], job["data"]
+    if kind == "ratio":
+        fig, ax = plt.subplots(figsize=(6, 6))
+        ax.pie(data["counts"], labels=list(data["labels"]), autopct="%1.1f%%", startangle=90, wedgeprops={"edgecolor": "black"})
+    elif kind == "gender":
+        fig, ax = plt.subplots(figsize=(5, 5))
+        ax.pie(data["counts"], labels=["male", "female"], autopct="%1.1f%%", startangle=90,
+               colors=["steelblue", "lightcoral"], wedgeprops={"edgecolor": "black"})
+    elif kind == "eligibility":
+        fig, ax = plt.subplots(figsize=(8, 5))
+        ax.plot(data["days"].astype("datetime64[D]"), data["counts"], color="royalblue", linewidth=2)
+        ax.set_xlabel("Date")
+        ax.set_ylabel("Number of Eligible Members")
+        ax.grid(True, linestyle="--", alpha=0.5)
+    elif kind == "age":
+        fig, ax = plt.subplots(figsize=(8, 4))
+        ages = np.flatnonzero(data["counts"])
+        ax.bar(ages, data["counts"][ages], width=0.8, color="skyblue", edgecolor="gray")
+        ax.set_xlabel("Age")
+        ax.set_ylabel("Count")
+        ax.grid(True, linestyle="--", alpha=0.5)
+        ax.xaxis.set_major_locator(ticker.MultipleLocator(5))
+    elif kind == "zcta":
+        options = job["options"]
+        layer = zcta_geometry.load(options["tolerance"], options["shapefile"]) ## Once per worker, then from memory
+        counts = np.full(ZIP_SPACE, np.nan)
+        counts[data["zips"]] = data["counts"]
+        fig, ax = plt.subplots(figsize=(5, 5))
+        layer.assign(count=counts[layer["zcta"].to_numpy()]).plot(column="count", cmap="OrRd", linewidth=0.2,
+                                                                 edgecolor="black", legend=True, ax=ax)
+        ax.axis("off")
+    else:
+        raise ValueError(f"Unknown figure kind: {kind} (known: {KINDS})")
+    ax.set_title(job["title"], fontsize=16 if kind == "zcta" else None)
+    fig.tight_layout()
+    tmp_path = f"{path}.tmp.png"
+    fig.savefig(tmp_path, dpi=DPI)
+    plt.close(fig)
+    os.replace(tmp_path, path)
+    return path
+
+
+def render_figures(jobs: List[Dict[str, Any]], directory: str, workers: Optional[int] = None,
+                   force: bool = False) -> Dict[str, str]:
+    """
+    Render `jobs` as PNGs into `directory` - only those whose content hash changed, in parallel
+
+    The hash of every rendered figure is kept in `directory/figures.json`; a figure whose file
+    exists and whose `content_hash()` matches is skipped, so a rerun over unchanged data renders
+    nothing. The rest are drawn by a process pool (matplotlib is single-threaded), or inline when
+    only one is stale or `workers` is 1.
+
+    Parameters
+    ----------
+    jobs : List[Dict[str, Any]]
+        Output of `figure_jobs()`
+    directory : str
+        Output directory, created if needed
+    workers : Optional[int], optional
+        Worker processes, by default one per CPU (capped by the stale figure count)
+    force : bool, optional
+        Render every figure regardless of its hash, by default False
+
+    Returns
+    -------
+    Dict[str, str]
+        File name -> "rendered" or "unchanged"
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(directory / MANIFEST) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    status, stale = {}, []
+    for job in jobs:
+        file_name, digest = f"{job['name']}.png", content_hash(job)
+        if not force and manifest.get(file_name) == digest and (directory / file_name).exists():
+            status[file_name] = "unchanged"
+        else:
+            stale.append((job, str(directory / file_name), digest))
+
+    workers = min(workers or os.cpu_count() or 1, len(stale))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(draw, [job for job, _, _ in stale], [path for _, path, _ in stale]))
+    else:
+        for job, path, _ in stale:
+            draw(job, path)
+    for job, path, digest in stale:
+        manifest[Path(path).name] = digest
+        status[Path(path).name] = "rendered"
+
+    with open(directory / f"{MANIFEST}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(directory / f"{MANIFEST}.tmp", directory / MANIFEST)
+    return status
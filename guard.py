@@ -108,7 +108,7 @@ class FileHandler(FileSystemEventHandler):
     
     def __init__(self, pipeline_script: Path, db: Path, source: Path, fail_bin: Path, _bin: Path, verbose: bool):
         super().__init__()
-        self.SUPPORTED_EXTENSION = ("csv", "txt", "json")
+        self.SUPPORTED_EXTENSION = ("csv", "txt", "json", "parquet", "arrow", "feather", "ipc")
         self.pipeline_script = pipeline_script
         self.source = source
         self.fail_bin = fail_bin
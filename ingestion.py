@@ -7,6 +7,8 @@ import json
 from pathlib import Path
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import sqlite3
 import textwrap
 import geopandas as gpd
@@ -15,11 +17,24 @@ import matplotlib.ticker as ticker
 import seaborn as sns
 from IPython.display import display
 import re
-from typing import Dict, List, Tuple, Optional, Literal
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Literal
 import argparse
 import shutil
 import sys
 import csv
+from itertools import chain
+
+import bloom
+import dedup
+import derived
+import eligibility
+import entity_resolution
+import sql_engine
+import star_schema
+import table_sync
+import zip_bitmap
+from backends import PipelineBackend, DuckDBBackend
+from sql_engine import DATE_COLUMN, NAME_PATTERN
 
 import warnings
 warnings.filterwarnings("ignore") ## Suppress unnecessary warning prints
@@ -39,6 +54,9 @@ REQUIRED_COLUMN = (
     "eligibility_end_date",
     "payer"
 )
+## Columns kept after `main()` drops `Age` & `Gender` - columnar readers only load these
+PROJECTED_COLUMN = tuple(col for col in REQUIRED_COLUMN if col not in ("Age", "Gender"))
+COLUMNAR_EXTENSION = {"parquet", "arrow", "feather", "ipc"}
 
 ## Constants
 STATE_MAPPER = {
@@ -97,8 +115,14 @@ KNOWN_PAYER = {
     "Mdcd", "Madv"
 }
 
-## Get data from SQLite3 Command 
-READ_SQL_TO_PANDAS = lambda table_name: f"SELECT * FROM {table_name};"
+## Eligibility window kept in `std_member_info` (inclusive, `%Y-%m-%d`)
+ELIGIBILITY_WINDOW = ("2025-01-01", "2025-12-31")
+## Only ISO dates compare correctly as SQLite TEXT - other formats are window-filtered in pandas
+ISO_DATE_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"
+EXISTING_CHUNK_SIZE = 100_000 ## Rows of `std_member_info` read at a time under `--max-memory`
+BLOOM_ERROR_RATE = 0.01
+BLOOM_MIN_CAPACITY = 1_000_000
+
 
 ## Printing Colors & Styles
 BOLD = "\033[1m"
@@ -286,11 +310,72 @@ def get_tables(
     
     return tables
 
+def get_columns(cursor: sqlite3.Cursor, table_name: str) -> List[str]:
+    """
+    Get column names of a table inside `.db` file
+
+    Parameters
+    ----------
+    cursor : sqlite3.Cursor
+        A cursor object used to execute SQL commands and interact with the database.
+    table_name : str
+        Table to inspect
+
+    Returns
+    -------
+    List[str]
+        Column names in table order
+    """
+    return [row[1] for row in cursor.execute(f'PRAGMA table_info("{table_name}");')]
+
+def build_roster_query(
+    table_name: str, table_columns: List[str], window: Tuple[str, str] = ELIGIBILITY_WINDOW
+    ) -> Tuple[str, Tuple[str, str]]:
+    """
+    Build the per-table roster read with column projection & eligibility-window pushdown
+
+    Parameters
+    ----------
+    table_name : str
+        Roster table to read
+    table_columns : List[str]
+        Columns of `table_name` (see `get_columns()`)
+    window : Tuple[str, str], optional
+        Inclusive eligibility window as `%Y-%m-%d` strings, by default `ELIGIBILITY_WINDOW`
+
+    Returns
+    -------
+    Tuple[str, Tuple[str, str]]
+        SQL statement & its parameters for `pd.read_sql_query()`
+
+    Notes
+    -----
+    * Only `PROJECTED_COLUMN` is selected - `Age` & `Gender` are dropped before writing anyway
+    * Rows with a null `Age`/`Gender` are still excluded, same as `dropna()` on the full table
+    * A row is pruned only if both eligibility dates are ISO dates and the period misses `window`;
+        other date formats (e.g. `%m/%d/%Y` in `roster_2`) reach pandas and are filtered there
+    """
+    missing = set(PROJECTED_COLUMN) - set(table_columns)
+    if missing:
+        raise ValueError(f"Schema mismatch. Missing column(s) in {table_name}: {sorted(missing)}")
+    
+    select = ", ".join(f'"{col}"' for col in PROJECTED_COLUMN)
+    not_null = [f'"{col}" IS NOT NULL' for col in ("Age", "Gender") if col in table_columns]
+    not_outside_window = (
+        f"NOT (\"eligibility_start_date\" GLOB '{ISO_DATE_GLOB}' "
+        f"AND \"eligibility_end_date\" GLOB '{ISO_DATE_GLOB}' "
+        f"AND (\"eligibility_start_date\" > ? OR \"eligibility_end_date\" < ?))"
+    )
+    where = " AND ".join(not_null + [not_outside_window])
+    
+    return f'SELECT {select} FROM "{table_name}" WHERE {where};', (window[1], window[0])
+
 def parse_date(
     df: pd.DataFrame, input_format: str = None,
     output_format: str = "%Y-%m-%d", error="coerce",   
     verbose: bool = False, inplace: bool = False,
-    theme: Optional[Theme] = None, bg_theme: Optional[Background_Theme] = None, indent: int = 0
+    theme: Optional[Theme] = None, bg_theme: Optional[Background_Theme] = None, indent: int = 0,
+    columns: Optional[Tuple[str, ...]] = None
     ) -> Optional[pd.DataFrame]:
     """
     Detect date columns & parse them into `output_format`
@@ -313,6 +398,8 @@ def parse_date(
         Logging background color
     inplace : bool, optional
         Inplace modification - if False, return the modified dataframe
+    columns : Tuple[str, ...], optional
+        Known date columns (e.g. typed columnar sources) - if None, detect among all columns
 
     Returns
     -------
@@ -323,7 +410,14 @@ def parse_date(
     
     modified_data = df if inplace else df.copy()
     
-    for col in modified_data.columns:
+    for col in (modified_data.columns if columns is None else columns):
+        ## Native date types (e.g. Parquet/Arrow `date32`) need no detection
+        if pd.api.types.is_datetime64_any_dtype(modified_data[col]):
+            modified_data[col] = modified_data[col].dt.strftime(output_format)
+            if verbose:
+                styled_log(f"{'\t'*indent}Column {col} [date parsing] - Status: Parsed (native date)",
+                           theme=theme, bg_theme=bg_theme)
+            continue
         try:
             parser = pd.to_datetime(modified_data[col], format=input_format, errors=error)
 
@@ -389,7 +483,8 @@ def parse_state(
     return modified_state if not inplace else None
 
 def validate_data(
-    df: pd.DataFrame, df_title: Optional[str] = "UNKNOWN", verbose: bool = False
+    df: pd.DataFrame, df_title: Optional[str] = "UNKNOWN", verbose: bool = False,
+    valid_zips: Optional[zip_bitmap.ZipBitmap] = None
     ) -> bool:
     """
     Validate all columns in df
@@ -402,6 +497,8 @@ def validate_data(
         Data to be validated
     verbose : bool
         Verbosity, by default False
+    valid_zips : zip_bitmap.ZipBitmap, optional
+        Existing zips (ZCTAs) - if given, every `Zip` must also be one of them, by default None
 
     Returns
     -------
@@ -415,12 +512,12 @@ def validate_data(
         * `First_Name` - only contain alphabets, "-", "'", and space
         * `Last_Name` - only contain alphabets, "-", "'", and space
         * `Dob` - only contain valid dates
-        * `Age` - only contain numbers
-        * `Gender` - "male/female" as the only option in existing data
+        * `Age` - only contain numbers (skipped if projected away by a columnar reader)
+        * `Gender` - "male/female" as the only option in existing data (skipped if projected away)
         * `Street_Address` - no hard enforcement implemented
         * `State` - only full state name or abbreviations
         * `City` - only alphabets, "-", "'" and space AND no leading space
-        * `Zip` - only contain numbers
+        * `Zip` - only contain numbers (and exist in `valid_zips`, if given)
         * `eligibility_start_date` - only contain valid dates
         * `eligibility_end_date` - only contain valid dates
         * `payer` - "Mdcd/Madv", other payer accepted but warning will be triggered
@@ -443,7 +540,7 @@ def validate_data(
     all_member_id_isdigit = df["Person_Id"].apply(lambda x: isinstance(x, str) and x.isdigit() and len(x) == 8).all() 
     
     ## Member First / Last Name Checks
-    regex_pat = re.compile(r"^[A-Za-z]+([ .'\-][A-Za-z]+)*$", re.UNICODE) ## no number, limit punctuations to ["-", "'"", " "]
+    regex_pat = re.compile(f"^{NAME_PATTERN}$", re.UNICODE) ## no number, limit punctuations to ["-", "'"", " "]
     def is_valid_name(name): 
         return isinstance(name, str) and bool(regex_pat.match(name))
     all_fname_valid = df["First_Name"].apply(is_valid_name).all()
@@ -453,11 +550,11 @@ def validate_data(
     all_dob_valid = isConvertibleToDate(df["Dob"])
     dob_matching_format = isMatchingFormat(df["Dob"])
     
-    ## Age Checks
-    all_age_isdigit = df["Age"].apply(lambda x: isinstance(x, str) and x.isdigit()).all()
+    ## Age Checks (column dropped later, so absent after projection)
+    all_age_isdigit = "Age" not in df.columns or df["Age"].apply(lambda x: isinstance(x, str) and x.isdigit()).all()
     
-    ## Gender Checks
-    all_gender_valid = df["Gender"].apply(lambda x: x == "Male" or x == "Female").all()
+    ## Gender Checks (column dropped later, so absent after projection)
+    all_gender_valid = "Gender" not in df.columns or df["Gender"].apply(lambda x: x == "Male" or x == "Female").all()
     
     ## State Checks
     valid_states_lower = set(k.lower() for k in STATE_MAPPER.keys()) | set(v.lower() for v in STATE_MAPPER.values())
@@ -468,6 +565,7 @@ def validate_data(
     
     ## Zip Checks
     all_zip_valid = df["Zip"].apply(lambda x: isinstance(x, str) and len(x) == 5 and x.isdigit()).all()
+    unknown_zips = set() if valid_zips is None else set(df["Zip"][~valid_zips.contains(df["Zip"])]) ## One bit lookup per row
     
     ## Eligibility Date Checks
     all_eligibility_start_valid = isConvertibleToDate(df["eligibility_start_date"])
@@ -538,6 +636,14 @@ def validate_data(
             theme="CYAN"
         )
 
+        if valid_zips is not None:
+            styled_log(
+                f"\t\tAll zip codes exist (`Zip`): {'Valid' if not unknown_zips else 'Invalid - - - ERROR'}"
+                + (f" | {len(unknown_zips)} unknown, e.g. {', '.join(sorted(map(str, unknown_zips))[:5])}" if unknown_zips else ""),
+                level="error" if unknown_zips else None,
+                theme="CYAN"
+            )
+
         styled_log(
             f"\t\tAll eligibility starting dates (`eligibility_start_date`): "
             f"{'Valid' if all_eligibility_start_valid else 'Invalid - - - ERROR'} | "
@@ -563,9 +669,10 @@ def validate_data(
     
     return all_member_id_isdigit and all_fname_valid and all_lname_valid and all_dob_valid and \
             all_age_isdigit and all_gender_valid and all_state_valid and all_city_valid and \
-                all_zip_valid and all_eligibility_start_valid and all_eligibility_end_valid
+                all_zip_valid and not unknown_zips and all_eligibility_start_valid and all_eligibility_end_valid
     
-def parse_data(data: pd.DataFrame, df_title: str = "UNKNOWN", state_col_name: str = "State", verbose: bool = False) -> pd.DataFrame:
+def parse_data(data: pd.DataFrame, df_title: str = "UNKNOWN", state_col_name: str = "State", verbose: bool = False,
+               date_columns: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
     """
     Function to parse the complete table.
 
@@ -577,6 +684,8 @@ def parse_data(data: pd.DataFrame, df_title: str = "UNKNOWN", state_col_name: st
         Column consisting state variables, by default "State"
     verbose : bool, optional
         Verbosity, by default False
+    date_columns : Tuple[str, ...], optional
+        Known date columns passed to `parse_date()` - if None, detect them
 
     Returns
     -------
@@ -594,7 +703,7 @@ def parse_data(data: pd.DataFrame, df_title: str = "UNKNOWN", state_col_name: st
                 bold=True
                 )
     ### Parse Data
-    data = parse_date(data, verbose=verbose, theme="BRIGHT_BLUE", indent=2)
+    data = parse_date(data, verbose=verbose, theme="BRIGHT_BLUE", indent=2, columns=date_columns)
     ### Parse State
     data[state_col_name] = parse_state(data=data[state_col_name], verbose=verbose, theme="BRIGHT_BLUE", indent=2)
     
@@ -602,7 +711,8 @@ def parse_data(data: pd.DataFrame, df_title: str = "UNKNOWN", state_col_name: st
 
 def write_to_db(table_name: str, data: pd.DataFrame, conn: sqlite3.Connection, cursor: sqlite3.Cursor, overwrite: bool = False,
                  verbose: bool = False, theme: Optional[Theme] = None,
-                 bg_theme: Optional[Theme] = None) -> pd.DataFrame:
+                 bg_theme: Optional[Theme] = None, max_memory: Optional[str] = None,
+                 spill_dir: Optional[str] = None) -> Optional[pd.DataFrame]:
     """
     Create table in .db file
 
@@ -624,11 +734,17 @@ def write_to_db(table_name: str, data: pd.DataFrame, conn: sqlite3.Connection, c
         Logging text color
     bg_theme : Background_Theme, optional 
         Logging background color
+    max_memory : str, optional
+        Memory budget for deduplication (e.g. "2GB") - existing rows are streamed in chunks,
+        deduplicated out-of-core past it and only the new unique rows are appended from a SQLite
+        staging table, by default None (all in memory)
+    spill_dir : str, optional
+        Directory for deduplication spill files, by default the system temp directory
         
     Returns
     -------
-    pd.DataFrame
-        Table snapshot of `std_member_info`
+    Optional[pd.DataFrame]
+        Table snapshot of `std_member_info` - None under `max_memory`, the table is never held in pandas
         
     Notes
     -----
@@ -639,15 +755,18 @@ def write_to_db(table_name: str, data: pd.DataFrame, conn: sqlite3.Connection, c
     tables = get_tables(cursor)
     table_exists = table_name in tables
 
-    ## Get existing data
+    ## Get existing data - only counted here under a memory budget, streamed while deduplicating
     existing_data = pd.DataFrame()
-    if table_exists:
+    existing_count = 0
+    if table_exists and max_memory is not None:
+        existing_count = cursor.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    elif table_exists:
         existing_data = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
         if verbose:
             styled_log(f"Data exists in table '{table_name}' — reading existing data...", level="warning", theme=theme)
         existing_data = parse_date(existing_data, verbose=verbose, theme=theme, bg_theme=bg_theme, indent=1)
+        existing_count = len(existing_data)
 
-    existing_count = len(existing_data)
     new_count = len(data)
 
     if verbose:
@@ -655,17 +774,36 @@ def write_to_db(table_name: str, data: pd.DataFrame, conn: sqlite3.Connection, c
         styled_log(f"New rows to add: {new_count}", theme=theme)
 
     ## Combine data - depending on overwrite
-    if overwrite or not table_exists:
-        combined_data = data
-        if verbose and overwrite:
-            styled_log(f"Overwriting table '{table_name}' with new data...", level="warning", theme=theme)
+    if verbose and overwrite:
+        styled_log(f"Overwriting table '{table_name}' with new data...", level="warning", theme=theme)
+    restart = overwrite or not table_exists
+    combined_data = None
+    if max_memory is not None:
+        ## Written while deduplicating - the stored rows are streamed first, so only unique rows after them are appended
+        existing_chunks = []
+        if not restart:
+            existing_chunks = (
+                parse_date(chunk, theme=theme, bg_theme=bg_theme)
+                for chunk in pd.read_sql_query(f"SELECT * FROM {table_name}", conn, chunksize=EXISTING_CHUNK_SIZE)
+            )
+        dedup_stats = dedup.drop_duplicates_to_sql(
+            chain(existing_chunks, [parse_date(df=data, theme=theme, bg_theme=bg_theme)]), conn, table_name,
+            max_memory=max_memory, spill_dir=spill_dir, skip_rows=0 if restart else existing_count,
+            if_exists="replace" if restart else "append"
+        ) ## unique set
+        if verbose and dedup_stats["partitions"] > 0:
+            styled_log(f"Deduplicated out-of-core in {dedup_stats['partitions']} partitions (budget: {max_memory})", theme=theme)
+        final_count = (0 if restart else existing_count) + dedup_stats["added_rows"]
     else:
-        combined_data = pd.concat([existing_data, data], ignore_index=True)
-    
-    combined_data = parse_date(df=combined_data, theme=theme, bg_theme=bg_theme)
-    combined_data = combined_data.drop_duplicates() ## unique set
+        if overwrite or not table_exists:
+            combined_data = data
+        else:
+            combined_data = pd.concat([existing_data, data], ignore_index=True)
+        
+        combined_data = parse_date(df=combined_data, theme=theme, bg_theme=bg_theme)
+        combined_data = combined_data.drop_duplicates() ## unique set
+        final_count = len(combined_data)
 
-    final_count = len(combined_data)
     if overwrite or not table_exists:
         added_unique_rows = new_count
         removed_dupes = 0
@@ -679,13 +817,320 @@ def write_to_db(table_name: str, data: pd.DataFrame, conn: sqlite3.Connection, c
         styled_log(f"Final row count in table '{table_name}': {final_count}", theme=theme, bold=True)
 
     # Write to SQL
-    combined_data.to_sql(table_name, conn, if_exists="replace", index=False)
+    if combined_data is not None:
+        combined_data.to_sql(table_name, conn, if_exists="replace", index=False)
     if verbose:
         styled_log(f"Data written to table `{table_name}`.", theme=theme, bg_theme=bg_theme, bold=True)
     
+    ## Only this write's rows reach the indexes & derived tables - existing rows come first in `combined_data`,
+    ## and are read back after the stored ones when the rows were appended from SQLite
+    added = None
+    if combined_data is not None:
+        added = combined_data if restart else combined_data.iloc[existing_count:]
+    synced = table_sync.sync_derived(conn, table_name, added=added, restart=restart, skip_rows=existing_count)
+    if verbose:
+        for index, label in (("interval_index", "Eligibility interval index"), ("member_search", "Member search index")):
+            if synced[index] is not None:
+                styled_log(f"{label} {synced[index]}.", theme=theme)
+        month_stats, cube_stats, score_stats = synced["member_month"], synced["member_cube"], synced["member_scores"]
+        styled_log(f"member_month: {month_stats['new_rows']} new row(s) -> {month_stats['member_months']} member-month(s) added", theme=theme)
+        styled_log(f"member_cube: {cube_stats['added_rows']} row(s) added, {cube_stats['removed_rows']} removed -> {cube_stats['cells']} cell(s)", theme=theme)
+        styled_log(f"member_scores: {score_stats['added_rows']} row(s) scored, {score_stats['removed_rows']} removed, "
+                   f"{score_stats['rescored_rows']} rescored in {score_stats['changed_zips']} changed zip(s)", theme=theme)
+        if synced["sketches"] is not None:
+            styled_log(f"Sketches recorded for run {synced['sketches']}.", theme=theme)
+    
     return combined_data
 
-def read_file(file_path: str, verbose: bool = False) -> List[pd.DataFrame]:
+def get_db_file(cursor: sqlite3.Cursor) -> Optional[str]:
+    """File backing the `main` database of `cursor`, None for in-memory databases"""
+    for _, name, file in cursor.execute("PRAGMA database_list;").fetchall():
+        if name == "main":
+            return file or None
+    return None
+
+def table_sync_token(conn: sqlite3.Connection, cursor: sqlite3.Cursor, table_name: str) -> Dict:
+    """
+    Fingerprint of `table_name` stored with its row filter - any mismatch means the table was
+    written without the filter, so the filter is rebuilt
+
+    Returns
+    -------
+    Dict
+        Table name, row count, max rowid & the digests of the last row
+    """
+    rows, max_rowid = cursor.execute(f'SELECT COUNT(*), MAX(rowid) FROM "{table_name}";').fetchone()
+    last_row = pd.read_sql_query(f'SELECT * FROM "{table_name}" WHERE rowid = ?;', conn, params=(max_rowid,))
+    return {
+        "table": table_name, "rows": rows, "max_rowid": max_rowid,
+        "last_row": [int(d) for d in bloom.row_digests(last_row).ravel()],
+    }
+
+def load_row_filter(conn: sqlite3.Connection, cursor: sqlite3.Cursor, table_name: str, incoming_rows: int,
+                    error_rate: float = BLOOM_ERROR_RATE, verbose: bool = False,
+                    theme: Optional[Theme] = None) -> bloom.BloomFilter:
+    """
+    Load the Bloom filter of `table_name` rows kept next to the database, rebuilding it from the
+    table when missing, out of sync, or too small for `incoming_rows` more rows
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the (file-backed) database
+    cursor : sqlite3.Cursor
+        Cursor object for SQL operation
+    table_name : str
+        Table the filter covers
+    incoming_rows : int
+        Rows about to be inserted
+    error_rate : float, optional
+        Target false-positive rate, by default `BLOOM_ERROR_RATE`
+    verbose : bool, optional
+        Verbosity, by default False
+    theme : Theme, optional
+        Logging text color
+
+    Returns
+    -------
+    bloom.BloomFilter
+        Filter holding every row of `table_name`
+    """
+    path = bloom.filter_path(get_db_file(cursor))
+    token = table_sync_token(conn, cursor, table_name)
+    
+    reason = "no filter file"
+    if path.exists():
+        try:
+            row_filter, metadata = bloom.BloomFilter.load(str(path))
+            if metadata != token:
+                reason = "table changed outside the filter"
+            elif row_filter.count + incoming_rows > row_filter.capacity:
+                reason = "capacity reached"
+            elif row_filter.error_rate != error_rate:
+                reason = "error rate changed"
+            else:
+                if verbose:
+                    styled_log(f"Row filter loaded from {path}", theme=theme)
+                return row_filter
+        except (OSError, ValueError, KeyError) as e:
+            reason = f"unreadable filter file ({e})"
+    
+    ## Stored rows are already parsed - digested as read
+    row_filter = bloom.BloomFilter(max(BLOOM_MIN_CAPACITY, 2 * (token["rows"] + incoming_rows)), error_rate)
+    for chunk in pd.read_sql_query(f'SELECT * FROM "{table_name}";', conn, chunksize=EXISTING_CHUNK_SIZE):
+        row_filter.add(bloom.row_digests(chunk))
+    if verbose:
+        styled_log(f"Row filter rebuilt from `{table_name}` ({reason})", level="warning", theme=theme)
+    return row_filter
+
+def find_existing_rows(candidates: pd.DataFrame, conn: sqlite3.Connection, cursor: sqlite3.Cursor,
+                       table_name: str) -> np.ndarray:
+    """
+    Exact membership of `candidates` rows in `table_name`, looked up through a `member_id` index
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask over `candidates` - True if the identical row is already stored
+    """
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table_name}_member_id" ON "{table_name}" (member_id);')
+    cursor.execute("DROP TABLE IF EXISTS temp.row_filter_candidates;")
+    cursor.execute("CREATE TEMP TABLE row_filter_candidates (member_id);")
+    cursor.executemany("INSERT INTO temp.row_filter_candidates VALUES (?);",
+                       [(member_id,) for member_id in candidates["member_id"].unique().tolist()])
+    existing = pd.read_sql_query(
+        f'SELECT * FROM "{table_name}" WHERE member_id IN (SELECT member_id FROM temp.row_filter_candidates);', conn
+    )
+    cursor.execute("DROP TABLE temp.row_filter_candidates;")
+    
+    ## Same equality as `drop_duplicates()` - whole rows, values compared as stored
+    existing_rows = set(existing[list(candidates.columns)].itertuples(index=False, name=None))
+    return np.fromiter(
+        (row in existing_rows for row in candidates.itertuples(index=False, name=None)),
+        dtype=bool, count=len(candidates)
+    )
+
+def write_with_row_filter(table_name: str, data: pd.DataFrame, conn: sqlite3.Connection, cursor: sqlite3.Cursor,
+                          error_rate: float = BLOOM_ERROR_RATE, verbose: bool = False,
+                          theme: Optional[Theme] = None, bg_theme: Optional[Theme] = None) -> Dict[str, int]:
+    """
+    Union-write `data` into `table_name` without reading the table back
+
+    A persistent Bloom filter of row digests (`<db file>.bloom`) splits new rows into
+    "definitely new" (appended straight away) and "maybe duplicate" (checked exactly against
+    the stored rows of the same `member_id`). Only new rows are appended.
+
+    Parameters
+    ----------
+    table_name : str
+        Target table, created if missing
+    data : pd.DataFrame
+        Data to be written in .db
+    conn : sqlite3.Connection
+        Connection to the (file-backed) database
+    cursor : sqlite3.Cursor
+        Cursor object for SQL operation
+    error_rate : float, optional
+        Target false-positive rate of the filter, by default `BLOOM_ERROR_RATE`
+    verbose : bool, optional
+        Verbosity, by default False
+    theme : Theme, optional
+        Logging text color
+    bg_theme : Background_Theme, optional 
+        Logging background color
+
+    Returns
+    -------
+    Dict[str, int]
+        Write statistics (`existing_rows`, `added_rows`, `final_rows`, `definitely_new`,
+        `maybe_duplicate`, `false_positives`)
+
+    Raises
+    ------
+    ValueError
+        In-memory database - there is nowhere to keep the filter
+        
+    Notes
+    -----
+    * Same resulting rows as `write_to_db()` (union-write), minus the full-table rewrite
+    """
+    db_file = get_db_file(cursor)
+    if db_file is None:
+        raise ValueError("The row filter needs a file-backed database.")
+    
+    data = parse_date(df=data, theme=theme, bg_theme=bg_theme).drop_duplicates()
+    table_exists = table_name in get_tables(cursor)
+    existing_count = cursor.execute(f'SELECT COUNT(*) FROM "{table_name}";').fetchone()[0] if table_exists else 0
+    if verbose:
+        styled_log(f"Existing rows: {existing_count}", theme=theme)
+        styled_log(f"New rows to add: {len(data)}", theme=theme)
+    
+    digests = bloom.row_digests(data)
+    if table_exists:
+        row_filter = load_row_filter(conn, cursor, table_name, incoming_rows=len(data), error_rate=error_rate,
+                                     verbose=verbose, theme=theme)
+    else:
+        row_filter = bloom.BloomFilter(max(BLOOM_MIN_CAPACITY, 2 * len(data)), error_rate)
+    expected_fp_rate = row_filter.expected_fp_rate()
+    
+    ## Pre-classify - only "maybe" rows touch the stored table
+    maybe = row_filter.contains(digests)
+    is_duplicate = np.zeros(len(data), dtype=bool)
+    if table_exists and maybe.any():
+        is_duplicate[maybe] = find_existing_rows(data[maybe], conn=conn, cursor=cursor, table_name=table_name)
+    
+    new_data = data[~is_duplicate]
+    new_data.to_sql(table_name, conn, if_exists="append", index=False)
+    conn.commit()
+    table_sync.sync_derived(conn, table_name, added=new_data, restart=not table_exists)
+    row_filter.add(digests[~is_duplicate])
+    row_filter.save(str(bloom.filter_path(db_file)), metadata=table_sync_token(conn, cursor, table_name))
+    
+    definitely_new, maybe_duplicate = int((~maybe).sum()), int(maybe.sum())
+    false_positives = int((maybe & ~is_duplicate).sum())
+    if verbose:
+        styled_log(f"Row filter: {row_filter.num_bits:,} bits, {row_filter.num_hashes} hashes, "
+                   f"{row_filter.nbytes / 2**20:.2f} MiB for {row_filter.count:,} of {row_filter.capacity:,} rows", theme=theme)
+        styled_log(f"Definitely new: {definitely_new} | Maybe duplicate: {maybe_duplicate}", theme=theme)
+        styled_log(f"Maybe duplicates confirmed: {int(is_duplicate.sum())} | False positives: {false_positives}", theme=theme)
+        styled_log(f"False-positive rate: observed {false_positives / max(1, definitely_new + false_positives):.4%} "
+                   f"| expected {expected_fp_rate:.4%}", theme=theme)
+        styled_log(f"Duplicates removed from new data: {int(is_duplicate.sum())}", theme=theme)
+        styled_log(f"Unique new rows added: {len(new_data)}", theme=theme)
+        styled_log(f"Final row count in table '{table_name}': {existing_count + len(new_data)}", theme=theme, bold=True)
+        styled_log(f"Data written to table `{table_name}`.", theme=theme, bg_theme=bg_theme, bold=True)
+    
+    return {
+        "existing_rows": existing_count,
+        "added_rows": len(new_data),
+        "final_rows": existing_count + len(new_data),
+        "definitely_new": definitely_new,
+        "maybe_duplicate": maybe_duplicate,
+        "false_positives": false_positives,
+    }
+
+def arrow_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """
+    Convert an Arrow table/batch into the string layout `validate_data` expects
+
+    Parameters
+    ----------
+    table : pa.Table
+        Projected Arrow data
+    
+    Returns
+    -------
+    pd.DataFrame
+        Date columns keep native `datetime64` dtype, other columns are strings
+    """
+    for idx, field in enumerate(table.schema):
+        is_native_date = pa.types.is_date(field.type) or pa.types.is_timestamp(field.type)
+        if field.name in DATE_COLUMN and is_native_date:
+            continue
+        if not pa.types.is_string(field.type) and not pa.types.is_large_string(field.type):
+            table = table.set_column(idx, field.name, table.column(idx).cast(pa.string()))
+    return table.to_pandas(date_as_object=False)
+
+def read_columnar(path: Path, verbose: bool = False) -> Iterator[pd.DataFrame]:
+    """
+    Stream a Parquet / Arrow IPC file as projected chunks
+
+    Parameters
+    ----------
+    path : Path
+        Path to `.parquet`, `.arrow`, `.feather` or `.ipc` file
+    verbose : bool
+        Verbosity, defaults to False
+    
+    Returns
+    -------
+    Iterator[pd.DataFrame]
+        One DataFrame per Parquet row group / Arrow record batch, `PROJECTED_COLUMN` only
+        
+    Notes
+    -----
+    * Schema is checked eagerly so a bad file fails inside `main()`'s read guard
+    * `Age` & `Gender` are never read from disk
+    """
+    ext = path.suffix.lstrip('.').lower()
+    columns = list(PROJECTED_COLUMN)
+    
+    if ext == "parquet":
+        parquet_file = pq.ParquetFile(path)
+        schema = parquet_file.schema_arrow
+        chunk_count = parquet_file.num_row_groups
+        
+        def chunks() -> Iterator[pd.DataFrame]:
+            for idx in range(chunk_count):
+                yield arrow_to_pandas(parquet_file.read_row_group(idx, columns=columns))
+    else:
+        source = pa.memory_map(str(path)) ## Zero-copy - unprojected columns are never paged in
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(idx) for idx in range(reader.num_record_batches))
+            chunk_count = reader.num_record_batches
+        except pa.ArrowInvalid:
+            source.seek(0)
+            reader = pa.ipc.open_stream(source)
+            batches = iter(reader)
+            chunk_count = "streamed"
+        schema = reader.schema
+        
+        def chunks() -> Iterator[pd.DataFrame]:
+            for batch in batches:
+                yield arrow_to_pandas(pa.Table.from_batches([batch]).select(columns))
+    
+    missing = set(PROJECTED_COLUMN) - set(schema.names)
+    if missing:
+        raise ValueError(f"Schema mismatch. Missing column(s): {sorted(missing)}")
+    
+    if verbose:
+        styled_log(f"[read_file] Projected columns: {columns}")
+        styled_log(f"[read_file] Chunks (row groups / record batches): {chunk_count}")
+    
+    return chunks()
+
+def read_file(file_path: str, verbose: bool = False) -> Iterator[pd.DataFrame]:
     """
     Read file and convert it into pd.DataFrame
     
@@ -698,8 +1143,9 @@ def read_file(file_path: str, verbose: bool = False) -> List[pd.DataFrame]:
     
     Returns
     -------
-    pd.DataFrame
-        Raw data read from `file_path`
+    Iterator[pd.DataFrame]
+        Raw data read from `file_path` - a list for row formats, 
+            a lazy chunk stream for columnar formats (see `read_columnar()`)
     """
     
     dfs = []
@@ -711,10 +1157,10 @@ def read_file(file_path: str, verbose: bool = False) -> List[pd.DataFrame]:
         styled_log(f"[read_file] Reading file: {path.name} (.{ext})")
     
     if ext == "csv":
-        df = pd.read_csv(path)
-        if set(df.columns) != REQUIRED_COLUMN:
+        df = pd.read_csv(path, dtype=str) ## Keep ids & zips as text, like the .db rosters
+        if set(df.columns) != set(REQUIRED_COLUMN):
             raise ValueError(f"Schema mismatch.")
-        dfs.append(pd.read_csv(path))
+        dfs.append(df)
         
     elif ext == "txt":
         with open(path, 'r', encoding='utf-8') as f:
@@ -728,18 +1174,21 @@ def read_file(file_path: str, verbose: bool = False) -> List[pd.DataFrame]:
         if verbose:
             styled_log(f"[read_file] Detected delimiter for TXT: '{delimiter}'")
 
-        df = pd.read_csv(path, delimiter=delimiter)
-        if set(df.columns) != REQUIRED_COLUMN:
+        df = pd.read_csv(path, delimiter=delimiter, dtype=str)
+        if set(df.columns) != set(REQUIRED_COLUMN):
             raise ValueError(f"Schema mismatch.")
-        dfs.append(pd.read_csv(path, delimiter=delimiter))
+        dfs.append(df)
         
     elif ext == "json":
         with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
         df = pd.json_normalize(data)
-        if set(df.columns) != REQUIRED_COLUMN:
+        if set(df.columns) != set(REQUIRED_COLUMN):
             raise ValueError(f"Schema mismatch.")
-        dfs.append(pd.json_normalize(data))
+        dfs.append(df)
+        
+    elif ext in COLUMNAR_EXTENSION:
+        return read_columnar(path, verbose=verbose)
         
     elif ext == "db":
         conn = sqlite3.connect(path)
@@ -752,11 +1201,8 @@ def read_file(file_path: str, verbose: bool = False) -> List[pd.DataFrame]:
             styled_log(f"[read_file] Found roster tables: {roster_tables}")
             
         for tab in roster_tables:
-            df = pd.read_sql_query(f"SELECT * FROM {tab};", conn)
-            
-            if set(df.columns) != REQUIRED_COLUMN:
-                raise ValueError(f"Schema mismatch.")
-            dfs.append(df)
+            query, params = build_roster_query(tab, get_columns(cursor, tab)) ## Raises on schema mismatch
+            dfs.append(pd.read_sql_query(query, conn, params=params))
             
             
         conn.close()
@@ -772,104 +1218,554 @@ def read_file(file_path: str, verbose: bool = False) -> List[pd.DataFrame]:
     
     
 
-def main(db_path: str, source_file: str, processed_dump: str, failed_dump: str, verbose: bool, overwrite: bool): 
-    
-    ## Establish Database Connection
-    conn, cur = read_database(path_to_db=db_path)
-    try:
-        dfs = read_file(source_file, verbose=verbose)
-    except Exception as e:
-        failed_path = Path(failed_dump) / Path(source_file).name
-        shutil.move(source_file, failed_path)
+class PandasBackend(PipelineBackend):
+    """
+    Default in-memory backend - every step is the pandas implementation in this file
 
-        if verbose:
-            styled_log(f"[main] Failed to process {source_file}, moved to {failed_path}")
-            styled_log(f"[main] Reason: {e}")
-        return
-        
-        
-    roster_data = pd.DataFrame()
+    Parameters
+    ----------
+    max_memory : str, optional
+        Deduplication memory budget (e.g. "2GB") - past it, duplicates are dropped
+        out-of-core by `dedup.drop_duplicates()`, by default None (all in memory)
+    spill_dir : str, optional
+        Directory for deduplication spill files, by default the system temp directory
+    bloom_error_rate : float, optional
+        Keep a Bloom filter of written rows next to the database and union-write through it
+        (`write_with_row_filter()`) at this false-positive rate, by default None (disabled)
+    valid_zips : zip_bitmap.ZipBitmap, optional
+        Existing zips - validation also rejects rosters with other zips, by default None (disabled)
+    """
+    name = "pandas"
     
-    for idx in range(len(dfs)):
-        if verbose:
-            styled_log(f"Processing table {idx}...",
-                       theme="BRIGHT_WHITE", bg_theme="BG_BLUE", bold=True)
-        
-        tmp_data = dfs[idx]
-        ## Check NULL
-        null_count = tmp_data.isnull().any(axis=1).sum()
-        if null_count > 0 and verbose:
-            styled_log(f"\t{null_count} row(s) with null values dropped before validation.", 
-                    level="warning", theme="CYAN")
-
-        tmp_data = tmp_data.dropna()
+    def __init__(self, max_memory: Optional[str] = None, spill_dir: Optional[str] = None,
+                 bloom_error_rate: Optional[float] = None, valid_zips: Optional[zip_bitmap.ZipBitmap] = None):
+        self.max_memory = max_memory
+        self.spill_dir = spill_dir
+        self.bloom_error_rate = bloom_error_rate
+        self.valid_zips = valid_zips
+    
+    def read_source(self, source_file: str, verbose: bool = False) -> Iterator[pd.DataFrame]:
+        return read_file(source_file, verbose=verbose)
+    
+    def drop_nulls(self, table: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+        return table.dropna(), int(table.isnull().any(axis=1).sum())
+    
+    def validate(self, table: pd.DataFrame, title: str = "UNKNOWN", verbose: bool = False) -> bool:
+        return validate_data(df=table, df_title=title, verbose=verbose, valid_zips=self.valid_zips)
+    
+    def parse(self, table: pd.DataFrame, date_columns: Optional[Tuple[str, ...]] = None, verbose: bool = False) -> pd.DataFrame:
+        return parse_data(data=table, state_col_name="State", verbose=verbose, date_columns=date_columns)
+    
+    def preview(self, table: pd.DataFrame, rows: int = 5) -> pd.DataFrame:
+        return table.head(rows)
+    
+    def concat(self, tables: List[pd.DataFrame]) -> pd.DataFrame:
+        return pd.concat(tables, ignore_index=True) if tables else self.standardize(pd.DataFrame(columns=list(PROJECTED_COLUMN)))
+    
+    def standardize(self, table: pd.DataFrame) -> pd.DataFrame:
+        return table.rename(columns={
+            "Person_Id": "member_id", 
+            "First_Name": "member_first_name",
+            "Last_Name": "member_last_name",
+            "Dob": "date_of_birth",
+            "Zip": "zip_code",
+            "City": "city",
+            "State": "state",
+            "Street_Address": "main_address",
+        }).drop(columns=["Age", "Gender"], errors="ignore") ## Columnar sources never load them
+    
+    def count(self, table: pd.DataFrame) -> int:
+        return len(table)
+    
+    def duplicate_count(self, table: pd.DataFrame) -> int:
+        return table[table.duplicated(keep=False)].drop_duplicates().shape[0]
+    
+    def dedupe(self, table: pd.DataFrame) -> pd.DataFrame:
+        return table.drop_duplicates()
+    
+    def combine(self, tables: Iterable[pd.DataFrame], count_duplicates: bool = False) -> Tuple[pd.DataFrame, int, Optional[int]]:
+        if self.max_memory is None:
+            return super().combine(tables, count_duplicates=count_duplicates)
         
-        ## Validate data
-        is_valid = validate_data(df=tmp_data, df_title=f"Table {idx}", verbose=verbose)
+        ## Tables stream into the partitioner one by one - never stacked in memory at once
+        roster_data, stats = dedup.drop_duplicates(tables, max_memory=self.max_memory, spill_dir=self.spill_dir,
+                                                   count_duplicates=count_duplicates)
+        if count_duplicates and stats["partitions"] > 0:
+            styled_log(f"Deduplicated out-of-core in {stats['partitions']} partitions (budget: {self.max_memory})",
+                       theme="BRIGHT_BLUE")
+        return roster_data, stats["rows"], stats["duplicate_rows"]
+    
+    def filter_window(self, table: pd.DataFrame, window: Tuple[str, str]) -> pd.DataFrame:
+        table = table.copy()
+        table["eligibility_start_date"], table["eligibility_end_date"] = (
+            pd.to_datetime(table["eligibility_start_date"]),
+            pd.to_datetime(table["eligibility_end_date"])
+        ) ## Making sure date is type-ready for comparing
+
+        start_2025 = pd.Timestamp(window[0])
+        end_2025 = pd.Timestamp(window[1])
+
+        def overlaps_2025(row):
+            return (row["eligibility_start_date"] <= end_2025) and (row["eligibility_end_date"] >= start_2025)
+
+        if table.empty:
+            return table
+        return table[table.apply(overlaps_2025, axis=1)]
+    
+    def write(self, table: pd.DataFrame, table_name: str, conn: sqlite3.Connection, cursor: sqlite3.Cursor,
+              overwrite: bool = False, verbose: bool = False) -> Dict[str, int]:
+        if self.bloom_error_rate is not None and not overwrite:
+            return write_with_row_filter(table_name=table_name, data=table, conn=conn, cursor=cursor,
+                                         error_rate=self.bloom_error_rate, verbose=verbose, theme="CYAN")
+        if self.bloom_error_rate is not None:
+            bloom.filter_path(get_db_file(cursor)).unlink(missing_ok=True) ## Rebuilt on the next union-write
         
-        if not is_valid:
+        existing_count = 0
+        if not overwrite and table_name in get_tables(cursor):
+            existing_count = cursor.execute(f'SELECT COUNT(*) FROM "{table_name}";').fetchone()[0]
+        written = write_to_db(table_name=table_name, data=table, conn=conn, cursor=cursor, overwrite=overwrite,
+                              verbose=verbose, theme="CYAN", max_memory=self.max_memory, spill_dir=self.spill_dir)
+        final_count = len(written) if written is not None else cursor.execute(f'SELECT COUNT(*) FROM "{table_name}";').fetchone()[0]
+        return {
+            "existing_rows": existing_count,
+            "added_rows": final_count - existing_count,
+            "final_rows": final_count,
+        }
+
+def get_backend(name: Literal["pandas", "duckdb"] = "pandas", spill_dir: Optional[str] = None,
+                max_memory: Optional[str] = None, bloom_error_rate: Optional[float] = None,
+                valid_zips: Optional[zip_bitmap.ZipBitmap] = None) -> PipelineBackend:
+    """
+    Build the execution backend for `run_pipeline()`
+
+    Parameters
+    ----------
+    name : Literal["pandas", "duckdb"], optional
+        Backend name, by default "pandas"
+    spill_dir : str, optional
+        Spill directory for out-of-core work
+    max_memory : str, optional
+        Memory budget (e.g. "4GB") - pandas deduplicates out-of-core past it, DuckDB spills past it
+    bloom_error_rate : float, optional
+        Bloom filter pre-check of written rows at this false-positive rate (pandas only)
+    valid_zips : zip_bitmap.ZipBitmap, optional
+        Zip existence rule for validation (pandas only)
+
+    Returns
+    -------
+    PipelineBackend
+        Backend instance
+    """
+    if max_memory is not None:
+        dedup.parse_memory(max_memory) ## Fail fast on a malformed budget
+    if name == "pandas":
+        return PandasBackend(max_memory=max_memory, spill_dir=spill_dir, bloom_error_rate=bloom_error_rate,
+                             valid_zips=valid_zips)
+    if bloom_error_rate is not None:
+        raise ValueError(f"The row filter is only supported by the pandas backend, not {name}")
+    if valid_zips is not None:
+        raise ValueError(f"The zip existence rule is only supported by the pandas backend, not {name}")
+    if name == "duckdb":
+        return DuckDBBackend(
+            state_mapper=STATE_MAPPER, known_payer=KNOWN_PAYER, roster_query=build_roster_query,
+            projected_column=PROJECTED_COLUMN, required_column=REQUIRED_COLUMN, spill_dir=spill_dir,
+            memory_limit=f"{dedup.parse_memory(max_memory)}B" if max_memory is not None else None,
+            log=styled_log
+        )
+    raise ValueError(f"Unknown backend: {name}")
+
+def run_pipeline(backend: PipelineBackend, tables: Iterable, conn: sqlite3.Connection, cur: sqlite3.Cursor,
+                 overwrite: bool = False, verbose: bool = False,
+                 date_columns: Optional[Tuple[str, ...]] = None) -> Dict[str, int]:
+    """
+    Validate, parse, aggregate, dedupe, window-filter & write roster tables on any backend
+
+    Parameters
+    ----------
+    backend : PipelineBackend
+        Execution backend (see `get_backend()`)
+    tables : Iterable
+        Backend-native roster tables from `backend.read_source()`
+    conn : sqlite3.Connection
+        Connection to the target database
+    cur : sqlite3.Cursor
+        Cursor object for SQL operation
+    overwrite : bool, optional
+        Wipe past data and insert the new (or not), by default False
+    verbose : bool, optional
+        Verbosity, by default False
+    date_columns : Tuple[str, ...], optional
+        Known date columns of typed sources, passed to `backend.parse()`
+
+    Returns
+    -------
+    Dict[str, int]
+        Write statistics (`existing_rows`, `added_rows`, `final_rows`)
+    """
+    def parsed_tables():
+        for idx, tmp_data in enumerate(tables): ## Columnar sources stream chunk by chunk
+            if verbose:
+                styled_log(f"Processing table {idx}...",
+                           theme="BRIGHT_WHITE", bg_theme="BG_BLUE", bold=True)
+            
+            ## Check NULL
+            tmp_data, null_count = backend.drop_nulls(tmp_data)
+            if null_count > 0 and verbose:
+                styled_log(f"\t{null_count} row(s) with null values dropped before validation.", 
+                        level="warning", theme="CYAN")
+            
+            ## Validate data
+            is_valid = backend.validate(tmp_data, title=f"Table {idx}", verbose=verbose)
+            
+            if not is_valid:
+                if verbose:
+                    styled_log(f"Skipping table {idx} due to invalid data detected.",
+                               theme="BRIGHT_BLACK", bg_theme="BG_YELLOW", bold=True)
+                pass ## Skipping table
+            
+            ## Parsing - typed columnar sources already know their date columns
+            parsed_tmp_data = backend.parse(tmp_data, date_columns=date_columns, verbose=verbose)
             if verbose:
-                styled_log(f"Skipping table {idx} due to invalid data detected.",
-                           theme="BRIGHT_BLACK", bg_theme="BG_YELLOW", bold=True)
-            pass ## Skipping table
+                print_dataframe_preview(backend.preview(parsed_tmp_data)) ## Sample
+            
+            ## Aggregation - drop unwanted columns & rename columns per table
+            yield backend.standardize(parsed_tmp_data)
+            if verbose:
+                styled_log(f"Table {idx} processed and added to aggregation.", bold=True, theme="BRIGHT_WHITE", bg_theme="BG_GREEN")
+                print("\n\n") ## Separate logging
+    
+    ## Aggregate & drop duplicates - streamed under a memory budget
+    roster_data, record_count, duplicate_count = backend.combine(parsed_tables(), count_duplicates=verbose)
+    
+    ## Original Record Count & Duplicate Count
+    if verbose:
+        styled_log(f"All record size: {record_count}", theme="BRIGHT_WHITE", bg_theme="BG_BLUE", bold=True)
+        styled_log(f"Duplcated record count: {duplicate_count}", theme="BRIGHT_WHITE", bg_theme="BG_BLUE", bold=True)
+        styled_log(f"Unique record count: {backend.count(roster_data)}", theme="BRIGHT_WHITE", bg_theme="BG_BLUE", bold=True)
+    
+    ## Filter to eligibility window
+    roster_data = backend.filter_window(roster_data, ELIGIBILITY_WINDOW)
+    if verbose:
+        styled_log(f"Only {backend.count(roster_data)} members are eligible in 2025.", theme="BRIGHT_BLUE")
+    
+    ## Write to .db
+    return backend.write(roster_data, table_name="std_member_info", conn=conn, cursor=cur,
+                         overwrite=overwrite, verbose=verbose)
+
+def ingest_attached_db(conn: sqlite3.Connection, db_path: str, source_file: str, 
+                       overwrite: bool = False, verbose: bool = False) -> Dict[str, int]:
+    """
+    Move validated roster rows from a `.db` source into `std_member_info` without pandas
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the target database
+    db_path : str
+        Path to the target database
+    source_file : str
+        Path to the source `.db` file - ATTACHed as `src` unless it is the target itself
+    overwrite : bool, optional
+        Wipe past data and insert the new (or not), by default False
+    verbose : bool, optional
+        Verbosity, by default False
+
+    Returns
+    -------
+    Dict[str, int]
+        Write statistics from `sql_engine.run_sql_engine()`
         
-        ## Parsing
-        parsed_tmp_data = parse_data(data=tmp_data, state_col_name="State", verbose=verbose)
+    Notes
+    -----
+    * Validation runs in place per row (`sql_engine.validation_rules()`) - only failing rows are read
+        back into Python for reporting; valid rows are copied table to table by SQLite
+    * Unlike the pandas path, an invalid row is dropped on its own instead of judging the whole table
+    """
+    same_file = Path(source_file).resolve() == Path(db_path).resolve()
+    schema = "main" if same_file else "src"
+    
+    conn.commit() ## ATTACH is not allowed inside a transaction
+    if not same_file:
+        conn.execute("ATTACH DATABASE ? AS src;", (str(source_file),))
+    
+    try:
+        tables = [row[0] for row in conn.execute(
+            f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table' AND name LIKE 'roster^_%' ESCAPE '^';"
+        )]
         if verbose:
-            print_dataframe_preview(parsed_tmp_data) ## Sample
+            styled_log(f"[ingest_attached_db] Found roster tables: {tables}")
         
-        ## Aggregation
-        roster_data = pd.concat([roster_data, parsed_tmp_data], ignore_index=True)
-        if verbose:
-            styled_log(f"Table {idx} processed and added to aggregation.", bold=True, theme="BRIGHT_WHITE", bg_theme="BG_GREEN")
-        print("\n\n") ## Separate logging
+        sql_engine.load_state_lookup(conn, STATE_MAPPER)
+        for tab in tables:
+            if set(sql_engine.table_columns(conn, tab, schema=schema)) != set(REQUIRED_COLUMN):
+                raise ValueError(f"Schema mismatch in {tab}.")
+            
+            if verbose:
+                styled_log(f"\t=== Table {tab} Validation (in place) ===", theme="CYAN", bold=True)
+                null_count = sql_engine.null_row_count(conn, tab, schema=schema)
+                if null_count > 0:
+                    styled_log(f"\t\t{null_count} row(s) with null values dropped before validation.",
+                               level="warning", theme="CYAN")
+                
+                failed_rows = pd.read_sql_query(sql_engine.invalid_rows_sql(tab, schema=schema), conn)
+                styled_log(
+                    f"\t\t{len(failed_rows)} invalid row(s) skipped{' - - - ERROR' if len(failed_rows) else ''}",
+                    level="error" if len(failed_rows) else None, theme="CYAN"
+                )
+                if len(failed_rows):
+                    for rule, rule_count in failed_rows["failed_rules"].str.split(",").explode().value_counts().items():
+                        styled_log(f"\t\t\t`{rule}`: {rule_count} row(s)", theme="CYAN")
+                    print_dataframe_preview(failed_rows)
+                
+                payer_list = ", ".join(f"'{payer}'" for payer in KNOWN_PAYER)
+                unexpected_payer = [row[0] for row in conn.execute(
+                    f'SELECT DISTINCT payer FROM {schema}."{tab}" WHERE payer NOT IN ({payer_list});'
+                )]
+                styled_log(
+                    f"\t\t{len(unexpected_payer)} unexpected payer type(s) found: "
+                    f"{'None' if len(unexpected_payer) == 0 else str(unexpected_payer) + ' - - - WARNING'}",
+                    level="warning" if len(unexpected_payer) > 0 else None,
+                    theme="CYAN"
+                )
         
-    ## Drop unwanted columns & Rename columns 
-    roster_data = roster_data.rename(columns={
-        "Person_Id": "member_id", 
-        "First_Name": "member_first_name",
-        "Last_Name": "member_last_name",
-        "Dob": "date_of_birth",
-        "Zip": "zip_code",
-        "City": "city",
-        "State": "state",
-        "Street_Address": "main_address",
-    }).drop(columns=["Age", "Gender"])
+        stats = sql_engine.run_sql_engine(conn, tables, STATE_MAPPER, window=ELIGIBILITY_WINDOW,
+                                          table_name="std_member_info", overwrite=overwrite,
+                                          schema=schema, valid_only=True)
+        table_sync.sync_derived(conn, "std_member_info", restart=overwrite or not stats["existing_rows"],
+                                skip_rows=stats["existing_rows"])
+    finally:
+        if not same_file:
+            conn.commit()
+            conn.execute("DETACH DATABASE src;")
     
-    ## Original Record Count & Duplicate Count
-    data_size = len(roster_data)
-    duplicate_row_count = roster_data[roster_data.duplicated(keep=False)].drop_duplicates().shape[0]
+    if verbose:
+        styled_log(f"Existing rows: {stats['existing_rows']}", theme="CYAN")
+        styled_log(f"Unique new rows added: {stats['added_rows']}", theme="CYAN")
+        styled_log(f"Final row count in table 'std_member_info': {stats['final_rows']}", theme="CYAN", bold=True)
+    
+    return stats
+
+def build_eligibility_spans(conn: sqlite3.Connection, verbose: bool = False) -> Dict:
+    """
+    Merge each member's overlapping or adjacent `std_member_info` periods into `member_eligibility_span`
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    verbose : bool, optional
+        Log span statistics, by default False
+
+    Returns
+    -------
+    Dict
+        `eligibility.build_span_table()` statistics
+    """
+    stats = eligibility.build_span_table(conn)
     
     if verbose:
-        styled_log(f"All record size: {data_size}", theme="BRIGHT_WHITE", bg_theme="BG_BLUE", bold=True)
-        styled_log(f"Duplcated record count: {duplicate_row_count}", theme="BRIGHT_WHITE", bg_theme="BG_BLUE", bold=True)
+        styled_log("===Eligibility Spans===", theme="BRIGHT_WHITE", bold=True)
+        if stats["skipped_rows"]:
+            styled_log(f"{stats['skipped_rows']} row(s) without a valid eligibility period left out of spans", level="warning")
+        styled_log(f"{stats['rows']} records -> {stats['spans']} spans for {stats['members']} members", theme="CYAN", bold=True)
+        styled_log("Runtime: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in stats["seconds"].items()),
+                   theme="CYAN")
+    
+    return stats
+
+def build_derived_attributes(conn: sqlite3.Connection, as_of: pd.Timestamp, rebuild: bool = False,
+                             verbose: bool = False) -> Dict:
+    """
+    Persist age as of `as_of`, age band & eligibility length of every `std_member_info` row into `member_derived`
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    as_of : pd.Timestamp
+        Reference date for ages
+    rebuild : bool, optional
+        Derive every row again instead of only appended ones (`std_member_info` was overwritten), by default False
+    verbose : bool, optional
+        Log derivation statistics, by default False
+
+    Returns
+    -------
+    Dict
+        `derived.build_table()` statistics
+    """
+    stats = derived.build_table(conn, as_of, rebuild=rebuild)
     
-    ## Drop duplicates
-    roster_data = roster_data.drop_duplicates()
     if verbose:
-        styled_log(f"Unique record count: {len(roster_data)}", theme="BRIGHT_WHITE", bg_theme="BG_BLUE", bold=True)
+        styled_log("===Derived Attributes===", theme="BRIGHT_WHITE", bold=True)
+        styled_log(f"{stats['derived_rows']} of {stats['rows']} records derived as of {as_of:%Y-%m-%d} "
+                   f"({'rebuilt' if stats['rebuilt'] else 'appended'})", theme="CYAN", bold=True)
+        styled_log("Runtime: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in stats["seconds"].items()),
+                   theme="CYAN")
     
-    ## Filter to 2025
-    roster_data["eligibility_start_date"], roster_data["eligibility_end_date"] = (
-        pd.to_datetime(roster_data["eligibility_start_date"]),
-        pd.to_datetime(roster_data["eligibility_end_date"])
-    ) ## Making sure date is type-ready for comparing
+    return stats
 
-    start_2025 = pd.Timestamp("2025-01-01")
-    end_2025 = pd.Timestamp("2025-12-31")
+def build_star_schema(conn: sqlite3.Connection, rebuild: bool = False, verbose: bool = False) -> Dict:
+    """
+    Mirror `std_member_info` into integer-keyed `dim_*` tables, `fact_member` & the `std_member_info_star` view
 
-    def overlaps_2025(row):
-        return (row["eligibility_start_date"] <= end_2025) and (row["eligibility_end_date"] >= start_2025)
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    rebuild : bool, optional
+        Encode every row again instead of only appended ones (`std_member_info` was overwritten), by default False
+    verbose : bool, optional
+        Log encoding statistics, by default False
 
-    roster_data = roster_data[roster_data.apply(overlaps_2025, axis=1)]
+    Returns
+    -------
+    Dict
+        `star_schema.build()` statistics
+    """
+    stats = star_schema.build(conn, rebuild=rebuild)
     
     if verbose:
-        styled_log(f"Only {len(roster_data)} members are eligible in 2025.", theme="BRIGHT_BLUE")
+        styled_log("===Star Schema===", theme="BRIGHT_WHITE", bold=True)
+        styled_log(f"{stats['encoded_rows']} of {stats['rows']} records encoded "
+                   f"({'rebuilt' if stats['rebuilt'] else 'appended'})", theme="CYAN", bold=True)
+        styled_log("Dimensions: " + ", ".join(f"{table} {count}" for table, count in stats["dimension_values"].items()),
+                   theme="CYAN")
+        styled_log("Runtime: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in stats["seconds"].items()),
+                   theme="CYAN")
     
+    return stats
+
+def resolve_members(conn: sqlite3.Connection, threshold: float = entity_resolution.MATCH_THRESHOLD,
+                    verbose: bool = False) -> Dict:
+    """
+    Cluster near-duplicate members of `std_member_info` into `member_entity`
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    threshold : float, optional
+        Minimum pair score to link two records, by default `entity_resolution.MATCH_THRESHOLD`
+    verbose : bool, optional
+        Log blocking & matching statistics, by default False
+
+    Returns
+    -------
+    Dict
+        `entity_resolution.resolve()` statistics
+    """
+    stats = entity_resolution.resolve_table(conn, STATE_MAPPER, threshold=threshold)
     
-    ## Write to .db
-    member_info_data = write_to_db(table_name="std_member_info", data=roster_data, conn=conn, cursor=cur, overwrite=overwrite, verbose=verbose,
-                theme="CYAN")
+    if verbose:
+        styled_log("===Entity Resolution===", theme="BRIGHT_WHITE", bold=True)
+        for key, key_stats in stats["blocking"].items():
+            styled_log(f"Blocking key '{key}': {key_stats['blocks']} blocks, {key_stats['pairs']} pairs", theme="CYAN")
+            if key_stats["skipped_blocks"]:
+                styled_log(f"Skipped {key_stats['skipped_blocks']} oversized '{key}' blocks "
+                           f"({key_stats['skipped_rows']} rows)", level="warning")
+        styled_log(f"Candidate pairs: {stats['candidate_pairs']} (naive: {stats['naive_pairs']})", theme="CYAN")
+        styled_log(f"Matched pairs: {stats['matched_pairs']}", theme="CYAN")
+        styled_log(f"{stats['rows']} records -> {stats['clusters']} members ({stats['merged_records']} merged)",
+                   theme="CYAN", bold=True)
+        styled_log("Runtime: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in stats["seconds"].items()),
+                   theme="CYAN")
+    
+    return stats
+
+def dump_failed_source(source_file: str, failed_dump: str, error: Exception, verbose: bool = False) -> None:
+    """Move a source that could not be processed to `failed_dump`, logging why"""
+    failed_path = Path(failed_dump) / Path(source_file).name
+    shutil.move(source_file, failed_path)
+    
+    if verbose:
+        styled_log(f"[main] Failed to process {source_file}, moved to {failed_path}")
+        styled_log(f"[main] Reason: {error}")
+
+def main(db_path: str, source_file: str, processed_dump: str, failed_dump: str, verbose: bool, overwrite: bool,
+         attach: bool = False, backend: Literal["pandas", "duckdb"] = "pandas", spill_dir: Optional[str] = None,
+         max_memory: Optional[str] = None, bloom_error_rate: Optional[float] = None,
+         resolve_threshold: Optional[float] = None,
+         spans: bool = False, valid_zips: Optional[str] = None,
+         derived_as_of: Optional[str] = None, star: bool = False): 
+    
+    ## Establish Database Connection
+    conn, cur = read_database(path_to_db=db_path)
+    if derived_as_of is not None:
+        derived_as_of = pd.Timestamp(derived_as_of).normalize()
+    
+    ## `.db` sources can skip pandas entirely
+    attach = attach and Path(source_file).suffix.lower() == ".db"
+    in_place = Path(source_file).resolve() == Path(db_path).resolve() ## Rosters already in the target - never moved
+    if valid_zips is not None:
+        try:
+            if attach:
+                raise ValueError("The zip existence rule is only supported by the pandas backend, not --attach")
+            valid_zips = zip_bitmap.open_bitmap(valid_zips, conn)
+        except Exception as e:
+            if in_place:
+                if verbose:
+                    styled_log(f"[main] Failed to process {source_file}", level="error")
+                    styled_log(f"[main] Reason: {e}")
+            else:
+                dump_failed_source(source_file, failed_dump, e, verbose=verbose)
+            return
+        if verbose:
+            styled_log(f"Checking zips against {len(valid_zips):,} valid zips ({valid_zips.source})", theme="CYAN")
+    if attach:
+        try:
+            ingest_attached_db(conn, db_path=db_path, source_file=source_file, overwrite=overwrite, verbose=verbose)
+        except Exception as e:
+            if in_place:
+                if verbose:
+                    styled_log(f"[main] Failed to process {source_file}", level="error")
+                    styled_log(f"[main] Reason: {e}")
+            else:
+                dump_failed_source(source_file, failed_dump, e, verbose=verbose)
+            return
+        if spans:
+            build_eligibility_spans(conn, verbose=verbose)
+        if derived_as_of is not None:
+            build_derived_attributes(conn, as_of=derived_as_of, rebuild=overwrite, verbose=verbose)
+        if star:
+            build_star_schema(conn, rebuild=overwrite, verbose=verbose)
+        if resolve_threshold is not None:
+            resolve_members(conn, threshold=resolve_threshold, verbose=verbose)
+        if verbose:
+            styled_log(f"{db_path} updated!", theme="BRIGHT_WHITE", bg_theme="BG_GREEN", bold=True)
+        
+        ## Move the attached file to processed_dump
+        if not in_place:
+            shutil.move(source_file, Path(processed_dump) / Path(source_file).name)
+            if verbose:
+                styled_log(f"Moved {source_file} to {processed_dump}", theme="BRIGHT_WHITE", bg_theme="BG_GREEN", bold=True)
+        return
+    
+    backend = get_backend(backend, spill_dir=spill_dir, max_memory=max_memory, bloom_error_rate=bloom_error_rate,
+                          valid_zips=valid_zips)
+    try:
+        dfs = backend.read_source(source_file, verbose=verbose)
+    except Exception as e:
+        dump_failed_source(source_file, failed_dump, e, verbose=verbose)
+        backend.close()
+        return
+    
+    is_columnar = Path(source_file).suffix.lstrip('.').lower() in COLUMNAR_EXTENSION
+    try:
+        run_pipeline(backend, dfs, conn=conn, cur=cur, overwrite=overwrite, verbose=verbose,
+                     date_columns=DATE_COLUMN if is_columnar else None)
+    finally:
+        backend.close()
+    
+    ## Consolidated eligibility, derived attributes, star schema & near-duplicate clusters over the updated table
+    if spans:
+        build_eligibility_spans(conn, verbose=verbose)
+    if derived_as_of is not None:
+        build_derived_attributes(conn, as_of=derived_as_of, rebuild=overwrite, verbose=verbose)
+    if star:
+        build_star_schema(conn, rebuild=overwrite, verbose=verbose)
+    if resolve_threshold is not None:
+        resolve_members(conn, threshold=resolve_threshold, verbose=verbose)
     
     if verbose:
         print("\n\n")
@@ -913,6 +1809,56 @@ if __name__ == "__main__":
         required=True,
         help="Database that new data should be transported into."
     )
+    parser.add_argument(
+        "-a", "--attach",
+        action="store_true",
+        help="For .db sources, ATTACH the source and move validated rows with SQL instead of pandas."
+    )
+    parser.add_argument(
+        "-e", "--backend",
+        choices=["pandas", "duckdb"],
+        default="pandas",
+        help="Execution backend - `duckdb` runs out-of-core on all cores (requires duckdb), default: pandas."
+    )
+    parser.add_argument(
+        "--spill-dir",
+        help="Directory for out-of-core spill files (default: a temporary directory)."
+    )
+    parser.add_argument(
+        "-m", "--max-memory",
+        help="Memory budget, e.g. 4GB - deduplication spills hash partitions to --spill-dir past it (default: no budget)."
+    )
+    parser.add_argument(
+        "--bloom",
+        nargs="?", type=float, const=BLOOM_ERROR_RATE, default=None, metavar="ERROR_RATE",
+        help=f"Pre-check rows against a Bloom filter kept next to the database (default false-positive rate: {BLOOM_ERROR_RATE})."
+    )
+    parser.add_argument(
+        "--spans",
+        action="store_true",
+        help="Merge overlapping/adjacent eligibility periods per member into `member_eligibility_span` after the write."
+    )
+    parser.add_argument(
+        "--derived",
+        nargs="?", const="today", default=None, metavar="AS_OF",
+        help="Persist age as of AS_OF, age band & eligibility length in days per row into `member_derived` after the write (default date: today)."
+    )
+    parser.add_argument(
+        "--star",
+        action="store_true",
+        help="Mirror `std_member_info` into integer-keyed dim_state/dim_city/dim_payer/dim_zip tables, a slim `fact_member` table & the `std_member_info_star` view after the write."
+    )
+    parser.add_argument(
+        "--resolve",
+        nargs="?", type=float, const=entity_resolution.MATCH_THRESHOLD, default=None, metavar="THRESHOLD",
+        help=f"Cluster near-duplicate members into `member_entity` after the write (default match threshold: {entity_resolution.MATCH_THRESHOLD})."
+    )
+    parser.add_argument(
+        "--valid-zips",
+        nargs="?", const=zip_bitmap.SCORES_SOURCE, default=None, metavar="SOURCE",
+        help="Also reject zips that don't exist - SOURCE is a ZCTA .shp, a .db with model_scores_by_zip or a "
+             "zip_bitmap.py file (default: model_scores_by_zip of --database)."
+    )
     args = parser.parse_args()
     
     verbose = args.verbose
@@ -929,4 +1875,7 @@ if __name__ == "__main__":
     
     main(db_path=args.database, source_file=args.source, processed_dump=args.bin if args.bin else "processed-bin", 
          failed_dump=args.failbin if args.failbin else "failed-bin", 
-         verbose=args.verbose, overwrite=args.overwrite)
\ No newline at end of file
+         verbose=args.verbose, overwrite=args.overwrite, attach=args.attach,
+         backend=args.backend, spill_dir=args.spill_dir, max_memory=args.max_memory,
+         bloom_error_rate=args.bloom, resolve_threshold=args.resolve, spans=args.spans, valid_zips=args.valid_zips,
+         derived_as_of=args.derived, star=args.star)
\ No newline at end of file
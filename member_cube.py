@@ -0,0 +1,328 @@
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+import bloom
+import eligibility
+from sql_engine import DigestSet, quote, table_chunks, unseen_digests
+
+CUBE_TABLE = "member_cube"
+SOURCE_TABLE = "member_cube_source" ## Cell attributes of every counted `std_member_info` row, by content digest
+DIMENSIONS = ("payer", "state", "gender", "age_band", "zip3", "month")
+## Cube tables, smallest first - `rollup()` reads the first one holding every dimension it needs.
+## zip3 x month is what makes the full cube large, so each is also kept without the other
+PROJECTIONS = {
+    "member_cube_zip3": ("payer", "state", "gender", "age_band", "zip3"),
+    "member_cube_month": ("payer", "state", "gender", "age_band", "month"),
+    CUBE_TABLE: DIMENSIONS,
+}
+AGE_BANDS, AGE_BAND_LABELS = eligibility.AGE_BANDS, eligibility.AGE_BAND_LABELS
+UNKNOWN = "Unknown" ## Missing dimension value - primary key columns cannot be NULL
+NO_PERIOD_MONTH = 0 ## `month` of rows without a valid eligibility period, counted in `members` only
+CHUNK_ROWS = 100_000 ## `std_member_info` rows read at a time by `sync_from_table()`
+
+
+def create_tables(conn: sqlite3.Connection) -> None:
+    """Cube, projection & source tables"""
+    for table, dimensions in PROJECTIONS.items():
+        columns = ", ".join(f"{name} {'INTEGER' if name == 'month' else 'TEXT'} NOT NULL" for name in dimensions)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS "{table}" (
+                {columns}, members INTEGER NOT NULL, member_months INTEGER NOT NULL,
+                PRIMARY KEY ({', '.join(dimensions)})
+            ) WITHOUT ROWID;
+        """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS "{SOURCE_TABLE}" (
+            row_digest INTEGER PRIMARY KEY, payer TEXT, state TEXT, gender TEXT, zip3 TEXT,
+            born_month INTEGER, first_month INTEGER, last_month INTEGER
+        );
+    """)
+
+
+def drop_tables(conn: sqlite3.Connection) -> None:
+    for table in PROJECTIONS:
+        conn.execute(f'DROP TABLE IF EXISTS "{table}";')
+    conn.execute(f'DROP TABLE IF EXISTS "{SOURCE_TABLE}";')
+
+
+def load_genders(conn: sqlite3.Connection) -> int:
+    """
+    `temp.member_cube_gender` (member id -> `Gender`) from every `roster_` table in reach
+
+    `std_member_info` drops `Gender`, so the cube reads it back from the rosters - attached
+    databases included (`ingest_attached_db()` runs before `DETACH`).
+
+    Returns
+    -------
+    int
+        Members with a known gender
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.member_cube_gender;")
+    conn.execute("CREATE TEMP TABLE member_cube_gender (member_id TEXT PRIMARY KEY, gender TEXT);")
+    selects = []
+    for _, schema, _ in conn.execute("PRAGMA database_list;").fetchall():
+        for (table,) in conn.execute(f"SELECT name FROM {quote(schema)}.sqlite_master WHERE type = 'table' AND name LIKE 'roster\\_%' ESCAPE '\\';").fetchall():
+            columns = [row[1] for row in conn.execute(f"PRAGMA {quote(schema)}.table_info({quote(table)});")]
+            if "Person_Id" in columns and "Gender" in columns:
+                selects.append(f'SELECT CAST("Person_Id" AS TEXT) AS member_id, "Gender" AS gender FROM {quote(schema)}.{quote(table)} '
+                               'WHERE "Gender" IS NOT NULL')
+    if selects:
+        conn.execute(f"INSERT INTO temp.member_cube_gender SELECT member_id, MAX(gender) FROM ({' UNION ALL '.join(selects)}) GROUP BY member_id;")
+    return conn.execute("SELECT COUNT(*) FROM temp.member_cube_gender;").fetchone()[0]
+
+
+def row_attributes(conn: sqlite3.Connection, rows: pd.DataFrame, digests: np.ndarray) -> pd.DataFrame:
+    """
+    Per-row cell attributes - what `SOURCE_TABLE` keeps so a row can later be subtracted
+
+    Months are counted from year 0 (`year * 12 + month - 1`). `born_month` is the month index of
+    the first month start the member has reached their birth date by, so the age on the first
+    day of month `m` is `(m - born_month) // 12`.
+    """
+    def text(column: str) -> np.ndarray:
+        values = rows[column] if column in rows else pd.Series(None, index=rows.index, dtype=object)
+        return values.astype(object).where(values.notna(), UNKNOWN).astype(str).to_numpy()
+
+    def months(column: str) -> tuple:
+        days = eligibility.to_days(rows[column])
+        dates = np.where(days == eligibility.NaT_DAYS, 0, days).astype("datetime64[D]")
+        return np.where(days == eligibility.NaT_DAYS, -1, dates.astype("datetime64[M]").astype(np.int64) + 1970 * 12), dates
+
+    attributes = pd.DataFrame({"row_digest": digests, "payer": text("payer"), "state": text("state")})
+    if "Gender" in rows or "gender" in rows:
+        attributes["gender"] = text("Gender" if "Gender" in rows else "gender")
+    else:
+        conn.execute("DROP TABLE IF EXISTS temp.member_cube_ids;")
+        conn.execute("CREATE TEMP TABLE member_cube_ids (member_id TEXT PRIMARY KEY);")
+        conn.executemany("INSERT OR IGNORE INTO temp.member_cube_ids VALUES (?);", ((value,) for value in rows["member_id"].astype(str).unique()))
+        genders = dict(conn.execute("SELECT member_id, gender FROM temp.member_cube_ids JOIN temp.member_cube_gender USING (member_id);").fetchall())
+        conn.execute("DROP TABLE temp.member_cube_ids;")
+        attributes["gender"] = rows["member_id"].astype(str).map(genders).fillna(UNKNOWN).to_numpy()
+    zips = rows["zip_code"].astype(str).str.strip().str.zfill(5).str[:3]
+    attributes["zip3"] = zips.where(rows["zip_code"].notna() & zips.str.isdigit(), UNKNOWN).to_numpy()
+
+    born, dob = months("date_of_birth")
+    attributes["born_month"] = np.where(born < 0, -1, born + ((dob - dob.astype("datetime64[M]")).astype(np.int64) > 0))
+    (first, start), (last, end) = months("eligibility_start_date"), months("eligibility_end_date")
+    has_period = (first >= 0) & (last >= 0) & (start <= end)
+    attributes["first_month"], attributes["last_month"] = np.where(has_period, first, -1), np.where(has_period, last, -1)
+    return attributes
+
+
+def age_band(born_month: np.ndarray, month: np.ndarray) -> np.ndarray:
+    """Index into `AGE_BAND_LABELS` of the age on the first day of `month`, -1 without a birth date or before birth"""
+    band = np.searchsorted(AGE_BANDS, (month - born_month) // 12, side="right") - 1
+    return np.where(born_month < 0, -1, band)
+
+
+def cell_deltas(attributes: pd.DataFrame, sign: int = 1) -> pd.DataFrame:
+    """
+    Cube cells touched by `attributes` rows, with `sign` * their counts
+
+    A row adds 1 to `member_months` of every month its period overlaps, and 1 to `members` of its
+    first month only - summing `members` over months counts each row once. Rows without a valid
+    period add 1 to `members` of month `NO_PERIOD_MONTH`.
+
+    Text attributes are factorized once per row, so the per-month expansion only moves integer
+    codes, and the cells are found with a single `np.unique()` over one mixed-radix key. Codes
+    follow the text order, so cells come out in primary key order - upserts walk the B-tree.
+    """
+    first, last = attributes["first_month"].to_numpy(), attributes["last_month"].to_numpy()
+    n_months = np.where(first >= 0, last - first + 1, 1)
+    row = np.repeat(np.arange(len(attributes)), n_months)
+    offset = np.arange(n_months.sum()) - np.repeat(np.cumsum(n_months) - n_months, n_months)
+    month = np.repeat(first, n_months) + offset
+    has_period = month >= 0
+
+    ## Key digits: sorted text attribute codes, age band (`UNKNOWN` last, as in text order) & month offset (0 = `NO_PERIOD_MONTH`)
+    codes, labels = {}, {}
+    for name in ("payer", "state", "gender", "zip3"):
+        row_codes, labels[name] = pd.factorize(attributes[name], sort=True, use_na_sentinel=False)
+        codes[name] = row_codes[row]
+    band = age_band(attributes["born_month"].to_numpy()[row], month)
+    codes["age_band"] = np.where(has_period & (band >= 0), band, len(AGE_BAND_LABELS))
+    first_month = first[first >= 0].min() if (first >= 0).any() else 0
+    codes["month"] = np.where(has_period, month - first_month + 1, 0)
+    radix = {name: len(labels[name]) for name in labels} | {"age_band": len(AGE_BAND_LABELS) + 1, "month": int(codes["month"].max()) + 1}
+    key = np.zeros(len(row), dtype=np.int64)
+    for name in DIMENSIONS:
+        key = key * radix[name] + codes[name]
+
+    cells, inverse = np.unique(key, return_inverse=True)
+    deltas = {}
+    for name in reversed(DIMENSIONS):
+        cells, digit = np.divmod(cells, radix[name])
+        deltas[name] = digit
+    band_labels = np.asarray((*AGE_BAND_LABELS, UNKNOWN))
+    month_index = deltas["month"] + first_month - 1
+    return pd.DataFrame({
+        **{name: np.asarray(labels[name], dtype=object)[deltas[name]] for name in ("payer", "state", "gender")},
+        "age_band": band_labels[deltas["age_band"]],
+        "zip3": np.asarray(labels["zip3"], dtype=object)[deltas["zip3"]],
+        "month": np.where(deltas["month"] > 0, (month_index // 12) * 100 + month_index % 12 + 1, NO_PERIOD_MONTH),
+        "members": np.bincount(inverse, weights=offset == 0).astype(np.int64) * sign,
+        "member_months": np.bincount(inverse, weights=has_period).astype(np.int64) * sign,
+    })
+
+
+def apply_deltas(conn: sqlite3.Connection, deltas: pd.DataFrame) -> None:
+    """Add `deltas` (full-cube cells) into every projection, dropping cells that reach zero"""
+    for table, dimensions in PROJECTIONS.items():
+        projected = deltas if dimensions == DIMENSIONS else deltas.groupby(list(dimensions))[["members", "member_months"]].sum().reset_index()
+        columns = [*dimensions, "members", "member_months"]
+        conn.executemany(
+            f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES ({", ".join("?" for _ in columns)}) '
+            f"ON CONFLICT ({', '.join(dimensions)}) DO UPDATE SET "
+            "members = members + excluded.members, member_months = member_months + excluded.member_months;",
+            zip(*(projected[column].tolist() for column in columns))
+        )
+        conn.execute(f'DELETE FROM "{table}" WHERE members = 0 AND member_months = 0;')
+
+
+def remove_rows(conn: sqlite3.Connection, digests: np.ndarray) -> int:
+    """Subtract the counted rows with these digests, from their `SOURCE_TABLE` attributes - returns rows subtracted"""
+    conn.execute("DROP TABLE IF EXISTS temp.member_cube_removed;")
+    conn.execute("CREATE TEMP TABLE member_cube_removed (row_digest INTEGER PRIMARY KEY);")
+    conn.executemany("INSERT OR IGNORE INTO temp.member_cube_removed VALUES (?);", ((d,) for d in np.asarray(digests, dtype=np.int64).tolist()))
+    attributes = pd.read_sql_query(f'SELECT s.* FROM "{SOURCE_TABLE}" AS s JOIN temp.member_cube_removed USING (row_digest);', conn)
+    conn.execute(f'DELETE FROM "{SOURCE_TABLE}" WHERE row_digest IN (SELECT row_digest FROM temp.member_cube_removed);')
+    conn.execute("DROP TABLE temp.member_cube_removed;")
+    if len(attributes):
+        apply_deltas(conn, cell_deltas(attributes, sign=-1))
+    return len(attributes)
+
+
+def add_rows(conn: sqlite3.Connection, rows: pd.DataFrame, digests: np.ndarray, genders_loaded: bool = False) -> int:
+    """Count the rows not counted yet (`unseen_digests()`) - returns rows added"""
+    new_positions = unseen_digests(conn, digests, SOURCE_TABLE)
+    if not len(new_positions):
+        return 0
+    if not genders_loaded and "Gender" not in rows and "gender" not in rows:
+        load_genders(conn)
+    attributes = row_attributes(conn, rows.iloc[new_positions], digests[new_positions])
+    attributes.to_sql(SOURCE_TABLE, conn, if_exists="append", index=False)
+    apply_deltas(conn, cell_deltas(attributes))
+    return len(new_positions)
+
+
+def update(conn: sqlite3.Connection, added: Optional[Union[pd.DataFrame, Iterable[pd.DataFrame]]] = None,
+           removed: Optional[pd.DataFrame] = None) -> Dict[str, int]:
+    """
+    Add rows to & subtract rows from the cube - member-level rows are never re-read
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    added : Union[pd.DataFrame, Iterable[pd.DataFrame]], optional
+        New rows in the `std_member_info` layout, or chunks of them - rows already counted are skipped, by default None
+    removed : pd.DataFrame, optional
+        Rows no longer in `std_member_info` - rows never counted are ignored, by default None
+
+    Returns
+    -------
+    Dict[str, int]
+        `added_rows`, `removed_rows` & `cells` (cube size afterwards)
+    """
+    create_tables(conn)
+    removed_rows = added_rows = 0
+    if removed is not None and len(removed):
+        removed_rows = remove_rows(conn, bloom.row_digests(removed)[:, 0].view(np.int64))
+    genders_loaded = False
+    for chunk in [added] if isinstance(added, pd.DataFrame) else added or []:
+        if chunk.empty:
+            continue
+        if not genders_loaded and "Gender" not in chunk and "gender" not in chunk:
+            load_genders(conn)
+            genders_loaded = True
+        added_rows += add_rows(conn, chunk, bloom.row_digests(chunk)[:, 0].view(np.int64), genders_loaded=genders_loaded)
+    conn.commit()
+    cells = conn.execute(f'SELECT COUNT(*) FROM "{CUBE_TABLE}";').fetchone()[0]
+    return {"added_rows": added_rows, "removed_rows": removed_rows, "cells": cells}
+
+
+def sync(conn: sqlite3.Connection, chunks: Iterable[pd.DataFrame]) -> Dict[str, int]:
+    """
+    Make the cube match a table given as its full contents (in chunks)
+
+    Rows new to the cube are added and rows counted before but absent from `chunks` are subtracted
+    - an overwrite moves the cube by the rows it changed, not by a rebuild (rows are matched by
+    content digest, see "Row identity" in `sql_engine`).
+
+    Returns
+    -------
+    Dict[str, int]
+        `added_rows`, `removed_rows` & `cells` (cube size afterwards)
+    """
+    create_tables(conn)
+    current = DigestSet(conn)
+    added_rows, genders_loaded = 0, False
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        digests = bloom.row_digests(chunk)[:, 0].view(np.int64)
+        current.add(digests)
+        if not genders_loaded and "Gender" not in chunk and "gender" not in chunk:
+            load_genders(conn)
+            genders_loaded = True
+        added_rows += add_rows(conn, chunk, digests, genders_loaded=genders_loaded)
+    removed = current.vanished(SOURCE_TABLE)
+    removed_rows = remove_rows(conn, removed) if len(removed) else 0
+    conn.commit()
+    cells = conn.execute(f'SELECT COUNT(*) FROM "{CUBE_TABLE}";').fetchone()[0]
+    return {"added_rows": added_rows, "removed_rows": removed_rows, "cells": cells}
+
+
+def sync_from_table(conn: sqlite3.Connection, table_name: str = "std_member_info") -> Dict[str, int]:
+    """`sync()` from the stored table, read in `CHUNK_ROWS` chunks - for writers that never hold the rows in pandas"""
+    return sync(conn, (pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                       for columns, rows in table_chunks(conn, table_name, CHUNK_ROWS)))
+
+
+def rollup(conn: sqlite3.Connection, by: Union[str, List[str]] = ("payer",), where: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """
+    Roll the cube up to any subset of its dimensions - reads the smallest cube table covering them
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    by : Union[str, List[str]], optional
+        Dimensions to keep (subset of `DIMENSIONS`, empty for the total), by default ("payer",)
+    where : Dict[str, Any], optional
+        Filters, dimension -> value or list of values, by default None
+
+    Returns
+    -------
+    pd.DataFrame
+        The `by` dimensions & `members`: rows eligible in the month when `by` has "month",
+        otherwise rows counted once each
+
+    Raises
+    ------
+    ValueError
+        Unknown dimension, or a `month` filter without grouping by month (rows would be counted once per month)
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    where = dict(where or {})
+    unknown = [name for name in [*by, *where] if name not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown cube dimension(s): {unknown}")
+    if "month" in where and "month" not in by:
+        raise ValueError("Filtering on `month` requires grouping by `month`.")
+
+    table = next(table for table, dimensions in PROJECTIONS.items() if set(by) | set(where) <= set(dimensions))
+    measure = "member_months" if "month" in by else "members"
+    conditions, params = ["month <> ?"] if "month" in by else [], [NO_PERIOD_MONTH] if "month" in by else []
+    for name, value in where.items():
+        values = list(value) if isinstance(value, (list, tuple, set, range)) else [value]
+        conditions.append(f"{name} IN ({', '.join('?' for _ in values)})")
+        params.extend(values)
+    group = f" GROUP BY {', '.join(by)} ORDER BY {', '.join(by)}" if by else ""
+    return pd.read_sql_query(
+        f'SELECT {"".join(f"{name}, " for name in by)}SUM({measure}) AS members FROM "{table}"'
+        f'{" WHERE " + " AND ".join(conditions) if conditions else ""}{group};', conn, params=params
+    )
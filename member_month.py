@@ -0,0 +1,174 @@
+import sqlite3
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+import bloom
+from sql_engine import table_chunks, unseen_digests
+
+FACT_TABLE = "member_month"
+SOURCE_TABLE = "member_month_source" ## Digests of the `std_member_info` rows already expanded
+## Dictionary-encoded attribute -> (dimension table, key column, source column)
+DIMENSIONS = {
+    "payer": ("member_month_payer", "payer_key", "payer"),
+    "state": ("member_month_state", "state_key", "state"),
+    "zip_code": ("member_month_zip", "zip_key", "zip_code"),
+}
+CHUNK_ROWS = 100_000 ## `std_member_info` rows read at a time by `sync_from_table()`
+
+
+def create_tables(conn: sqlite3.Connection) -> None:
+    """Fact, dimension & source-digest tables - the fact table is clustered by month"""
+    for table, key, column in DIMENSIONS.values():
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({key} INTEGER PRIMARY KEY, "{column}" TEXT UNIQUE);')
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS "{FACT_TABLE}" (
+            month INTEGER NOT NULL, member_id TEXT NOT NULL, payer_key INTEGER NOT NULL,
+            state_key INTEGER, zip_key INTEGER,
+            PRIMARY KEY (month, member_id, payer_key)
+        ) WITHOUT ROWID;
+    """)
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{SOURCE_TABLE}" (row_digest INTEGER PRIMARY KEY);')
+
+
+def drop_tables(conn: sqlite3.Connection) -> None:
+    for table, _, _ in DIMENSIONS.values():
+        conn.execute(f'DROP TABLE IF EXISTS "{table}";')
+    conn.execute(f'DROP TABLE IF EXISTS "{FACT_TABLE}";')
+    conn.execute(f'DROP TABLE IF EXISTS "{SOURCE_TABLE}";')
+
+
+def encode(conn: sqlite3.Connection, attribute: str, values: pd.Series) -> np.ndarray:
+    """
+    Dictionary keys of `values`, adding unseen values to the attribute's dimension table
+
+    Returns
+    -------
+    np.ndarray
+        Key per value, aligned with `values`
+    """
+    table, key, column = DIMENSIONS[attribute]
+    values = values.astype(str)
+    known = dict(conn.execute(f'SELECT "{column}", {key} FROM "{table}";').fetchall())
+    unseen = [value for value in values.unique() if value not in known]
+    if unseen:
+        next_key = max(known.values(), default=-1) + 1
+        new_keys = dict(zip(unseen, range(next_key, next_key + len(unseen))))
+        conn.executemany(f'INSERT INTO "{table}" ({key}, "{column}") VALUES (?, ?);',
+                         [(new_key, value) for value, new_key in new_keys.items()])
+        known.update(new_keys)
+    return values.map(known).to_numpy(dtype=np.int64)
+
+
+def month_index(dates: pd.Series) -> np.ndarray:
+    """Parsed dates -> months since year 0 (`year * 12 + month - 1`), -1 when missing"""
+    return np.where(dates.isna(), -1, dates.dt.year.fillna(0) * 12 + dates.dt.month.fillna(1) - 1).astype(np.int64)
+
+
+def expand_months(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (calendar month overlapped by the eligibility period, source row)
+
+    Returns
+    -------
+    pd.DataFrame
+        `month` (`YYYYMM` integer) & the positional `row` it came from
+    """
+    start = pd.to_datetime(rows["eligibility_start_date"], format="%Y-%m-%d", errors="coerce")
+    end = pd.to_datetime(rows["eligibility_end_date"], format="%Y-%m-%d", errors="coerce")
+    first, last = month_index(start), month_index(end)
+    n_months = np.where((first >= 0) & (last >= 0) & (start <= end).to_numpy(), last - first + 1, 0)
+    row = np.repeat(np.arange(len(rows)), n_months)
+    month = np.repeat(first, n_months) + (np.arange(n_months.sum()) - np.repeat(np.cumsum(n_months) - n_months, n_months))
+    return pd.DataFrame({"month": (month // 12) * 100 + month % 12 + 1, "row": row})
+
+
+def update(conn: sqlite3.Connection, rows: Union[pd.DataFrame, Iterable[pd.DataFrame]], rebuild: bool = False) -> Dict[str, int]:
+    """
+    Expand the `std_member_info` rows not yet in `member_month`
+
+    Rows already expanded are skipped by content digest (see "Row identity" in `sql_engine`), so
+    passing the whole table is safe.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    rows : Union[pd.DataFrame, Iterable[pd.DataFrame]]
+        Rows in the `std_member_info` layout (`%Y-%m-%d` date strings), or chunks of them
+    rebuild : bool, optional
+        Drop the fact table first (the source table was overwritten), by default False
+
+    Returns
+    -------
+    Dict[str, int]
+        `new_rows` expanded, `skipped_rows` already expanded & `member_months` inserted
+    """
+    if rebuild:
+        drop_tables(conn)
+    create_tables(conn)
+    stats = {"new_rows": 0, "skipped_rows": 0, "member_months": 0}
+    for chunk in [rows] if isinstance(rows, pd.DataFrame) else rows:
+        if chunk.empty:
+            continue
+        digests = bloom.row_digests(chunk)[:, 0].view(np.int64)
+        new_positions = unseen_digests(conn, digests, SOURCE_TABLE)
+        new_rows = chunk.iloc[new_positions].reset_index(drop=True)
+
+        facts = expand_months(new_rows)
+        source_row = facts["row"].to_numpy()
+        facts["member_id"] = new_rows["member_id"].astype(str).to_numpy()[source_row]
+        for attribute, (_, key, column) in DIMENSIONS.items():
+            facts[key] = encode(conn, attribute, new_rows[column])[source_row]
+
+        before = conn.total_changes
+        conn.executemany(
+            f'INSERT OR IGNORE INTO "{FACT_TABLE}" (month, member_id, payer_key, state_key, zip_key) VALUES (?, ?, ?, ?, ?);',
+            zip(facts["month"].tolist(), facts["member_id"].tolist(), facts["payer_key"].tolist(),
+                facts["state_key"].tolist(), facts["zip_key"].tolist())
+        )
+        stats["member_months"] += conn.total_changes - before
+        conn.executemany(f'INSERT INTO "{SOURCE_TABLE}" VALUES (?);', ((d,) for d in digests[new_positions].tolist()))
+        stats["new_rows"] += len(new_rows)
+        stats["skipped_rows"] += len(chunk) - len(new_rows)
+    conn.commit()
+    return stats
+
+
+def sync_from_table(conn: sqlite3.Connection, table_name: str = "std_member_info", rebuild: bool = False) -> Dict[str, int]:
+    """`update()` from the stored table, read in `CHUNK_ROWS` chunks - for writers that never hold the rows in pandas"""
+    return update(conn, (pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                         for columns, rows in table_chunks(conn, table_name, CHUNK_ROWS)), rebuild=rebuild)
+
+
+def monthly_counts(conn: sqlite3.Connection, months: Union[int, Iterable[int]], by: Optional[str] = "payer") -> pd.DataFrame:
+    """
+    Eligible members per month (and per attribute) - an index range over `member_month`
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    months : Union[int, Iterable[int]]
+        `YYYYMM` month, or an inclusive `(first, last)` pair
+    by : str, optional
+        "payer", "state", "zip_code" or None for totals, by default "payer"
+
+    Returns
+    -------
+    pd.DataFrame
+        `month`, the `by` attribute & `members`
+    """
+    first, last = (months, months) if isinstance(months, int) else tuple(months)
+    if by is None:
+        return pd.read_sql_query(
+            f'SELECT month, COUNT(DISTINCT member_id) AS members FROM "{FACT_TABLE}" '
+            "WHERE month BETWEEN ? AND ? GROUP BY month ORDER BY month;", conn, params=(first, last)
+        )
+    table, key, column = DIMENSIONS[by]
+    return pd.read_sql_query(
+        f'SELECT f.month, d."{column}", COUNT(DISTINCT f.member_id) AS members FROM "{FACT_TABLE}" AS f '
+        f'JOIN "{table}" AS d ON d.{key} = f.{key} WHERE f.month BETWEEN ? AND ? '
+        f'GROUP BY f.month, f.{key} ORDER BY f.month, d."{column}";', conn, params=(first, last)
+    )
@@ -0,0 +1,224 @@
+import argparse
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+import bloom
+from score_lookup import SCORE_TABLE, ScoreLookup, zip_index
+from sql_engine import DigestSet, quote, table_chunks, unseen_digests
+
+MEMBER_SCORES_TABLE = "member_scores" ## One row per `std_member_info` row (by content digest) with the scores of its zip
+ZIP_HASH_TABLE = "member_scores_zip_hash" ## Hash of each zip's `SCORE_TABLE` row, as last applied to `MEMBER_SCORES_TABLE`
+BASE_COLUMNS = ("row_digest", "member_id", "payer", "zip")
+CHUNK_ROWS = 100_000 ## `std_member_info` rows read at a time by `sync_from_table()`
+
+
+def score_columns(conn: sqlite3.Connection) -> List[str]:
+    """Score columns currently materialized in `MEMBER_SCORES_TABLE`"""
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{MEMBER_SCORES_TABLE}");') if row[1] not in BASE_COLUMNS]
+
+
+def create_tables(conn: sqlite3.Connection, columns: Iterable[str] = ()) -> None:
+    scores = "".join(f", {quote(column)} REAL" for column in columns)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS "{MEMBER_SCORES_TABLE}" (
+            row_digest INTEGER PRIMARY KEY, member_id TEXT, payer TEXT, zip INTEGER NOT NULL{scores}
+        );
+    """)
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "{MEMBER_SCORES_TABLE}_zip" ON "{MEMBER_SCORES_TABLE}" (zip);')
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{ZIP_HASH_TABLE}" (zip INTEGER PRIMARY KEY, row_hash INTEGER NOT NULL);')
+
+
+def drop_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(f'DROP TABLE IF EXISTS "{MEMBER_SCORES_TABLE}";')
+    conn.execute(f'DROP TABLE IF EXISTS "{ZIP_HASH_TABLE}";')
+
+
+def zip_hashes(lookup: ScoreLookup) -> pd.DataFrame:
+    """`zip` & `row_hash` of every zip with scores - hashes the values the lookup serves, so formatting changes don't count"""
+    zips = np.flatnonzero(lookup.present[:-1])
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(lookup.values[zips]), index=False).to_numpy().view(np.int64)
+    return pd.DataFrame({"zip": zips, "row_hash": hashes})
+
+
+def ensure_columns(conn: sqlite3.Connection, columns: List[str]) -> bool:
+    """
+    Give `MEMBER_SCORES_TABLE` exactly `columns` as score columns - rebuilt (member rows kept) when they differ
+
+    Returns
+    -------
+    bool
+        The table was rebuilt - every zip must be rescored
+    """
+    create_tables(conn, columns)
+    if score_columns(conn) == columns:
+        return False
+    base = ", ".join(BASE_COLUMNS)
+    conn.execute(f'ALTER TABLE "{MEMBER_SCORES_TABLE}" RENAME TO "{MEMBER_SCORES_TABLE}_old";')
+    conn.execute(f'DROP INDEX IF EXISTS "{MEMBER_SCORES_TABLE}_zip";')
+    create_tables(conn, columns)
+    conn.execute(f'INSERT INTO "{MEMBER_SCORES_TABLE}" ({base}) SELECT {base} FROM "{MEMBER_SCORES_TABLE}_old";')
+    conn.execute(f'DROP TABLE "{MEMBER_SCORES_TABLE}_old";')
+    conn.execute(f'DELETE FROM "{ZIP_HASH_TABLE}";')
+    return True
+
+
+def refresh_scores(conn: sqlite3.Connection, lookup: Optional[ScoreLookup] = None) -> Dict[str, int]:
+    """
+    Rescore only the members whose zip changed in `SCORE_TABLE` since the last refresh
+
+    Each zip's score row is hashed and compared with `ZIP_HASH_TABLE`: zips added, removed or with
+    any score changed are rewritten in one `UPDATE` over the zip index, every other member row is
+    left alone. A change in the set of score columns rebuilds the score columns and rescores every zip.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    lookup : ScoreLookup, optional
+        Current scores, by default loaded from `SCORE_TABLE`
+
+    Returns
+    -------
+    Dict[str, int]
+        `changed_zips` & `rescored_rows`
+    """
+    lookup = lookup or ScoreLookup.load(conn)
+    ensure_columns(conn, lookup.columns)
+    conn.execute("DROP TABLE IF EXISTS temp.member_scores_hash;")
+    conn.execute("CREATE TEMP TABLE member_scores_hash (zip INTEGER PRIMARY KEY, row_hash INTEGER NOT NULL);")
+    current = zip_hashes(lookup)
+    conn.executemany("INSERT INTO temp.member_scores_hash VALUES (?, ?);", zip(current["zip"].tolist(), current["row_hash"].tolist()))
+    changed = np.array([row[0] for row in conn.execute(f"""
+        SELECT n.zip FROM temp.member_scores_hash AS n LEFT JOIN "{ZIP_HASH_TABLE}" AS o USING (zip)
+        WHERE o.row_hash IS NULL OR o.row_hash <> n.row_hash
+        UNION ALL
+        SELECT zip FROM "{ZIP_HASH_TABLE}" WHERE zip NOT IN (SELECT zip FROM temp.member_scores_hash);
+    """)], dtype=np.int64)
+    conn.execute(f'DELETE FROM "{ZIP_HASH_TABLE}";')
+    conn.execute(f'INSERT INTO "{ZIP_HASH_TABLE}" SELECT zip, row_hash FROM temp.member_scores_hash;')
+    conn.execute("DROP TABLE temp.member_scores_hash;")
+
+    rescored_rows = 0
+    if len(changed) and lookup.columns:
+        columns = ", ".join(map(quote, lookup.columns))
+        conn.execute("DROP TABLE IF EXISTS temp.member_scores_changed;")
+        conn.execute(f"CREATE TEMP TABLE member_scores_changed (zip INTEGER PRIMARY KEY{''.join(f', {quote(c)} REAL' for c in lookup.columns)});")
+        conn.executemany(f"INSERT INTO temp.member_scores_changed VALUES (?{', ?' * len(lookup.columns)});",
+                         ((z, *row) for z, row in zip(changed.tolist(), lookup.values[changed].tolist())))
+        before = conn.total_changes
+        conn.execute(f"""
+            UPDATE "{MEMBER_SCORES_TABLE}" SET ({columns}) = (
+                SELECT {columns} FROM temp.member_scores_changed AS c WHERE c.zip = "{MEMBER_SCORES_TABLE}".zip
+            ) WHERE zip IN (SELECT zip FROM temp.member_scores_changed);
+        """)
+        rescored_rows = conn.total_changes - before
+        conn.execute("DROP TABLE temp.member_scores_changed;")
+    conn.commit()
+    return {"changed_zips": len(changed), "rescored_rows": rescored_rows}
+
+
+def remove_rows(conn: sqlite3.Connection, digests: np.ndarray) -> int:
+    """Drop the rows with these digests - returns rows removed"""
+    before = conn.total_changes
+    conn.executemany(f'DELETE FROM "{MEMBER_SCORES_TABLE}" WHERE row_digest = ?;', ((d,) for d in np.asarray(digests, dtype=np.int64).tolist()))
+    return conn.total_changes - before
+
+
+def add_rows(conn: sqlite3.Connection, rows: pd.DataFrame, digests: np.ndarray, lookup: ScoreLookup) -> int:
+    """Score only the rows not in `MEMBER_SCORES_TABLE` yet (`unseen_digests()`) - returns rows added"""
+    new_positions = unseen_digests(conn, digests, MEMBER_SCORES_TABLE)
+    if not len(new_positions):
+        return 0
+    new_rows = rows.iloc[new_positions]
+    zips = zip_index(new_rows["zip_code"])
+    scored = pd.DataFrame(lookup.values[zips], columns=lookup.columns)
+    scored.insert(0, "row_digest", digests[new_positions])
+    scored.insert(1, "member_id", new_rows["member_id"].astype("string").to_numpy())
+    scored.insert(2, "payer", new_rows["payer"].to_numpy())
+    scored.insert(3, "zip", zips)
+    scored.to_sql(MEMBER_SCORES_TABLE, conn, if_exists="append", index=False)
+    return len(new_positions)
+
+
+def update(conn: sqlite3.Connection, added: Optional[Union[pd.DataFrame, Iterable[pd.DataFrame]]] = None,
+           removed: Optional[pd.DataFrame] = None) -> Dict[str, int]:
+    """
+    Refresh changed zips, then add & remove member rows - only new rows are joined to the scores
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    added : Union[pd.DataFrame, Iterable[pd.DataFrame]], optional
+        New rows in the `std_member_info` layout, or chunks of them - rows already scored are skipped, by default None
+    removed : pd.DataFrame, optional
+        Rows no longer in `std_member_info`, by default None
+
+    Returns
+    -------
+    Dict[str, int]
+        `added_rows`, `removed_rows`, `changed_zips` & `rescored_rows`
+    """
+    lookup = ScoreLookup.load(conn)
+    stats = refresh_scores(conn, lookup)
+    stats["removed_rows"] = stats["added_rows"] = 0
+    if removed is not None and len(removed):
+        stats["removed_rows"] = remove_rows(conn, bloom.row_digests(removed)[:, 0].view(np.int64))
+    for chunk in [added] if isinstance(added, pd.DataFrame) else added or []:
+        if not chunk.empty:
+            stats["added_rows"] += add_rows(conn, chunk, bloom.row_digests(chunk)[:, 0].view(np.int64), lookup)
+    conn.commit()
+    return stats
+
+
+def sync(conn: sqlite3.Connection, chunks: Iterable[pd.DataFrame]) -> Dict[str, int]:
+    """
+    Make `MEMBER_SCORES_TABLE` match a table given as its full contents (in chunks)
+
+    New rows are scored and vanished rows dropped, matched by content digest (see "Row identity"
+    in `sql_engine`) - an overwrite only touches the rows it changed.
+
+    Returns
+    -------
+    Dict[str, int]
+        `added_rows`, `removed_rows`, `changed_zips` & `rescored_rows`
+    """
+    lookup = ScoreLookup.load(conn)
+    stats = refresh_scores(conn, lookup)
+    current = DigestSet(conn)
+    stats["added_rows"] = 0
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        digests = bloom.row_digests(chunk)[:, 0].view(np.int64)
+        current.add(digests)
+        stats["added_rows"] += add_rows(conn, chunk, digests, lookup)
+    stats["removed_rows"] = remove_rows(conn, current.vanished(MEMBER_SCORES_TABLE))
+    conn.commit()
+    return stats
+
+
+def sync_from_table(conn: sqlite3.Connection, table_name: str = "std_member_info") -> Dict[str, int]:
+    """`sync()` from the stored table, read in `CHUNK_ROWS` chunks - for writers that never hold the rows in pandas"""
+    return sync(conn, (pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                       for columns, rows in table_chunks(conn, table_name, CHUNK_ROWS)))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description=f"Rescore `{MEMBER_SCORES_TABLE}` after `{SCORE_TABLE}` was replaced - only members in changed zips are touched."
+    )
+    parser.add_argument(
+        "-db", "--database",
+        required=True,
+        help="Path to .db file"
+    )
+
+    args = parser.parse_args()
+    with sqlite3.connect(args.database) as conn:
+        stats = refresh_scores(conn)
+    print(f"{stats['changed_zips']} changed zip(s) -> {stats['rescored_rows']} member row(s) rescored")
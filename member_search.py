@@ -0,0 +1,240 @@
+import argparse
+import sqlite3
+import sys
+from typing import Optional, Sequence
+
+import pandas as pd
+
+from sql_engine import quote, rowids_unchanged
+
+SEARCH_COLUMNS = ("member_first_name", "member_last_name", "city", "main_address")
+COLUMN_WEIGHTS = (2.0, 2.0, 1.0, 1.0) ## bm25 weights - a name hit outranks an address hit
+MIN_TERM = 3 ## Trigram index: shorter terms can't be looked up, they filter the indexed matches
+DEFAULT_LIMIT = 20
+
+
+def index_name(table_name: str = "std_member_info") -> str:
+    """FTS5 virtual table indexing the searchable columns of `table_name`"""
+    return f"{table_name}_search"
+
+
+def state_name(table_name: str = "std_member_info") -> str:
+    """Rows & highest rowid the index covers - kept current by the index triggers"""
+    return f"{index_name(table_name)}_state"
+
+
+def has_trigram(conn: sqlite3.Connection) -> bool:
+    """True if this SQLite build ships FTS5 with the trigram tokenizer (3.34+)"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.trigram_probe USING fts5(value, tokenize='trigram');")
+        conn.execute("DROP TABLE temp.trigram_probe;")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _triggers_present(conn: sqlite3.Connection, table_name: str) -> bool:
+    count = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ? AND name LIKE ?;",
+        (table_name, f"{index_name(table_name)}_%")
+    ).fetchone()[0]
+    return count == 3
+
+
+def sync_index(conn: sqlite3.Connection, table_name: str = "std_member_info", rebuild: bool = False) -> Optional[str]:
+    """
+    Make the FTS5 trigram index over the names, city & address of `table_name` current
+
+    The index is an external-content FTS5 table (only the trigrams are stored, the text stays in
+    `table_name`), keyed by rowid. New rows are indexed here in one bulk insert, every row after
+    the highest rowid indexed so far - per-row insert triggers are ~10x slower, as FTS5 flushes its
+    pending terms at each trigger statement. Delete & update triggers keep indexed rows current.
+    Replacing `table_name` drops the triggers: when the rows the index covered are still the
+    first rows (a union-write puts existing rows first) only the rows after them are indexed,
+    otherwise - or with `rebuild` (overwrite) - the whole index is rebuilt.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    table_name : str, optional
+        Table with `SEARCH_COLUMNS`, by default "std_member_info"
+    rebuild : bool, optional
+        Index every row again, by default False
+
+    Returns
+    -------
+    Optional[str]
+        "current", "appended", "rebuilt", or None if the table or a search column is missing or
+        SQLite lacks FTS5 trigrams
+    """
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({quote(table_name)});")}
+    if not set(SEARCH_COLUMNS) <= columns or not has_trigram(conn):
+        return None
+    index, state, table = quote(index_name(table_name)), quote(state_name(table_name)), quote(table_name)
+    selected = ", ".join(map(quote, SEARCH_COLUMNS))
+    last, triggers = None, _triggers_present(conn, table_name)
+    if conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name IN (?, ?);",
+                    (index_name(table_name), state_name(table_name))).fetchone()[0] == 2:
+        last = conn.execute(f"SELECT rows, max_rowid FROM {state};").fetchone()
+    ## Triggers still on the table, or still the same first rows: only rows after them are new
+    appended = not rebuild and last is not None and (triggers or rowids_unchanged(conn, table_name, *last))
+
+    if appended:
+        before = conn.total_changes
+        conn.execute(f"INSERT INTO {index} (rowid, {selected}) SELECT rowid, {selected} FROM {table} WHERE rowid > ?;",
+                     (last[1] if last[1] is not None else -1,))
+        if triggers and conn.total_changes == before:
+            return "current"
+    else:
+        conn.execute(f"DROP TABLE IF EXISTS {index};")
+        conn.execute(f"CREATE VIRTUAL TABLE {index} USING fts5({selected}, content={table}, content_rowid='rowid', "
+                     "tokenize='trigram');")
+        conn.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild');")
+    conn.execute(f"DROP TABLE IF EXISTS {state};")
+    conn.execute(f"CREATE TABLE {state} AS SELECT COUNT(*) AS rows, MAX(rowid) AS max_rowid FROM {table};")
+    if not triggers or not appended:
+        old_values = ", ".join(f"OLD.{quote(c)}" for c in SEARCH_COLUMNS)
+        new_values = ", ".join(f"NEW.{quote(c)}" for c in SEARCH_COLUMNS)
+        indexed = f"OLD.rowid <= (SELECT max_rowid FROM {state})" ## Rows appended since the last sync aren't in the index yet
+        for name in ("_insert", "_delete", "_update"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {quote(index_name(table_name) + name)};")
+        conn.executescript(f"""
+            CREATE TRIGGER {quote(index_name(table_name) + '_insert')} AFTER INSERT ON {table}
+            WHEN NEW.rowid <= (SELECT max_rowid FROM {state}) -- Reused rowid below the indexed ones
+            BEGIN
+                INSERT INTO {index} (rowid, {selected}) VALUES (NEW.rowid, {new_values});
+                UPDATE {state} SET rows = rows + 1;
+            END;
+            CREATE TRIGGER {quote(index_name(table_name) + '_delete')} AFTER DELETE ON {table} WHEN {indexed}
+            BEGIN
+                INSERT INTO {index} ({index}, rowid, {selected}) VALUES ('delete', OLD.rowid, {old_values});
+                UPDATE {state} SET rows = rows - 1;
+            END;
+            CREATE TRIGGER {quote(index_name(table_name) + '_update')} AFTER UPDATE OF {selected} ON {table} WHEN {indexed}
+            BEGIN
+                INSERT INTO {index} ({index}, rowid, {selected}) VALUES ('delete', OLD.rowid, {old_values});
+                INSERT INTO {index} (rowid, {selected}) VALUES (NEW.rowid, {new_values});
+            END;
+        """)
+    conn.commit()
+    return "appended" if appended else "rebuilt"
+
+
+def _phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def match_expression(query: str, columns: Sequence[str] = SEARCH_COLUMNS, fuzzy: bool = False) -> Optional[str]:
+    """
+    FTS5 MATCH expression of `query`, None when no term is long enough for the trigram index
+
+    Every term of at least `MIN_TERM` characters must appear as a substring (any column of
+    `columns`). `fuzzy` instead matches any trigram of any term, so a misspelled name still
+    finds rows - bm25 ranks the rows sharing the most (and rarest) trigrams first.
+    """
+    terms = [term for term in query.split() if len(term) >= MIN_TERM]
+    if not terms:
+        return None
+    if fuzzy:
+        trigrams = dict.fromkeys(term[i:i + 3].lower() for term in terms for i in range(len(term) - 2))
+        expression = " OR ".join(map(_phrase, trigrams))
+    else:
+        expression = " AND ".join(map(_phrase, terms))
+    return f"{{{' '.join(columns)}}} : ({expression})"
+
+
+def search(conn: sqlite3.Connection, query: str, table_name: str = "std_member_info", limit: Optional[int] = DEFAULT_LIMIT,
+           columns: Sequence[str] = SEARCH_COLUMNS, fuzzy: bool = False) -> pd.DataFrame:
+    """
+    Rows of `table_name` matching `query` by partial name, city or address - best matches first
+
+    Same rows as `LIKE '%term%'` on any of `columns` for every term (case-insensitive), found
+    through the trigram index instead of a scan. Terms shorter than `MIN_TERM` characters are
+    checked with `LIKE` on the indexed matches; a query made only of short terms scans.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    query : str
+        Whitespace-separated terms, e.g. "ann smi"
+    table_name : str, optional
+        Indexed table, by default "std_member_info"
+    limit : Optional[int], optional
+        Maximum rows returned, None for all, by default `DEFAULT_LIMIT`
+    columns : Sequence[str], optional
+        Columns searched, a subset of `SEARCH_COLUMNS`, by default all of them
+    fuzzy : bool, optional
+        Match any trigram of the terms instead of every term (see `match_expression()`), by default False
+
+    Returns
+    -------
+    pd.DataFrame
+        Matching rows with `member_rowid` and `rank` (bm25, lower is better), ordered by `rank`
+    """
+    unknown = [column for column in columns if column not in SEARCH_COLUMNS]
+    if unknown or not columns:
+        raise ValueError(f"Columns not searchable: {unknown} (searchable: {SEARCH_COLUMNS})")
+    if sync_index(conn, table_name) is None:
+        raise ValueError(f"No search index on {table_name}: missing {SEARCH_COLUMNS} columns or SQLite lacks FTS5 trigrams")
+    index, table = quote(index_name(table_name)), quote(table_name)
+    expression = match_expression(query, columns, fuzzy=fuzzy)
+    short = [] if fuzzy else [term for term in query.split() if len(term) < MIN_TERM]
+    if expression is None and not short:
+        return pd.read_sql_query(f"SELECT rowid AS member_rowid, *, NULL AS rank FROM {table} LIMIT 0;", conn)
+
+    where, params = [], []
+    if expression is not None:
+        where.append(f"{index} MATCH ?")
+        params.append(expression)
+    for term in short: ## LIKE on the FTS table reads its content table - no trigram lookup under 3 characters
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        where.append("(" + " OR ".join(f"s.{quote(column)} LIKE ? ESCAPE '\\'" for column in columns) + ")")
+        params += [f"%{escaped}%"] * len(columns)
+    weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+    rank = f"bm25({index}, {weights})" if expression is not None else "NULL"
+    matches = (f"SELECT s.rowid AS member_rowid, {rank} AS rank FROM {index} AS s WHERE {' AND '.join(where)} "
+               f"ORDER BY rank, s.rowid" + (" LIMIT ?" if limit is not None else ""))
+    return pd.read_sql_query(
+        f"SELECT m.member_rowid, t.*, m.rank FROM ({matches}) AS m JOIN {table} AS t ON t.rowid = m.member_rowid "
+        f"ORDER BY m.rank, m.member_rowid;", conn, params=params + ([limit] if limit is not None else [])
+    )
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Search std_member_info by partial name, city or address through its FTS5 trigram index."
+    )
+    parser.add_argument(
+        "-db", "--database",
+        required=True,
+        help="Path to .db file"
+    )
+    parser.add_argument(
+        "query",
+        help="Terms to find, e.g. \"ann smi\""
+    )
+    parser.add_argument(
+        "-n", "--limit",
+        type=int, default=DEFAULT_LIMIT,
+        help=f"Maximum matches (default: {DEFAULT_LIMIT})"
+    )
+    parser.add_argument(
+        "-c", "--columns",
+        nargs="+", choices=SEARCH_COLUMNS, default=list(SEARCH_COLUMNS),
+        help="Columns searched (default: all)"
+    )
+    parser.add_argument(
+        "--fuzzy",
+        action="store_true",
+        help="Rank rows by shared trigrams, so misspelled terms still match"
+    )
+    args = parser.parse_args()
+    with sqlite3.connect(args.database) as conn:
+        try:
+            matches = search(conn, args.query, limit=args.limit, columns=args.columns, fuzzy=args.fuzzy)
+        except ValueError as error:
+            sys.exit(f"member_search: {error}")
+    print(matches.to_string(index=False) if len(matches) else "No match")
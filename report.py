@@ -0,0 +1,275 @@
+import argparse
+import json
+import sqlite3
+import sys
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+import derived
+import eligibility
+import sketches
+from score_lookup import ScoreLookup
+from sql_engine import quote
+
+## Metric input -> accepted column names, `std_member_info` first, then the raw roster layout
+COLUMN_ALIASES = {
+    "member_id": ("member_id", "Person_Id"),
+    "city": ("city", "City"),
+    "state": ("state", "State"),
+    "zip_code": ("zip_code", "Zip"),
+    "date_of_birth": ("date_of_birth", "Dob"),
+    "age": ("Age", "age"),
+    "gender": ("Gender", "gender"),
+    "eligibility_start_date": ("eligibility_start_date",),
+    "eligibility_end_date": ("eligibility_end_date",),
+}
+## Summary columns, in `eda.ipynb`'s breakdown order (absent inputs -> absent columns)
+METRICS = ("population", "members", "male", "female", "female_per_male", "unique_city", "unique_state",
+           "eligibility_start", "eligibility_end", "age_min", "age_max", "age_mean", "unique_zip")
+FORMATS = ("table", "json", "csv")
+
+
+def resolve_column(columns: Iterable[str], name: str) -> Optional[str]:
+    """Column of `columns` holding `name` (a `COLUMN_ALIASES` key or any column), None if absent"""
+    columns = list(columns)
+    for candidate in COLUMN_ALIASES.get(name, (name,)):
+        if candidate in columns:
+            return candidate
+    lowered = {column.lower(): column for column in columns}
+    return lowered.get(name.lower())
+
+
+def summarize(data: pd.DataFrame, by: Union[str, List[str]] = "payer", as_of: Optional[pd.Timestamp] = None,
+              scores: Optional[ScoreLookup] = None) -> pd.DataFrame:
+    """
+    Per-group summary of members - every metric of `eda.ipynb`'s per-payer breakdown in one grouped pass
+
+    The notebook re-filters `roster_data[roster_data["payer"] == payer_class]` for each metric of
+    each payer. Here the metric inputs are prepared once as columns and a single `groupby().agg()`
+    hashes the group keys once and fills every metric.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Member rows, in the `std_member_info` or the raw roster layout
+    by : Union[str, List[str]], optional
+        Grouping column(s), by default "payer"
+    as_of : pd.Timestamp, optional
+        Date ages are computed at when `data` has no `Age` column, by default today
+    scores : ScoreLookup, optional
+        Zip scores averaged per group (`<score>_mean`) - gathered by each row's zip, by default None
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per group (sorted), with the group column(s) and:
+        * `population` (rows) & `members` (distinct member ids)
+        * `male`, `female` & `female_per_male` - only when `data` has a `Gender` column
+        * `unique_city` & `unique_state`
+        * `eligibility_start` & `eligibility_end` - earliest start & latest end
+        * `age_min`, `age_max` & `age_mean`
+        * `unique_zip`
+        * `<score>_mean` for every column of `scores` - rows whose zip has no scores are left out
+
+    Notes
+    -----
+    * Missing values are not counted as a distinct city/state/zip, and unparseable dates are ignored
+    * Rows with a missing group value form their own group
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    group_columns = [resolve_column(data.columns, name) for name in by]
+    missing = [name for name, column in zip(by, group_columns) if column is None]
+    if missing:
+        raise KeyError(f"Grouping column(s) not found: {missing}")
+    column = {name: resolve_column(data.columns, name) for name in COLUMN_ALIASES}
+
+    ## Metric inputs, one vectorized pass each
+    inputs = pd.DataFrame({name: data[source].to_numpy() for name, source in zip(by, group_columns)}, index=data.index)
+    aggregations = {"population": (by[0], "size")}
+    for name in ("member_id", "city", "state", "zip_code"):
+        if column[name] is not None:
+            inputs[name] = data[column[name]].to_numpy()
+            aggregations["members" if name == "member_id" else f"unique_{name.removesuffix('_code')}"] = (name, "nunique")
+    if column["gender"] is not None:
+        gender = data[column["gender"]].astype(str).str.lower()
+        inputs["male"], inputs["female"] = (gender == "male").to_numpy(), (gender == "female").to_numpy()
+        aggregations.update(male=("male", "sum"), female=("female", "sum"))
+    for name, fn in (("eligibility_start_date", "min"), ("eligibility_end_date", "max")):
+        if column[name] is not None:
+            days = eligibility.to_days(data[column[name]]).astype(np.float64)
+            inputs[name] = np.where(days == eligibility.NaT_DAYS, np.nan, days)
+            aggregations[name.removesuffix("_date")] = (name, fn)
+    if column["age"] is not None:
+        inputs["age"] = pd.to_numeric(data[column["age"]], errors="coerce").to_numpy()
+    elif column["date_of_birth"] is not None:
+        inputs["age"] = eligibility.age_in_years(data[column["date_of_birth"]], as_of or pd.Timestamp.today().normalize())
+    if "age" in inputs:
+        aggregations.update(age_min=("age", "min"), age_max=("age", "max"), age_mean=("age", "mean"))
+    score_metrics = []
+    if scores is not None and column["zip_code"] is not None:
+        gathered = scores.gather(data[column["zip_code"]])
+        for name in scores.columns:
+            inputs[f"score:{name}"] = gathered[name].to_numpy()
+            aggregations[f"{name}_mean"] = (f"score:{name}", "mean")
+            score_metrics.append(f"{name}_mean")
+
+    summary = inputs.groupby(by, dropna=False, sort=True).agg(**aggregations).reset_index()
+    if "male" in summary:
+        summary["female_per_male"] = (summary["female"] / summary["male"].replace(0, np.nan)).round(2)
+    for name in ("eligibility_start", "eligibility_end"):
+        if name in summary:
+            summary[name] = pd.to_datetime(summary[name], unit="D").dt.strftime("%Y-%m-%d")
+    if "age_mean" in summary:
+        summary[["age_min", "age_max"]] = summary[["age_min", "age_max"]].astype("Int64")
+        summary["age_mean"] = summary["age_mean"].round(1)
+    summary[score_metrics] = summary[score_metrics].round(3)
+    return summary[[*by, *(metric for metric in METRICS if metric in summary), *score_metrics]]
+
+
+def read_members(conn: sqlite3.Connection, tables: List[str], by: List[str],
+                 as_of: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """
+    Rows of `tables` (concatenated), only the grouping columns & the columns `summarize()` can use
+
+    When `member_derived` is current for `as_of` (see `derived.py`), `std_member_info` comes with
+    its persisted `age` column, so ages aren't derived from `date_of_birth` again.
+    """
+    frames = []
+    for table in tables:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({quote(table)});")]
+        if not columns:
+            raise KeyError(f"Table not found: {table}")
+        selected = dict.fromkeys(resolve_column(columns, name) for name in [*by, *COLUMN_ALIASES])
+        selected.pop(None, None)
+        if as_of is not None and table == derived.MEMBER_TABLE and resolve_column(columns, "age") is None \
+                and derived.is_current(conn, as_of):
+            frames.append(pd.read_sql_query(
+                f"SELECT {', '.join(f'm.{quote(column)}' for column in selected)}, d.age FROM {quote(table)} AS m "
+                f"LEFT JOIN {quote(derived.DERIVED_TABLE)} AS d ON d.member_rowid = m.rowid;", conn
+            ))
+            continue
+        frames.append(pd.read_sql_query(f"SELECT {', '.join(map(quote, selected))} FROM {quote(table)};", conn))
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def render(summary: pd.DataFrame, fmt: str = "table", metadata: Optional[Dict] = None) -> str:
+    """
+    Summary as text
+
+    Parameters
+    ----------
+    summary : pd.DataFrame
+        Output of `summarize()`
+    fmt : str, optional
+        "table" (fixed width), "json" (`metadata` + one record per group) or "csv", by default "table"
+    metadata : Dict, optional
+        Source, grouping & run date written alongside the groups in JSON, by default None
+    """
+    if fmt == "json":
+        groups = json.loads(summary.to_json(orient="records"))
+        return json.dumps({**(metadata or {}), "groups": groups}, indent=2)
+    if fmt == "csv":
+        return summary.to_csv(index=False)
+    return summary.to_string(index=False)
+
+
+def main(db_path: str, tables: List[str], by: List[str], fmt: str = "table", output: Optional[str] = None,
+         as_of: Optional[str] = None, sketch: bool = False, scores: bool = False, figures: Optional[str] = None,
+         workers: Optional[int] = None) -> pd.DataFrame:
+    as_of = pd.Timestamp(as_of) if as_of else pd.Timestamp.today().normalize()
+    if figures and (sketch or len(by) != 1):
+        raise ValueError("--figures needs member rows (not --sketch) and a single --by column")
+    rendered = None
+    with sqlite3.connect(db_path) as conn:
+        if sketch: ## Approximate, from the per-run sketches - no member rows read
+            summary = sketches.summary(conn, by=by[0] if len(by) == 1 else by or None)
+            rows = int(summary["population"].sum()) if len(summary) else 0
+        else:
+            data = read_members(conn, tables, by, as_of=as_of)
+            summary = summarize(data, by=by, as_of=as_of, scores=ScoreLookup.load(conn) if scores else None)
+            rows = len(data)
+    if figures:
+        import figures as figure_stage ## matplotlib & geopandas only when drawing
+
+        rendered = figure_stage.render_figures(figure_stage.figure_jobs(data, by=by[0], as_of=as_of), figures, workers=workers)
+        print(f"report: {sum(state == 'rendered' for state in rendered.values())} figure(s) rendered, "
+              f"{sum(state == 'unchanged' for state in rendered.values())} unchanged in {figures}", file=sys.stderr)
+    text = render(summary, fmt, metadata={
+        "database": db_path, "tables": tables, "group_by": by, "rows": rows, "as_of": as_of.strftime("%Y-%m-%d"),
+        "generated": pd.Timestamp.now().isoformat(timespec="seconds"), "mode": "sketch" if sketch else "exact",
+        **({"figures": rendered} if rendered is not None else {}),
+    })
+    if output:
+        with open(output, "w") as file:
+            file.write(text if text.endswith("\n") else text + "\n")
+    else:
+        print(text)
+    return summary
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Per-payer (or any grouping) member summary from n1_data_ops_challenge.db, without the notebook."
+    )
+    parser.add_argument(
+        "-db", "--database",
+        required=True,
+        help="Path to .db file"
+    )
+    parser.add_argument(
+        "-t", "--table",
+        nargs="+", default=["std_member_info"],
+        help="Table(s) to summarize, concatenated - e.g. `roster_1 roster_2` for the raw rosters with `Gender` (default: std_member_info)"
+    )
+    parser.add_argument(
+        "-b", "--by",
+        nargs="+", default=["payer"],
+        help="Grouping column(s) (default: payer)"
+    )
+    parser.add_argument(
+        "-f", "--format",
+        choices=FORMATS, default="table",
+        help="Output format (default: table)"
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Write the report to this file instead of stdout"
+    )
+    parser.add_argument(
+        "--as-of",
+        help="Date ages are computed at when the table has no `Age` column (default: today)"
+    )
+    parser.add_argument(
+        "--scores",
+        action="store_true",
+        help="Add the mean of every model_scores_by_zip score per group, looked up by member zip"
+    )
+    parser.add_argument(
+        "--sketch",
+        action="store_true",
+        help="Approximate summary (distinct counts within ~2.5%, quantiles within 1%) merged from the stored "
+             "per-run sketches of std_member_info - grouped by payer only"
+    )
+    parser.add_argument(
+        "--figures",
+        metavar="DIR",
+        help="Also render the notebook's figures per group (ratio & gender pies, eligibility over time, ages, "
+             "choropleth) as PNGs into DIR - only figures whose data changed since the last run are redrawn"
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        help="Processes rendering figures in parallel (default: one per CPU)"
+    )
+
+    args = parser.parse_args()
+    try:
+        main(db_path=args.database, tables=args.table, by=args.by, fmt=args.format, output=args.output, as_of=args.as_of,
+             sketch=args.sketch, scores=args.scores, figures=args.figures, workers=args.workers)
+    except KeyError as error:
+        sys.exit(f"report: {error.args[0]}")
+    except ValueError as error:
+        sys.exit(f"report: {error}")
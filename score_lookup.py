@@ -0,0 +1,92 @@
+import sqlite3
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from sql_engine import quote
+
+SCORE_TABLE = "model_scores_by_zip"
+KEY_COLUMN = "zcta"
+ZIP_SPACE = 100_000 ## Every 5-digit zip is a row of the dense array
+NO_ZIP = -1 ## Index of missing / unparseable zips - the trailing all-NaN row
+NON_SCORE_COLUMNS = ("state_code",) ## Numeric columns of `SCORE_TABLE` that are not member attributes
+
+
+def zip_index(zip_codes: Union[pd.Series, np.ndarray, Sequence]) -> np.ndarray:
+    """
+    Integer zip of each value - `NO_ZIP` where missing or not a zip
+
+    "01001", "1001", 1001 & "01001-1234" all give 1001, so neither side needs zero-padding.
+    ZIP+4 written without the dash (9 digits) keeps its first 5 digits.
+    """
+    zip_codes = pd.Series(zip_codes)
+    if pd.api.types.is_numeric_dtype(zip_codes):
+        numbers = zip_codes.astype(np.float64).to_numpy()
+        valid = (numbers >= 0) & (numbers < ZIP_SPACE) & (numbers == np.floor(numbers))
+        return np.where(valid, np.nan_to_num(numbers), NO_ZIP).astype(np.int64)
+    ## At most ~100k distinct strings - parse those, then map every row by its factor code
+    codes, uniques = pd.factorize(zip_codes)
+    text = pd.Series(uniques, dtype="string").str.strip().str.split("-", n=1).str[0]
+    text = text.where(text.str.len() != 9, text.str[:5])
+    parsed = np.append(zip_index(pd.to_numeric(text, errors="coerce").astype(np.float64)), NO_ZIP)
+    return parsed[codes] ## Code -1 (missing) -> trailing NO_ZIP
+
+
+class ScoreLookup:
+    """
+    `SCORE_TABLE` as a dense array indexed by integer zip - member scores are one vectorized gather
+
+    Row `z` of `values` holds the scores of zip `z`, NaN where the zip has no scores. A trailing
+    all-NaN row serves `NO_ZIP`, so a gather needs no mask and no hash join. At 100k zips the array
+    is 800 KB per score column.
+
+    Parameters
+    ----------
+    scores : pd.DataFrame
+        `KEY_COLUMN` & score columns - the last row of a repeated zip wins
+    columns : Sequence[str], optional
+        Score columns to keep, by default every numeric column but `KEY_COLUMN` & `NON_SCORE_COLUMNS`
+    """
+
+    def __init__(self, scores: pd.DataFrame, columns: Optional[Sequence[str]] = None):
+        if columns is None:
+            columns = [column for column in scores.columns if column not in (KEY_COLUMN, *NON_SCORE_COLUMNS)
+                       and pd.api.types.is_numeric_dtype(scores[column])]
+        missing = [column for column in columns if column not in scores]
+        if missing:
+            raise KeyError(f"Score column(s) not found: {missing}")
+        self.columns: List[str] = list(columns)
+        self.values = np.full((ZIP_SPACE + 1, len(self.columns)), np.nan)
+        zips = zip_index(scores[KEY_COLUMN])
+        keep = zips != NO_ZIP
+        self.values[zips[keep]] = scores.loc[keep, self.columns].apply(pd.to_numeric, errors="coerce").to_numpy(np.float64)
+        self.present = np.zeros(ZIP_SPACE + 1, dtype=bool)
+        self.present[zips[keep]] = True
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection, columns: Optional[Sequence[str]] = None) -> "ScoreLookup":
+        """Lookup over `SCORE_TABLE` of `conn` - no score columns when the table is missing"""
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;", (SCORE_TABLE,)).fetchone():
+            return cls(pd.DataFrame({KEY_COLUMN: []}), columns=[])
+        selected = "*" if columns is None else ", ".join(map(quote, [KEY_COLUMN, *columns]))
+        return cls(pd.read_sql_query(f"SELECT {selected} FROM {quote(SCORE_TABLE)};", conn), columns=columns)
+
+    def __len__(self) -> int:
+        return int(self.present.sum())
+
+    def column(self, name: str, zip_codes: Union[pd.Series, np.ndarray, Sequence]) -> np.ndarray:
+        """`name` score of each zip - NaN for zips without scores"""
+        return self.values[zip_index(zip_codes), self.columns.index(name)]
+
+    def gather(self, zip_codes: Union[pd.Series, np.ndarray, Sequence], columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Scores of each zip, aligned with `zip_codes` (its index kept when a Series)
+
+        Equivalent to `merge(scores, how="left", left_on=zip, right_on="zcta")` after zero-padding
+        both sides, but rows are never duplicated and the result keeps the input order.
+        """
+        columns = self.columns if columns is None else list(columns)
+        positions = [self.columns.index(column) for column in columns]
+        index = zip_codes.index if isinstance(zip_codes, pd.Series) else None
+        return pd.DataFrame(self.values[zip_index(zip_codes)[:, None], positions], columns=columns, index=index)
@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import bloom
+from score_lookup import NO_ZIP, ZIP_SPACE, ScoreLookup, zip_index
+from sql_engine import quote
+
+MEMBER_TABLE = "std_member_info"
+FORMAT_VERSION = 1
+
+
+def index_path(db_path: str) -> Path:
+    """Index file kept next to the database, e.g. `members.db` -> `members.db.score-index`"""
+    db_path = Path(db_path)
+    return db_path.with_name(db_path.name + ".score-index")
+
+
+def db_file(conn: sqlite3.Connection) -> Optional[str]:
+    """File backing the `main` database, None for in-memory databases"""
+    for _, name, file in conn.execute("PRAGMA database_list;").fetchall():
+        if name == "main":
+            return file or None
+    return None
+
+
+def source_token(conn: sqlite3.Connection, lookup: ScoreLookup) -> Dict[str, Any]:
+    """
+    Fingerprint of the index inputs - any mismatch means the index is stale
+
+    `MEMBER_TABLE`: row count, max rowid & the digest of the last row, like the row filter's sync
+    token (the pipelines only append or rewrite it). `SCORE_TABLE` (a few 10k rows): a hash of
+    every score the lookup serves.
+    """
+    rows, max_rowid = conn.execute(f"SELECT COUNT(*), MAX(rowid) FROM {quote(MEMBER_TABLE)};").fetchone()
+    last_row = pd.read_sql_query(f"SELECT * FROM {quote(MEMBER_TABLE)} WHERE rowid = ?;", conn, params=(max_rowid,))
+    zcta = np.flatnonzero(lookup.present[:-1])
+    scores = pd.DataFrame(lookup.values[zcta], columns=lookup.columns).assign(zcta=zcta)
+    return {
+        "rows": rows, "max_rowid": max_rowid, "last_row": [int(d) for d in bloom.row_digests(last_row).ravel()],
+        "scores": int(pd.util.hash_pandas_object(scores, index=False).sum()), "score_columns": lookup.columns,
+    }
+
+
+class ScoreIndex:
+    """
+    Members grouped by zip, and for every score the zips sorted by score - top-k, threshold &
+    percentile-band queries in O(log n + k)
+
+    Members are stored in zip order with `zip_offsets` (members of zip `z` are the slice
+    `zip_offsets[z]:zip_offsets[z + 1]`). For each score, `zips[score]` lists the zips with a score
+    in ascending order and `cumulative[score]` the members before each of them, so the members in
+    ascending score order form a virtual array: any rank range maps back to a run of zips (binary
+    search) and to member slices, without scanning or joining the roster.
+
+    Notes
+    -----
+    * Members tie within a zip - every member of a zip has the zip's score
+    * Members without a valid zip, and zips without a score, are left out of the score's order
+    """
+
+    def __init__(self, member_id: np.ndarray, payer: np.ndarray, zips: np.ndarray, lookup: ScoreLookup,
+                 token: Optional[Dict[str, Any]] = None):
+        keep = zips != NO_ZIP
+        order = np.argsort(zips[keep], kind="stable")
+        self.member_id = member_id[keep][order].astype(str)
+        self.payer = payer[keep][order].astype(str)
+        self.member_zip = zips[keep][order]
+        self.zip_offsets = np.searchsorted(self.member_zip, np.arange(ZIP_SPACE + 1))
+        self.lookup = lookup
+        self.token = token or {}
+        members_per_zip = np.diff(self.zip_offsets)
+        self.zips: Dict[str, np.ndarray] = {}
+        self.cumulative: Dict[str, np.ndarray] = {}
+        for position, column in enumerate(lookup.columns):
+            values = lookup.values[:ZIP_SPACE, position]
+            scored = np.flatnonzero(~np.isnan(values) & (members_per_zip > 0))
+            self.zips[column] = scored[np.argsort(values[scored], kind="stable")]
+            self.cumulative[column] = np.concatenate([[0], np.cumsum(members_per_zip[self.zips[column]])])
+
+    @classmethod
+    def build(cls, conn: sqlite3.Connection, lookup: Optional[ScoreLookup] = None,
+              token: Optional[Dict[str, Any]] = None) -> "ScoreIndex":
+        """Index of `MEMBER_TABLE` & `SCORE_TABLE` (or `lookup`) - reads the member id, payer & zip columns only"""
+        lookup = lookup or ScoreLookup.load(conn)
+        rows = pd.read_sql_query(f"SELECT member_id, payer, zip_code FROM {quote(MEMBER_TABLE)};", conn)
+        return cls(rows["member_id"].to_numpy(), rows["payer"].to_numpy(), zip_index(rows["zip_code"]), lookup,
+                   token=token or source_token(conn, lookup))
+
+    def save(self, path: str) -> None:
+        """Write the index (member arrays & score lookup) to `path` atomically - score orders are rebuilt on load"""
+        header = {"version": FORMAT_VERSION, "token": self.token, "columns": self.lookup.columns}
+        zcta = np.flatnonzero(self.lookup.present[:-1])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, member_id=self.member_id, payer=self.payer, member_zip=self.member_zip,
+                     zcta=zcta, scores=self.lookup.values[zcta], header=np.array(json.dumps(header)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ScoreIndex":
+        with np.load(path) as data:
+            header = json.loads(str(data["header"]))
+            if header.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported score index file version: {header.get('version')}")
+            scores = pd.DataFrame(data["scores"], columns=header["columns"]).assign(zcta=data["zcta"])
+            lookup = ScoreLookup(scores, columns=header["columns"])
+            return cls(data["member_id"], data["payer"], data["member_zip"], lookup, token=header["token"])
+
+    def _positions(self, score: str, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Member positions & their zip for ranks `[start, stop)` of `score`'s ascending member order"""
+        if score not in self.zips:
+            raise KeyError(f"Unknown score: {score} (known: {self.lookup.columns})")
+        zips, cumulative = self.zips[score], self.cumulative[score]
+        start, stop = max(start, 0), min(stop, int(cumulative[-1]))
+        if start >= stop:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        first, last = np.searchsorted(cumulative, [start, stop - 1], side="right") - 1 ## Zips holding the first & last rank
+        run, before = zips[first:last + 1], cumulative[first:last + 2]
+        ranks = np.arange(start, stop)
+        zip_of_rank = np.searchsorted(before, ranks, side="right") - 1
+        return self.zip_offsets[run][zip_of_rank] + ranks - before[zip_of_rank], run[zip_of_rank]
+
+    def _members(self, score: str, start: int, stop: int, descending: bool = False) -> pd.DataFrame:
+        positions, zips = self._positions(score, start, stop)
+        if descending:
+            positions, zips = positions[::-1], zips[::-1]
+        result = pd.DataFrame({"member_id": self.member_id[positions], "payer": self.payer[positions], "zip": zips})
+        result[score] = self.lookup.values[zips, self.lookup.columns.index(score)]
+        return result
+
+    def count(self, score: str) -> int:
+        """Members with a `score`"""
+        return int(self.cumulative[score][-1]) if score in self.cumulative else 0
+
+    def top(self, score: str, k: int, lowest: bool = False) -> pd.DataFrame:
+        """The `k` members with the highest (`lowest`: lowest) `score` - highest first, ties cut within a zip"""
+        total = self.count(score)
+        return self._members(score, 0, k) if lowest else self._members(score, total - k, total, descending=True)
+
+    def top_zips(self, score: str, k: int = 1, lowest: bool = False) -> pd.DataFrame:
+        """The `k` zips (with members) of highest (`lowest`: lowest) `score`, with their member counts"""
+        if score not in self.zips:
+            raise KeyError(f"Unknown score: {score} (known: {self.lookup.columns})")
+        zips = self.zips[score][:k] if lowest else self.zips[score][::-1][:k]
+        return pd.DataFrame({"zip": zips, score: self.lookup.values[zips, self.lookup.columns.index(score)],
+                             "members": self.zip_offsets[zips + 1] - self.zip_offsets[zips]})
+
+    def members_in_top_zips(self, score: str, k: int = 1, lowest: bool = False) -> pd.DataFrame:
+        """Every member of the `k` zips of highest (`lowest`: lowest) `score` - e.g. the highest-SDOH zip's members"""
+        total, cumulative = self.count(score), self.cumulative.get(score, np.zeros(1, dtype=np.int64))
+        k = min(k, len(cumulative) - 1)
+        if lowest:
+            return self._members(score, 0, int(cumulative[k]))
+        return self._members(score, int(cumulative[len(cumulative) - 1 - k]), total, descending=True)
+
+    def threshold(self, score: str, below: Optional[float] = None, above: Optional[float] = None,
+                  inclusive: bool = False) -> pd.DataFrame:
+        """
+        Members with `above < score < below` (`inclusive`: `<=`) - either bound optional
+
+        E.g. `threshold("food_access_score", below=2)` for the low food access cohort.
+        """
+        if score not in self.zips:
+            raise KeyError(f"Unknown score: {score} (known: {self.lookup.columns})")
+        sorted_scores = self.lookup.values[self.zips[score], self.lookup.columns.index(score)]
+        first = 0 if above is None else np.searchsorted(sorted_scores, above, side="left" if inclusive else "right")
+        last = len(sorted_scores) if below is None else np.searchsorted(sorted_scores, below, side="right" if inclusive else "left")
+        cumulative = self.cumulative[score]
+        return self._members(score, int(cumulative[first]), int(cumulative[max(last, first)]))
+
+    def percentile_band(self, score: str, low: float, high: float) -> pd.DataFrame:
+        """Members ranked in `[low, high)` (0 ~ 1) of all scored members by `score`, e.g. (0.9, 1.0) for the top decile"""
+        total = self.count(score)
+        return self._members(score, int(np.floor(low * total)), int(np.floor(high * total)) if high < 1 else total)
+
+
+_CACHE: Dict[str, ScoreIndex] = {} ## Database file -> index, for repeated queries in one process
+
+
+def open_index(conn: sqlite3.Connection, persist: bool = True) -> ScoreIndex:
+    """
+    Score index of `conn`'s database - rebuilt only when `MEMBER_TABLE` or `SCORE_TABLE` changed
+
+    The index is reused from this process, then from the file next to the database
+    (`index_path()`), when its `source_token()` still matches; otherwise it is rebuilt (and saved
+    when `persist`).
+    """
+    lookup = ScoreLookup.load(conn)
+    token = source_token(conn, lookup)
+    path = db_file(conn)
+    index = _CACHE.get(path) if path else None
+    if index is None and path and index_path(path).exists():
+        try:
+            index = ScoreIndex.load(str(index_path(path)))
+        except (ValueError, OSError, KeyError):
+            index = None
+    if index is None or index.token != json.loads(json.dumps(token)):
+        index = ScoreIndex.build(conn, lookup, token=token)
+        if path and persist:
+            index.save(str(index_path(path)))
+    if path:
+        _CACHE[path] = index
+    return index
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Score queries over std_member_info x model_scores_by_zip, from a presorted index kept next to the .db file."
+    )
+    parser.add_argument(
+        "-db", "--database",
+        required=True,
+        help="Path to .db file"
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Write the result as CSV to this file instead of printing it"
+    )
+    queries = parser.add_subparsers(dest="query", required=True)
+    top = queries.add_parser("top", help="k members with the highest (--lowest: lowest) score")
+    top_zips = queries.add_parser("top-zips", help="k zips with the highest (--lowest: lowest) score, with member counts")
+    zip_members = queries.add_parser("zip-members", help="Every member of the k highest (--lowest: lowest) scoring zips")
+    for query in (top, top_zips, zip_members):
+        query.add_argument("score", help="Score column, e.g. algorex_sdoh_composite_score")
+        query.add_argument("-k", type=int, default=10 if query is top else 1, help="How many")
+        query.add_argument("--lowest", action="store_true", help="Lowest scores instead of highest")
+    threshold = queries.add_parser("threshold", help="Members with a score below and/or above a value")
+    threshold.add_argument("score", help="Score column, e.g. food_access_score")
+    threshold.add_argument("--below", type=float, help="Upper bound (exclusive)")
+    threshold.add_argument("--above", type=float, help="Lower bound (exclusive)")
+    threshold.add_argument("--inclusive", action="store_true", help="Make the bounds inclusive")
+    band = queries.add_parser("band", help="Members ranked in a percentile band of a score")
+    band.add_argument("score", help="Score column")
+    band.add_argument("low", type=float, help="Lower percentile, 0 ~ 1")
+    band.add_argument("high", type=float, help="Upper percentile, 0 ~ 1")
+
+    args = parser.parse_args()
+    with sqlite3.connect(args.database) as conn:
+        index = open_index(conn)
+    try:
+        if args.query == "top":
+            result = index.top(args.score, args.k, lowest=args.lowest)
+        elif args.query == "top-zips":
+            result = index.top_zips(args.score, args.k, lowest=args.lowest)
+        elif args.query == "zip-members":
+            result = index.members_in_top_zips(args.score, args.k, lowest=args.lowest)
+        elif args.query == "threshold":
+            result = index.threshold(args.score, below=args.below, above=args.above, inclusive=args.inclusive)
+        else:
+            result = index.percentile_band(args.score, args.low, args.high)
+    except KeyError as error:
+        sys.exit(f"score_query: {error.args[0]}")
+    if args.output:
+        result.to_csv(args.output, index=False)
+    else:
+        print(result.to_string(index=False))
+        print(f"{len(result)} row(s)")
@@ -11,6 +11,17 @@ import re
 from typing import Dict, List, Tuple, Optional, Literal
 import argparse
 import shutil
+from itertools import chain
+
+import dedup
+import derived
+import eligibility
+import entity_resolution
+import sql_engine
+import star_schema
+import table_sync
+import zip_bitmap
+from sql_engine import NAME_PATTERN
 
 import warnings
 warnings.filterwarnings("ignore") ## Suppress unnecessary warning prints
@@ -71,9 +82,27 @@ STATE_MAPPER = {
 KNOWN_PAYER = {
     "Mdcd", "Madv"
 }
+## Roster columns kept in `std_member_info` - `Age` & `Gender` are never read
+PROJECTED_COLUMN = (
+    "Person_Id",
+    "First_Name",
+    "Last_Name",
+    "Dob",
+    "Street_Address",
+    "State",
+    "City",
+    "Zip",
+    "eligibility_start_date",
+    "eligibility_end_date",
+    "payer"
+)
+
+## Eligibility window kept in `std_member_info` (inclusive, `%Y-%m-%d`)
+ELIGIBILITY_WINDOW = ("2025-01-01", "2025-12-31")
+## Only ISO dates compare correctly as SQLite TEXT - other formats are window-filtered in pandas
+ISO_DATE_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"
+EXISTING_CHUNK_SIZE = 100_000 ## Rows of `std_member_info` read at a time under `--max-memory`
 
-## Get data from SQLite3 Command 
-READ_SQL_TO_PANDAS = lambda table_name: f"SELECT * FROM {table_name};"
 
 ## Printing Colors & Styles
 BOLD = "\033[1m"
@@ -261,6 +290,66 @@ def get_tables(
     
     return tables
 
+def get_columns(cursor: sqlite3.Cursor, table_name: str) -> List[str]:
+    """
+    Get column names of a table inside `.db` file
+
+    Parameters
+    ----------
+    cursor : sqlite3.Cursor
+        A cursor object used to execute SQL commands and interact with the database.
+    table_name : str
+        Table to inspect
+
+    Returns
+    -------
+    List[str]
+        Column names in table order
+    """
+    return [row[1] for row in cursor.execute(f'PRAGMA table_info("{table_name}");')]
+
+def build_roster_query(
+    table_name: str, table_columns: List[str], window: Tuple[str, str] = ELIGIBILITY_WINDOW
+    ) -> Tuple[str, Tuple[str, str]]:
+    """
+    Build the per-table roster read with column projection & eligibility-window pushdown
+
+    Parameters
+    ----------
+    table_name : str
+        Roster table to read
+    table_columns : List[str]
+        Columns of `table_name` (see `get_columns()`)
+    window : Tuple[str, str], optional
+        Inclusive eligibility window as `%Y-%m-%d` strings, by default `ELIGIBILITY_WINDOW`
+
+    Returns
+    -------
+    Tuple[str, Tuple[str, str]]
+        SQL statement & its parameters for `pd.read_sql_query()`
+
+    Notes
+    -----
+    * Only `PROJECTED_COLUMN` is selected - `Age` & `Gender` are dropped before writing anyway
+    * Rows with a null `Age`/`Gender` are still excluded, same as `dropna()` on the full table
+    * A row is pruned only if both eligibility dates are ISO dates and the period misses `window`;
+        other date formats (e.g. `%m/%d/%Y` in `roster_2`) reach pandas and are filtered there
+    """
+    missing = set(PROJECTED_COLUMN) - set(table_columns)
+    if missing:
+        raise ValueError(f"Schema mismatch. Missing column(s) in {table_name}: {sorted(missing)}")
+    
+    select = ", ".join(f'"{col}"' for col in PROJECTED_COLUMN)
+    not_null = [f'"{col}" IS NOT NULL' for col in ("Age", "Gender") if col in table_columns]
+    not_outside_window = (
+        f"NOT (\"eligibility_start_date\" GLOB '{ISO_DATE_GLOB}' "
+        f"AND \"eligibility_end_date\" GLOB '{ISO_DATE_GLOB}' "
+        f"AND (\"eligibility_start_date\" > ? OR \"eligibility_end_date\" < ?))"
+    )
+    where = " AND ".join(not_null + [not_outside_window])
+    
+    return f'SELECT {select} FROM "{table_name}" WHERE {where};', (window[1], window[0])
+
 def parse_date(
     df: pd.DataFrame, input_format: str = None,
     output_format: str = "%Y-%m-%d", error="coerce",   
@@ -364,7 +453,8 @@ def parse_state(
     return modified_state if not inplace else None
 
 def validate_data(
-    df: pd.DataFrame, df_title: Optional[str] = "UNKNOWN", verbose: bool = False
+    df: pd.DataFrame, df_title: Optional[str] = "UNKNOWN", verbose: bool = False,
+    valid_zips: Optional[zip_bitmap.ZipBitmap] = None
     ) -> bool:
     """
     Validate all columns in df
@@ -377,6 +467,8 @@ def validate_data(
         Data to be validated
     verbose : bool
         Verbosity, by default False
+    valid_zips : zip_bitmap.ZipBitmap, optional
+        Existing zips (ZCTAs) - if given, every `Zip` must also be one of them, by default None
 
     Returns
     -------
@@ -390,12 +482,12 @@ def validate_data(
         * `First_Name` - only contain alphabets, "-", "'", and space
         * `Last_Name` - only contain alphabets, "-", "'", and space
         * `Dob` - only contain valid dates
-        * `Age` - only contain numbers
-        * `Gender` - "male/female" as the only option in existing data
+        * `Age` - only contain numbers (skipped if not read, see `build_roster_query()`)
+        * `Gender` - "male/female" as the only option in existing data (skipped if not read)
         * `Street_Address` - no hard enforcement implemented
         * `State` - only full state name or abbreviations
         * `City` - only alphabets, "-", "'" and space AND no leading space
-        * `Zip` - only contain numbers
+        * `Zip` - only contain numbers (and exist in `valid_zips`, if given)
         * `eligibility_start_date` - only contain valid dates
         * `eligibility_end_date` - only contain valid dates
         * `payer` - "Mdcd/Madv", other payer accepted but warning will be triggered
@@ -418,7 +510,7 @@ def validate_data(
     all_member_id_isdigit = df["Person_Id"].apply(lambda x: isinstance(x, str) and x.isdigit() and len(x) == 8).all() 
     
     ## Member First / Last Name Checks
-    regex_pat = re.compile(r"^[A-Za-z]+([ .'\-][A-Za-z]+)*$", re.UNICODE) ## no number, limit punctuations to ["-", "'"", " "]
+    regex_pat = re.compile(f"^{NAME_PATTERN}$", re.UNICODE) ## no number, limit punctuations to ["-", "'"", " "]
     def is_valid_name(name): 
         return isinstance(name, str) and bool(regex_pat.match(name))
     all_fname_valid = df["First_Name"].apply(is_valid_name).all()
@@ -428,11 +520,11 @@ def validate_data(
     all_dob_valid = isConvertibleToDate(df["Dob"])
     dob_matching_format = isMatchingFormat(df["Dob"])
     
-    ## Age Checks
-    all_age_isdigit = df["Age"].apply(lambda x: isinstance(x, str) and x.isdigit()).all()
+    ## Age Checks (column dropped later, so absent after projection)
+    all_age_isdigit = "Age" not in df.columns or df["Age"].apply(lambda x: isinstance(x, str) and x.isdigit()).all()
     
-    ## Gender Checks
-    all_gender_valid = df["Gender"].apply(lambda x: x == "Male" or x == "Female").all()
+    ## Gender Checks (column dropped later, so absent after projection)
+    all_gender_valid = "Gender" not in df.columns or df["Gender"].apply(lambda x: x == "Male" or x == "Female").all()
     
     ## State Checks
     valid_states_lower = set(k.lower() for k in STATE_MAPPER.keys()) | set(v.lower() for v in STATE_MAPPER.values())
@@ -443,6 +535,7 @@ def validate_data(
     
     ## Zip Checks
     all_zip_valid = df["Zip"].apply(lambda x: isinstance(x, str) and len(x) == 5 and x.isdigit()).all()
+    unknown_zips = set() if valid_zips is None else set(df["Zip"][~valid_zips.contains(df["Zip"])]) ## One bit lookup per row
     
     ## Eligibility Date Checks
     all_eligibility_start_valid = isConvertibleToDate(df["eligibility_start_date"])
@@ -513,6 +606,14 @@ def validate_data(
             theme="CYAN"
         )
 
+        if valid_zips is not None:
+            styled_log(
+                f"\t\tAll zip codes exist (`Zip`): {'Valid' if not unknown_zips else 'Invalid - - - ERROR'}"
+                + (f" | {len(unknown_zips)} unknown, e.g. {', '.join(sorted(map(str, unknown_zips))[:5])}" if unknown_zips else ""),
+                level="error" if unknown_zips else None,
+                theme="CYAN"
+            )
+
         styled_log(
             f"\t\tAll eligibility starting dates (`eligibility_start_date`): "
             f"{'Valid' if all_eligibility_start_valid else 'Invalid - - - ERROR'} | "
@@ -538,7 +639,7 @@ def validate_data(
     
     return all_member_id_isdigit and all_fname_valid and all_lname_valid and all_dob_valid and \
             all_age_isdigit and all_gender_valid and all_state_valid and all_city_valid and \
-                all_zip_valid and all_eligibility_start_valid and all_eligibility_end_valid
+                all_zip_valid and not unknown_zips and all_eligibility_start_valid and all_eligibility_end_valid
     
 def parse_data(data: pd.DataFrame, df_title: str = "UNKNOWN", state_col_name: str = "State", verbose: bool = False) -> pd.DataFrame:
     """
@@ -577,7 +678,8 @@ def parse_data(data: pd.DataFrame, df_title: str = "UNKNOWN", state_col_name: st
 
 def write_to_db(table_name: str, data: pd.DataFrame, conn: sqlite3.Connection, cursor: sqlite3.Cursor, overwrite: bool = False,
                  verbose: bool = False, theme: Optional[Theme] = None,
-                 bg_theme: Optional[Theme] = None) -> pd.DataFrame:
+                 bg_theme: Optional[Theme] = None, max_memory: Optional[str] = None,
+                 spill_dir: Optional[str] = None) -> Optional[pd.DataFrame]:
     """
     Create table in .db file
 
@@ -599,11 +701,17 @@ def write_to_db(table_name: str, data: pd.DataFrame, conn: sqlite3.Connection, c
         Logging text color
     bg_theme : Background_Theme, optional 
         Logging background color
+    max_memory : str, optional
+        Memory budget for deduplication (e.g. "2GB") - existing rows are streamed in chunks,
+        deduplicated out-of-core past it and only the new unique rows are appended from a SQLite
+        staging table, by default None (all in memory)
+    spill_dir : str, optional
+        Directory for deduplication spill files, by default the system temp directory
         
     Returns
     -------
-    pd.DataFrame
-        Table snapshot of `std_member_info`
+    Optional[pd.DataFrame]
+        Table snapshot of `std_member_info` - None under `max_memory`, the table is never held in pandas
         
     Notes
     -----
@@ -614,15 +722,18 @@ def write_to_db(table_name: str, data: pd.DataFrame, conn: sqlite3.Connection, c
     tables = get_tables(cursor)
     table_exists = table_name in tables
 
-    ## Get existing data
+    ## Get existing data - only counted here under a memory budget, streamed while deduplicating
     existing_data = pd.DataFrame()
-    if table_exists:
+    existing_count = 0
+    if table_exists and max_memory is not None:
+        existing_count = cursor.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    elif table_exists:
         existing_data = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
         if verbose:
             styled_log(f"Data exists in table '{table_name}' — reading existing data...", level="warning", theme=theme)
         existing_data = parse_date(existing_data, verbose=verbose, theme=theme, bg_theme=bg_theme, indent=1)
+        existing_count = len(existing_data)
 
-    existing_count = len(existing_data)
     new_count = len(data)
 
     if verbose:
@@ -630,17 +741,36 @@ def write_to_db(table_name: str, data: pd.DataFrame, conn: sqlite3.Connection, c
         styled_log(f"New rows to add: {new_count}", theme=theme)
 
     ## Combine data - depending on overwrite
-    if overwrite or not table_exists:
-        combined_data = data
-        if verbose and overwrite:
-            styled_log(f"Overwriting table '{table_name}' with new data...", level="warning", theme=theme)
+    if verbose and overwrite:
+        styled_log(f"Overwriting table '{table_name}' with new data...", level="warning", theme=theme)
+    restart = overwrite or not table_exists
+    combined_data = None
+    if max_memory is not None:
+        ## Written while deduplicating - the stored rows are streamed first, so only unique rows after them are appended
+        existing_chunks = []
+        if not restart:
+            existing_chunks = (
+                parse_date(chunk, theme=theme, bg_theme=bg_theme)
+                for chunk in pd.read_sql_query(f"SELECT * FROM {table_name}", conn, chunksize=EXISTING_CHUNK_SIZE)
+            )
+        dedup_stats = dedup.drop_duplicates_to_sql(
+            chain(existing_chunks, [parse_date(df=data, theme=theme, bg_theme=bg_theme)]), conn, table_name,
+            max_memory=max_memory, spill_dir=spill_dir, skip_rows=0 if restart else existing_count,
+            if_exists="replace" if restart else "append"
+        ) ## unique set
+        if verbose and dedup_stats["partitions"] > 0:
+            styled_log(f"Deduplicated out-of-core in {dedup_stats['partitions']} partitions (budget: {max_memory})", theme=theme)
+        final_count = (0 if restart else existing_count) + dedup_stats["added_rows"]
     else:
-        combined_data = pd.concat([existing_data, data], ignore_index=True)
-    
-    combined_data = parse_date(df=combined_data, theme=theme, bg_theme=bg_theme)
-    combined_data = combined_data.drop_duplicates() ## unique set
+        if overwrite or not table_exists:
+            combined_data = data
+        else:
+            combined_data = pd.concat([existing_data, data], ignore_index=True)
+        
+        combined_data = parse_date(df=combined_data, theme=theme, bg_theme=bg_theme)
+        combined_data = combined_data.drop_duplicates() ## unique set
+        final_count = len(combined_data)
 
-    final_count = len(combined_data)
     if overwrite or not table_exists:
         added_unique_rows = new_count
         removed_dupes = 0
@@ -654,51 +784,286 @@ def write_to_db(table_name: str, data: pd.DataFrame, conn: sqlite3.Connection, c
         styled_log(f"Final row count in table '{table_name}': {final_count}", theme=theme, bold=True)
 
     # Write to SQL
-    combined_data.to_sql(table_name, conn, if_exists="replace", index=False)
+    if combined_data is not None:
+        combined_data.to_sql(table_name, conn, if_exists="replace", index=False)
     if verbose:
         styled_log(f"Data written to table `{table_name}`.", theme=theme, bg_theme=bg_theme, bold=True)
     
+    ## Only this write's rows reach the indexes & derived tables - existing rows come first in `combined_data`,
+    ## and are read back after the stored ones when the rows were appended from SQLite
+    added = None
+    if combined_data is not None:
+        added = combined_data if restart else combined_data.iloc[existing_count:]
+    synced = table_sync.sync_derived(conn, table_name, added=added, restart=restart, skip_rows=existing_count)
+    if verbose:
+        for index, label in (("interval_index", "Eligibility interval index"), ("member_search", "Member search index")):
+            if synced[index] is not None:
+                styled_log(f"{label} {synced[index]}.", theme=theme)
+        month_stats, cube_stats, score_stats = synced["member_month"], synced["member_cube"], synced["member_scores"]
+        styled_log(f"member_month: {month_stats['new_rows']} new row(s) -> {month_stats['member_months']} member-month(s) added", theme=theme)
+        styled_log(f"member_cube: {cube_stats['added_rows']} row(s) added, {cube_stats['removed_rows']} removed -> {cube_stats['cells']} cell(s)", theme=theme)
+        styled_log(f"member_scores: {score_stats['added_rows']} row(s) scored, {score_stats['removed_rows']} removed, "
+                   f"{score_stats['rescored_rows']} rescored in {score_stats['changed_zips']} changed zip(s)", theme=theme)
+        if synced["sketches"] is not None:
+            styled_log(f"Sketches recorded for run {synced['sketches']}.", theme=theme)
+    
     return combined_data
 
-def main(db_path: str, verbose: bool, overwrite: bool): 
+def run_sql_engine(conn: sqlite3.Connection, cur: sqlite3.Cursor, overwrite: bool, verbose: bool) -> None:
+    """
+    `--engine sql`: run the whole pipeline inside SQLite (see `sql_engine.py`)
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to database
+    cur : sqlite3.Cursor
+        Cursor object for SQL operation
+    overwrite : bool
+        Wipe past data and insert the new (or not)
+    verbose : bool
+        Verbosity
+    """
+    tables = get_tables(cursor=cur, prefix="roster_")
+    
+    if verbose:
+        ## Validation report only - like the pandas engine, invalid tables are still merged
+        sql_engine.load_state_lookup(conn, STATE_MAPPER)
+        for tab in tables:
+            styled_log(f"\t=== Table {tab} Validation (SQL) ===", theme="CYAN", bold=True)
+            styled_log(f"\t\tState column: {sql_engine.detect_state_mode(conn, tab)}", theme="CYAN")
+            for col, invalid_count in sql_engine.invalid_counts(conn, tab).items():
+                styled_log(
+                    f"\t\t`{col}`: {'Valid' if invalid_count == 0 else f'{invalid_count} invalid row(s) - - - ERROR'}",
+                    level="error" if invalid_count > 0 else None,
+                    theme="CYAN"
+                )
+    
+    stats = sql_engine.run_sql_engine(conn, tables, STATE_MAPPER, window=ELIGIBILITY_WINDOW,
+                                      table_name="std_member_info", overwrite=overwrite)
+    table_sync.sync_derived(conn, "std_member_info", restart=overwrite or not stats["existing_rows"], skip_rows=stats["existing_rows"])
+    
+    if verbose:
+        styled_log(f"Existing rows: {stats['existing_rows']}", theme="CYAN")
+        styled_log(f"Unique new rows added: {stats['added_rows']}", theme="CYAN")
+        styled_log(f"Final row count in table 'std_member_info': {stats['final_rows']}", theme="CYAN", bold=True)
+
+def build_eligibility_spans(conn: sqlite3.Connection, verbose: bool = False) -> Dict:
+    """
+    Merge each member's overlapping or adjacent `std_member_info` periods into `member_eligibility_span`
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    verbose : bool, optional
+        Log span statistics, by default False
+
+    Returns
+    -------
+    Dict
+        `eligibility.build_span_table()` statistics
+    """
+    stats = eligibility.build_span_table(conn)
+    
+    if verbose:
+        styled_log("===Eligibility Spans===", theme="BRIGHT_WHITE", bold=True)
+        if stats["skipped_rows"]:
+            styled_log(f"{stats['skipped_rows']} row(s) without a valid eligibility period left out of spans", level="warning")
+        styled_log(f"{stats['rows']} records -> {stats['spans']} spans for {stats['members']} members", theme="CYAN", bold=True)
+        styled_log("Runtime: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in stats["seconds"].items()),
+                   theme="CYAN")
+    
+    return stats
+
+def build_derived_attributes(conn: sqlite3.Connection, as_of: pd.Timestamp, rebuild: bool = False,
+                             verbose: bool = False) -> Dict:
+    """
+    Persist age as of `as_of`, age band & eligibility length of every `std_member_info` row into `member_derived`
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    as_of : pd.Timestamp
+        Reference date for ages
+    rebuild : bool, optional
+        Derive every row again instead of only appended ones (`std_member_info` was overwritten), by default False
+    verbose : bool, optional
+        Log derivation statistics, by default False
+
+    Returns
+    -------
+    Dict
+        `derived.build_table()` statistics
+    """
+    stats = derived.build_table(conn, as_of, rebuild=rebuild)
+    
+    if verbose:
+        styled_log("===Derived Attributes===", theme="BRIGHT_WHITE", bold=True)
+        styled_log(f"{stats['derived_rows']} of {stats['rows']} records derived as of {as_of:%Y-%m-%d} "
+                   f"({'rebuilt' if stats['rebuilt'] else 'appended'})", theme="CYAN", bold=True)
+        styled_log("Runtime: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in stats["seconds"].items()),
+                   theme="CYAN")
+    
+    return stats
+
+def build_star_schema(conn: sqlite3.Connection, rebuild: bool = False, verbose: bool = False) -> Dict:
+    """
+    Mirror `std_member_info` into integer-keyed `dim_*` tables, `fact_member` & the `std_member_info_star` view
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    rebuild : bool, optional
+        Encode every row again instead of only appended ones (`std_member_info` was overwritten), by default False
+    verbose : bool, optional
+        Log encoding statistics, by default False
+
+    Returns
+    -------
+    Dict
+        `star_schema.build()` statistics
+    """
+    stats = star_schema.build(conn, rebuild=rebuild)
+    
+    if verbose:
+        styled_log("===Star Schema===", theme="BRIGHT_WHITE", bold=True)
+        styled_log(f"{stats['encoded_rows']} of {stats['rows']} records encoded "
+                   f"({'rebuilt' if stats['rebuilt'] else 'appended'})", theme="CYAN", bold=True)
+        styled_log("Dimensions: " + ", ".join(f"{table} {count}" for table, count in stats["dimension_values"].items()),
+                   theme="CYAN")
+        styled_log("Runtime: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in stats["seconds"].items()),
+                   theme="CYAN")
+    
+    return stats
+
+def resolve_members(conn: sqlite3.Connection, threshold: float = entity_resolution.MATCH_THRESHOLD,
+                    verbose: bool = False) -> Dict:
+    """
+    Cluster near-duplicate members of `std_member_info` into `member_entity`
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    threshold : float, optional
+        Minimum pair score to link two records, by default `entity_resolution.MATCH_THRESHOLD`
+    verbose : bool, optional
+        Log blocking & matching statistics, by default False
+
+    Returns
+    -------
+    Dict
+        `entity_resolution.resolve()` statistics
+    """
+    stats = entity_resolution.resolve_table(conn, STATE_MAPPER, threshold=threshold)
+    
+    if verbose:
+        styled_log("===Entity Resolution===", theme="BRIGHT_WHITE", bold=True)
+        for key, key_stats in stats["blocking"].items():
+            styled_log(f"Blocking key '{key}': {key_stats['blocks']} blocks, {key_stats['pairs']} pairs", theme="CYAN")
+            if key_stats["skipped_blocks"]:
+                styled_log(f"Skipped {key_stats['skipped_blocks']} oversized '{key}' blocks "
+                           f"({key_stats['skipped_rows']} rows)", level="warning")
+        styled_log(f"Candidate pairs: {stats['candidate_pairs']} (naive: {stats['naive_pairs']})", theme="CYAN")
+        styled_log(f"Matched pairs: {stats['matched_pairs']}", theme="CYAN")
+        styled_log(f"{stats['rows']} records -> {stats['clusters']} members ({stats['merged_records']} merged)",
+                   theme="CYAN", bold=True)
+        styled_log("Runtime: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in stats["seconds"].items()),
+                   theme="CYAN")
+    
+    return stats
+
+def main(db_path: str, verbose: bool, overwrite: bool, engine: Literal["pandas", "sql"] = "pandas",
+         max_memory: Optional[str] = None, spill_dir: Optional[str] = None, resolve_threshold: Optional[float] = None, spans: bool = False,
+         valid_zips: Optional[str] = None,
+         derived_as_of: Optional[str] = None, star: bool = False): 
     
     ## Establish Database Connection
     conn, cur = read_database(path_to_db=db_path)
-    roster_data = pd.DataFrame()
-    for tab in get_tables(cursor=cur, prefix="roster_"):
-        ## READ SQL
+    if derived_as_of is not None:
+        derived_as_of = pd.Timestamp(derived_as_of).normalize()
+    if valid_zips is not None:
+        try:
+            if engine != "pandas":
+                raise ValueError(f"The zip existence rule is only supported by the pandas engine, not {engine}")
+            valid_zips = zip_bitmap.open_bitmap(valid_zips, conn)
+        except Exception as e:
+            if verbose:
+                styled_log(f"[main] Failed to process {db_path}", level="error")
+                styled_log(f"[main] Reason: {e}")
+            return
+        if verbose:
+            styled_log(f"Checking zips against {len(valid_zips):,} valid zips ({valid_zips.source})", theme="CYAN")
+    if engine == "sql":
+        run_sql_engine(conn, cur, overwrite=overwrite, verbose=verbose)
+        if spans:
+            build_eligibility_spans(conn, verbose=verbose)
+        if derived_as_of is not None:
+            build_derived_attributes(conn, as_of=derived_as_of, rebuild=overwrite, verbose=verbose)
+        if star:
+            build_star_schema(conn, rebuild=overwrite, verbose=verbose)
+        if resolve_threshold is not None:
+            resolve_members(conn, threshold=resolve_threshold, verbose=verbose)
         if verbose:
-            styled_log(f"Processing table {tab}...",
-                       theme="BRIGHT_WHITE", bg_theme="BG_BLUE", bold=True)
-        tmp_data = pd.read_sql_query(READ_SQL_TO_PANDAS(tab), conn)
+            styled_log(f"{db_path} updated!", theme="BRIGHT_WHITE", bg_theme="BG_GREEN", bold=True)
+        return
+    
+    def parsed_tables():
+        for tab in get_tables(cursor=cur, prefix="roster_"):
+            ## READ SQL
+            if verbose:
+                styled_log(f"Processing table {tab}...",
+                           theme="BRIGHT_WHITE", bg_theme="BG_BLUE", bold=True)
+            query, params = build_roster_query(tab, get_columns(cur, tab))
+            tmp_data = pd.read_sql_query(query, conn, params=params)
+            if verbose:
+                total_count = cur.execute(f'SELECT COUNT(*) FROM "{tab}";').fetchone()[0]
+                styled_log(f"\t{total_count - len(tmp_data)} of {total_count} row(s) pruned in SQLite "
+                           f"(null `Age`/`Gender` or outside eligibility window).", theme="CYAN")
         
-        ## Check NULL
-        null_count = tmp_data.isnull().any(axis=1).sum()
-        if null_count > 0 and verbose:
-            styled_log(f"\t{null_count} row(s) with null values dropped before validation.", 
-                    level="warning", theme="CYAN")
+            ## Check NULL
+            null_count = tmp_data.isnull().any(axis=1).sum()
+            if null_count > 0 and verbose:
+                styled_log(f"\t{null_count} row(s) with null values dropped before validation.", 
+                        level="warning", theme="CYAN")
 
-        tmp_data = tmp_data.dropna()
+            tmp_data = tmp_data.dropna()
         
-        ## Validate data
-        is_valid = validate_data(df=tmp_data, df_title=tab, verbose=verbose)
+            ## Validate data
+            is_valid = validate_data(df=tmp_data, df_title=tab, verbose=verbose, valid_zips=valid_zips)
         
-        if not is_valid:
-            if verbose:
-                styled_log(f"Skipping table {tab} due to invalid data detected.",
-                           theme="BRIGHT_BLACK", bg_theme="BG_YELLOW", bold=True)
-            pass ## Skipping table
+            if not is_valid:
+                if verbose:
+                    styled_log(f"Skipping table {tab} due to invalid data detected.",
+                               theme="BRIGHT_BLACK", bg_theme="BG_YELLOW", bold=True)
+                pass ## Skipping table
         
-        ## Parsing
-        parsed_tmp_data = parse_data(data=tmp_data, state_col_name="State", verbose=verbose)
-        if verbose:
-            print_dataframe_preview(parsed_tmp_data) ## Sample
+            ## Parsing
+            parsed_tmp_data = parse_data(data=tmp_data, state_col_name="State", verbose=verbose)
+            if verbose:
+                print_dataframe_preview(parsed_tmp_data) ## Sample
         
-        ## Aggregation
-        roster_data = pd.concat([roster_data, parsed_tmp_data], ignore_index=True)
-        if verbose:
-            styled_log(f"Table {tab} processed and added to aggregation.", bold=True, theme="BRIGHT_WHITE", bg_theme="BG_GREEN")
-        print("\n\n") ## Separate logging
+            ## Aggregation
+            yield parsed_tmp_data
+            if verbose:
+                styled_log(f"Table {tab} processed and added to aggregation.", bold=True, theme="BRIGHT_WHITE", bg_theme="BG_GREEN")
+            print("\n\n") ## Separate logging
+    
+    ## Aggregate & drop duplicates - out-of-core under `max_memory`, consuming tables as they are parsed
+    if max_memory is None:
+        roster_data = pd.DataFrame()
+        for parsed_tmp_data in parsed_tables():
+            roster_data = pd.concat([roster_data, parsed_tmp_data], ignore_index=True)
+    else:
+        roster_data, dedup_stats = dedup.drop_duplicates(
+            parsed_tables(), max_memory=max_memory, spill_dir=spill_dir, count_duplicates=verbose
+        )
+        if verbose and dedup_stats["partitions"] > 0:
+            styled_log(f"Deduplicated out-of-core in {dedup_stats['partitions']} partitions (budget: {max_memory})",
+                       theme="BRIGHT_BLUE")
     
     if verbose:
         styled_log(f"Aggregation Completed: all valid roster data parsed & included.", bold=True, theme="BRIGHT_WHITE", bg_theme="BG_GREEN")
@@ -713,18 +1078,22 @@ def main(db_path: str, verbose: bool, overwrite: bool):
         "City": "city",
         "State": "state",
         "Street_Address": "main_address",
-    }).drop(columns=["Age", "Gender"])
+    }).drop(columns=["Age", "Gender"], errors="ignore") ## Not selected by `build_roster_query()`
     
     ## Original Record Count & Duplicate Count
-    data_size = len(roster_data)
-    duplicate_row_count = roster_data[roster_data.duplicated(keep=False)].drop_duplicates().shape[0]
+    if max_memory is None:
+        data_size = len(roster_data)
+        duplicate_row_count = roster_data[roster_data.duplicated(keep=False)].drop_duplicates().shape[0]
+    else:
+        data_size, duplicate_row_count = dedup_stats["rows"], dedup_stats["duplicate_rows"]
     
     if verbose:
         styled_log(f"All record size: {data_size}", theme="BRIGHT_WHITE", bg_theme="BG_BLUE", bold=True)
         styled_log(f"Duplcated record count: {duplicate_row_count}", theme="BRIGHT_WHITE", bg_theme="BG_BLUE", bold=True)
     
     ## Drop duplicates
-    roster_data = roster_data.drop_duplicates()
+    if max_memory is None:
+        roster_data = roster_data.drop_duplicates()
     if verbose:
         styled_log(f"Unique record count: {len(roster_data)}", theme="BRIGHT_WHITE", bg_theme="BG_BLUE", bold=True)
     
@@ -734,8 +1103,8 @@ def main(db_path: str, verbose: bool, overwrite: bool):
         pd.to_datetime(roster_data["eligibility_end_date"])
     ) ## Making sure date is type-ready for comparing
 
-    start_2025 = pd.Timestamp("2025-01-01")
-    end_2025 = pd.Timestamp("2025-12-31")
+    start_2025 = pd.Timestamp(ELIGIBILITY_WINDOW[0])
+    end_2025 = pd.Timestamp(ELIGIBILITY_WINDOW[1])
 
     def overlaps_2025(row):
         return (row["eligibility_start_date"] <= end_2025) and (row["eligibility_end_date"] >= start_2025)
@@ -748,7 +1117,17 @@ def main(db_path: str, verbose: bool, overwrite: bool):
     
     ## Write to .db
     member_info_data = write_to_db(table_name="std_member_info", data=roster_data, conn=conn, cursor=cur, overwrite=overwrite, verbose=verbose,
-                theme="CYAN")
+                theme="CYAN", max_memory=max_memory, spill_dir=spill_dir)
+    
+    ## Consolidated eligibility, derived attributes, star schema & near-duplicate clusters over the updated table
+    if spans:
+        build_eligibility_spans(conn, verbose=verbose)
+    if derived_as_of is not None:
+        build_derived_attributes(conn, as_of=derived_as_of, rebuild=overwrite, verbose=verbose)
+    if star:
+        build_star_schema(conn, rebuild=overwrite, verbose=verbose)
+    if resolve_threshold is not None:
+        resolve_members(conn, threshold=resolve_threshold, verbose=verbose)
     
     if verbose:
         print("\n\n")
@@ -775,10 +1154,53 @@ if __name__ == "__main__":
         action="store_true",
         help="New data overwrites `std_member_info`"
     )
+    parser.add_argument(
+        "-e", "--engine",
+        choices=["pandas", "sql"],
+        default="pandas",
+        help="Execution engine - `sql` runs the whole pipeline inside SQLite (default: pandas)"
+    )
+    parser.add_argument(
+        "-m", "--max-memory",
+        help="Memory budget, e.g. 4GB - deduplication spills hash partitions to --spill-dir past it (default: no budget)."
+    )
+    parser.add_argument(
+        "--spill-dir",
+        help="Directory for deduplication spill files (default: a temporary directory)."
+    )
+    parser.add_argument(
+        "--spans",
+        action="store_true",
+        help="Merge overlapping/adjacent eligibility periods per member into `member_eligibility_span` after the write."
+    )
+    parser.add_argument(
+        "--derived",
+        nargs="?", const="today", default=None, metavar="AS_OF",
+        help="Persist age as of AS_OF, age band & eligibility length in days per row into `member_derived` after the write (default date: today)."
+    )
+    parser.add_argument(
+        "--star",
+        action="store_true",
+        help="Mirror `std_member_info` into integer-keyed dim_state/dim_city/dim_payer/dim_zip tables, a slim `fact_member` table & the `std_member_info_star` view after the write."
+    )
+    parser.add_argument(
+        "--resolve",
+        nargs="?", type=float, const=entity_resolution.MATCH_THRESHOLD, default=None, metavar="THRESHOLD",
+        help=f"Cluster near-duplicate members into `member_entity` after the write (default match threshold: {entity_resolution.MATCH_THRESHOLD})."
+    )
+    parser.add_argument(
+        "--valid-zips",
+        nargs="?", const=zip_bitmap.SCORES_SOURCE, default=None, metavar="SOURCE",
+        help="Also reject zips that don't exist - SOURCE is a ZCTA .shp, a .db with model_scores_by_zip or a "
+             "zip_bitmap.py file (default: model_scores_by_zip of the database)."
+    )
     
     args = parser.parse_args()
     db_path = args.database
     verbose = args.verbose
     overwrite = args.overwrite
     
-    main(db_path=db_path, verbose=verbose, overwrite=overwrite)
\ No newline at end of file
+    main(db_path=db_path, verbose=verbose, overwrite=overwrite, engine=args.engine,
+         max_memory=args.max_memory, spill_dir=args.spill_dir, resolve_threshold=args.resolve, spans=args.spans,
+         valid_zips=args.valid_zips,
+         derived_as_of=args.derived, star=args.star)
\ No newline at end of file
@@ -0,0 +1,378 @@
+import math
+import sqlite3
+import struct
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+import eligibility
+from score_lookup import SCORE_TABLE, ScoreLookup
+from sql_engine import table_chunks
+
+RUN_TABLE = "member_sketch_run"
+SKETCH_TABLE = "member_sketch"
+DISTINCT_METRICS = {"members": "member_id", "unique_city": "city", "unique_zip": "zip_code"} ## Summary column -> column sketched
+HLL_PRECISION = 14 ## 2^14 registers: 16 KiB, relative standard error 1.04 / sqrt(2^14) ~ 0.81%
+RELATIVE_ACCURACY = 0.01 ## Quantile sketch: every reported quantile within 1% of the exact value
+CHUNK_ROWS = 100_000 ## Rows read at a time by `record_from_table()`
+
+
+def _leading_zeros(words: np.ndarray) -> np.ndarray:
+    """Leading zero bits of each uint64 (64 for 0) - binary search, 6 vectorized steps"""
+    zeros = np.zeros(words.shape, dtype=np.int64)
+    words = words.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        top_clear = words < (np.uint64(1) << np.uint64(64 - shift))
+        zeros += np.where(top_clear, shift, 0)
+        words = np.where(top_clear, words << np.uint64(shift), words)
+    return zeros + (words == 0)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter - mergeable, fixed size, duplicate-insensitive
+
+    Each value is hashed to 64 bits: the top `precision` bits pick a register, which keeps the
+    longest run of leading zeros seen in the remaining bits. The estimate is the bias-corrected
+    harmonic mean of `2^register`, with linear counting for small cardinalities.
+
+    Parameters
+    ----------
+    precision : int, optional
+        log2 of the register count, by default `HLL_PRECISION`
+
+    Notes
+    -----
+    * Relative standard error is `1.04 / sqrt(2^precision)` - 0.81% at the default, so ~99%
+      of estimates fall within 2.5% of the exact count
+    * `merge()` of two sketches equals the sketch of the union of their values - merging
+      overlapping runs or partitions does not double count
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values: Union[pd.Series, np.ndarray]) -> "HyperLogLog":
+        """Add values (nulls skipped), compared by their string form"""
+        values = pd.Series(values)
+        hashes = pd.util.hash_array(values[values.notna()].astype(str).to_numpy(dtype=object))
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rank = np.minimum(_leading_zeros(hashes << np.uint64(self.precision)) + 1, 64 - self.precision + 1)
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        empty = int((self.registers == 0).sum())
+        if raw <= 2.5 * m and empty:
+            return m * math.log(m / empty) ## Linear counting
+        return float(raw)
+
+    def to_bytes(self) -> bytes:
+        return struct.pack("<B", self.precision) + zlib.compress(self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        sketch = cls(data[0])
+        sketch.registers = np.frombuffer(zlib.decompress(data[1:]), dtype=np.uint8).copy()
+        return sketch
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch (DDSketch) - mergeable, relative-error quantiles
+
+    A value `x > 0` falls in bucket `ceil(log_gamma(x))` with `gamma = (1 + a) / (1 - a)`;
+    negatives use a mirrored store and values near 0 a zero count. A quantile is read from the
+    cumulative bucket counts, and every value of a bucket is within `a` (relative) of its midpoint.
+
+    Parameters
+    ----------
+    relative_accuracy : float, optional
+        `a` - relative error of every quantile, by default `RELATIVE_ACCURACY`
+
+    Notes
+    -----
+    * `quantile(q)` is within `a * |exact|` of the exact `q` quantile (lower median convention)
+    * `merge()` adds bucket counts - merged sketches equal the sketch of all the values
+    * Size grows with the log of the value range, not with the count: ~`ln(max/min) / 2a` buckets
+    """
+
+    MIN_VALUE = 1e-9 ## Smaller magnitudes count as 0
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.zero_count = 0
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.positive.values()) + sum(self.negative.values())
+
+    @staticmethod
+    def _add_counts(store: Dict[int, int], keys: np.ndarray, counts: np.ndarray) -> None:
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+
+    def add(self, values: Union[pd.Series, np.ndarray]) -> "QuantileSketch":
+        """Add values (NaN skipped)"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        magnitude = np.abs(values)
+        is_zero = magnitude < self.MIN_VALUE
+        self.zero_count += int(is_zero.sum())
+        keys = np.ceil(np.log(np.where(is_zero, 1.0, magnitude)) / math.log(self.gamma)).astype(np.int64)
+        for store, mask in ((self.positive, ~is_zero & (values > 0)), (self.negative, ~is_zero & (values < 0))):
+            unique, counts = np.unique(keys[mask], return_counts=True)
+            self._add_counts(store, unique, counts)
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge quantile sketches of different relative accuracy.")
+        self.zero_count += other.zero_count
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            self._add_counts(store, np.fromiter(other_store.keys(), np.int64), np.fromiter(other_store.values(), np.int64))
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Value at quantile `q` (0 ~ 1), NaN when empty"""
+        total = self.count
+        if total == 0:
+            return float("nan")
+        rank = q * (total - 1)
+        midpoint = lambda key: 2 * self.gamma ** key / (self.gamma + 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True): ## Most negative first
+            seen += self.negative[key]
+            if seen > rank:
+                return -midpoint(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return midpoint(key)
+        return midpoint(max(self.positive))
+
+    def to_bytes(self) -> bytes:
+        arrays = [np.fromiter(store.keys(), np.int64) for store in (self.positive, self.negative)]
+        counts = [np.fromiter(store.values(), np.int64) for store in (self.positive, self.negative)]
+        header = struct.pack("<dqqq", self.relative_accuracy, self.zero_count, len(arrays[0]), len(arrays[1]))
+        return header + zlib.compress(np.concatenate([arrays[0], counts[0], arrays[1], counts[1]]).tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "QuantileSketch":
+        relative_accuracy, zero_count, n_positive, n_negative = struct.unpack_from("<dqqq", data)
+        sketch = cls(relative_accuracy)
+        sketch.zero_count = zero_count
+        values = np.frombuffer(zlib.decompress(data[struct.calcsize("<dqqq"):]), dtype=np.int64)
+        positive, negative = values[:2 * n_positive], values[2 * n_positive:]
+        sketch.positive = dict(zip(positive[:n_positive].tolist(), positive[n_positive:].tolist()))
+        sketch.negative = dict(zip(negative[:n_negative].tolist(), negative[n_negative:].tolist()))
+        return sketch
+
+
+SKETCH_KINDS = {"hll": HyperLogLog, "quantile": QuantileSketch}
+
+
+def create_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS "{RUN_TABLE}" (
+            run_id INTEGER PRIMARY KEY, created TEXT NOT NULL, as_of TEXT NOT NULL, rows INTEGER NOT NULL
+        );
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS "{SKETCH_TABLE}" (
+            run_id INTEGER NOT NULL, payer TEXT NOT NULL, metric TEXT NOT NULL, kind TEXT NOT NULL,
+            rows INTEGER NOT NULL, sketch BLOB NOT NULL, PRIMARY KEY (run_id, payer, metric)
+        );
+    """)
+
+
+def score_columns(conn: sqlite3.Connection) -> List[str]:
+    """`*_score` columns of `SCORE_TABLE`, empty if the table is missing"""
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{SCORE_TABLE}");') if row[1].endswith("_score")]
+
+
+def build_sketches(rows: pd.DataFrame, scores: Optional[ScoreLookup] = None, as_of: Optional[pd.Timestamp] = None,
+                   sketches: Optional[Dict] = None) -> Dict:
+    """
+    Add `rows` to per-payer sketches
+
+    Parameters
+    ----------
+    rows : pd.DataFrame
+        Rows in the `std_member_info` layout
+    scores : ScoreLookup, optional
+        Scores sketched - members get the scores of their zip, by default None
+    as_of : pd.Timestamp, optional
+        Date ages are computed at, by default today
+    sketches : Dict, optional
+        (payer, metric) -> sketch to add to, by default a new dict
+
+    Returns
+    -------
+    Dict
+        (payer, metric) -> `HyperLogLog` (`DISTINCT_METRICS`) or `QuantileSketch` (`age` & every score)
+    """
+    sketches = {} if sketches is None else sketches
+    as_of = as_of or pd.Timestamp.today().normalize()
+    rows = rows.assign(age=eligibility.age_in_years(rows["date_of_birth"], as_of))
+    if scores is not None:
+        rows = pd.concat([rows, scores.gather(rows["zip_code"])], axis=1)
+    quantile_metrics = ["age", *(scores.columns if scores is not None else [])]
+    for payer, group in rows.groupby(rows["payer"].fillna("Unknown"), sort=False):
+        for metric, column in DISTINCT_METRICS.items():
+            sketches.setdefault((payer, metric), HyperLogLog()).add(group[column])
+        for metric in quantile_metrics:
+            sketches.setdefault((payer, metric), QuantileSketch()).add(pd.to_numeric(group[metric], errors="coerce"))
+    return sketches
+
+
+def record_run(conn: sqlite3.Connection, chunks: Union[pd.DataFrame, Iterable[pd.DataFrame]], reset: bool = False,
+               as_of: Optional[pd.Timestamp] = None) -> Optional[int]:
+    """
+    Store per-payer sketches of the rows one ingestion run added
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    chunks : Union[pd.DataFrame, Iterable[pd.DataFrame]]
+        Rows the run added to `std_member_info`
+    reset : bool, optional
+        The run replaced the table - earlier runs are dropped, since sketches cannot subtract, by default False
+    as_of : pd.Timestamp, optional
+        Date ages are computed at, by default today
+
+    Returns
+    -------
+    Optional[int]
+        New `run_id`, None if the run added no rows
+    """
+    create_tables(conn)
+    if reset:
+        conn.execute(f'DELETE FROM "{SKETCH_TABLE}";')
+        conn.execute(f'DELETE FROM "{RUN_TABLE}";')
+    as_of = as_of or pd.Timestamp.today().normalize()
+    columns = score_columns(conn)
+    scores = ScoreLookup.load(conn, columns) if columns else None
+
+    sketches, rows, payer_rows = {}, 0, {}
+    for chunk in [chunks] if isinstance(chunks, pd.DataFrame) else chunks:
+        if chunk.empty:
+            continue
+        build_sketches(chunk, scores=scores, as_of=as_of, sketches=sketches)
+        rows += len(chunk)
+        for payer, count in chunk["payer"].fillna("Unknown").value_counts().items():
+            payer_rows[payer] = payer_rows.get(payer, 0) + count
+    if not rows:
+        conn.commit()
+        return None
+
+    run_id = conn.execute(
+        f'INSERT INTO "{RUN_TABLE}" (created, as_of, rows) VALUES (?, ?, ?);',
+        (pd.Timestamp.now().isoformat(timespec="seconds"), as_of.strftime("%Y-%m-%d"), rows)
+    ).lastrowid
+    conn.executemany(
+        f'INSERT INTO "{SKETCH_TABLE}" (run_id, payer, metric, kind, rows, sketch) VALUES (?, ?, ?, ?, ?, ?);',
+        [(run_id, payer, metric, "hll" if isinstance(sketch, HyperLogLog) else "quantile", int(payer_rows[payer]), sketch.to_bytes())
+         for (payer, metric), sketch in sketches.items()]
+    )
+    conn.commit()
+    return run_id
+
+
+def record_from_table(conn: sqlite3.Connection, table_name: str = "std_member_info", skip_rows: int = 0,
+                      reset: bool = False) -> Optional[int]:
+    """`record_run()` over the rows appended after the first `skip_rows` (in rowid order) - for writers that append in SQL"""
+    chunks = (pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+              for columns, rows in table_chunks(conn, table_name, CHUNK_ROWS, skip_rows=skip_rows))
+    return record_run(conn, chunks, reset=reset)
+
+
+def merged(conn: sqlite3.Connection, runs: Optional[Sequence[int]] = None) -> Dict:
+    """(payer, metric) -> sketch merged over `runs` (default: every run)"""
+    query = f'SELECT payer, metric, kind, sketch FROM "{SKETCH_TABLE}"'
+    params = []
+    if runs is not None:
+        query += f" WHERE run_id IN ({', '.join('?' for _ in runs)})"
+        params = list(runs)
+    sketches = {}
+    for payer, metric, kind, data in conn.execute(query + " ORDER BY run_id;", params):
+        sketch = SKETCH_KINDS[kind].from_bytes(data)
+        if (payer, metric) in sketches:
+            sketches[(payer, metric)].merge(sketch)
+        else:
+            sketches[(payer, metric)] = sketch
+    return sketches
+
+
+def summary(conn: sqlite3.Connection, by: Optional[str] = "payer", runs: Optional[Sequence[int]] = None,
+            quantiles: Sequence[float] = (0.25, 0.5, 0.75)) -> pd.DataFrame:
+    """
+    Approximate per-payer summary from merged sketches - no member rows are read
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    by : str, optional
+        "payer", or None to merge every payer into one row, by default "payer"
+    runs : Sequence[int], optional
+        `run_id`s to merge, by default every run
+    quantiles : Sequence[float], optional
+        Quantiles reported for age & every score, by default (0.25, 0.5, 0.75)
+
+    Returns
+    -------
+    pd.DataFrame
+        `population`, rounded `DISTINCT_METRICS` estimates & `<metric>_p<q>` columns
+
+    Raises
+    ------
+    ValueError
+        `by` other than "payer" or None - sketches are kept per payer only
+    """
+    if by not in ("payer", None):
+        raise ValueError("Sketches are kept per payer - `by` must be 'payer' or None.")
+    create_tables(conn)
+    sketches = merged(conn, runs)
+    populations = dict(conn.execute(
+        f'SELECT payer, SUM(rows) FROM "{SKETCH_TABLE}" WHERE metric = ?'
+        + (f" AND run_id IN ({', '.join('?' for _ in runs)})" if runs is not None else "") + " GROUP BY payer;",
+        ["members", *(runs or [])]
+    ).fetchall())
+    if by is None:
+        combined = {}
+        for (_, metric), sketch in sketches.items():
+            combined[("All", metric)] = combined[("All", metric)].merge(sketch) if ("All", metric) in combined else sketch
+        sketches, populations = combined, {"All": sum(populations.values())}
+
+    records = []
+    for payer in sorted(populations):
+        record = {"payer": payer, "population": populations[payer]}
+        for (group, metric), sketch in sorted(sketches.items(), key=lambda item: (isinstance(item[1], QuantileSketch), item[0])):
+            if group != payer:
+                continue
+            if isinstance(sketch, HyperLogLog):
+                record[metric] = round(sketch.estimate())
+            else:
+                record.update({f"{metric}_p{round(q * 100)}": round(sketch.quantile(q), 2) for q in quantiles})
+        records.append(record)
+    table = pd.DataFrame(records)
+    return table.drop(columns="payer") if by is None else table
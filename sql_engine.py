@@ -0,0 +1,468 @@
+import sqlite3
+from typing import Dict, Iterator, List, Literal, Optional, Tuple
+
+import numpy as np
+
+## Roster column -> `std_member_info` column (in `std_member_info` order)
+STD_COLUMN_MAPPER = {
+    "Person_Id": "member_id",
+    "First_Name": "member_first_name",
+    "Last_Name": "member_last_name",
+    "Dob": "date_of_birth",
+    "Street_Address": "main_address",
+    "State": "state",
+    "City": "city",
+    "Zip": "zip_code",
+    "eligibility_start_date": "eligibility_start_date",
+    "eligibility_end_date": "eligibility_end_date",
+    "payer": "payer",
+}
+STD_MEMBER_COLUMN = tuple(STD_COLUMN_MAPPER.values())
+## Every roster column - a null in any of them drops the row (`dropna()` in the pandas engine)
+ROSTER_COLUMN = tuple(STD_COLUMN_MAPPER) + ("Age", "Gender")
+DATE_COLUMN = ("Dob", "eligibility_start_date", "eligibility_end_date")
+## Date formats found in the rosters, normalized to the first one
+INPUT_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y")
+## `validate_data()`'s name rule - letters separated by single `[ .'-]` characters
+NAME_PATTERN = r"[A-Za-z]+([ .'\-][A-Za-z]+)*"
+
+STATE_LOOKUP_TABLE = "state_lookup"
+ISO_DATE_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"
+US_DATE_GLOB = "[0-9]*/[0-9]*/[0-9][0-9][0-9][0-9]"
+
+StateMode = Literal["full", "abbreviation", "unparsed"]
+
+
+def quote(identifier: str) -> str:
+    """Quote a SQLite identifier"""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def normalize_date_sql(column: str) -> str:
+    """
+    SQL expression normalizing a TEXT date column into `%Y-%m-%d`
+
+    Parameters
+    ----------
+    column : str
+        Quoted column reference
+
+    Returns
+    -------
+    str
+        Expression yielding `%Y-%m-%d`, or NULL when the value is not a valid date
+
+    Notes
+    -----
+    * Handles `%Y-%m-%d` and `%m/%d/%Y` (unpadded month/day allowed) - the formats found in the rosters
+    * Impossible calendar dates (e.g. `2025-02-30`) become NULL, like `errors="coerce"` in `parse_date()`
+    """
+    month = f"CAST(substr({column}, 1, instr({column}, '/') - 1) AS INTEGER)"
+    rest = f"substr({column}, instr({column}, '/') + 1)"
+    day = f"CAST(substr({rest}, 1, instr({rest}, '/') - 1) AS INTEGER)"
+    year = f"CAST(substr({column}, -4) AS INTEGER)"
+    candidate = (
+        f"(CASE WHEN {column} GLOB '{ISO_DATE_GLOB}' THEN {column} "
+        f"WHEN {column} GLOB '{US_DATE_GLOB}' THEN printf('%04d-%02d-%02d', {year}, {month}, {day}) END)"
+    )
+    return f"(CASE WHEN date({candidate}, '+0 days') = {candidate} THEN {candidate} END)"
+
+
+def name_rule_sql(column: str) -> str:
+    """
+    SQL predicate equivalent to `validate_data()`'s name regex `^[A-Za-z]+([ .'\\-][A-Za-z]+)*$`
+
+    Letters separated by single `[ .'-]` characters, starting & ending with a letter.
+    """
+    return (
+        f"(typeof({column}) = 'text' "
+        f"AND ({column} GLOB '[A-Za-z]' OR {column} GLOB '[A-Za-z]*[A-Za-z]') "
+        f"AND {column} NOT GLOB '*[^A-Za-z .''-]*' "
+        f"AND {column} NOT GLOB '*[ .''-][ .''-]*')"
+    )
+
+
+def digit_rule_sql(column: str, length: Optional[int] = None) -> str:
+    """SQL predicate for a non-empty TEXT value of digits only (optionally of exact `length`)"""
+    length_rule = f"length({column}) = {length}" if length else f"{column} <> ''"
+    return f"(typeof({column}) = 'text' AND {length_rule} AND {column} NOT GLOB '*[^0-9]*')"
+
+
+def validation_rules(alias: str = "r") -> Dict[str, str]:
+    """
+    Row-level SQL predicates mirroring `validate_data()` (True = valid)
+
+    Parameters
+    ----------
+    alias : str, optional
+        Alias of the roster table in the query, by default "r"
+
+    Returns
+    -------
+    Dict[str, str]
+        Roster column -> predicate; `payer` is only a warning and not included
+    """
+    col = lambda name: f"{alias}.{quote(name)}"
+    states = (
+        f"(SELECT lower(abbreviation) FROM {STATE_LOOKUP_TABLE} "
+        f"UNION SELECT lower(name) FROM {STATE_LOOKUP_TABLE})"
+    )
+    return {
+        "Person_Id": digit_rule_sql(col("Person_Id"), length=8),
+        "First_Name": name_rule_sql(col("First_Name")),
+        "Last_Name": name_rule_sql(col("Last_Name")),
+        "Dob": f"{normalize_date_sql(col('Dob'))} IS NOT NULL",
+        "Age": digit_rule_sql(col("Age")),
+        "Gender": f"{col('Gender')} IN ('Male', 'Female')",
+        "State": f"lower({col('State')}) IN {states}",
+        "City": name_rule_sql(col("City")),
+        "Zip": digit_rule_sql(col("Zip"), length=5),
+        "eligibility_start_date": f"{normalize_date_sql(col('eligibility_start_date'))} IS NOT NULL",
+        "eligibility_end_date": f"{normalize_date_sql(col('eligibility_end_date'))} IS NOT NULL",
+    }
+
+
+def not_null_sql(alias: str = "r") -> str:
+    """SQL predicate dropping rows with a null in any roster column"""
+    return " AND ".join(f"{alias}.{quote(col)} IS NOT NULL" for col in ROSTER_COLUMN)
+
+
+def valid_sql(alias: str = "r") -> str:
+    """SQL predicate keeping only rows that pass every `validation_rules()` predicate"""
+    return " AND ".join(f"({rule})" for rule in validation_rules(alias).values())
+
+
+def table_columns(conn: sqlite3.Connection, table: str, schema: str = "main") -> List[str]:
+    """Column names of `schema.table`"""
+    return [row[1] for row in conn.execute(f"PRAGMA {quote(schema)}.table_info({quote(table)});")]
+
+
+def table_chunks(conn: sqlite3.Connection, table: str, chunk_rows: int, skip_rows: int = 0,
+                 schema: str = "main") -> Iterator[Tuple[List[str], List[tuple]]]:
+    """
+    (column names, rows) of `schema.table` in rowid order, `chunk_rows` rows at a time
+
+    Each chunk is its own fully-read query (keyset on rowid), so no statement stays open between
+    chunks - unlike a cursor read with `fetchmany()`, during which SQLite refuses `DROP TABLE`
+    ("database table is locked") to the consumer of the chunks.
+    """
+    columns = table_columns(conn, table, schema)
+    source, selected = f"{quote(schema)}.{quote(table)}", ", ".join(map(quote, columns))
+    query = f"SELECT rowid, {selected} FROM {source} WHERE rowid > ? ORDER BY rowid LIMIT ?;"
+    after = conn.execute(f"SELECT MIN(rowid) - 1 FROM {source};").fetchone()[0]
+    if skip_rows:
+        row = conn.execute(f"SELECT rowid FROM {source} ORDER BY rowid LIMIT 1 OFFSET ?;", (skip_rows - 1,)).fetchone()
+        if row is None:
+            return
+        after = row[0]
+    while after is not None:
+        rows = conn.execute(query, (after, chunk_rows)).fetchall()
+        if not rows:
+            return
+        after = rows[-1][0]
+        yield columns, [row[1:] for row in rows]
+
+
+## Row identity of the tables kept in step with `std_member_info`. Every write puts the rows already
+## stored first (union-write) and `dedup` keeps first occurrences, so a rowid names the same row for as
+## long as the table is only appended to - `rowids_unchanged()` tells such an append from a rewrite
+## (overwrite, or rows dropped). Row-for-row mirrors (`derived`, `star_schema`, `member_search`) are
+## keyed by rowid and rebuilt on a rewrite. Aggregates (`member_month`, `member_cube`, `member_scores`)
+## can't take a row back out by rowid, so they record the content digest (`bloom.row_digests()`) of
+## every row applied: `unseen_digests()` finds the rows to add, `DigestSet` the rows to subtract.
+def rowids_unchanged(conn: sqlite3.Connection, table: str, rows: int, max_rowid: Optional[int]) -> bool:
+    """True if the `rows` rows `table` held up to `max_rowid` are all still there - it was only appended to since"""
+    return max_rowid is not None and \
+        conn.execute(f"SELECT COUNT(*) FROM {quote(table)} WHERE rowid <= ?;", (max_rowid,)).fetchone()[0] == rows
+
+
+def unseen_digests(conn: sqlite3.Connection, digests: np.ndarray, applied_table: str) -> np.ndarray:
+    """
+    Positions of the digests missing from `applied_table.row_digest` - first occurrence of each, in order
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    digests : np.ndarray
+        int64 row digests (first 64 bits of `bloom.row_digests()`), one per candidate row
+    applied_table : str
+        Table whose `row_digest` column holds the digests of the rows already applied
+
+    Returns
+    -------
+    np.ndarray
+        Positions into `digests` of the rows to apply
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.digest_candidates;")
+    conn.execute("CREATE TEMP TABLE digest_candidates (position INTEGER, row_digest INTEGER);")
+    conn.executemany("INSERT INTO temp.digest_candidates VALUES (?, ?);",
+                     zip(range(len(digests)), np.asarray(digests, dtype=np.int64).tolist()))
+    positions = np.array([row[0] for row in conn.execute(
+        f"SELECT MIN(position) FROM temp.digest_candidates WHERE row_digest NOT IN (SELECT row_digest FROM {quote(applied_table)}) "
+        "GROUP BY row_digest ORDER BY 1;"
+    )], dtype=np.int64)
+    conn.execute("DROP TABLE temp.digest_candidates;")
+    return positions
+
+
+class DigestSet:
+    """
+    Digests of a table read in chunks (`temp.digest_set`), to find the applied rows no longer in it
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    """
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        conn.execute("DROP TABLE IF EXISTS temp.digest_set;")
+        conn.execute("CREATE TEMP TABLE digest_set (row_digest INTEGER PRIMARY KEY);")
+
+    def add(self, digests: np.ndarray) -> None:
+        self.conn.executemany("INSERT OR IGNORE INTO temp.digest_set VALUES (?);",
+                              ((d,) for d in np.asarray(digests, dtype=np.int64).tolist()))
+
+    def vanished(self, applied_table: str) -> np.ndarray:
+        """Digests in `applied_table.row_digest` never `add()`ed - drops the set"""
+        vanished = np.array([row[0] for row in self.conn.execute(
+            f"SELECT row_digest FROM {quote(applied_table)} WHERE row_digest NOT IN (SELECT row_digest FROM temp.digest_set);"
+        )], dtype=np.int64)
+        self.conn.execute("DROP TABLE temp.digest_set;")
+        return vanished
+
+
+def load_state_lookup(conn: sqlite3.Connection, state_mapper: Dict[str, str]) -> None:
+    """
+    Load `STATE_MAPPER` into a temporary `state_lookup(abbreviation, name)` table
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection the engine runs on
+    state_mapper : Dict[str, str]
+        Abbreviation -> full state name
+    """
+    conn.execute(f"DROP TABLE IF EXISTS temp.{STATE_LOOKUP_TABLE};")
+    conn.execute(f"CREATE TEMP TABLE {STATE_LOOKUP_TABLE} (abbreviation TEXT PRIMARY KEY, name TEXT NOT NULL);")
+    conn.executemany(f"INSERT INTO temp.{STATE_LOOKUP_TABLE} VALUES (?, ?);", state_mapper.items())
+
+
+def detect_state_mode(conn: sqlite3.Connection, table: str, schema: str = "main") -> StateMode:
+    """
+    Decide how a roster's `State` column is parsed, exactly like `parse_state()`
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection with `state_lookup` loaded
+    table : str
+        Roster table
+    schema : str, optional
+        Database schema holding `table`, by default "main"
+
+    Returns
+    -------
+    StateMode
+        "full" - every state is a full name (kept), "abbreviation" - every state is an abbreviation (mapped),
+        "unparsed" - mixed/unknown values (`parse_state()` fails and keeps them as-is)
+    """
+    full_names, abbreviations, total = conn.execute(f"""
+        SELECT
+            SUM(lower(r.State) IN (SELECT lower(name) FROM {STATE_LOOKUP_TABLE})),
+            SUM(r.State IN (SELECT abbreviation FROM {STATE_LOOKUP_TABLE})),
+            COUNT(*)
+        FROM {quote(schema)}.{quote(table)} AS r
+        WHERE {not_null_sql()};
+    """).fetchone()
+    if total == 0 or full_names == total:
+        return "full"
+    if abbreviations == total:
+        return "abbreviation"
+    return "unparsed"
+
+
+def normalized_roster_sql(conn: sqlite3.Connection, table: str, schema: str = "main",
+                          where: Optional[str] = None) -> str:
+    """
+    SELECT statement normalizing one roster table into `std_member_info` columns
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection with `state_lookup` loaded
+    table : str
+        Roster table
+    schema : str, optional
+        Database schema holding `table`, by default "main"
+    where : str, optional
+        Extra predicate on the raw roster row (alias `r`)
+
+    Returns
+    -------
+    str
+        SELECT with nulls dropped, dates normalized, states mapped & columns renamed
+    """
+    state_mode = detect_state_mode(conn, table, schema=schema)
+    if state_mode == "abbreviation":
+        state = f"(SELECT name FROM {STATE_LOOKUP_TABLE} WHERE abbreviation = r.State)"
+    else:
+        state = "r.State"
+
+    select = []
+    for roster_col, std_col in STD_COLUMN_MAPPER.items():
+        if roster_col == "State":
+            expression = state
+        elif roster_col in DATE_COLUMN:
+            expression = normalize_date_sql(f"r.{quote(roster_col)}")
+        else:
+            expression = f"r.{quote(roster_col)}"
+        select.append(f"{expression} AS {quote(std_col)}")
+
+    predicate = not_null_sql() + (f" AND ({where})" if where else "")
+    return f"SELECT {', '.join(select)} FROM {quote(schema)}.{quote(table)} AS r WHERE {predicate}"
+
+
+def create_member_table(conn: sqlite3.Connection, table_name: str = "std_member_info") -> None:
+    """Create `std_member_info` with the TEXT layout `to_sql()` produces, if missing"""
+    columns = ", ".join(f"{quote(col)} TEXT" for col in STD_MEMBER_COLUMN)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {quote(table_name)} ({columns});")
+
+
+def invalid_counts(conn: sqlite3.Connection, table: str, schema: str = "main") -> Dict[str, int]:
+    """
+    Count rows violating each `validation_rules()` predicate, in place
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection with `state_lookup` loaded
+    table : str
+        Roster table
+    schema : str, optional
+        Database schema holding `table`, by default "main"
+
+    Returns
+    -------
+    Dict[str, int]
+        Roster column -> number of non-null rows failing its rule
+    """
+    rules = validation_rules()
+    counts = ", ".join(f"SUM(NOT {rule})" for rule in rules.values())
+    row = conn.execute(
+        f"SELECT {counts} FROM {quote(schema)}.{quote(table)} AS r WHERE {not_null_sql()};"
+    ).fetchone()
+    return {col: int(count or 0) for col, count in zip(rules, row)}
+
+
+def invalid_rows_sql(table: str, schema: str = "main") -> str:
+    """
+    SELECT statement returning only the rows of a roster that fail validation
+
+    Parameters
+    ----------
+    table : str
+        Roster table
+    schema : str, optional
+        Database schema holding `table`, by default "main"
+
+    Returns
+    -------
+    str
+        Failing rows (all roster columns) plus a `failed_rules` column listing the failed checks
+    """
+    rules = validation_rules()
+    failed_rules = " || ".join(
+        f"(CASE WHEN NOT {rule} THEN '{col},' ELSE '' END)" for col, rule in rules.items()
+    )
+    return (
+        f"SELECT r.*, rtrim({failed_rules}, ',') AS failed_rules "
+        f"FROM {quote(schema)}.{quote(table)} AS r WHERE {not_null_sql()} AND NOT ({valid_sql()});"
+    )
+
+
+def null_row_count(conn: sqlite3.Connection, table: str, schema: str = "main") -> int:
+    """Number of rows with a null in any roster column (dropped before validation)"""
+    return conn.execute(
+        f"SELECT COUNT(*) FROM {quote(schema)}.{quote(table)} AS r WHERE NOT ({not_null_sql()});"
+    ).fetchone()[0]
+
+
+def run_sql_engine(
+    conn: sqlite3.Connection, tables: List[str], state_mapper: Dict[str, str],
+    window: Tuple[str, str], table_name: str = "std_member_info",
+    overwrite: bool = False, schema: str = "main", valid_only: bool = False
+    ) -> Dict[str, int]:
+    """
+    Normalize, dedupe, window-filter & merge roster tables into `table_name` entirely inside SQLite
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the target database
+    tables : List[str]
+        Roster tables to merge
+    state_mapper : Dict[str, str]
+        Abbreviation -> full state name (`STATE_MAPPER`)
+    window : Tuple[str, str]
+        Inclusive eligibility window as `%Y-%m-%d` strings
+    table_name : str, optional
+        Target table, by default "std_member_info"
+    overwrite : bool, optional
+        Replace the target table instead of union-writing, by default False
+    schema : str, optional
+        Database schema holding the roster tables (e.g. an ATTACHed source), by default "main"
+    valid_only : bool, optional
+        Merge only rows passing every `validation_rules()` predicate, by default False
+            (the pandas engine validates per table and merges regardless)
+
+    Returns
+    -------
+    Dict[str, int]
+        `existing_rows`, `added_rows` & `final_rows` of `table_name`
+
+    Notes
+    -----
+    * Runs in one transaction - rows never leave SQLite
+    * Matches the pandas engine (`parse_date()`, `parse_state()`, `drop_duplicates()`, window filter,
+        `write_to_db()`) for the `%Y-%m-%d` & `%m/%d/%Y` date formats found in the rosters
+    """
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None ## Manual transaction control
+    try:
+        conn.execute("BEGIN;")
+        load_state_lookup(conn, state_mapper)
+
+        if overwrite:
+            conn.execute(f"DROP TABLE IF EXISTS {quote(table_name)};")
+        create_member_table(conn, table_name)
+        existing_rows = conn.execute(f"SELECT COUNT(*) FROM {quote(table_name)};").fetchone()[0]
+
+        columns = ", ".join(quote(col) for col in STD_MEMBER_COLUMN)
+        if tables:
+            where = valid_sql() if valid_only else None
+            union = " UNION ALL ".join(
+                normalized_roster_sql(conn, tab, schema=schema, where=where) for tab in tables
+            )
+            conn.execute(f"""
+                INSERT INTO {quote(table_name)} ({columns})
+                SELECT DISTINCT {columns} FROM ({union})
+                WHERE eligibility_start_date <= ? AND eligibility_end_date >= ?
+                EXCEPT
+                SELECT {columns} FROM {quote(table_name)};
+            """, (window[1], window[0]))
+
+        final_rows = conn.execute(f"SELECT COUNT(*) FROM {quote(table_name)};").fetchone()[0]
+        conn.execute("COMMIT;")
+    except Exception:
+        conn.execute("ROLLBACK;")
+        raise
+    finally:
+        conn.isolation_level = isolation_level
+
+    return {
+        "existing_rows": existing_rows,
+        "added_rows": final_rows - existing_rows,
+        "final_rows": final_rows,
+    }
@@ -0,0 +1,260 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sql_engine import quote, rowids_unchanged
+
+MEMBER_TABLE = "std_member_info"
+FACT_TABLE = "fact_member"
+COMPAT_VIEW = "std_member_info_star" ## `std_member_info`'s columns over the star schema (named `std_member_info` in an export)
+STAR_RUN_TABLE = "star_schema_run" ## One row: the source rows covered by `FACT_TABLE`
+## `std_member_info` column -> dimension table, each a dictionary of its distinct values
+DIMENSIONS = {
+    "state": "dim_state",
+    "city": "dim_city",
+    "payer": "dim_payer",
+    "zip_code": "dim_zip",
+}
+## Keys indexed on `FACT_TABLE` - the few-valued filters; a key index costs about what its strings saved
+INDEXED_KEYS = ("state", "payer")
+CHUNK_ROWS = 100_000 ## `std_member_info` rows encoded at a time
+
+
+def key_column(column: str) -> str:
+    """Surrogate key column of a dimension, e.g. `zip_code` -> `zip_code_key`"""
+    return f"{column}_key"
+
+
+class KeyDictionaries:
+    """
+    Value -> integer key of every dimension, loaded once and kept in memory for the whole run
+
+    New values get the next key and are written to their dimension table as they are seen, so
+    keys never change once assigned - a rebuilt fact table keeps the same keys. Chunks are encoded
+    with one `pd.factorize()` each: only their distinct values touch the dictionaries.
+    """
+
+    def __init__(self, keys: Dict[str, Dict[str, int]]):
+        self.keys = keys
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> "KeyDictionaries":
+        create_dimensions(conn)
+        return cls({column: dict(conn.execute(f"SELECT {quote(column)}, {key_column(column)} FROM {quote(table)};").fetchall())
+                    for column, table in DIMENSIONS.items()})
+
+    def encode(self, conn: sqlite3.Connection, column: str, values: Iterable) -> np.ndarray:
+        """
+        Keys of `values` (a dimension column), missing values -> -1 - unseen values are added to the dimension
+
+        Returns
+        -------
+        np.ndarray
+            int64 keys, same length as `values`
+        """
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        keys = self.keys[column]
+        new = [value for value in uniques.tolist() if value not in keys]
+        if new:
+            first = max(keys.values(), default=0) + 1
+            conn.executemany(f"INSERT INTO {quote(DIMENSIONS[column])} VALUES (?, ?);",
+                             ((first + i, value) for i, value in enumerate(new)))
+            keys.update(zip(new, range(first, first + len(new))))
+        lookup = np.fromiter((keys[value] for value in uniques.tolist()), dtype=np.int64, count=len(uniques))
+        return np.where(codes >= 0, lookup[codes] if len(lookup) else -1, -1)
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self.keys.values())
+
+
+def create_dimensions(conn: sqlite3.Connection, types: Optional[Dict[str, str]] = None) -> None:
+    """`dim_*` tables - values keep the declared type of their source column (`types`, by default TEXT)"""
+    for column, table in DIMENSIONS.items():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {quote(table)} ({key_column(column)} INTEGER PRIMARY KEY, "
+                     f"{quote(column)} {(types or {}).get(column) or 'TEXT'} NOT NULL UNIQUE);")
+
+
+def fact_columns(columns: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """(name, declared type) of `FACT_TABLE` for `std_member_info` columns - dimension columns become INTEGER keys"""
+    return [(key_column(name), "INTEGER") if name in DIMENSIONS else (name, kind) for name, kind in columns]
+
+
+def create_tables(conn: sqlite3.Connection, columns: List[Tuple[str, str]], view: str = COMPAT_VIEW) -> None:
+    """Dimensions, `FACT_TABLE` (one row per source rowid) & the compatibility view exposing `columns`"""
+    create_dimensions(conn, dict(columns))
+    fact = ", ".join(f"{quote(name)} {kind}".rstrip() for name, kind in fact_columns(columns))
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {quote(FACT_TABLE)} (member_rowid INTEGER PRIMARY KEY, {fact});")
+    for column in INDEXED_KEYS:
+        if column in dict(columns):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {quote(f'{FACT_TABLE}_{key_column(column)}')} "
+                         f"ON {quote(FACT_TABLE)} ({key_column(column)});")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {quote(STAR_RUN_TABLE)} (rows INTEGER, max_rowid INTEGER, columns TEXT);")
+    create_view(conn, [name for name, _ in columns], view)
+
+
+def create_view(conn: sqlite3.Connection, columns: List[str], view: str = COMPAT_VIEW) -> None:
+    """`view` = `FACT_TABLE` joined back to its dimensions, with exactly `columns` in their order"""
+    selected, joins = [], []
+    for name in columns:
+        if name in DIMENSIONS:
+            alias = DIMENSIONS[name]
+            selected.append(f"{quote(alias)}.{quote(name)} AS {quote(name)}")
+            joins.append(f"LEFT JOIN {quote(alias)} USING ({key_column(name)})")
+        else:
+            selected.append(f"f.{quote(name)}")
+    conn.execute(f"DROP VIEW IF EXISTS {quote(view)};")
+    conn.execute(f"CREATE VIEW {quote(view)} AS SELECT {', '.join(selected)} FROM {quote(FACT_TABLE)} AS f {' '.join(joins)};")
+
+
+def source_columns(conn: sqlite3.Connection, table_name: str) -> List[Tuple[str, str]]:
+    return [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({quote(table_name)});")]
+
+
+def build(conn: sqlite3.Connection, table_name: str = MEMBER_TABLE, dictionaries: Optional[KeyDictionaries] = None,
+          rebuild: bool = False, chunk_rows: int = CHUNK_ROWS) -> Dict:
+    """
+    Mirror `table_name` into the star schema: dictionary-encoded dimensions & a slim `FACT_TABLE`
+
+    State, city, payer & zip strings are stored once in their `dim_*` table; fact rows carry
+    their integer keys (`INDEXED_KEYS` indexed) and the member's own columns. `COMPAT_VIEW` joins them back
+    into `std_member_info`'s columns. When rows were only appended since the last build, only
+    the new rows are encoded; a changed column set or `rebuild` (after an overwrite - rowids
+    alone can't tell a replaced table from an appended one) re-encodes every row.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    table_name : str, optional
+        Source table, by default `MEMBER_TABLE`
+    dictionaries : KeyDictionaries, optional
+        Key dictionaries to reuse across calls of the same run, by default loaded from the dimensions
+    rebuild : bool, optional
+        Re-encode every row, by default False
+    chunk_rows : int, optional
+        Rows encoded at a time, by default `CHUNK_ROWS`
+
+    Returns
+    -------
+    Dict
+        `rows` (in the table), `encoded_rows`, `rebuilt`, `dimension_values` & per-phase `seconds`
+    """
+    seconds = {"read": 0.0, "encode": 0.0, "write": 0.0}
+    columns = source_columns(conn, table_name)
+    if not columns:
+        raise KeyError(f"Table not found: {table_name}")
+    signature = ",".join(f"{name} {kind}" for name, kind in columns)
+    rows, max_rowid = conn.execute(f"SELECT COUNT(*), MAX(rowid) FROM {quote(table_name)};").fetchone()
+
+    last = None
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?;", (STAR_RUN_TABLE,)).fetchone():
+        last = conn.execute(f"SELECT rows, max_rowid, columns FROM {quote(STAR_RUN_TABLE)};").fetchone()
+    appended = not rebuild and last is not None and last[2] == signature and rowids_unchanged(conn, table_name, last[0], last[1])
+    if not appended:
+        conn.execute(f"DROP TABLE IF EXISTS {quote(FACT_TABLE)};")
+    create_tables(conn, columns)
+    dictionaries = dictionaries or KeyDictionaries.load(conn)
+
+    names = [name for name, _ in columns]
+    query = (f"SELECT rowid, {', '.join(map(quote, names))} FROM {quote(table_name)} "
+             f"WHERE rowid > ? ORDER BY rowid LIMIT ?;")
+    insert = f"INSERT INTO {quote(FACT_TABLE)} VALUES (?{', ?' * len(names)});"
+    after, encoded_rows = (last[1] if appended else -1), 0
+    while after is not None:
+        start = time.perf_counter()
+        chunk = conn.execute(query, (after, chunk_rows)).fetchall()
+        seconds["read"] += time.perf_counter() - start
+        if not chunk:
+            break
+        after = chunk[-1][0]
+
+        start = time.perf_counter()
+        values = list(zip(*chunk))
+        for position, name in enumerate(names, start=1):
+            if name in DIMENSIONS:
+                keys = dictionaries.encode(conn, name, values[position])
+                values[position] = [None if key < 0 else key for key in keys.tolist()]
+        seconds["encode"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        conn.executemany(insert, zip(*values))
+        seconds["write"] += time.perf_counter() - start
+        encoded_rows += len(chunk)
+
+    conn.execute(f"DELETE FROM {quote(STAR_RUN_TABLE)};")
+    conn.execute(f"INSERT INTO {quote(STAR_RUN_TABLE)} VALUES (?, ?, ?);", (rows, max_rowid, signature))
+    conn.commit()
+    return {"rows": rows, "encoded_rows": encoded_rows, "rebuilt": not appended,
+            "dimension_values": {table: len(dictionaries.keys[column]) for column, table in DIMENSIONS.items()},
+            "seconds": seconds}
+
+
+def export(conn: sqlite3.Connection, path: str) -> None:
+    """
+    Write only the star schema to a new database at `path`, with `std_member_info` as its compatibility view
+
+    Readers of `std_member_info` (`report.py`, the notebook) work on the export unchanged, at a
+    fraction of the file size. Build the schema first (`build()`).
+    """
+    columns = source_columns(conn, COMPAT_VIEW)
+    if not columns:
+        raise KeyError(f"No star schema to export - build it first ({COMPAT_VIEW} not found)")
+    source = conn.execute("PRAGMA database_list;").fetchone()[2]
+    if not source:
+        raise ValueError("Only a file-backed database can be exported")
+    if os.path.exists(path):
+        raise FileExistsError(f"Export target exists: {path}")
+    member_columns = source_columns(conn, FACT_TABLE)[1:]
+    indexed = {key_column(name) for name in INDEXED_KEYS}
+    with sqlite3.connect(path) as target:
+        create_dimensions(target, {name: kind for name, kind in source_columns(conn, MEMBER_TABLE)})
+        fact = ", ".join(f"{quote(name)} {kind}".rstrip() for name, kind in member_columns)
+        target.execute(f"CREATE TABLE {quote(FACT_TABLE)} (member_rowid INTEGER PRIMARY KEY, {fact});")
+        for name, _ in member_columns:
+            if name in indexed:
+                target.execute(f"CREATE INDEX {quote(f'{FACT_TABLE}_{name}')} ON {quote(FACT_TABLE)} ({name});")
+        target.execute("ATTACH DATABASE ? AS source;", (source,))
+        for table in [*DIMENSIONS.values(), FACT_TABLE]:
+            target.execute(f"INSERT INTO main.{quote(table)} SELECT * FROM source.{quote(table)};")
+        target.commit()
+        target.execute("DETACH DATABASE source;")
+        create_view(target, [name for name, _ in columns], view=MEMBER_TABLE)
+        target.commit()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Mirror std_member_info into integer-keyed dim_state / dim_city / dim_payer / dim_zip tables and a slim fact_member table."
+    )
+    parser.add_argument(
+        "-db", "--database",
+        required=True,
+        help="Path to .db file"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Encode every row again, e.g. after std_member_info was overwritten"
+    )
+    parser.add_argument(
+        "--export",
+        metavar="PATH",
+        help="Also write the star schema alone to a new .db, with std_member_info as a view over it"
+    )
+    args = parser.parse_args()
+    with sqlite3.connect(args.database) as conn:
+        try:
+            stats = build(conn, rebuild=args.rebuild)
+            if args.export:
+                export(conn, args.export)
+        except (KeyError, ValueError, FileExistsError) as error:
+            sys.exit(f"star_schema: {error.args[0]}")
+    print(f"{stats['encoded_rows']:,} of {stats['rows']:,} row(s) encoded ({'rebuilt' if stats['rebuilt'] else 'appended'}), "
+          + ", ".join(f"{table} {count:,}" for table, count in stats["dimension_values"].items()))
@@ -0,0 +1,66 @@
+import sqlite3
+from typing import Any, Dict, Iterable, Optional
+
+import pandas as pd
+
+import interval_index
+import member_cube
+import member_month
+import member_scores
+import member_search
+import sketches
+from sql_engine import table_chunks
+
+CHUNK_ROWS = 100_000 ## Added rows read back at a time when the writer does not hold them in pandas
+
+
+def sync_derived(conn: sqlite3.Connection, table_name: str = "std_member_info", added: Optional[pd.DataFrame] = None,
+                 restart: bool = False, skip_rows: int = 0) -> Dict[str, Any]:
+    """
+    Bring the indexes, aggregates & sketches kept in step with `table_name` up to date after a write
+
+    Every writer of `table_name` calls this once it committed. Only the rows the write added are
+    read: `added` when the writer holds them in pandas, otherwise every row after the first
+    `skip_rows` (rowid order - writes keep the rows already stored first, see "Row identity" in
+    `sql_engine`), read back in `CHUNK_ROWS` chunks. When the write started the table over
+    (`restart`), the indexes & `member_month` are rebuilt, the cube & scores are moved to the
+    whole table (subtracting the rows it dropped) and earlier sketch runs are dropped.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the member database
+    table_name : str, optional
+        Table just written, by default "std_member_info"
+    added : pd.DataFrame, optional
+        Rows the write added - the whole table when `restart`, by default None (read from `table_name`)
+    restart : bool, optional
+        The write overwrote `table_name` or created it, by default False
+    skip_rows : int, optional
+        Rows `table_name` held before the write, ignored with `added` or `restart`, by default 0
+
+    Returns
+    -------
+    Dict[str, Any]
+        `interval_index` & `member_search` index states, `member_month`, `member_cube` &
+        `member_scores` statistics, and the `sketches` run id
+    """
+    def rows() -> Iterable[pd.DataFrame]:
+        if added is not None:
+            return [added]
+        return (pd.DataFrame.from_records(chunk, columns=columns, coerce_float=True)
+                for columns, chunk in table_chunks(conn, table_name, CHUNK_ROWS, skip_rows=0 if restart else skip_rows))
+
+    stats = {
+        "interval_index": interval_index.sync_index(conn, table_name, rebuild=restart),
+        "member_search": member_search.sync_index(conn, table_name, rebuild=restart),
+        "member_month": member_month.update(conn, rows(), rebuild=restart),
+    }
+    if restart: ## Counts left from the replaced table are subtracted, not rebuilt
+        stats["member_cube"] = member_cube.sync(conn, rows())
+        stats["member_scores"] = member_scores.sync(conn, rows())
+    else:
+        stats["member_cube"] = member_cube.update(conn, added=rows())
+        stats["member_scores"] = member_scores.update(conn, added=rows())
+    stats["sketches"] = sketches.record_run(conn, rows(), reset=restart)
+    return stats
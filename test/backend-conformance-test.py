@@ -0,0 +1,92 @@
+import contextlib
+import io
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import ingestion
+from synthetic_rosters import make_rosters, write_roster_db
+
+## Configuration name -> `ingestion.main()` keywords, the first one is the reference
+BACKENDS = {
+    "pandas": {"backend": "pandas"},
+    "pandas --max-memory": {"backend": "pandas", "max_memory": "64KB"}, ## Forces the partitioned spill
+    "pandas --bloom": {"backend": "pandas", "bloom_error_rate": 0.01},
+    "pandas --attach": {"backend": "pandas", "attach": True}, ## Only the `.db` step is attached, other sources read as usual
+}
+try:
+    import duckdb # noqa: F401
+    BACKENDS["duckdb"] = {"backend": "duckdb"}
+except ImportError:
+    print("SKIP duckdb backend (duckdb not installed)")
+
+
+def read_member_table(db_path: Path) -> pd.DataFrame:
+    """`std_member_info` in a canonical row order for comparison"""
+    with sqlite3.connect(db_path) as conn:
+        data = pd.read_sql_query("SELECT * FROM std_member_info;", conn)
+    return data.sort_values(list(data.columns)).reset_index(drop=True)
+
+
+def ingest(config: dict, db_path: Path, source_file: Path, workdir: Path, overwrite: bool = False) -> None:
+    """Run `ingestion.main()` on a copy of `source_file` (non-`.db` sources get moved away)"""
+    source_copy = workdir / f"copy-{source_file.name}"
+    shutil.copy(source_file, source_copy)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ingestion.main(db_path=str(db_path), source_file=str(source_copy), processed_dump=str(workdir),
+                       failed_dump=str(workdir), verbose=True, overwrite=overwrite, **config)
+
+
+if __name__ == "__main__":
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        rosters = make_rosters(3_000, seed=7)
+
+        ## Batch 1: multi-roster `.db` (date formats, state abbreviations, shuffled columns)
+        source_db = tmp / "source.db"
+        write_roster_db(str(source_db), rosters)
+
+        ## Batch 2: CSV re-sending part of batch 1 plus new members
+        source_csv = tmp / "batch.csv"
+        pd.concat([rosters["roster_3"].sample(frac=0.5, random_state=0),
+                   make_rosters(500, n_rosters=1, seed=8)["roster_1"]]).to_csv(source_csv, index=False)
+
+        ## Batch 3: `.db` re-sending part of batch 1 plus new members, union-written
+        source_db_update = tmp / "update.db"
+        write_roster_db(str(source_db_update), {"roster_2": rosters["roster_2"].sample(frac=0.5, random_state=1),
+                                                "roster_6": make_rosters(300, n_rosters=1, seed=9)["roster_1"]})
+
+        ## Batch 4: Parquet overwrite
+        source_parquet = tmp / "batch.parquet"
+        rosters["roster_1"].to_parquet(source_parquet, index=False)
+
+        steps = [
+            ("db", source_db, False),
+            ("csv union-write", source_csv, False),
+            ("db union-write", source_db_update, False),
+            ("parquet overwrite", source_parquet, True),
+        ]
+        results = {backend: [] for backend in BACKENDS}
+        for idx, (backend, config) in enumerate(BACKENDS.items()):
+            db_path = tmp / f"backend-{idx}.db"
+            for _, source_file, overwrite in steps:
+                ingest(config, db_path, source_file, tmp, overwrite=overwrite)
+                results[backend].append(read_member_table(db_path))
+
+        for backend in list(BACKENDS)[1:]:
+            for step, (name, _, _) in enumerate(steps):
+                expected, actual = results["pandas"][step], results[backend][step]
+                ok = expected.equals(actual)
+                failures += not ok
+                print(f"{'PASS' if ok else 'FAIL'} {backend} == pandas after {name} "
+                      f"({len(actual)} vs {len(expected)} rows)")
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,90 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import derived
+import report
+from synthetic_rosters import make_members, std_layout
+
+AS_OF = pd.Timestamp("2025-06-01")
+
+
+def expected_age(dob: str) -> int:
+    born = pd.Timestamp(dob)
+    return AS_OF.year - born.year - ((AS_OF.month, AS_OF.day) < (born.month, born.day))
+
+
+if __name__ == "__main__":
+    failures = 0
+
+    ## Edge cases: birthdays on/after the reference date, leap days, band edges, missing & reversed dates
+    data = pd.DataFrame({
+        "date_of_birth": ["2007-06-01", "2007-06-02", "2004-02-29", "1940-01-01", None, "2030-01-01"],
+        "eligibility_start_date": ["2025-01-01", "2025-01-01", "2024-02-28", None, "2025-03-01", "2025-01-31"],
+        "eligibility_end_date": ["2025-01-01", "2025-12-31", "2024-03-01", "2025-01-01", "2025-02-01", "2025-02-01"],
+    })
+    result = derived.derive(data, AS_OF).astype(object)
+    result = result.where(result.notna(), None)
+    ok = result["age"].tolist() == [18, 17, 21, 85, None, None]
+    ok &= result["age_band"].tolist() == ["18-34", "0-17", "18-34", "85+", None, None]
+    ok &= result["eligibility_days"].tolist() == [1, 365, 3, None, None, 2]
+    ok &= derived.band_labels((0, 18, 65)) == ["0-17", "18-64", "65+"]
+    print(f"{'PASS' if ok else 'FAIL'} vectorized age, age band & eligibility days")
+    failures += not ok
+
+    ## bincount histogram == value_counts per group
+    roster = make_members(5_000, seed=8)
+    ages = derived.derive(std_layout(roster), AS_OF)["age"].to_numpy(dtype=float, na_value=np.nan)
+    codes, groups = pd.factorize(roster["State"], sort=True)
+    histogram = derived.age_histogram(ages, codes, n_groups=len(groups))
+    ok = histogram.sum() == len(roster)
+    for i, group in enumerate(groups):
+        counts = pd.Series(ages[codes == i]).astype(int).value_counts()
+        ok &= (histogram[i][counts.index] == counts.to_numpy()).all() and histogram[i].sum() == counts.sum()
+    ok &= derived.age_histogram(np.array([np.nan])).shape == (1, 1)
+    print(f"{'PASS' if ok else 'FAIL'} age histogram by bincount")
+    failures += not ok
+
+    ## Persisted as typed columns: full build, append-only increment, rebuild on a new reference date
+    std = std_layout(roster)
+    with sqlite3.connect(":memory:") as conn:
+        std.iloc[:4_000].to_sql("std_member_info", conn, index=False)
+        stats = derived.build_table(conn, AS_OF)
+        ok = stats["rebuilt"] and stats["derived_rows"] == 4_000 and derived.is_current(conn, AS_OF)
+        std.iloc[4_000:].to_sql("std_member_info", conn, index=False, if_exists="append")
+        ok &= not derived.is_current(conn, AS_OF)
+        stats = derived.build_table(conn, AS_OF)
+        ok &= not stats["rebuilt"] and stats["derived_rows"] == 1_000 and derived.is_current(conn, AS_OF)
+        types = {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({derived.DERIVED_TABLE});")}
+        ok &= types == {"member_rowid": "INTEGER", "age": "INTEGER", "age_band": "INTEGER", "eligibility_days": "INTEGER"}
+        stored = pd.read_sql_query(f"SELECT d.age, m.date_of_birth FROM std_member_info AS m "
+                                   f"JOIN {derived.DERIVED_TABLE} AS d ON d.member_rowid = m.rowid;", conn)
+        ok &= len(stored) == len(std) and (stored["age"] == stored["date_of_birth"].map(expected_age)).all()
+        ok &= not derived.is_current(conn, pd.Timestamp("2026-01-01"))
+        ok &= derived.build_table(conn, pd.Timestamp("2026-01-01"))["rebuilt"]
+        conn.execute("DELETE FROM std_member_info WHERE rowid = 10;")
+        ok &= derived.build_table(conn, pd.Timestamp("2026-01-01"))["rebuilt"]
+        print(f"{'PASS' if ok else 'FAIL'} persisted typed columns, incremental on append")
+        failures += not ok
+
+        ## Reports read the persisted ages when they are current, same summary either way
+        derived.build_table(conn, AS_OF)
+        persisted = report.read_members(conn, ["std_member_info"], ["state"], as_of=AS_OF)
+        ok = "age" in persisted and "age" not in report.read_members(conn, ["std_member_info"], ["state"],
+                                                                      as_of=pd.Timestamp("2026-01-01"))
+        computed = report.summarize(report.read_members(conn, ["std_member_info"], ["state"]), by="state", as_of=AS_OF)
+        ok &= report.summarize(persisted, by="state", as_of=AS_OF).equals(computed)
+        ## Overwritten with as many rows: no longer current, and an incremental build rebuilds
+        std.iloc[::-1].to_sql("std_member_info", conn, index=False, if_exists="replace")
+        ok &= not derived.is_current(conn, AS_OF) and "age" not in report.read_members(conn, ["std_member_info"], ["state"], as_of=AS_OF)
+        ok &= derived.build_table(conn, AS_OF)["rebuilt"] and derived.is_current(conn, AS_OF)
+        print(f"{'PASS' if ok else 'FAIL'} report reads persisted ages")
+        failures += not ok
+
+    sys.exit(1 if failures else 0)
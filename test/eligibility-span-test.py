@@ -0,0 +1,89 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import eligibility
+
+
+def reference_spans(member, start, end) -> list:
+    """Per-member merge of sorted periods, one member at a time"""
+    spans = []
+    for code in sorted(set(member)):
+        current = None
+        for a, b in sorted((a, b) for m, a, b in zip(member, start, end) if m == code and a <= b):
+            if current and a <= current[2] + eligibility.ADJACENT_DAYS:
+                current[2] = max(current[2], b)
+            else:
+                if current:
+                    spans.append(tuple(current))
+                current = [code, a, b]
+        if current:
+            spans.append(tuple(current))
+    return spans
+
+
+if __name__ == "__main__":
+    failures = 0
+    rng = np.random.default_rng(0)
+
+    ok = True
+    for _ in range(200):
+        n = rng.integers(1, 50)
+        member, start = rng.integers(0, 5, n), rng.integers(0, 40, n)
+        end = start + rng.integers(-2, 10, n) ## Some periods end before they start
+        row_span, spans = eligibility.merge_spans(member, start, end)
+        ok &= list(zip(spans["member_code"], spans["start_day"], spans["end_day"])) == reference_spans(member, start, end)
+        traced = row_span >= 0
+        ok &= (traced == (start <= end)).all() and spans["row_count"].sum() == traced.sum()
+        ok &= (spans["member_code"][row_span[traced]] == member[traced]).all()
+        ok &= (spans["start_day"][row_span[traced]] <= start[traced]).all() and (end[traced] <= spans["end_day"][row_span[traced]]).all()
+    print(f"{'PASS' if ok else 'FAIL'} sweep matches per-member merge, rows traced to covering span")
+    failures += not ok
+
+    members = pd.DataFrame({
+        "member_id": ["1", "1", "1", "2", "2", "3"],
+        "eligibility_start_date": ["2025-01-01", "2025-04-01", "2025-03-01", "2025-01-01", "2025-06-01", "2025-05-01"],
+        "eligibility_end_date": ["2025-03-31", "2025-06-30", "2025-05-15", "2025-02-28", "2025-12-31", "not a date"],
+    })
+    with sqlite3.connect(":memory:") as conn:
+        members.to_sql("std_member_info", conn, index=False)
+        stats = eligibility.build_span_table(conn)
+        spans = pd.read_sql_query("SELECT * FROM member_eligibility_span ORDER BY span_id;", conn)
+        traced = pd.read_sql_query(
+            "SELECT m.rowid, s.eligibility_start_date FROM std_member_info m "
+            "JOIN member_eligibility_span_row r ON r.member_rowid = m.rowid "
+            "JOIN member_eligibility_span s USING (span_id) ORDER BY m.rowid;", conn
+        )
+    expected = [("1", "2025-01-01", "2025-06-30", 3), ("2", "2025-01-01", "2025-02-28", 1), ("2", "2025-06-01", "2025-12-31", 1)]
+    ok = list(spans[["member_id", "eligibility_start_date", "eligibility_end_date", "row_count"]].itertuples(index=False, name=None)) == expected
+    ok &= stats["skipped_rows"] == 1 and traced["eligibility_start_date"].tolist() == ["2025-01-01"] * 4 + ["2025-06-01"]
+    print(f"{'PASS' if ok else 'FAIL'} member_eligibility_span written with row map")
+    failures += not ok
+
+    ## Daily curves match the notebook's dense broadcast, missing dates & reversed periods included
+    ok = True
+    for _ in range(50):
+        n = rng.integers(1, 200)
+        start = np.datetime64("2024-01-01") + rng.integers(0, 100, n)
+        end = start + rng.integers(-5, 60, n)
+        periods = pd.DataFrame({"payer": rng.choice(["Mdcd", "Madv"], n), "eligibility_start_date": start.astype(str),
+                                "eligibility_end_date": end.astype(str)})
+        periods.loc[rng.random(n) < 0.05, "eligibility_end_date"] = None
+        curves = eligibility.daily_eligibility(periods, by="payer")
+        ok &= list(curves) == sorted(periods["payer"].unique())
+        for payer_class, curve in curves.items():
+            subset = periods[periods["payer"] == payer_class]
+            start_dates = pd.to_datetime(subset["eligibility_start_date"])
+            end_dates = pd.to_datetime(subset["eligibility_end_date"])
+            date_range = pd.date_range(start_dates.min(), end_dates.max())
+            date_mask = (start_dates.values[:, None] <= date_range.values) & (end_dates.values[:, None] >= date_range.values)
+            ok &= curve.index.equals(date_range) and (curve.to_numpy() == date_mask.sum(axis=0)).all()
+    print(f"{'PASS' if ok else 'FAIL'} daily curves match the dense broadcast")
+    failures += not ok
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,69 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import entity_resolution
+
+STATE_MAPPER = {"CA": "California", "AZ": "Arizona", "TX": "Texas"}
+
+## (member_id, first, last, dob, address, state, city, zip) - `person` is the ground truth
+MEMBERS = pd.DataFrame([
+    ("10001", "Jonathan", "Smith", "1980-04-12", "12 Oak Street", "California", "Fresno", "93701", "jon"),
+    ("10001", "JONATHAN", "SMITH", "04/12/1980", "12 Oak St.", "CA", "Fresno", "93701", "jon"),
+    ("20417", "Jonathan", "Smith", "1980-04-12", "12 oak st", "ca", "Fresno", "93701", "jon"), ## Re-issued id
+    ("10002", "Jane", "Smith", "1980-04-12", "12 Oak Street", "California", "Fresno", "93701", "jane"), ## Twin
+    ("30001", "Maria", "Garcia", "1975-09-30", "400 W Main Avenue", "Texas", "Austin", "78701", "maria-1"),
+    ("30002", "Maria", "Garcia", "1991-01-05", "77 Elm Rd", "Texas", "Austin", "78702", "maria-2"),
+    ("30001", "maria", "garcia", "09/30/1975", "400 West Main Ave", "TX", "Austin", "78701", "maria-1"),
+    ("40001", "Wei", "Chen", "2001-06-15", "9 Palm Dr", "Arizona", "Phoenix", "85001", "wei"),
+], columns=["member_id", "member_first_name", "member_last_name", "date_of_birth", "main_address",
+            "state", "city", "zip_code", "person"])
+MEMBERS["eligibility_start_date"], MEMBERS["eligibility_end_date"], MEMBERS["payer"] = "2025-01-01", "2025-12-31", "Mdcd"
+
+
+def same_partition(cluster_ids: pd.Series, truth: pd.Series) -> bool:
+    """Clusters & ground truth group the rows identically"""
+    return (pd.factorize(cluster_ids)[0] == pd.factorize(truth)[0]).all()
+
+
+if __name__ == "__main__":
+    failures = 0
+    records = MEMBERS.drop(columns=["person"])
+
+    cluster_ids, stats = entity_resolution.resolve(records, STATE_MAPPER)
+    ok = same_partition(cluster_ids, MEMBERS["person"]) and stats["clusters"] == MEMBERS["person"].nunique()
+    print(f"{'PASS' if ok else 'FAIL'} variants clustered, twins & namesakes kept apart")
+    failures += not ok
+
+    ## Ids depend on cluster content only
+    shuffled = records.sample(frac=1, random_state=3)
+    shuffled_ids, _ = entity_resolution.resolve(shuffled, STATE_MAPPER)
+    ok = shuffled_ids.sort_index().equals(cluster_ids)
+    print(f"{'PASS' if ok else 'FAIL'} cluster ids stable under row order")
+    failures += not ok
+
+    ## Blocking never compares rows that share no key
+    ok = 0 < stats["candidate_pairs"] < stats["naive_pairs"]
+    print(f"{'PASS' if ok else 'FAIL'} blocking prunes pairs ({stats['candidate_pairs']} of {stats['naive_pairs']})")
+    failures += not ok
+
+    _, skipped = entity_resolution.resolve(records, STATE_MAPPER, max_block_size=2)
+    ok = sum(key_stats["skipped_blocks"] for key_stats in skipped["blocking"].values()) > 0
+    print(f"{'PASS' if ok else 'FAIL'} oversized blocks reported")
+    failures += not ok
+
+    with sqlite3.connect(":memory:") as conn:
+        records.to_sql("std_member_info", conn, index=False)
+        entity_resolution.resolve_table(conn, STATE_MAPPER)
+        written = pd.read_sql_query(
+            "SELECT e.cluster_id FROM std_member_info m JOIN member_entity e ON e.member_rowid = m.rowid ORDER BY m.rowid;", conn
+        )
+    ok = written["cluster_id"].tolist() == cluster_ids.tolist()
+    print(f"{'PASS' if ok else 'FAIL'} member_entity written by rowid")
+    failures += not ok
+
+    sys.exit(1 if failures else 0)
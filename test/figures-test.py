@@ -0,0 +1,86 @@
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import eligibility
+import figures
+import report
+from synthetic_rosters import make_members, make_zcta_polygons, std_layout
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+if __name__ == "__main__":
+    failures = 0
+    roster = make_members(3_000, seed=4)
+    roster["payer"] = np.random.default_rng(4).choice(["Mdcd", "Madv"], len(roster))
+    polygons = make_zcta_polygons(200, vertices=16)
+    roster["Zip"] = polygons["ZCTA5CE20"].sample(len(roster), replace=True, random_state=4).to_numpy()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shapefile = str(Path(tmp) / "tl_2020_us_zcta520.shp")
+        polygons.to_file(shapefile)
+
+        ## One job per figure of the notebook, with the notebook's aggregates
+        jobs = {job["name"]: job for job in figures.figure_jobs(roster, shapefile=shapefile)}
+        ok = sorted(jobs) == sorted(["payer-ratio", *(f"{kind}-{payer}" for kind in ("gender", "eligibility", "age", "zcta")
+                                                      for payer in ("madv", "mdcd"))])
+        mdcd = roster[roster["payer"] == "Mdcd"]
+        ages = mdcd["Age"].astype(int).value_counts()
+        ok &= np.array_equal(np.flatnonzero(jobs["age-mdcd"]["data"]["counts"]), np.sort(ages.index))
+        ok &= (jobs["age-mdcd"]["data"]["counts"][ages.index] == ages.to_numpy()).all()
+        ok &= jobs["gender-mdcd"]["data"]["counts"].tolist() == [(mdcd["Gender"] == "Male").sum(), (mdcd["Gender"] == "Female").sum()]
+        curve = eligibility.daily_eligibility(mdcd, by=None)[None]
+        ok &= np.array_equal(jobs["eligibility-mdcd"]["data"]["counts"], curve.to_numpy())
+        zips = mdcd["Zip"].astype(int).value_counts().sort_index()
+        ok &= jobs["zcta-mdcd"]["data"]["zips"].tolist() == zips.index.tolist() and jobs["zcta-mdcd"]["data"]["counts"].tolist() == zips.tolist()
+        ok &= not any(job["kind"] == "zcta" for job in figures.figure_jobs(roster, shapefile=str(Path(tmp) / "missing.shp")))
+        print(f"{'PASS' if ok else 'FAIL'} figure jobs carry the notebook's aggregates")
+        failures += not ok
+
+        ## Rendered in parallel, then only what changed
+        out = str(Path(tmp) / "figures")
+        status = figures.render_figures(list(jobs.values()), out, workers=2)
+        ok = set(status.values()) == {"rendered"} and len(status) == len(jobs)
+        ok &= all((Path(out) / name).read_bytes()[:8] == PNG_HEADER for name in status)
+        start = time.perf_counter()
+        status = figures.render_figures(figures.figure_jobs(roster, shapefile=shapefile), out, workers=2)
+        ok &= set(status.values()) == {"unchanged"} and time.perf_counter() - start < 5
+        changed = roster.copy()
+        changed.loc[changed["payer"] == "Madv", "Age"] = "44"
+        status = figures.render_figures(figures.figure_jobs(changed, shapefile=shapefile), out)
+        ok &= sorted(name for name, state in status.items() if state == "rendered") == ["age-madv.png"]
+        (Path(out) / "gender-mdcd.png").unlink()
+        status = figures.render_figures(figures.figure_jobs(changed, shapefile=shapefile), out, workers=1)
+        ok &= sorted(name for name, state in status.items() if state == "rendered") == ["gender-mdcd.png"]
+        print(f"{'PASS' if ok else 'FAIL'} parallel render, unchanged figures skipped by content hash")
+        failures += not ok
+
+        ## `report.py --figures` - std_member_info layout (no gender), statuses in the JSON metadata
+        db_path = str(Path(tmp) / "members.db")
+        std = std_layout(roster)
+        with sqlite3.connect(db_path) as conn:
+            std.to_sql("std_member_info", conn, index=False)
+        output = str(Path(tmp) / "report.json")
+        report.main(db_path, ["std_member_info"], ["payer"], fmt="json", output=output, as_of="2025-06-01",
+                    figures=str(Path(tmp) / "std-figures"), workers=2)
+        with open(output) as f:
+            rendered = json.load(f)["figures"]
+        ok = sorted(rendered) == ["age-madv.png", "age-mdcd.png", "eligibility-madv.png", "eligibility-mdcd.png", "payer-ratio.png"]
+        try:
+            report.main(db_path, ["std_member_info"], ["payer"], sketch=True, figures=out)
+            ok = False
+        except ValueError:
+            pass
+        print(f"{'PASS' if ok else 'FAIL'} report --figures")
+        failures += not ok
+
+    sys.exit(1 if failures else 0)
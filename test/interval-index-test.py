@@ -0,0 +1,87 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import interval_index
+
+PERIODS = pd.DataFrame({
+    "member_id": ["1", "2", "3", "4", "5"],
+    "eligibility_start_date": ["2025-01-01", "2025-03-15", "2024-06-01", "2025-05-01", "2025-02-01"],
+    "eligibility_end_date": ["2025-03-31", "2025-04-01", "2025-04-30", "2025-12-31", "not a date"],
+})
+
+
+def scan_ids(conn: sqlite3.Connection, start: str, end: str) -> list:
+    """TEXT scan over parseable, non-reversed periods - "not a date" would otherwise compare after every ISO date"""
+    return [row[0] for row in conn.execute(
+        "SELECT member_id FROM std_member_info WHERE eligibility_start_date <= ? AND eligibility_end_date >= ? "
+        "AND julianday(eligibility_start_date) IS NOT NULL AND julianday(eligibility_end_date) IS NOT NULL "
+        "AND eligibility_start_date <= eligibility_end_date ORDER BY rowid;",
+        (end, start)
+    )]
+
+
+def check(conn: sqlite3.Connection, label: str) -> int:
+    """Index queries agree with the scan on a few point & range queries"""
+    ok = True
+    for start, end in [("2025-04-01", "2025-04-01"), ("2025-04-01", "2025-04-30"), ("2025-03-31", "2025-03-31"), ("2023-01-01", "2023-12-31")]:
+        rows = interval_index.eligible_during(conn, start, end)
+        ok &= rows["member_id"].tolist() == scan_ids(conn, start, end)
+        ok &= interval_index.eligible_during(conn, start, end, count=True) == len(rows)
+    print(f"{'PASS' if ok else 'FAIL'} {label}")
+    return not ok
+
+
+if __name__ == "__main__":
+    failures = 0
+    with sqlite3.connect(":memory:") as conn:
+        PERIODS.to_sql("std_member_info", conn, index=False)
+        ok = interval_index.sync_index(conn) == "rebuilt" and interval_index.sync_index(conn) == "current"
+        print(f"{'PASS' if ok else 'FAIL'} index built once, then current")
+        failures += not ok
+        failures += check(conn, "queries match the scan")
+
+        ## Appends are indexed in bulk on the next sync
+        pd.DataFrame({"member_id": ["6"], "eligibility_start_date": ["2025-04-10"], "eligibility_end_date": ["2025-04-20"]}).to_sql(
+            "std_member_info", conn, if_exists="append", index=False)
+        ok = interval_index.sync_index(conn) == "appended" and interval_index.sync_index(conn) == "current"
+        failures += check(conn, "index follows an append")
+
+        ## A union-write replaces the table with its rows first - only the rows after them are indexed
+        stored = pd.read_sql_query("SELECT * FROM std_member_info;", conn)
+        union = pd.concat([stored, pd.DataFrame({"member_id": ["8"], "eligibility_start_date": ["2025-04-02"],
+                                                 "eligibility_end_date": ["2025-04-03"]})], ignore_index=True)
+        union.to_sql("std_member_info", conn, if_exists="replace", index=False)
+        ok &= interval_index.sync_index(conn) == "appended" and interval_index.sync_index(conn) == "current"
+        print(f"{'PASS' if ok else 'FAIL'} appends & union-writes index only their new rows")
+        failures += not ok
+        failures += check(conn, "queries match the scan after a union-write")
+
+        ## Deletes & updates go through the triggers, back on the replaced table
+        conn.execute("DELETE FROM std_member_info WHERE member_id = '2';")
+        conn.execute("UPDATE std_member_info SET eligibility_end_date = '2025-04-15' WHERE member_id = '1';")
+        ok = interval_index.sync_index(conn) == "current"
+        failures += check(conn, "index follows delete & update")
+
+        ## A rewrite dropping rows, or an overwrite (`rebuild`), indexes the table again
+        union.iloc[2:].to_sql("std_member_info", conn, if_exists="replace", index=False)
+        ok &= interval_index.sync_index(conn) == "rebuilt"
+        failures += check(conn, "queries match the scan after a rewrite")
+        PERIODS.iloc[::-1].to_sql("std_member_info", conn, if_exists="replace", index=False)
+        ok &= interval_index.sync_index(conn, rebuild=True) == "rebuilt"
+        print(f"{'PASS' if ok else 'FAIL'} replaced table detected")
+        failures += not ok
+        failures += check(conn, "queries match the scan after replace")
+
+        ## Reversed periods match no query - through the index or the scan fallback
+        pd.DataFrame({"member_id": ["7"], "eligibility_start_date": ["2025-04-20"], "eligibility_end_date": ["2025-04-05"]}).to_sql(
+            "std_member_info", conn, if_exists="append", index=False)
+        failures += check(conn, "reversed periods left out")
+        interval_index.has_rtree = lambda conn: False
+        failures += check(conn, "scan fallback matches the index")
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,97 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import member_cube
+from synthetic_rosters import make_std_members
+
+
+def reference_cells(members: pd.DataFrame, genders: dict) -> pd.DataFrame:
+    """(payer, state, gender, age_band, zip3, month) -> rows eligible, one month at a time"""
+    start = pd.to_datetime(members["eligibility_start_date"], errors="coerce")
+    end = pd.to_datetime(members["eligibility_end_date"], errors="coerce")
+    dob = pd.to_datetime(members["date_of_birth"], errors="coerce")
+    frames = []
+    for month in pd.period_range(start.min(), end.max(), freq="M"):
+        first = month.to_timestamp()
+        eligible = members[(start <= month.to_timestamp(how="end")) & (end >= first) & (start <= end)]
+        born = dob[eligible.index]
+        age = first.year - born.dt.year - ((first.month, first.day) < pd.concat([born.dt.month, born.dt.day], axis=1).apply(tuple, axis=1))
+        band = pd.cut(age, bins=[*member_cube.AGE_BANDS, np.inf], right=False, labels=member_cube.AGE_BAND_LABELS).astype(str)
+        zip3 = eligible["zip_code"].str.zfill(5).str[:3]
+        frames.append(pd.DataFrame({
+            "payer": eligible["payer"], "state": eligible["state"], "gender": eligible["member_id"].map(genders).fillna("Unknown"),
+            "age_band": band.where(born.notna(), "Unknown"), "zip3": zip3.where(eligible["zip_code"].notna(), "Unknown"),
+            "month": month.year * 100 + month.month,
+        }))
+    cells = pd.concat(frames).value_counts().rename("members").reset_index()
+    return cells.sort_values(list(member_cube.DIMENSIONS)).reset_index(drop=True)
+
+
+def cube_table(conn: sqlite3.Connection) -> pd.DataFrame:
+    return pd.read_sql_query(f"SELECT * FROM member_cube ORDER BY {', '.join(member_cube.DIMENSIONS)};", conn)
+
+
+if __name__ == "__main__":
+    failures = 0
+    ## Missing zips/birth dates, a short zip, reversed periods & missing dates
+    members = make_std_members(1500, dob="1930-01-01", dob_days=365 * 90, start="2024-06-01", start_days=400, length_days=(-20, 300),
+                               states=("California", "Nevada"), zip_codes=("90001", "89501", "93650", "1001"),
+                               missing={"eligibility_end_date": 0.03, "date_of_birth": 0.03, "zip_code": 0.03})
+    genders = dict(zip(members["member_id"][::2], np.where(np.arange(len(members))[::2] % 4 == 0, "Male", "Female")))
+
+    with sqlite3.connect(":memory:") as conn:
+        pd.DataFrame({"Person_Id": list(genders), "Gender": list(genders.values())}).to_sql("roster_1", conn, index=False)
+        member_cube.sync(conn, [members.iloc[:1000]])
+        stats = member_cube.sync(conn, [members.iloc[200:700], members.iloc[700:1500]]) ## Overwrite: 200 out, 500 in
+        current = members.iloc[200:]
+        ok = (stats["added_rows"], stats["removed_rows"]) == (500, 200)
+        cells = cube_table(conn)
+        expected = reference_cells(current, genders)
+        monthly = cells[cells["month"] != member_cube.NO_PERIOD_MONTH][[*member_cube.DIMENSIONS, "member_months"]]
+        ok &= monthly[monthly["member_months"] > 0].reset_index(drop=True).rename(columns={"member_months": "members"}).equals(expected)
+        ok &= cells["members"].sum() == len(current)
+        print(f"{'PASS' if ok else 'FAIL'} cube matches the month-by-month count after adds & removals")
+        failures += not ok
+
+        with sqlite3.connect(":memory:") as fresh:
+            conn.backup(fresh)
+            member_cube.drop_tables(fresh)
+            member_cube.sync(fresh, [current])
+            ok = cube_table(fresh).equals(cells)
+        member_cube.update(conn, added=members.iloc[:200], removed=members.iloc[1400:])
+        member_cube.update(conn, added=members.iloc[1400:], removed=members.iloc[:200])
+        ok &= cube_table(conn).equals(cells)
+        print(f"{'PASS' if ok else 'FAIL'} incremental cube equals a rebuild")
+        failures += not ok
+
+        ## Rollups against pandas over the member rows
+        gender = current["member_id"].map(genders).fillna("Unknown")
+        by_payer_state = current.groupby(["payer", "state"]).size()
+        rolled = member_cube.rollup(conn, ["payer", "state"]).set_index(["payer", "state"])["members"]
+        ok = rolled.equals(by_payer_state.rename("members"))
+        ok &= member_cube.rollup(conn, "gender")["members"].tolist() == gender.value_counts().sort_index().tolist()
+        ok &= member_cube.rollup(conn, [])["members"].iloc[0] == len(current)
+        april = expected[expected["month"] == 202504].groupby("payer")["members"].sum()
+        rolled = member_cube.rollup(conn, ["month", "payer"], where={"month": 202504}).set_index("payer")["members"]
+        ok &= rolled.equals(april.rename("members"))
+        rolled = member_cube.rollup(conn, ["age_band"], where={"payer": "Mdcd", "state": ["Nevada"]})
+        ok &= rolled["members"].sum() == ((current["payer"] == "Mdcd") & (current["state"] == "Nevada")).sum()
+        print(f"{'PASS' if ok else 'FAIL'} rollups match pandas")
+        failures += not ok
+
+        try:
+            member_cube.rollup(conn, "payer", where={"month": 202504})
+            ok = False
+        except ValueError:
+            ok = True
+        print(f"{'PASS' if ok else 'FAIL'} month filter without grouping by month rejected")
+        failures += not ok
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,68 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import member_month
+from synthetic_rosters import make_std_members
+
+
+def reference_counts(members: pd.DataFrame, month: int) -> dict:
+    """Distinct members per payer whose period overlaps `month` (YYYYMM), straight from the rows"""
+    first = pd.Timestamp(year=month // 100, month=month % 100, day=1)
+    last = first + pd.offsets.MonthEnd(0)
+    start = pd.to_datetime(members["eligibility_start_date"], errors="coerce")
+    end = pd.to_datetime(members["eligibility_end_date"], errors="coerce")
+    overlap = members[(start <= last) & (end >= first) & (start <= end)]
+    return overlap.groupby("payer")["member_id"].nunique().to_dict()
+
+
+def stored_counts(conn: sqlite3.Connection, month: int) -> dict:
+    counts = member_month.monthly_counts(conn, month, by="payer")
+    return dict(zip(counts["payer"], counts["members"]))
+
+
+if __name__ == "__main__":
+    failures = 0
+    ## Dual-payer members, reversed periods & missing dates
+    members = make_std_members(2000, n_ids=1000, dob="1950-01-01", start="2023-11-01", start_days=500, length_days=(-20, 400),
+                               states=("CA", "NY", "TX"), zip_codes=("90001", "10001", "73301"),
+                               missing={"eligibility_end_date": 0.03})
+    months = [202311, 202402, 202406, 202412, 202503, 202601]
+
+    with sqlite3.connect(":memory:") as conn:
+        stats = member_month.update(conn, members.iloc[:1500], rebuild=True)
+        stats = member_month.update(conn, members) ## Whole table again - only the last 500 rows are new
+        ok = stats["new_rows"] == 500 and stats["skipped_rows"] == 1500
+        ok &= all(stored_counts(conn, month) == reference_counts(members, month) for month in months)
+        print(f"{'PASS' if ok else 'FAIL'} incremental update matches the per-month overlap")
+        failures += not ok
+
+        before = conn.execute("SELECT COUNT(*) FROM member_month;").fetchone()[0]
+        stats = member_month.update(conn, members.sample(frac=1, random_state=1))
+        ok = stats["new_rows"] == 0 and stats["member_months"] == 0
+        ok &= conn.execute("SELECT COUNT(*) FROM member_month;").fetchone()[0] == before
+        print(f"{'PASS' if ok else 'FAIL'} rerun with reordered rows adds nothing")
+        failures += not ok
+
+        dual = pd.DataFrame([members.iloc[0]] * 2).assign(member_id="dual", payer=["Mdcd", "Madv"],
+                                                          eligibility_start_date="2025-01-15", eligibility_end_date="2025-03-01")
+        member_month.update(conn, dual)
+        payers = conn.execute("SELECT COUNT(*) FROM member_month WHERE member_id = 'dual';").fetchone()[0]
+        ok = payers == 6 and member_month.monthly_counts(conn, (202501, 202503), by=None).shape[0] == 3
+        print(f"{'PASS' if ok else 'FAIL'} dual-payer member kept under both payers")
+        failures += not ok
+
+        members.to_sql("std_member_info", conn, index=False)
+        stats = member_month.sync_from_table(conn, rebuild=True)
+        ok = stats["new_rows"] == len(members.drop_duplicates()) and stats["skipped_rows"] == len(members) - stats["new_rows"]
+        ok &= conn.execute("SELECT COUNT(*) FROM member_month WHERE member_id = 'dual';").fetchone()[0] == 0
+        ok &= all(stored_counts(conn, month) == reference_counts(members, month) for month in months)
+        print(f"{'PASS' if ok else 'FAIL'} rebuild from the stored table")
+        failures += not ok
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,77 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import bloom
+import member_scores
+from synthetic_rosters import make_model_scores, make_std_members
+
+
+def reference(members: pd.DataFrame, scores: pd.DataFrame) -> pd.DataFrame:
+    """Full join from scratch - what `member_scores` must equal"""
+    joined = members.assign(zip=members["zip_code"].astype(str).str.zfill(5)).merge(
+        scores.assign(zip=scores["zcta"].astype(str).str.zfill(5)), on="zip", how="left")
+    joined["row_digest"] = bloom.row_digests(members)[:, 0].view(np.int64)
+    columns = ["row_digest", *[c for c in scores.columns if c not in ("zcta", "state_code", "state name")]]
+    return joined[columns].sort_values("row_digest").reset_index(drop=True)
+
+
+def stored(conn: sqlite3.Connection) -> pd.DataFrame:
+    columns = ", ".join(f'"{c}"' for c in ["row_digest", *member_scores.score_columns(conn)])
+    return pd.read_sql_query(f"SELECT {columns} FROM member_scores ORDER BY row_digest;", conn)
+
+
+if __name__ == "__main__":
+    failures = 0
+    ## Small zip range, with missing & out-of-table zips
+    members = make_std_members(3000, zip_codes=(90001, 90060), missing={"zip_code": 0.05})
+    members.loc[np.random.default_rng(1).random(len(members)) < 0.05, "zip_code"] = "01001"
+    scores = make_model_scores()
+
+    with sqlite3.connect(":memory:") as conn:
+        scores.to_sql("model_scores_by_zip", conn, index=False)
+        member_scores.sync(conn, [members.iloc[:2000]])
+        stats = member_scores.update(conn, added=members.iloc[1500:])
+        ok = stats["added_rows"] == 1000 and stats["changed_zips"] == 0
+        stats = member_scores.sync(conn, [members.iloc[500:]]) ## Overwrite: 500 rows out
+        ok &= (stats["added_rows"], stats["removed_rows"]) == (0, 500)
+        ok &= stored(conn).equals(reference(members.iloc[500:], scores))
+        members.iloc[:2500].to_sql("std_member_info", conn, index=False)
+        member_scores.CHUNK_ROWS = 700 ## Several chunks - temp tables are dropped between them
+        stats = member_scores.sync_from_table(conn)
+        ok &= (stats["added_rows"], stats["removed_rows"]) == (500, 500)
+        ok &= stored(conn).equals(reference(members.iloc[:2500], scores))
+        member_scores.sync(conn, [members.iloc[500:]])
+        print(f"{'PASS' if ok else 'FAIL'} member_scores matches a full join after adds & removals")
+        failures += not ok
+
+        ## Scores change for 3 zips, one zip disappears, another appears
+        changed = scores.copy()
+        changed.loc[changed["zcta"].isin([90003, 90010, 90020]), "food_access_score"] += 1
+        changed = pd.concat([changed[changed["zcta"] != 90030], pd.DataFrame({"zcta": [1001], "food_access_score": [1.5]})])
+        changed.to_sql("model_scores_by_zip", conn, index=False, if_exists="replace")
+        current = members.iloc[500:]
+        zips = current["zip_code"].astype(str)
+        stats = member_scores.refresh_scores(conn)
+        ok = stats["changed_zips"] == 5 and stats["rescored_rows"] == zips.isin(["90003", "90010", "90020", "90030", "01001"]).sum()
+        ok &= stored(conn).equals(reference(current, changed))
+        ok &= member_scores.refresh_scores(conn) == {"changed_zips": 0, "rescored_rows": 0}
+        print(f"{'PASS' if ok else 'FAIL'} only members of changed zips are rescored")
+        failures += not ok
+
+        ## A new score column rebuilds the score columns, member rows kept
+        changed.assign(extra_score=changed["zcta"] % 7).to_sql("model_scores_by_zip", conn, index=False, if_exists="replace")
+        stats = member_scores.refresh_scores(conn)
+        scored = current["zip_code"].str.zfill(5).isin(changed["zcta"].astype(str).str.zfill(5))
+        ok = "extra_score" in member_scores.score_columns(conn) and stats["rescored_rows"] == scored.sum()
+        ok &= stored(conn).equals(reference(current, changed.assign(extra_score=changed["zcta"] % 7)))
+        print(f"{'PASS' if ok else 'FAIL'} score column changes rescore every member")
+        failures += not ok
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,81 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import member_search
+from synthetic_rosters import make_members, std_layout
+
+
+def scan(conn: sqlite3.Connection, query: str, columns=member_search.SEARCH_COLUMNS) -> set:
+    """Rowids the naive `LIKE '%term%'` scan finds"""
+    where = " AND ".join("(" + " OR ".join(f"{column} LIKE ?" for column in columns) + ")" for _ in query.split())
+    params = [f"%{term}%" for term in query.split() for _ in columns]
+    return {row[0] for row in conn.execute(f"SELECT rowid FROM std_member_info WHERE {where};", params)}
+
+
+def found(conn: sqlite3.Connection, query: str, **kwargs) -> set:
+    return set(member_search.search(conn, query, limit=None, **kwargs)["member_rowid"])
+
+
+if __name__ == "__main__":
+    failures = 0
+    std = std_layout(make_members(8_000, seed=11))
+    std["payer"] = np.random.default_rng(11).choice(["Mdcd", "Madv"], len(std))
+    std.loc[7, ["member_first_name", "member_last_name"]] = ["Maximiliana", "Rodriguez-Quintero"]
+    std.loc[::53, "main_address"] = None
+
+    with sqlite3.connect(":memory:") as conn:
+        std.iloc[:6_000].to_sql("std_member_info", conn, index=False)
+        ok = member_search.sync_index(conn) == "rebuilt" and member_search.sync_index(conn) == "current"
+
+        ## Same rows as the LIKE scan: substrings, any case, several terms, short terms, column subsets
+        for query in ("ann", "SMITH", "ohn oak", "ma 12", "riguez-q"):
+            ok &= found(conn, query) == scan(conn, query)
+        ok &= found(conn, "son", columns=["member_last_name"]) == scan(conn, "son", ["member_last_name"])
+        ok &= len(found(conn, "zzzqqq")) == 0 and len(member_search.search(conn, "   ")) == 0
+        top = member_search.search(conn, "maximiliana", limit=5)
+        ok &= len(top) == 1 and top["member_rowid"].iloc[0] == 8 and "rank" in top
+        ranked = member_search.search(conn, "smith", limit=50)
+        ok &= ranked["rank"].is_monotonic_increasing and len(ranked) == min(50, len(scan(conn, "smith")))
+        print(f"{'PASS' if ok else 'FAIL'} trigram search matches the LIKE scan, ranked")
+        failures += not ok
+
+        ## Fuzzy: a misspelled name still finds its member first
+        fuzzy = member_search.search(conn, "Rodrigues-Quintero", fuzzy=True, limit=3)
+        ok = fuzzy["member_rowid"].iloc[0] == 8 and len(found(conn, "Rodrigues-Quintero")) == 0
+        try:
+            member_search.search(conn, "ann", columns=["state"])
+            ok = False
+        except ValueError:
+            pass
+        print(f"{'PASS' if ok else 'FAIL'} fuzzy trigram search")
+        failures += not ok
+
+        ## Incremental: appends indexed in bulk, triggers follow updates/deletes, a union-write only indexes its new rows
+        std.iloc[6_000:7_000].to_sql("std_member_info", conn, index=False, if_exists="append")
+        conn.execute("UPDATE std_member_info SET city = 'Xylophone Springs' WHERE rowid = 20;")
+        conn.execute("UPDATE std_member_info SET city = 'Quuxville' WHERE rowid = 6500;") ## Not indexed yet
+        ok = member_search.sync_index(conn) == "appended" and member_search.sync_index(conn) == "current"
+        ok &= found(conn, "xylophone") == {20} and found(conn, "quuxville") == {6500}
+        std.iloc[[0]].assign(city="Zebulon Falls").to_sql("std_member_info", conn, index=False, if_exists="append")
+        ok &= found(conn, "zebulon") == {7001} ## Searching catches the index up first
+        union = pd.concat([pd.read_sql_query("SELECT * FROM std_member_info;", conn), std.iloc[7_000:]], ignore_index=True)
+        union.to_sql("std_member_info", conn, index=False, if_exists="replace")
+        ok &= member_search.sync_index(conn) == "appended" and found(conn, "ann") == scan(conn, "ann")
+        conn.execute("DELETE FROM std_member_info WHERE rowid = 8;")
+        ok &= member_search.sync_index(conn) == "current" and len(found(conn, "maximiliana")) == 0
+        for query in ("ann", "oak", "xylophone"):
+            ok &= found(conn, query) == scan(conn, query)
+        union.iloc[::-1].to_sql("std_member_info", conn, index=False, if_exists="replace")
+        ok &= member_search.sync_index(conn) == "rebuilt" and found(conn, "ann") == scan(conn, "ann")
+        ok &= member_search.sync_index(conn, rebuild=True) == "rebuilt" and found(conn, "xylophone") == scan(conn, "xylophone")
+        print(f"{'PASS' if ok else 'FAIL'} index kept current incrementally")
+        failures += not ok
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,77 @@
+import json
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import report
+from synthetic_rosters import std_layout
+
+ROSTER = pd.DataFrame({
+    "Person_Id": ["1", "2", "3", "3", "4", "5"],
+    "Dob": ["1950-06-15", "1980-01-01", "2000-12-31", "2000-12-31", None, "1990-06-16"],
+    "Age": ["74", "45", "24", "24", "", "35"],
+    "Gender": ["Male", "Female", "Female", "Female", "Male", "Female"],
+    "State": ["California", "California", "Nevada", "Nevada", "Oregon", None],
+    "City": ["Fresno", "Chico", "Reno", "Reno", "Salem", "Fresno"],
+    "Zip": ["93650", "95926", "89501", "89501", "97301", "93650"],
+    "eligibility_start_date": ["2024-01-01", "2025-03-01", "2023-05-01", "2025-01-01", "2024-07-01", "not a date"],
+    "eligibility_end_date": ["2025-12-31", "2025-06-30", "2024-04-30", "2026-01-31", "2024-12-31", "2025-01-31"],
+    "payer": ["Mdcd", "Madv", "Mdcd", "Mdcd", "Madv", None],
+})
+
+
+if __name__ == "__main__":
+    failures = 0
+
+    summary = report.summarize(ROSTER, by="payer")
+    mdcd = summary[summary["payer"] == "Mdcd"].iloc[0]
+    ok = list(summary["payer"].iloc[:2]) == ["Madv", "Mdcd"] and summary["payer"].isna().iloc[2]
+    ok &= (mdcd["population"], mdcd["members"], mdcd["male"], mdcd["female"]) == (3, 2, 1, 2)
+    ok &= (mdcd["unique_city"], mdcd["unique_state"], mdcd["unique_zip"]) == (2, 2, 2)
+    ok &= (mdcd["eligibility_start"], mdcd["eligibility_end"]) == ("2023-05-01", "2026-01-31")
+    ok &= (mdcd["age_min"], mdcd["age_max"], mdcd["age_mean"]) == (24, 74, 40.7) and mdcd["female_per_male"] == 2.0
+    print(f"{'PASS' if ok else 'FAIL'} one pass matches the per-payer breakdown")
+    failures += not ok
+
+    ## Every group matches filtering the rows to that group
+    ok = True
+    for by in (["State"], ["payer", "City"]):
+        for _, row in report.summarize(ROSTER, by=by).iterrows():
+            subset = ROSTER[np.logical_and.reduce([ROSTER[column].isna() if pd.isna(row[column]) else ROSTER[column] == row[column]
+                                                   for column in by])]
+            ok &= row["population"] == len(subset) and row["members"] == subset["Person_Id"].nunique()
+            ok &= row["male"] == (subset["Gender"] == "Male").sum() and row["unique_zip"] == subset["Zip"].nunique()
+    print(f"{'PASS' if ok else 'FAIL'} any grouping column")
+    failures += not ok
+
+    ## `std_member_info` layout: no `Gender`, ages from the birth date
+    std = std_layout(ROSTER)
+    summary = report.summarize(std, by="payer", as_of=pd.Timestamp("2025-06-14"))
+    mdcd = summary[summary["payer"] == "Mdcd"].iloc[0]
+    ok = "male" not in summary and (mdcd["age_min"], mdcd["age_max"]) == (24, 74)
+    ok &= report.summarize(std, as_of=pd.Timestamp("2025-06-15"))["age_max"].iloc[1] == 75 ## Birthday on `as_of` counts
+    print(f"{'PASS' if ok else 'FAIL'} std_member_info layout, ages as of a date")
+    failures += not ok
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path, output = str(Path(tmp) / "report.db"), str(Path(tmp) / "report.json")
+        with sqlite3.connect(db_path) as conn:
+            std.to_sql("std_member_info", conn, index=False)
+        report.main(db_path, tables=["std_member_info"], by=["state"], fmt="json", output=output, as_of="2025-06-15")
+        with open(output) as file:
+            document = json.load(file)
+    ok = document["group_by"] == ["state"] and document["rows"] == len(std) and len(document["groups"]) == 4
+    ok &= document["groups"][0] == {"state": "California", "population": 2, "members": 2, "unique_city": 2, "unique_state": 1,
+                                    "eligibility_start": "2024-01-01", "eligibility_end": "2025-12-31", "age_min": 45,
+                                    "age_max": 75, "age_mean": 60.0, "unique_zip": 2}
+    print(f"{'PASS' if ok else 'FAIL'} JSON report written from the database")
+    failures += not ok
+
+    sys.exit(1 if failures else 0)
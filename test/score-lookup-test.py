@@ -0,0 +1,63 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import report
+import score_lookup
+from synthetic_rosters import make_model_scores
+
+
+def notebook_join(zips: pd.Series, scores: pd.DataFrame) -> pd.DataFrame:
+    """`eda.ipynb`'s join - zero-pad both sides, then a left merge"""
+    left = pd.DataFrame({"Zip": zips.astype(str).str.split("-").str[0].str.zfill(5)})
+    right = scores.assign(zcta=scores["zcta"].astype(str).str.zfill(5))
+    return left.merge(right, how="left", left_on="Zip", right_on="zcta")
+
+
+if __name__ == "__main__":
+    failures = 0
+    rng = np.random.default_rng(0)
+    scores = pd.concat([make_model_scores(), pd.DataFrame({"zcta": [1001], "food_access_score": [1.25]})], ignore_index=True)
+    lookup = score_lookup.ScoreLookup(scores)
+
+    ## Gather against the notebook's padded merge, odd zips included
+    zips = pd.Series(rng.integers(89990, 96200, 5000).astype(str))
+    zips[:6] = ["01001", "1001", "90001-1234", "900011234", " 90002 ", "01001"]
+    ok = lookup.columns == [column for column in scores.columns if column not in ("zcta", "state_code", "state name")]
+    expected = notebook_join(zips.str.strip().where(zips.str.len() != 9, zips.str[:5]), scores)
+    ok &= lookup.gather(zips).equals(expected[lookup.columns].astype(np.float64))
+    ok &= np.array_equal(lookup.column("food_access_score", zips), expected["food_access_score"].to_numpy(), equal_nan=True)
+    ok &= lookup.gather(np.array([1001, 90001]), ["food_access_score"])["food_access_score"].tolist() == [
+        1.25, scores.loc[0, "food_access_score"]]
+    print(f"{'PASS' if ok else 'FAIL'} gather matches the zero-padded merge")
+    failures += not ok
+
+    odd = pd.Series(["", None, "ABCDE", "123456", "-5", "9000.5", np.nan], index=range(10, 17))
+    gathered = lookup.gather(odd)
+    ok = gathered.index.equals(odd.index) and gathered.isna().all().all()
+    ok &= (score_lookup.zip_index(odd) == score_lookup.NO_ZIP).all() and len(lookup) == len(scores)
+    print(f"{'PASS' if ok else 'FAIL'} missing & malformed zips get no scores")
+    failures += not ok
+
+    ## Report means against the merge, & the lookup loaded from the database
+    members = pd.DataFrame({"payer": rng.choice(["Mdcd", "Madv"], 3000), "zip_code": rng.integers(90000, 90200, 3000).astype(str)})
+    with sqlite3.connect(":memory:") as conn:
+        scores.to_sql(score_lookup.SCORE_TABLE, conn, index=False)
+        loaded = score_lookup.ScoreLookup.load(conn, ["food_access_score", "social_isolation_score"])
+        summary = report.summarize(members, scores=loaded)
+        ok = np.array_equal(loaded.values, lookup.values[:, [lookup.columns.index(c) for c in loaded.columns]], equal_nan=True)
+    joined = notebook_join(members["zip_code"], scores).assign(payer=members["payer"].to_numpy())
+    means = joined.groupby("payer")[["food_access_score", "social_isolation_score"]].mean().round(3)
+    ok &= np.allclose(summary[["food_access_score_mean", "social_isolation_score_mean"]].to_numpy(), means.to_numpy())
+    with sqlite3.connect(":memory:") as conn:
+        ok &= score_lookup.ScoreLookup.load(conn).columns == []
+    print(f"{'PASS' if ok else 'FAIL'} per-payer score means match the merge")
+    failures += not ok
+
+    sys.exit(1 if failures else 0)
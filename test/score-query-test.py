@@ -0,0 +1,82 @@
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import score_query
+from synthetic_rosters import make_model_scores, make_std_members
+
+
+def joined(members: pd.DataFrame, scores: pd.DataFrame, score: str) -> pd.DataFrame:
+    """The notebook's way - full join, then filter/sort the joined frame"""
+    frame = members.merge(scores.assign(zip_code=scores["zcta"].astype(str)), on="zip_code", how="inner")
+    return frame[frame[score].notna()]
+
+
+def same_members(result: pd.DataFrame, expected: pd.DataFrame) -> bool:
+    return sorted(result["member_id"]) == sorted(expected["member_id"])
+
+
+if __name__ == "__main__":
+    failures = 0
+    members = make_std_members(20_000, zip_codes=(89900, 90400), missing={"zip_code": 0.05}) ## A few hundred zips, some missing or without scores
+    scores = make_model_scores()
+    score = "algorex_sdoh_composite_score"
+    frame = joined(members, scores, score)
+    ranked = frame.sort_values(score, kind="stable")
+
+    with sqlite3.connect(":memory:") as conn:
+        members.to_sql("std_member_info", conn, index=False)
+        scores.to_sql("model_scores_by_zip", conn, index=False)
+        index = score_query.ScoreIndex.build(conn)
+
+    ## Against scanning & filtering the joined frame
+    low_food = joined(members, scores, "food_access_score")
+    ok = same_members(index.threshold("food_access_score", below=2), low_food[low_food["food_access_score"] < 2])
+    ok &= same_members(index.threshold(score, above=6.0, below=7.0, inclusive=True), frame[frame[score].between(6.0, 7.0)])
+    ok &= same_members(index.threshold(score, above=6.5), frame[frame[score] > 6.5])
+    ok &= index.threshold(score, above=7.0, below=6.0).empty
+    top = index.top(score, 250)
+    ok &= len(top) == 250 and top[score].is_monotonic_decreasing and top[score].iloc[-1] >= ranked[score].iloc[-250]
+    ok &= np.allclose(np.sort(index.top(score, 250, lowest=True)[score]), ranked[score].iloc[:250])
+    print(f"{'PASS' if ok else 'FAIL'} threshold & top-k match the joined frame")
+    failures += not ok
+
+    best_zip = frame.loc[frame[score].idxmax(), "zip_code"]
+    zips = index.top_zips(score, 3)
+    per_zip = frame.groupby("zip_code").agg(score=(score, "first"), members=("member_id", "size")).sort_values("score", ascending=False)
+    ok = zips["zip"].astype(str).tolist() == per_zip.index[:3].tolist() and zips["members"].tolist() == per_zip["members"].iloc[:3].tolist()
+    ok &= same_members(index.members_in_top_zips(score), frame[frame["zip_code"] == best_zip])
+    band = index.percentile_band(score, 0.9, 1.0)
+    ok &= len(band) == len(frame) - int(np.floor(0.9 * len(frame))) and band[score].min() >= ranked[score].quantile(0.89)
+    ok &= len(index.percentile_band(score, 0.0, 0.5)) + len(index.percentile_band(score, 0.5, 1.0)) == len(frame)
+    print(f"{'PASS' if ok else 'FAIL'} top zips, their members & percentile bands")
+    failures += not ok
+
+    ## Persisted next to the database, rebuilt when either table changes
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "members.db"
+        with sqlite3.connect(db_path) as conn:
+            members.to_sql("std_member_info", conn, index=False)
+            scores.to_sql("model_scores_by_zip", conn, index=False)
+            first = score_query.open_index(conn)
+            ok = score_query.index_path(str(db_path)).exists() and score_query.open_index(conn) is first
+            score_query._CACHE.clear()
+            loaded = score_query.open_index(conn)
+            ok &= loaded is not first and loaded.token == first.token and loaded.top(score, 50).equals(first.top(score, 50))
+
+            make_std_members(10, seed=1).assign(member_id="new", zip_code=best_zip).to_sql("std_member_info", conn, index=False, if_exists="append")
+            ok &= "new" in set(score_query.open_index(conn).members_in_top_zips(score)["member_id"])
+            changed = scores.assign(food_access_score=scores["food_access_score"] + 10)
+            changed.to_sql("model_scores_by_zip", conn, index=False, if_exists="replace")
+            ok &= score_query.open_index(conn).threshold("food_access_score", below=2).empty
+        print(f"{'PASS' if ok else 'FAIL'} index persisted & invalidated by member or score changes")
+        failures += not ok
+
+    sys.exit(1 if failures else 0)
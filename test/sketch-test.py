@@ -0,0 +1,94 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import eligibility
+import sketches
+from synthetic_rosters import make_std_members
+
+AS_OF = pd.Timestamp("2026-01-01")
+
+
+def within_accuracy(estimate: float, exact: float, accuracy: float = sketches.RELATIVE_ACCURACY) -> bool:
+    return abs(estimate - exact) <= accuracy * abs(exact) + 1e-9
+
+
+def lower_quantile(values: np.ndarray, q: float) -> float:
+    return float(np.sort(values)[int(q * (len(values) - 1))])
+
+
+if __name__ == "__main__":
+    failures = 0
+    rng = np.random.default_rng(1)
+
+    ## HyperLogLog: estimate within 4 standard errors, merge = union, byte round trip
+    left, right = np.arange(0, 150_000), np.arange(100_000, 400_000)
+    union = sketches.HyperLogLog().add(left).merge(sketches.HyperLogLog().add(right))
+    ok = abs(union.estimate() / 400_000 - 1) < 4 * 1.04 / np.sqrt(2 ** sketches.HLL_PRECISION)
+    ok &= np.array_equal(union.registers, sketches.HyperLogLog().add(np.arange(0, 400_000)).registers)
+    ok &= np.array_equal(sketches.HyperLogLog.from_bytes(union.to_bytes()).registers, union.registers)
+    ok &= round(sketches.HyperLogLog().add(pd.Series(["a", "b", "b", None])).estimate()) == 2
+    print(f"{'PASS' if ok else 'FAIL'} HyperLogLog estimate, merge & serialization")
+    failures += not ok
+
+    ## Quantile sketch: every quantile within the relative accuracy, negatives & zeros included
+    values = np.concatenate([rng.normal(0, 2, 20_000), rng.lognormal(3, 1, 20_000), np.zeros(500)])
+    parts = np.array_split(rng.permutation(values), 4)
+    merged = sketches.QuantileSketch().add(parts[0])
+    for part in parts[1:]:
+        merged.merge(sketches.QuantileSketch.from_bytes(sketches.QuantileSketch().add(part).to_bytes()))
+    whole = sketches.QuantileSketch().add(values)
+    ok = merged.count == len(values) and (merged.positive, merged.negative, merged.zero_count) == (whole.positive, whole.negative, whole.zero_count)
+    ok &= all(within_accuracy(whole.quantile(q), lower_quantile(values, q)) for q in np.linspace(0, 1, 41))
+    ok &= np.isnan(sketches.QuantileSketch().add([np.nan]).quantile(0.5))
+    print(f"{'PASS' if ok else 'FAIL'} quantile sketch accuracy, merge & serialization")
+    failures += not ok
+
+    ## Per-run sketches merged per payer against exact answers over every run's rows
+    ## Repeated member ids (overlapping across runs) & missing birth dates
+    runs = [make_std_members(20_000, seed=seed, n_ids=20_000, id_offset=seed * 15_000, dob="1930-01-01", dob_days=365 * 90,
+                             cities=3000, zip_codes=("90001", "89501", "93650"), missing={"date_of_birth": 0.03})
+            for seed in range(3)]
+    with sqlite3.connect(":memory:") as conn:
+        pd.DataFrame({"zcta": [90001, 89501], "health_score": [1.5, -2.0]}).to_sql(sketches.SCORE_TABLE, conn, index=False)
+        run_ids = [sketches.record_run(conn, runs[0], reset=True, as_of=AS_OF)]
+        run_ids += [sketches.record_run(conn, [run.iloc[:7000], run.iloc[7000:]], as_of=AS_OF) for run in runs[1:]]
+        ok = sketches.record_run(conn, runs[0].iloc[:0]) is None
+
+        members = pd.concat(runs, ignore_index=True)
+        age = pd.Series(eligibility.age_in_years(members["date_of_birth"], AS_OF))
+        summary = sketches.summary(conn).set_index("payer")
+        for payer, group in members.groupby("payer"):
+            row = summary.loc[payer]
+            ok &= row["population"] == len(group)
+            for metric, column in sketches.DISTINCT_METRICS.items():
+                ok &= abs(row[metric] / group[column].nunique() - 1) < 0.03
+            ages = age[group.index].dropna().to_numpy()
+            ok &= all(within_accuracy(row[f"age_p{q}"], lower_quantile(ages, q / 100), 0.011) for q in (25, 50, 75))
+            scores = group["zip_code"].map({"90001": 1.5, "89501": -2.0}).dropna().to_numpy()
+            ok &= row["health_score_p25"] == round(sketches.QuantileSketch().add(scores).quantile(0.25), 2)
+        total = sketches.summary(conn, by=None)
+        ok &= len(total) == 1 and total["population"].iloc[0] == len(members)
+        ok &= abs(total["members"].iloc[0] / members["member_id"].nunique() - 1) < 0.03
+        ok &= sketches.summary(conn, runs=run_ids[:1])["population"].sum() == len(runs[0])
+        print(f"{'PASS' if ok else 'FAIL'} merged per-run sketches match exact per-payer answers")
+        failures += not ok
+
+        sketches.record_run(conn, runs[2], reset=True, as_of=AS_OF)
+        ok = conn.execute(f"SELECT COUNT(*) FROM {sketches.RUN_TABLE};").fetchone()[0] == 1
+        ok &= sketches.summary(conn)["population"].sum() == len(runs[2])
+        try:
+            sketches.summary(conn, by="state")
+            ok = False
+        except ValueError:
+            pass
+        print(f"{'PASS' if ok else 'FAIL'} reset drops earlier runs & non-payer groupings rejected")
+        failures += not ok
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,65 @@
+import contextlib
+import importlib.util
+import io
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+from synthetic_rosters import make_rosters, write_roster_db
+
+## `singular-ingestion.py` is not importable by name
+spec = importlib.util.spec_from_file_location("singular_ingestion", ROOT / "singular-ingestion.py")
+singular_ingestion = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(singular_ingestion)
+
+
+def read_member_table(db_path: Path) -> pd.DataFrame:
+    """`std_member_info` in a canonical row order for comparison"""
+    with sqlite3.connect(db_path) as conn:
+        data = pd.read_sql_query("SELECT * FROM std_member_info;", conn)
+    return data.sort_values(list(data.columns)).reset_index(drop=True)
+
+
+def ingest(engine: str, db_path: Path, overwrite: bool = False) -> None:
+    """Run `singular-ingestion.py` on `db_path` with `engine`"""
+    with contextlib.redirect_stdout(io.StringIO()): ## Pandas engine prints separators
+        singular_ingestion.main(db_path=str(db_path), verbose=False, overwrite=overwrite, engine=engine)
+
+
+if __name__ == "__main__":
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        ## `roster_2` has `%m/%d/%Y` dates, `roster_4` state abbreviations, `roster_5` shuffled columns
+        source = tmp / "source.db"
+        write_roster_db(str(source), make_rosters(3_000, seed=7))
+        new_roster = make_rosters(500, n_rosters=1, seed=8)["roster_1"]
+
+        steps = [
+            ("first run", None, False),
+            ("union-write of a new roster", new_roster, False),
+            ("overwrite", None, True),
+        ]
+        db_paths = {engine: tmp / f"{engine}.db" for engine in ("pandas", "sql")}
+        for db_path in db_paths.values():
+            shutil.copy(source, db_path)
+        for name, roster, overwrite in steps:
+            results = {}
+            for engine, db_path in db_paths.items():
+                if roster is not None:
+                    write_roster_db(str(db_path), {"roster_6": roster})
+                ingest(engine, db_path, overwrite=overwrite)
+                results[engine] = read_member_table(db_path)
+            expected, actual = results["pandas"], results["sql"]
+            ok = not expected.empty and expected.equals(actual)
+            failures += not ok
+            print(f"{'PASS' if ok else 'FAIL'} sql == pandas after {name} ({len(actual)} vs {len(expected)} rows)")
+
+    sys.exit(1 if failures else 0)
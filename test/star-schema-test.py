@@ -0,0 +1,88 @@
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import report
+import star_schema
+from synthetic_rosters import make_members, std_layout
+
+
+def same_rows(conn: sqlite3.Connection, left: str, right: str) -> bool:
+    a, b = (pd.read_sql_query(f"SELECT * FROM {star_schema.quote(name)};", conn) for name in (left, right))
+    if list(a.columns) != list(b.columns) or len(a) != len(b):
+        return False
+    a, b = (frame.fillna("<null>").sort_values(list(frame.columns)).reset_index(drop=True) for frame in (a, b))
+    return a.equals(b)
+
+
+if __name__ == "__main__":
+    failures = 0
+    std = std_layout(make_members(6_000, seed=9))
+    std["payer"] = np.random.default_rng(9).choice(["Mdcd", "Madv"], len(std))
+    std.loc[::97, "city"] = None
+    std.loc[::89, "zip_code"] = None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "members.db")
+        with sqlite3.connect(db_path) as conn:
+            ## Dimensions hold each distinct value once, the view gives back std_member_info
+            std.iloc[:5_000].to_sql("std_member_info", conn, index=False)
+            stats = star_schema.build(conn, chunk_rows=1_500)
+            ok = stats["rebuilt"] and stats["encoded_rows"] == 5_000
+            for column, table in star_schema.DIMENSIONS.items():
+                ok &= conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0] == std.iloc[:5_000][column].nunique()
+            fact = {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({star_schema.FACT_TABLE});")}
+            ok &= all(fact[star_schema.key_column(column)] == "INTEGER" for column in star_schema.DIMENSIONS)
+            ok &= not set(star_schema.DIMENSIONS) & set(fact)
+            ok &= same_rows(conn, "std_member_info", star_schema.COMPAT_VIEW)
+            print(f"{'PASS' if ok else 'FAIL'} dictionary-encoded dimensions, compatibility view")
+            failures += not ok
+
+            ## Appended rows only are encoded, keys never move
+            keys = dict(conn.execute("SELECT city, city_key FROM dim_city;").fetchall())
+            appended = std.iloc[5_000:].copy()
+            appended.loc[appended.index[0], "city"] = "Brand New City"
+            appended.to_sql("std_member_info", conn, index=False, if_exists="append")
+            dictionaries = star_schema.KeyDictionaries.load(conn)
+            stats = star_schema.build(conn, dictionaries=dictionaries)
+            ok = not stats["rebuilt"] and stats["encoded_rows"] == 1_000
+            ok &= same_rows(conn, "std_member_info", star_schema.COMPAT_VIEW)
+            current = dict(conn.execute("SELECT city, city_key FROM dim_city;").fetchall())
+            ok &= all(current[city] == key for city, key in keys.items()) and current["Brand New City"] == max(current.values())
+            ok &= dictionaries.keys["city"] == current ## The run's dictionaries saw the new value
+            stats = star_schema.build(conn, rebuild=True)
+            ok &= stats["rebuilt"] and stats["encoded_rows"] == 6_000 and same_rows(conn, "std_member_info", star_schema.COMPAT_VIEW)
+            ok &= dict(conn.execute("SELECT city, city_key FROM dim_city;").fetchall()) == current
+            conn.execute("DELETE FROM std_member_info WHERE rowid = 3;")
+            ok &= star_schema.build(conn)["rebuilt"] and same_rows(conn, "std_member_info", star_schema.COMPAT_VIEW)
+            print(f"{'PASS' if ok else 'FAIL'} incremental encoding, stable keys")
+            failures += not ok
+
+            ## Export: the star schema alone, `std_member_info` a view readers use unchanged
+            export_path = str(Path(tmp) / "star.db")
+            star_schema.export(conn, export_path)
+            expected = report.summarize(report.read_members(conn, ["std_member_info"], ["payer"]), by="payer",
+                                        as_of=pd.Timestamp("2025-06-01"))
+        with sqlite3.connect(export_path) as exported:
+            kinds = dict(exported.execute("SELECT name, type FROM sqlite_master WHERE name = 'std_member_info';").fetchall())
+            ok = kinds == {"std_member_info": "view"}
+            summary = report.summarize(report.read_members(exported, ["std_member_info"], ["payer"]), by="payer",
+                                       as_of=pd.Timestamp("2025-06-01"))
+            ok &= summary.equals(expected)
+        try:
+            with sqlite3.connect(db_path) as conn:
+                star_schema.export(conn, export_path)
+            ok = False
+        except FileExistsError:
+            pass
+        print(f"{'PASS' if ok else 'FAIL'} export with std_member_info as a view")
+        failures += not ok
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,69 @@
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import zcta_assign
+import zcta_geometry
+from score_lookup import NO_ZIP
+from synthetic_rosters import make_zcta_polygons
+
+
+def brute_force(polygons, longitude: np.ndarray, latitude: np.ndarray) -> np.ndarray:
+    """Every point against every polygon"""
+    assigned = np.full(len(longitude), NO_ZIP)
+    for zcta, polygon in zip(polygons["ZCTA5CE20"].astype(int)[::-1], polygons.geometry[::-1]):
+        assigned[shapely.intersects_xy(polygon, longitude, latitude)] = zcta
+    return assigned
+
+
+if __name__ == "__main__":
+    failures = 0
+    polygons = make_zcta_polygons(400, vertices=120)
+    rng = np.random.default_rng(0)
+    n_points = 20_000
+    longitude, latitude = rng.uniform(-124.2, -113.8, n_points), rng.uniform(31.8, 42.2, n_points)
+    longitude[:2_000], latitude[:2_000] = longitude[2_000:4_000], latitude[2_000:4_000] ## Members at the same address
+    longitude[-50:] = np.nan
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shapefile = str(Path(tmp) / "tl_2020_us_zcta520.shp")
+        polygons.to_file(shapefile)
+        index = zcta_assign.ZctaIndex.load(shapefile)
+
+        ## Same answer as testing every polygon, in any chunk size
+        expected = brute_force(polygons, longitude, latitude)
+        assigned = index.assign(longitude, latitude)
+        ok = np.array_equal(assigned, expected) and np.array_equal(index.assign(longitude, latitude, chunk_points=777), expected)
+        ok &= 0 < (assigned == NO_ZIP).sum() < n_points and (assigned[-50:] == NO_ZIP).all()
+        ok &= zcta_geometry.layer_path(zcta_geometry.cache_dir(shapefile), zcta_geometry.FULL_RESOLUTION).exists()
+        inside = shapely.point_on_surface(polygons.geometry.to_numpy())
+        ok &= np.array_equal(index.assign(shapely.get_x(inside), shapely.get_y(inside)), polygons["ZCTA5CE20"].astype(int).to_numpy())
+        print(f"{'PASS' if ok else 'FAIL'} point-in-polygon assignment matches brute force")
+        failures += not ok
+
+        ## Mismatches against the reported zip
+        truth = pd.Series(expected).astype(str).str.zfill(5)
+        reported = truth.where(rng.random(n_points) < 0.8, "99999")
+        reported[:10] = None
+        reported[10:20] = truth[10:20] + "-1234"
+        frame = pd.DataFrame({"member_id": np.arange(n_points).astype(str), "zip_code": reported,
+                              "longitude": longitude, "latitude": latitude.astype(str)})
+        result = zcta_assign.assign_zctas(frame, index)
+        ok = result["assigned_zcta"].isna().tolist() == (expected == NO_ZIP).tolist()
+        ok &= result["assigned_zcta"].fillna(NO_ZIP).to_numpy().tolist() == expected.tolist()
+        should_flag = (expected != NO_ZIP) & (reported.isna() | (reported == "99999")).to_numpy()
+        ok &= result["zip_mismatch"].tolist() == should_flag.tolist() and not result["zip_mismatch"][10:20].any()
+        summary = zcta_assign.summarize(result)
+        ok &= summary == {"rows": n_points, "assigned": int((expected != NO_ZIP).sum()),
+                          "unassigned": int((expected == NO_ZIP).sum()), "zip_mismatch": int(should_flag.sum())}
+        print(f"{'PASS' if ok else 'FAIL'} assigned zcta & zip mismatch flags")
+        failures += not ok
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import zcta_geometry
+from synthetic_rosters import make_zcta_polygons
+
+
+if __name__ == "__main__":
+    failures = 0
+    polygons = make_zcta_polygons(300, vertices=200)
+    with tempfile.TemporaryDirectory() as tmp:
+        shapefile = str(Path(tmp) / "tl_2020_us_zcta520.shp")
+        polygons.to_file(shapefile)
+
+        ## Every tolerance keyed by zcta, within tolerance of the original, with the original bounding box
+        directory = zcta_geometry.build(shapefile)
+        original = gpd.read_file(shapefile)
+        ok = sorted(p.name for p in directory.glob("*.parquet")) == sorted(f"zcta-{t:g}.parquet" for t in zcta_geometry.TOLERANCES)
+        for tolerance in zcta_geometry.TOLERANCES:
+            layer = zcta_geometry.load(tolerance, shapefile, columns=["zcta", *zcta_geometry.BBOX_COLUMNS])
+            ok &= layer["zcta"].tolist() == original["ZCTA5CE20"].astype(int).tolist()
+            ok &= np.allclose(layer[zcta_geometry.BBOX_COLUMNS].to_numpy(), original.geometry.bounds.to_numpy())
+            ok &= bool(layer.is_valid.all()) and layer.crs == original.crs
+            ## Topology-preserving simplification bounds the deviation by about the tolerance, not exactly
+            ok &= float(shapely.hausdorff_distance(layer.geometry.to_numpy(), original.geometry.to_numpy()).max()) <= 2 * tolerance
+        vertices = [shapely.get_num_coordinates(zcta_geometry.load(t, shapefile).geometry.to_numpy()).sum() for t in zcta_geometry.TOLERANCES]
+        ok &= vertices == sorted(vertices, reverse=True) and vertices[-1] < shapely.get_num_coordinates(original.geometry.to_numpy()).sum() / 10
+        print(f"{'PASS' if ok else 'FAIL'} simplified layers keyed by zcta with bounding boxes")
+        failures += not ok
+
+        ## Column, bounding box & zcta filters; counts gathered like the notebook's left merge
+        bbox = (-120.0, 35.0, -118.0, 37.0)
+        boxed = zcta_geometry.load(0.01, shapefile, bbox=bbox)
+        ok = 0 < len(boxed) < len(original)
+        ok &= set(boxed["zcta"]) == set(original.cx[bbox[0]:bbox[2], bbox[1]:bbox[3]]["ZCTA5CE20"].astype(int))
+        ok &= list(zcta_geometry.load(0.01, shapefile).columns) == ["zcta", "geometry"]
+        keys = original["ZCTA5CE20"]
+        ok &= zcta_geometry.load(0.05, shapefile, zctas=[keys[0], int(keys[7]), "bad"])["zcta"].tolist() == [int(keys[0]), int(keys[7])]
+        zips = pd.Series([keys[0], keys[0], f"{keys[3]}-1234", None, "99999", keys[3], keys[299]])
+        frame = zcta_geometry.choropleth_frame(zips, 0.05, shapefile)
+        notebook = original.merge(zips.str[:5].value_counts().rename("count").rename_axis("Zip").reset_index(),
+                                  how="left", left_on="ZCTA5CE20", right_on="Zip")
+        ok &= np.array_equal(frame["count"].to_numpy(), notebook["count"].to_numpy(dtype=float), equal_nan=True)
+        try:
+            zcta_geometry.load(0.01, shapefile, columns=["ZCTA5CE20"])
+            ok = False
+        except ValueError:
+            pass
+        print(f"{'PASS' if ok else 'FAIL'} column, bounding box & zcta filters, choropleth counts")
+        failures += not ok
+
+        ## Rebuilt when the shapefile changes, served from the cache without it
+        polygons.iloc[:100].to_file(shapefile)
+        os.utime(shapefile, ns=(1, 1))
+        ok = len(zcta_geometry.load(0.01, shapefile)) == 100
+        ok &= len(zcta_geometry.load(0.002, shapefile)) == 100 and zcta_geometry.layer_path(directory, 0.002).exists()
+        for suffix in (".shp", ".dbf", ".shx", ".prj", ".cpg"):
+            Path(shapefile).with_suffix(suffix).unlink(missing_ok=True)
+        zcta_geometry._CACHE.clear()
+        ok &= len(zcta_geometry.load(0.05, shapefile)) == 100
+        try:
+            zcta_geometry.load(0.5, shapefile)
+            ok = False
+        except FileNotFoundError:
+            pass
+        print(f"{'PASS' if ok else 'FAIL'} cache rebuilt on source change & usable without the shapefile")
+        failures += not ok
+
+    sys.exit(1 if failures else 0)
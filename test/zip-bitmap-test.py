@@ -0,0 +1,72 @@
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import ingestion
+import zip_bitmap
+from synthetic_rosters import make_model_scores, make_rosters, make_zcta_polygons
+
+
+if __name__ == "__main__":
+    failures = 0
+    scores = make_model_scores()
+    scores = scores[scores["zcta"] % 7 != 0] ## Holes in the zip range
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ## Same answer as a set lookup; a ~12 kB artifact
+        with sqlite3.connect(":memory:") as conn:
+            scores.to_sql("model_scores_by_zip", conn, index=False)
+            bitmap = zip_bitmap.open_bitmap(zip_bitmap.SCORES_SOURCE, conn)
+        zips = pd.Series(np.random.default_rng(0).integers(0, 100_000, 50_000)).astype(str).str.zfill(5)
+        zips[:5] = ["90001-1234", None, "9000", "abcde", "900011234"]
+        known = set(scores["zcta"].astype(str))
+        ok = len(bitmap) == len(scores)
+        ok &= bitmap.contains(zips).tolist() == [isinstance(z, str) and z[:5] in known and z not in ("9000", "abcde")
+                                                 and len(z.replace("-", "")) in (5, 9) for z in zips]
+        path = str(Path(tmp) / "valid-zips.zip-bitmap")
+        bitmap.save(path)
+        loaded = zip_bitmap.open_bitmap(path)
+        ok &= np.array_equal(loaded.present, bitmap.present) and loaded.source == "model_scores_by_zip"
+        ok &= os.path.getsize(path) < 16_000
+        print(f"{'PASS' if ok else 'FAIL'} bitmap lookups match the zip set & round-trip through the artifact")
+        failures += not ok
+
+        ## Shapefile source, cached next to it & rebuilt when it changes
+        polygons = make_zcta_polygons(200, vertices=8)
+        shapefile = str(Path(tmp) / "tl_2020_us_zcta520.shp")
+        polygons.to_file(shapefile)
+        from_shapes = zip_bitmap.open_bitmap(shapefile)
+        cached = Path(shapefile + zip_bitmap.BITMAP_SUFFIX)
+        ok = cached.exists() and len(from_shapes) == 200 and from_shapes.contains(polygons["ZCTA5CE20"]).all()
+        ok &= from_shapes.contains(pd.Series(["00601"])).tolist() == ["00601" in set(polygons["ZCTA5CE20"])]
+        polygons.iloc[:50].to_file(shapefile)
+        os.utime(shapefile, ns=(1, 1))
+        ok &= len(zip_bitmap.open_bitmap(shapefile)) == 50
+        print(f"{'PASS' if ok else 'FAIL'} bitmap from the shapefile, cached & rebuilt on change")
+        failures += not ok
+
+    ## Optional validation rule - off by default, rejects rosters with unknown zips when on
+    roster = make_rosters(2_000, n_rosters=1, seed=3)["roster_1"]
+    valid = roster[roster["Zip"].astype(int).isin(scores["zcta"])]
+    ok = ingestion.validate_data(valid) and ingestion.validate_data(valid, valid_zips=bitmap)
+    unknown = valid.copy()
+    unknown.iloc[3, unknown.columns.get_loc("Zip")] = "90006" ## Five digits, not a zcta (a multiple of 7)
+    ok &= ingestion.validate_data(unknown) and not ingestion.validate_data(unknown, valid_zips=bitmap)
+    ok &= not ingestion.get_backend("pandas", valid_zips=bitmap).validate(unknown)
+    try:
+        ingestion.get_backend("duckdb", valid_zips=bitmap)
+        ok = False
+    except ValueError:
+        pass
+    print(f"{'PASS' if ok else 'FAIL'} validate_data zip existence rule")
+    failures += not ok
+
+    sys.exit(1 if failures else 0)
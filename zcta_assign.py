@@ -0,0 +1,152 @@
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import shapely
+
+import zcta_geometry
+from score_lookup import NO_ZIP, zip_index
+
+CHUNK_POINTS = 500_000
+
+
+class ZctaIndex:
+    """
+    STR-tree over the full-resolution ZCTA polygons - assigns coordinates to the ZCTA containing them
+
+    The polygons come from the geometry cache (`zcta_geometry.FULL_RESOLUTION` layer), so the
+    shapefile is parsed once per cache build, not once per run. Packing the tree over the ~34k
+    polygon envelopes takes milliseconds, so only the polygons are kept on disk and the tree is
+    re-packed on load (a pickled tree re-packs on load too and is several times larger).
+    """
+
+    def __init__(self, zcta: np.ndarray, geometry: np.ndarray):
+        order = np.argsort(zcta, kind="stable") ## Points on a shared border go to the lowest zcta
+        self.zcta = np.asarray(zcta, dtype=np.int64)[order]
+        self.geometry = np.asarray(geometry)[order]
+        self.tree = shapely.STRtree(self.geometry)
+
+    @classmethod
+    def load(cls, shapefile: str = zcta_geometry.SHAPEFILE) -> "ZctaIndex":
+        """Index of the cached full-resolution layer - built from `shapefile` on first use"""
+        layer = zcta_geometry.load(zcta_geometry.FULL_RESOLUTION, shapefile)
+        return cls(layer["zcta"].to_numpy(), layer.geometry.to_numpy())
+
+    def assign(self, longitude: np.ndarray, latitude: np.ndarray, chunk_points: int = CHUNK_POINTS) -> np.ndarray:
+        """
+        ZCTA of each (longitude, latitude) point, `NO_ZIP` outside every polygon or for missing coordinates
+
+        Coordinates are in the shapefile's NAD83 degrees (GPS / WGS84 coordinates differ by about a
+        metre). Repeated coordinates - members at the same address - are tested once, and the tree
+        is queried `chunk_points` unique points at a time to bound the (point, polygon) pair arrays.
+        """
+        longitude, latitude = np.asarray(longitude, dtype=float), np.asarray(latitude, dtype=float)
+        assigned = np.full(len(longitude), NO_ZIP, dtype=np.int64)
+        valid = np.flatnonzero(np.isfinite(longitude) & np.isfinite(latitude))
+        if not len(valid):
+            return assigned
+        coordinates, inverse = np.unique(np.column_stack([longitude[valid], latitude[valid]]), axis=0, return_inverse=True)
+        unique_zcta = np.full(len(coordinates), NO_ZIP, dtype=np.int64)
+        for start in range(0, len(coordinates), chunk_points):
+            chunk = coordinates[start:start + chunk_points]
+            point, polygon = self.tree.query(shapely.points(chunk), predicate="intersects")
+            pairs = np.lexsort([polygon, point])
+            point, polygon = point[pairs], polygon[pairs]
+            first = np.flatnonzero(np.diff(point, prepend=-1) != 0) ## Lowest zcta (tree order) of each matched point
+            unique_zcta[start + point[first]] = self.zcta[polygon[first]]
+        assigned[valid] = unique_zcta[inverse.ravel()]
+        return assigned
+
+
+def assign_zctas(frame: pd.DataFrame, index: ZctaIndex, longitude: str = "longitude", latitude: str = "latitude",
+                 zip_column: Optional[str] = "zip_code") -> pd.DataFrame:
+    """
+    `frame` with the ZCTA assigned from its coordinates and a flag where it disagrees with the reported zip
+
+    Added columns:
+    * `assigned_zcta` - ZCTA containing the point (nullable `Int64`, NA outside every polygon)
+    * `zip_mismatch` - a ZCTA was assigned and the reported zip (`zip_column`, normalized like the
+      score joins: ZIP+4 cut to 5 digits) is a different one, or is missing / invalid
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        Rows with coordinates, e.g. geocoded member addresses
+    index : ZctaIndex
+        ZCTA polygons, see `ZctaIndex.load()`
+    longitude : str, optional
+        Longitude column, by default "longitude"
+    latitude : str, optional
+        Latitude column, by default "latitude"
+    zip_column : Optional[str], optional
+        Reported zip column, by default "zip_code" (`None`: no mismatch flag)
+
+    Returns
+    -------
+    pd.DataFrame
+        A copy of `frame` with the added columns
+    """
+    assigned = index.assign(pd.to_numeric(frame[longitude], errors="coerce").to_numpy(dtype=float),
+                            pd.to_numeric(frame[latitude], errors="coerce").to_numpy(dtype=float))
+    result = frame.assign(assigned_zcta=pd.array(np.where(assigned == NO_ZIP, None, assigned), dtype="Int64"))
+    if zip_column is not None:
+        result["zip_mismatch"] = (assigned != NO_ZIP) & (zip_index(frame[zip_column]) != assigned)
+    return result
+
+
+def summarize(result: pd.DataFrame) -> Dict[str, int]:
+    """Row, assigned, unassigned & mismatch counts of an `assign_zctas()` result"""
+    assigned = int(result["assigned_zcta"].notna().sum())
+    summary = {"rows": len(result), "assigned": assigned, "unassigned": len(result) - assigned}
+    if "zip_mismatch" in result:
+        summary["zip_mismatch"] = int(result["zip_mismatch"].sum())
+    return summary
+
+
+def read_points(path: str, columns: Tuple[str, ...]) -> pd.DataFrame:
+    """CSV or Parquet file of coordinates - zips are read as strings to keep leading zeros"""
+    if Path(path).suffix.lower() == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype={column: str for column in columns})
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Assign ZCTAs to geocoded addresses by point-in-polygon, flagging rows whose reported zip disagrees."
+    )
+    parser.add_argument(
+        "-i", "--input",
+        required=True,
+        help="CSV or Parquet file with longitude / latitude columns"
+    )
+    parser.add_argument(
+        "-o", "--output",
+        required=True,
+        help="Output file (.csv or .parquet) - the input with assigned_zcta & zip_mismatch columns"
+    )
+    parser.add_argument(
+        "-s", "--shapefile",
+        default=zcta_geometry.SHAPEFILE,
+        help=f"ZCTA shapefile the geometry cache is built from, by default {zcta_geometry.SHAPEFILE}"
+    )
+    parser.add_argument("--longitude", default="longitude", help="Longitude column, by default longitude")
+    parser.add_argument("--latitude", default="latitude", help="Latitude column, by default latitude")
+    parser.add_argument("--zip-column", default="zip_code", help="Reported zip column, by default zip_code ('' for none)")
+
+    args = parser.parse_args()
+    zip_column = args.zip_column or None
+    try:
+        points = read_points(args.input, (zip_column,) if zip_column else ())
+        index = ZctaIndex.load(args.shapefile)
+        result = assign_zctas(points, index, args.longitude, args.latitude, zip_column)
+    except (FileNotFoundError, KeyError) as error:
+        sys.exit(f"zcta_assign: {error}")
+    if Path(args.output).suffix.lower() == ".parquet":
+        result.to_parquet(args.output, index=False)
+    else:
+        result.to_csv(args.output, index=False)
+    print(", ".join(f"{name}: {count:,}" for name, count in summarize(result).items()))
@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from score_lookup import NO_ZIP, ZIP_SPACE, zip_index
+
+SHAPEFILE = "./tl_2020_us_zcta520.shp"
+ZCTA_COLUMN = "ZCTA5CE20"
+TOLERANCES = (0.001, 0.01, 0.05) ## Degrees (NAD83) - ~100m for a county, ~1km for a state, ~5km for the country
+FULL_RESOLUTION = 0.0 ## Tolerance of the unsimplified layer, e.g. for point-in-polygon tests
+DEFAULT_TOLERANCE = 0.01
+BBOX_COLUMNS = ["minx", "miny", "maxx", "maxy"]
+ROW_GROUP_SIZE = 2_048
+FORMAT_VERSION = 1
+
+
+def cache_dir(shapefile: str = SHAPEFILE) -> Path:
+    """Cache kept next to the shapefile, e.g. `tl_2020_us_zcta520.shp` -> `tl_2020_us_zcta520.shp.geometry/`"""
+    shapefile = Path(shapefile)
+    return shapefile.with_name(shapefile.name + ".geometry")
+
+
+def layer_path(directory: Path, tolerance: float) -> Path:
+    return directory / f"zcta-{tolerance:g}.parquet"
+
+
+def source_token(shapefile: str) -> Dict[str, List[int]]:
+    """Size & modification time of the shapefile's geometry (`.shp`) and attribute (`.dbf`) files"""
+    token = {}
+    for suffix in (".shp", ".dbf"):
+        path = Path(shapefile).with_suffix(suffix)
+        if path.exists():
+            stat = path.stat()
+            token[suffix] = [stat.st_size, stat.st_mtime_ns]
+    return token
+
+
+def read_manifest(directory: Path) -> dict:
+    try:
+        with open(directory / "manifest.json") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get("version") == FORMAT_VERSION else {}
+
+
+def build(shapefile: str = SHAPEFILE, tolerances: Iterable[float] = TOLERANCES) -> Path:
+    """
+    Read the shapefile once and write one GeoParquet layer per simplification tolerance
+
+    Every layer holds `zcta` (int), the full-resolution bounding box (`BBOX_COLUMNS`) and the
+    simplified `geometry`, sorted by zcta. Zips are handed out by region, so zcta order keeps row
+    groups spatially compact and bounding-box filters skip most of them. The manifest is written
+    last - an interrupted build leaves the cache stale, not half valid.
+
+    Parameters
+    ----------
+    shapefile : str, optional
+        ZCTA shapefile, by default `SHAPEFILE`
+    tolerances : Iterable[float], optional
+        Douglas-Peucker tolerances in the shapefile's units (degrees), by default `TOLERANCES`.
+        `FULL_RESOLUTION` keeps the original polygons
+
+    Returns
+    -------
+    Path
+        The cache directory
+    """
+    if not Path(shapefile).exists():
+        raise FileNotFoundError(f"ZCTA shapefile not found: {shapefile}")
+    source = gpd.read_file(shapefile, columns=[ZCTA_COLUMN])
+    zcta = zip_index(source[ZCTA_COLUMN])
+    source = source.assign(zcta=zcta)[zcta != NO_ZIP].sort_values("zcta", kind="stable")
+    source = source[~source.geometry.is_empty & source.geometry.notna()]
+    bounds = source.geometry.bounds.to_numpy()
+
+    directory = cache_dir(shapefile)
+    directory.mkdir(exist_ok=True)
+    tolerances = sorted({float(tolerance) for tolerance in tolerances})
+    for tolerance in tolerances:
+        ## Neighbours are simplified independently - slivers along shared edges stay below `tolerance`
+        geometry = source.geometry.to_numpy()
+        if tolerance != FULL_RESOLUTION:
+            geometry = shapely.simplify(geometry, tolerance, preserve_topology=True)
+        layer = gpd.GeoDataFrame({"zcta": source["zcta"].to_numpy(dtype=np.int32),
+                                  **{name: bounds[:, i] for i, name in enumerate(BBOX_COLUMNS)}},
+                                 geometry=geometry, crs=source.crs)
+        path = layer_path(directory, tolerance)
+        layer.to_parquet(f"{path}.tmp", index=False, row_group_size=ROW_GROUP_SIZE)
+        os.replace(f"{path}.tmp", path)
+
+    manifest = {"version": FORMAT_VERSION, "source": source_token(shapefile), "tolerances": tolerances,
+                "zctas": len(source), "crs": source.crs.to_string() if source.crs else None}
+    with open(directory / "manifest.json.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(directory / "manifest.json.tmp", directory / "manifest.json")
+    return directory
+
+
+def ensure(shapefile: str = SHAPEFILE, tolerances: Sequence[float] = (DEFAULT_TOLERANCE,)) -> Path:
+    """Cache directory holding `tolerances` - (re)built only when missing, stale or lacking a tolerance"""
+    directory = cache_dir(shapefile)
+    manifest = read_manifest(directory)
+    cached = manifest.get("tolerances", [])
+    if Path(shapefile).exists() and manifest.get("source") != json.loads(json.dumps(source_token(shapefile))):
+        return build(shapefile, set(cached) | set(TOLERANCES) | set(tolerances))
+    missing = {float(tolerance) for tolerance in tolerances} - set(cached)
+    if missing:
+        if not Path(shapefile).exists():
+            raise FileNotFoundError(f"ZCTA shapefile not found: {shapefile} (cached tolerances: {cached})")
+        return build(shapefile, set(cached) | missing)
+    return directory
+
+
+_CACHE: Dict[Tuple[str, str, float, Tuple[str, ...]], gpd.GeoDataFrame] = {} ## (cache dir, source, tolerance, columns) -> layer
+
+
+def load(tolerance: float = DEFAULT_TOLERANCE, shapefile: str = SHAPEFILE, columns: Optional[Sequence[str]] = None,
+         bbox: Optional[Tuple[float, float, float, float]] = None, zctas: Optional[Iterable] = None) -> gpd.GeoDataFrame:
+    """
+    ZCTA polygons simplified at `tolerance` - from the cache, built on first use
+
+    Only the requested columns are read. `bbox` (minx, miny, maxx, maxy) and `zctas` are pushed
+    down to the Parquet reader, so row groups outside them are never decoded. Unfiltered layers
+    are also kept in memory for the rest of the process (treat them as read-only).
+
+    Parameters
+    ----------
+    tolerance : float, optional
+        One of the cached tolerances, by default `DEFAULT_TOLERANCE`
+    shapefile : str, optional
+        ZCTA shapefile the cache was built from, by default `SHAPEFILE`
+    columns : Optional[Sequence[str]], optional
+        Columns besides `geometry` - `zcta` and/or `BBOX_COLUMNS`, by default `zcta` only
+    bbox : Optional[Tuple[float, float, float, float]], optional
+        Keep ZCTAs whose bounding box intersects this one, by default every ZCTA
+    zctas : Optional[Iterable], optional
+        Keep these ZCTAs only (ints or zip strings), by default every ZCTA
+
+    Returns
+    -------
+    gpd.GeoDataFrame
+        One row per ZCTA, in zcta order
+    """
+    directory = ensure(shapefile, (tolerance,))
+    columns = tuple(dict.fromkeys(columns or ["zcta"]))
+    unknown = set(columns) - {"zcta", "geometry", *BBOX_COLUMNS}
+    if unknown:
+        raise ValueError(f"Unknown ZCTA layer column(s): {sorted(unknown)}")
+    key = (str(directory.resolve()), json.dumps(read_manifest(directory).get("source")), float(tolerance), columns)
+    if bbox is None and zctas is None and key in _CACHE:
+        return _CACHE[key]
+
+    filters = []
+    if bbox is not None:
+        minx, miny, maxx, maxy = bbox
+        filters += [("maxx", ">=", minx), ("minx", "<=", maxx), ("maxy", ">=", miny), ("miny", "<=", maxy)]
+    if zctas is not None:
+        wanted = zip_index(pd.Series(list(zctas)))
+        filters.append(("zcta", "in", [int(z) for z in np.unique(wanted[wanted != NO_ZIP])]))
+    layer = gpd.read_parquet(layer_path(directory, float(tolerance)), columns=[*[c for c in columns if c != "geometry"], "geometry"],
+                             filters=filters or None)
+    if bbox is None and zctas is None:
+        _CACHE[key] = layer
+    return layer
+
+
+def choropleth_frame(zips: pd.Series, tolerance: float = DEFAULT_TOLERANCE, shapefile: str = SHAPEFILE,
+                     bbox: Optional[Tuple[float, float, float, float]] = None) -> gpd.GeoDataFrame:
+    """
+    ZCTA polygons with a `count` of `zips` per ZCTA - ready for `.plot(column="count")`
+
+    Replaces `zctas.merge(zipcode_counts, how="left", left_on="ZCTA5CE20", right_on="Zip")`: zips
+    are counted into a dense per-zip array and gathered by the layer's integer zcta. ZCTAs without
+    members get NaN, like the left merge, so they are left uncoloured.
+    """
+    index = zip_index(zips)
+    counts = np.bincount(index[index != NO_ZIP], minlength=ZIP_SPACE).astype(float)
+    counts[counts == 0] = np.nan
+    layer = load(tolerance, shapefile, bbox=bbox)
+    return layer.assign(count=counts[layer["zcta"].to_numpy()])
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Build the simplified ZCTA geometry cache next to the Census ZCTA shapefile."
+    )
+    parser.add_argument(
+        "-s", "--shapefile",
+        default=SHAPEFILE,
+        help=f"Path to the ZCTA shapefile, by default {SHAPEFILE}"
+    )
+    parser.add_argument(
+        "-t", "--tolerance",
+        type=float,
+        nargs="+",
+        default=list(TOLERANCES),
+        help=f"Simplification tolerances in degrees, by default {' '.join(map(str, TOLERANCES))}"
+    )
+    args = parser.parse_args()
+    try:
+        directory = build(args.shapefile, args.tolerance)
+    except FileNotFoundError as error:
+        sys.exit(f"zcta_geometry: {error}")
+    for tolerance in sorted(set(args.tolerance)):
+        path = layer_path(directory, tolerance)
+        print(f"{path}  {path.stat().st_size / 2**20:,.1f} MiB")
@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from score_lookup import KEY_COLUMN, NO_ZIP, SCORE_TABLE, ZIP_SPACE, zip_index
+from sql_engine import quote
+
+BITMAP_SUFFIX = ".zip-bitmap"
+SCORES_SOURCE = "scores" ## `--valid-zips` without a path: the target database's `SCORE_TABLE`
+FORMAT_VERSION = 1
+
+
+class ZipBitmap:
+    """
+    The valid 5-digit zips (ZCTAs) as a `ZIP_SPACE`-bit bitmap - a zip exists iff its bit is set
+
+    On disk the bits are packed into 12.5 kB; in memory they are kept unpacked (100 kB of bools,
+    plus a trailing False slot for `NO_ZIP`), so checking a column is one `zip_index()` and one
+    gather, with no join.
+    """
+
+    def __init__(self, present: np.ndarray, source: str = "", token: Optional[dict] = None):
+        self.present = np.zeros(ZIP_SPACE + 1, dtype=bool)
+        self.present[:ZIP_SPACE] = present[:ZIP_SPACE]
+        self.source = source
+        self.token = token or {}
+
+    def __len__(self) -> int:
+        return int(self.present.sum())
+
+    @classmethod
+    def from_zips(cls, zips: pd.Series, source: str = "") -> "ZipBitmap":
+        """Bitmap of every valid zip in `zips` - strings, ZIP+4 or integers"""
+        index = zip_index(pd.Series(zips))
+        present = np.zeros(ZIP_SPACE, dtype=bool)
+        present[index[index != NO_ZIP]] = True
+        return cls(present, source=source)
+
+    @classmethod
+    def from_shapefile(cls, shapefile: Optional[str] = None) -> "ZipBitmap":
+        """Bitmap of the ZCTAs in the Census shapefile - reads the attribute table only, no geometry"""
+        import geopandas as gpd
+        import zcta_geometry
+
+        shapefile = shapefile or zcta_geometry.SHAPEFILE
+        if not Path(shapefile).exists():
+            raise FileNotFoundError(f"ZCTA shapefile not found: {shapefile}")
+        zctas = gpd.read_file(shapefile, columns=[zcta_geometry.ZCTA_COLUMN], ignore_geometry=True)
+        return cls.from_zips(zctas[zcta_geometry.ZCTA_COLUMN], source=str(shapefile))
+
+    @classmethod
+    def from_scores(cls, conn: sqlite3.Connection) -> "ZipBitmap":
+        """Bitmap of the zips scored in `SCORE_TABLE`"""
+        zctas = pd.read_sql_query(f"SELECT {quote(KEY_COLUMN)} FROM {quote(SCORE_TABLE)};", conn)
+        return cls.from_zips(zctas[KEY_COLUMN], source=SCORE_TABLE)
+
+    def save(self, path: str) -> None:
+        """Write the packed bitmap to `path` atomically"""
+        header = {"version": FORMAT_VERSION, "source": self.source, "token": self.token, "zips": len(self)}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, bits=np.packbits(self.present[:ZIP_SPACE], bitorder="little"),
+                                header=np.array(json.dumps(header)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ZipBitmap":
+        with np.load(path) as data:
+            header = json.loads(str(data["header"]))
+            if header.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported zip bitmap file version: {header.get('version')}")
+            present = np.unpackbits(data["bits"], count=ZIP_SPACE, bitorder="little").astype(bool)
+        return cls(present, source=header.get("source", ""), token=header.get("token"))
+
+    def contains(self, zips: pd.Series) -> np.ndarray:
+        """Per value: is it a valid zip with its bit set (missing & malformed values are False)"""
+        return self.present[zip_index(pd.Series(zips))]
+
+
+def open_bitmap(source: str, conn: Optional[sqlite3.Connection] = None) -> ZipBitmap:
+    """
+    Zip bitmap from a shapefile, a database or a saved bitmap
+
+    Parameters
+    ----------
+    source : str
+        * `SCORES_SOURCE` - `SCORE_TABLE` of `conn`
+        * `*.shp` - the shapefile's ZCTAs; the bitmap is cached next to it (`<shapefile>.zip-bitmap`)
+          and rebuilt when the shapefile changes
+        * `*.db` - `SCORE_TABLE` of that database
+        * anything else - a bitmap written by `ZipBitmap.save()`
+    conn : Optional[sqlite3.Connection], optional
+        Target database, required for `SCORES_SOURCE`
+
+    Returns
+    -------
+    ZipBitmap
+        The valid zips
+    """
+    if source == SCORES_SOURCE:
+        if conn is None:
+            raise ValueError(f"A database connection is required for the `{SCORES_SOURCE}` zip source")
+        return ZipBitmap.from_scores(conn)
+    suffix = Path(source).suffix.lower()
+    if suffix == ".db":
+        if not Path(source).exists():
+            raise FileNotFoundError(f"Database not found: {source}")
+        with sqlite3.connect(source) as source_conn:
+            return ZipBitmap.from_scores(source_conn)
+    if suffix == ".shp":
+        import zcta_geometry
+
+        cached = Path(source).with_name(Path(source).name + BITMAP_SUFFIX)
+        token = json.loads(json.dumps(zcta_geometry.source_token(source)))
+        if cached.exists():
+            bitmap = ZipBitmap.load(str(cached))
+            if not Path(source).exists() or bitmap.token == token:
+                return bitmap
+        bitmap = ZipBitmap.from_shapefile(source)
+        bitmap.token = token
+        bitmap.save(str(cached))
+        return bitmap
+    return ZipBitmap.load(source)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Build the valid-zip bitmap used by `--valid-zips` from the ZCTA shapefile or model_scores_by_zip."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "-s", "--shapefile",
+        help="ZCTA shapefile, e.g. ./tl_2020_us_zcta520.shp"
+    )
+    source.add_argument(
+        "-db", "--database",
+        help="Database with a model_scores_by_zip table"
+    )
+    parser.add_argument(
+        "-o", "--output",
+        required=True,
+        help=f"Bitmap file to write, e.g. valid-zips{BITMAP_SUFFIX}"
+    )
+    args = parser.parse_args()
+    try:
+        bitmap = open_bitmap(args.shapefile or args.database)
+    except (FileNotFoundError, ValueError, pd.errors.DatabaseError) as error:
+        sys.exit(f"zip_bitmap: {error}")
+    bitmap.save(args.output)
+    print(f"{len(bitmap):,} valid zips written to {args.output} ({Path(args.output).stat().st_size:,} bytes)")